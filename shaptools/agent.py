@@ -0,0 +1,405 @@
+"""
+Persistent remote agent client
+
+AgentClient starts the agentserver module once per host (through ssh for remote hosts, or as a
+local subprocess) and sends the requests to it. The commands, file reads, file status checks
+and process lookups are executed by the same long-lived process, without new connections or
+processes for each operation.
+
+Example:
+    executor = agent.AgentExecutor()
+    hana_instance = hana.HanaInstance('prd', '00', 'pass', remote_host='hana02', executor=executor)
+    hana_instance.is_running()
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import inspect
+import itertools
+import json
+import logging
+import shlex
+import subprocess
+import sys
+import threading
+
+from shaptools import agentserver
+from shaptools import cmdstream
+from shaptools import executors
+from shaptools import shell
+
+LOGGER = logging.getLogger('agent')
+
+
+class AgentError(shell.ShellError):
+    """
+    Error in the agent communication or reported by the agent
+    """
+
+
+class StderrReader(object):
+    """
+    Thread which drains the agent stderr, logging the lines and keeping the last ones to
+    report them if the agent finishes
+
+    Args:
+        pipe (file): Agent stderr pipe
+        size (int, opt): Number of kept lines
+    """
+
+    # Maximum time waiting for the reader, in case other processes keep the pipe open
+    JOIN_TIMEOUT = 5
+
+    def __init__(self, pipe, size=20):
+        self._lines = collections.deque(maxlen=size)
+        self._thread = threading.Thread(target=self._read, args=(pipe,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _read(self, pipe):
+        """
+        Read the pipe until its end of file
+        """
+        for line in iter(pipe.readline, b''):
+            line = line.decode('utf-8', 'replace').rstrip('\n')
+            LOGGER.debug('agent stderr: %s', line)
+            self._lines.append(line)
+
+    def join(self):
+        """
+        Wait until the pipe is closed
+        """
+        self._thread.join(self.JOIN_TIMEOUT)
+
+    def tail(self):
+        """
+        Get the last read lines
+
+        Returns:
+            str: Last lines joined by new lines
+        """
+        return '\n'.join(self._lines).strip()
+
+
+class AgentClient(object):
+    # pylint:disable=R0902
+    """
+    Client of an agent process. The requests are serialized, so the same client can be used by
+    multiple threads
+
+    Args:
+        remote_host (str, opt): Host where the agent is started using ssh. The agent is
+            started as a local subprocess if it's not set
+        user (str, opt): User used in the ssh connection. The agent runs with this user and
+            uses `su` to run the commands of other users
+        python (str, opt): Python interpreter used to run the agent. python3 in remote hosts
+            and the current interpreter locally by default
+        ssh_options (str, opt): Additional ssh command line options
+    """
+
+    # The first stdin line is the agent source code size, followed by the code itself
+    BOOTSTRAP = 'import sys; size = int(sys.stdin.readline()); '\
+        'exec(compile(sys.stdin.read(size), "agentserver", "exec"))'
+
+    def __init__(self, remote_host=None, user='root', python=None, ssh_options=None):
+        self.remote_host = remote_host
+        self.user = user
+        self.python = python or ('python3' if remote_host else sys.executable)
+        self.ssh_options = ssh_options
+        self._proc = None
+        self._stderr = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _args(self):
+        """
+        Get the agent process arguments
+        """
+        if not self.remote_host:
+            return [self.python, '-u', '-c', self.BOOTSTRAP]
+        args = ['ssh']
+        if self.ssh_options:
+            args.extend(shlex.split(self.ssh_options))
+        args.append('{}@{}'.format(self.user, self.remote_host))
+        args.append("{} -u -c '{}'".format(self.python, self.BOOTSTRAP))
+        return args
+
+    def is_alive(self):
+        """
+        Check if the agent process is running
+
+        Returns:
+            bool: True if running, False otherwise
+        """
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """
+        Start the agent process sending its source code
+        """
+        LOGGER.debug('Starting agent in host %s', self.remote_host or 'localhost')
+        source = inspect.getsource(agentserver)
+        self._proc = subprocess.Popen(
+            self._args(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        # stderr is drained all the time, so ssh warnings or tracebacks never fill the pipe
+        self._stderr = StderrReader(self._proc.stderr)
+        try:
+            self._proc.stdin.write('{}\n{}'.format(len(source), source).encode())
+            self._proc.stdin.flush()
+        except (IOError, OSError):
+            # The agent finished before reading its code, so the error is read later
+            pass
+
+    def _read_response(self, request_id, callback):
+        """
+        Read the messages of the agent until the request response is received
+        """
+        while True:
+            line = self._proc.stdout.readline()
+            if not line:
+                stderr = self._stderr
+                self.close()
+                raise AgentError('agent finished unexpectedly: {}'.format(stderr.tail()))
+            message = json.loads(line.decode('utf-8'))
+            if message.get('id', None) != request_id:
+                LOGGER.warning('unexpected agent message: %s', message)
+            elif 'event' in message:
+                if callback:
+                    callback(message['stream'], message['line'])
+            else:
+                return message
+
+    def request(self, operation, callback=None, **params):
+        """
+        Send a request to the agent and wait for its response. The agent is started if it's
+        not running
+
+        Args:
+            operation (str): Requested operation (run, read, stat, scandir, pidof, ping)
+            callback (callable, opt): Function called with the stream name and line of each
+                output line event
+            params (opt): Request parameters
+
+        Returns:
+            dict: Request result
+
+        Raises:
+            OSError: If the operation fails with a system error in the agent
+            AgentError: If the agent fails or reports any other error
+        """
+        with self._lock:
+            if not self.is_alive():
+                if self._proc is not None:
+                    self.close()
+                self.start()
+            request_id = next(self._ids)
+            params.update({'id': request_id, 'op': operation})
+            try:
+                self._proc.stdin.write((json.dumps(params) + '\n').encode())
+                self._proc.stdin.flush()
+            except (IOError, OSError):
+                # The agent finished after the liveness check, so the error is read below
+                pass
+            response = self._read_response(request_id, callback)
+
+        if response['ok']:
+            return response['result']
+        if response.get('type', None) == 'OSError':
+            raise OSError(response['errno'], response['error'], response['filename'])
+        if response.get('type', None) == 'timeout':
+            raise shell.ShellTimeoutError(params.get('cmd', None), params.get('timeout', None))
+        raise AgentError(response['error'])
+
+    def run(self, cmd, user=None, timeout=None, callback=None):
+        """
+        Run a command in the agent host. The commands of other users or remote hosts are
+        unwrapped as `su -lc` and ssh do in shell.execute_cmd
+
+        Args:
+            cmd (str): Command to be executed
+            user (str, opt): User to execute the command
+            timeout (float, opt): Timeout in seconds, with the same behaviour as in
+                shell.execute_cmd
+            callback (callable, opt): Function called with the stream name and line for every
+                output line while the command is running
+
+        Returns:
+            ProcessResult: ProcessResult instance storing the command returncode,
+                stdout and stderr
+        """
+        def _run():
+            params = {
+                'cmd': shell.unwrap_cmd(cmd) if user or self.remote_host else cmd,
+                'user': user,
+                'stream': callback is not None
+            }
+            run_timeout = shell.get_timeout(timeout)
+            if run_timeout is not None:
+                params['timeout'] = run_timeout
+            try:
+                result = self.request('run', callback=callback, **params)
+            except shell.ShellTimeoutError:
+                raise shell.ShellTimeoutError(cmd, run_timeout)  # pylint:disable=W0707
+            return shell.ProcessResult(
+                cmd, result['returncode'], result['stdout'].encode('utf-8'),
+                result['stderr'].encode('utf-8'))
+
+        return shell.instrument(cmd, user, self.remote_host, _run)
+
+    def read_file(self, path):
+        """
+        Read a file
+
+        Returns:
+            str: File content
+        """
+        return self.request('read', path=path)['content']
+
+    def stat(self, path):
+        """
+        Get a file status
+
+        Returns:
+            dict: mode, size, mtime, uid, gid, is_file and is_dir values
+        """
+        return self.request('stat', path=path)
+
+    def exists(self, path):
+        """
+        Check if a path exists
+
+        Returns:
+            bool: True if it exists, False otherwise
+        """
+        try:
+            self.stat(path)
+            return True
+        except OSError:
+            return False
+
+    def scandir(self, path):
+        """
+        Get the entries of a folder
+
+        Returns:
+            list: Entries as dictionaries with the name, is_file, is_dir and is_link values
+        """
+        return self.request('scandir', path=path)['entries']
+
+    def pidof(self, name):
+        """
+        Find the processes by name
+
+        Returns:
+            list: Process ids
+        """
+        return self.request('pidof', name=name)['pids']
+
+    def ping(self):
+        """
+        Check the agent
+
+        Returns:
+            dict: Agent protocol version, process id and python version
+        """
+        return self.request('ping')
+
+    def close(self):
+        """
+        Stop the agent process
+        """
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            try:
+                self._proc.stdin.write((json.dumps({'op': 'exit'}) + '\n').encode())
+                self._proc.stdin.close()
+            except (IOError, OSError):
+                pass
+            try:
+                self._proc.wait()
+            except OSError:
+                pass
+        self._stderr.join()
+        for pipe in (self._proc.stdout, self._proc.stderr):
+            pipe.close()
+        self._proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AgentExecutor(executors.Executor):
+    """
+    Executor which runs the commands through one agent per host. The password is not used, as
+    the agent runs the commands of other users with `su`
+
+    Args:
+        user (str, opt): User used in the ssh connections
+        python (str, opt): Python interpreter used to run the remote agents
+        ssh_options (str, opt): Additional ssh command line options
+    """
+
+    def __init__(self, user='root', python=None, ssh_options=None):
+        self.user = user
+        self.python = python
+        self.ssh_options = ssh_options
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get_client(self, remote_host=None):
+        """
+        Get the agent client of a host
+
+        Args:
+            remote_host (str, opt): Agent host. None for the local agent
+
+        Returns:
+            AgentClient: Agent client
+        """
+        with self._lock:
+            client = self._clients.get(remote_host, None)
+            if client is None:
+                client = AgentClient(
+                    remote_host, self.user, python=self.python, ssh_options=self.ssh_options)
+                self._clients[remote_host] = client
+            return client
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        return self.get_client(remote_host).run(cmd, user, timeout)
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        return self.get_client(remote_host).run(
+            cmd, user, kwargs.get('timeout', None),
+            callback=kwargs.get('callback', None) or cmdstream.bounded_line_logger())
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+
+
+def get_client(executor, remote_host=None):
+    """
+    Get the agent client of a host if the executor uses agents
+
+    Args:
+        executor (executors.Executor): Executor
+        remote_host (str, opt): Agent host. None for the local agent
+
+    Returns:
+        AgentClient: Agent client. None if the executor doesn't use agents
+    """
+    if isinstance(executor, AgentExecutor):
+        return executor.get_client(remote_host)
+    return None
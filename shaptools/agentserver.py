@@ -0,0 +1,319 @@
+"""
+Remote agent server
+
+Persistent process which executes the requests received through its stdin, one JSON document
+per line, and writes the responses to its stdout with the same format. It's started once per
+host by agent.AgentClient, so running commands, reading files or checking processes doesn't
+need a new ssh connection and login shell every time.
+
+INFO: This module only uses the python standard library and it doesn't import any shaptools
+module, as its source code is sent to the remote hosts where shaptools is not installed
+
+Requests:
+    {"id": 1, "op": "run", "cmd": "HDB info", "user": "prdadm", "timeout": 10, "stream": false}
+    {"id": 2, "op": "read", "path": "/etc/hosts"}
+    {"id": 3, "op": "stat", "path": "/usr/sap"}
+    {"id": 4, "op": "scandir", "path": "/usr/sap"}
+    {"id": 5, "op": "pidof", "name": "hdb.sapPRD_HDB00"}
+    {"id": 6, "op": "ping"}
+    {"id": 7, "op": "exit"}
+
+Responses:
+    {"id": 1, "ok": true, "result": {...}}
+    {"id": 1, "ok": false, "error": "message", "type": "OSError", "errno": 2, "filename": "path"}
+    {"id": 1, "event": "line", "stream": "stdout", "line": "text"} (run requests with stream)
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import json
+import os
+import pwd
+import select
+import signal
+import stat
+import subprocess
+import sys
+import time
+
+PROTOCOL_VERSION = 1
+READ_SIZE = 65536
+
+
+class RequestError(Exception):
+    """
+    Error reported to the client
+
+    Args:
+        message (str): Error message
+        error_type (str): Error type identifier
+    """
+
+    def __init__(self, message, error_type='error'):
+        super(RequestError, self).__init__(message)
+        self.error_type = error_type
+
+
+def _decode(data):
+    """
+    Decode process output
+    """
+    return data.decode('utf-8', 'replace')
+
+
+def _kill_process_group(proc):
+    """
+    Kill the process group of a timed out command
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    proc.wait()
+
+
+def _run_args(cmd, user):
+    """
+    Get the process arguments to run the command. su is only used if the command must be
+    executed by other user
+    """
+    if user and user != pwd.getpwuid(os.geteuid()).pw_name:
+        return ['su', '-lc', cmd, user]
+    return ['/bin/sh', '-c', cmd]
+
+
+def run(request, send_event):
+    """
+    Run a command, sending the output lines as events if stream is requested
+    """
+    timeout = request.get('timeout', None)
+    stream = request.get('stream', False)
+    with open(os.devnull, 'rb') as devnull:
+        proc = subprocess.Popen(
+            _run_args(request['cmd'], request.get('user', None)),
+            stdin=devnull, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            preexec_fn=os.setsid)
+
+    stdout_fd = proc.stdout.fileno()
+    stderr_fd = proc.stderr.fileno()
+    streams = {stdout_fd: 'stdout', stderr_fd: 'stderr'}
+    chunks = dict((file_d, []) for file_d in streams)
+    partial = dict((file_d, b'') for file_d in streams)
+    pending = list(streams)
+    limit = time.time() + timeout if timeout is not None else None
+    while pending:
+        wait = None if limit is None else max(limit - time.time(), 0)
+        ready = select.select(pending, [], [], wait)[0]
+        if not ready:
+            _kill_process_group(proc)
+            proc.stdout.close()
+            proc.stderr.close()
+            raise RequestError(
+                'command timed out after {} seconds'.format(timeout), 'timeout')
+        for file_d in ready:
+            chunk = os.read(file_d, READ_SIZE)
+            if not chunk:
+                pending.remove(file_d)
+                continue
+            chunks[file_d].append(chunk)
+            if stream:
+                lines = (partial[file_d] + chunk).split(b'\n')
+                partial[file_d] = lines.pop()
+                for line in lines:
+                    send_event(streams[file_d], _decode(line))
+    proc.wait()
+    proc.stdout.close()
+    proc.stderr.close()
+
+    if stream:
+        for file_d, line in partial.items():
+            if line:
+                send_event(streams[file_d], _decode(line))
+    return {
+        'returncode': proc.returncode,
+        'stdout': _decode(b''.join(chunks[stdout_fd])),
+        'stderr': _decode(b''.join(chunks[stderr_fd]))
+    }
+
+
+def read(request, send_event):
+    """
+    Read a file content
+    """
+    # pylint:disable=W0613
+    with open(request['path'], 'rb') as file_ptr:
+        return {'content': _decode(file_ptr.read())}
+
+
+def _stat_data(path):
+    """
+    Get the data of a file status
+    """
+    file_stat = os.stat(path)
+    return {
+        'mode': file_stat.st_mode,
+        'size': file_stat.st_size,
+        'mtime': file_stat.st_mtime,
+        'uid': file_stat.st_uid,
+        'gid': file_stat.st_gid,
+        'is_file': stat.S_ISREG(file_stat.st_mode),
+        'is_dir': stat.S_ISDIR(file_stat.st_mode)
+    }
+
+
+def stat_path(request, send_event):
+    """
+    Get a file status. The symbolic links are followed
+    """
+    # pylint:disable=W0613
+    return _stat_data(request['path'])
+
+
+def scandir(request, send_event):
+    """
+    Get the entries of a folder
+    """
+    # pylint:disable=W0613
+    entries = []
+    for name in sorted(os.listdir(request['path'])):
+        path = os.path.join(request['path'], name)
+        try:
+            entry = _stat_data(path)
+        except OSError:
+            # Broken symbolic link
+            entry = {'is_file': False, 'is_dir': False}
+        entry['name'] = name
+        entry['is_link'] = os.path.islink(path)
+        entries.append(entry)
+    return {'entries': entries}
+
+
+def pidof(request, send_event):
+    """
+    Find the processes by name, as the pidof command does, reading the /proc entries
+    """
+    # pylint:disable=W0613
+    name = request['name']
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/cmdline'.format(entry), 'rb') as file_ptr:
+                executable = file_ptr.read().split(b'\0')[0]
+            with open('/proc/{}/comm'.format(entry), 'rb') as file_ptr:
+                comm = file_ptr.read().strip()
+        except (IOError, OSError):
+            # The process finished while it was checked
+            continue
+        if _decode(os.path.basename(executable)) == name or _decode(comm) == name:
+            pids.append(int(entry))
+    return {'pids': sorted(pids)}
+
+
+def ping(request, send_event):
+    """
+    Get the agent data
+    """
+    # pylint:disable=W0613
+    return {
+        'version': PROTOCOL_VERSION,
+        'pid': os.getpid(),
+        'python': '.'.join(str(item) for item in sys.version_info[:3])
+    }
+
+
+OPERATIONS = {
+    'run': run,
+    'read': read,
+    'stat': stat_path,
+    'scandir': scandir,
+    'pidof': pidof,
+    'ping': ping
+}
+
+
+def _send(output, message):
+    """
+    Write a message in the output
+    """
+    output.write(json.dumps(message) + '\n')
+    output.flush()
+
+
+def handle(request, output):
+    """
+    Execute a request and send its response
+
+    Returns:
+        bool: False if the agent must finish, True otherwise
+    """
+    request_id = request.get('id', None)
+    operation = request.get('op', None)
+    if operation == 'exit':
+        _send(output, {'id': request_id, 'ok': True, 'result': {}})
+        return False
+
+    def _send_event(stream, line):
+        _send(output, {'id': request_id, 'event': 'line', 'stream': stream, 'line': line})
+
+    try:
+        if operation not in OPERATIONS:
+            raise RequestError('unknown operation: {}'.format(operation))
+        result = OPERATIONS[operation](request, _send_event)
+        response = {'id': request_id, 'ok': True, 'result': result}
+    except RequestError as err:
+        response = {'id': request_id, 'ok': False, 'error': str(err), 'type': err.error_type}
+    except (IOError, OSError) as err:
+        response = {
+            'id': request_id, 'ok': False, 'error': err.strerror or str(err), 'type': 'OSError',
+            'errno': err.errno, 'filename': getattr(err, 'filename', None)
+        }
+    except KeyError as err:
+        response = {
+            'id': request_id, 'ok': False, 'error': 'missing parameter: {}'.format(err),
+            'type': 'error'
+        }
+    _send(output, response)
+    return True
+
+
+def serve(input_stream, output):
+    """
+    Execute the requests until the input is closed or an exit request is received
+
+    Args:
+        input_stream (file): Requests input
+        output (file): Responses output
+    """
+    while True:
+        line = input_stream.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            _send(output, {'id': None, 'ok': False, 'error': 'invalid request', 'type': 'error'})
+            continue
+        if not handle(request, output):
+            return
+
+
+def main():
+    """
+    Start the agent using the process stdin and stdout. The stdout file descriptor is moved, so
+    nothing else can write in the responses channel
+    """
+    output = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+    serve(sys.stdin, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+asyncio based execution API. It allows to drive many SAP instances from the same event loop
+without using threads.
+
+The thread deadline set with shell.deadline is not used by the asynchronous commands, as all
+the tasks share the event loop thread. The deadline is provided to every call instead.
+
+INFO: This module is only available for python 3.5 or newer versions
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import asyncio
+import logging
+import os
+import shlex
+import signal
+
+import time
+
+from shaptools import shell
+from shaptools import executors
+from shaptools import hana
+from shaptools import netweaver
+
+LOGGER = logging.getLogger('aio')
+
+
+async def _kill_process_group(proc):
+    """
+    Kill the process group of a timed out process, sending SIGTERM first and SIGKILL after the
+    grace period
+    """
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError:
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), shell.KILL_GRACE_PERIOD)
+            return
+        except asyncio.TimeoutError:
+            continue
+
+
+async def _instrument_async(cmd, user, remote_host, execute):
+    """
+    Run a command execution coroutine notifying the registered hooks. See shell.instrument
+    """
+    # pylint:disable=W0212
+    if not shell.HOOKS:
+        return await execute()
+    event = shell.CommandEvent(cmd, user, remote_host, shell.get_operation())
+    shell._notify_hooks('on_start', event)
+    try:
+        result = await execute()
+    except Exception as err:
+        event.duration = time.time() - event.start_time
+        event.error = err
+        shell._notify_hooks('on_error', event)
+        raise
+    event.duration = time.time() - event.start_time
+    event.returncode = result.returncode
+    event.output_size = result.output_size
+    shell._notify_hooks('on_end', event)
+    return result
+
+
+async def execute_cmd_async(
+        cmd, user=None, password=None, remote_host=None, timeout=None, deadline=None):
+    """
+    Execute a shell command asynchronously. If user and password are provided it will be
+    executed with this user. It has the same behaviour as shell.execute_cmd, and the registered
+    command hooks are notified
+
+    Args:
+        cmd (str): Command to be executed
+        user (str, opt): User to execute the command
+        password (str, opt): User password
+        remote_host (str, opt): Remote host where the command will be executed
+        timeout (float, opt): Timeout in seconds. The whole process group is killed when it
+            expires. shell.DEFAULT_TIMEOUT is applied if it's not set
+        deadline (float, opt): Deadline of the call as epoch time. The thread deadline is
+            not used
+
+    Returns:
+        ProcessResult: ProcessResult instance storing subprocess returncode,
+            stdout and stderr
+
+    Raises:
+        ShellTimeoutError: If the command or the deadline times out
+    """
+    return await _instrument_async(
+        cmd, user, remote_host,
+        lambda: _execute_cmd_async(cmd, user, password, remote_host, timeout, deadline))
+
+
+async def _execute_cmd_async(cmd, user, password, remote_host, timeout, deadline):
+    """
+    Execute a shell command asynchronously. See execute_cmd_async
+    """
+
+    LOGGER.debug('Executing command "%s" with user %s', cmd, user)
+    timeout = shell.remaining_timeout(timeout, deadline)
+
+    if remote_host or user:
+        cmd = shell.format_cmd(cmd, user, remote_host)
+        LOGGER.debug('Command updated to "%s"', cmd)
+
+    popen_kwargs = {}
+    if timeout is not None:
+        popen_kwargs['start_new_session'] = True
+    proc = await asyncio.create_subprocess_exec(
+        *shlex.split(cmd),
+        stdout=asyncio.subprocess.PIPE, stdin=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, **popen_kwargs)
+
+    if password:
+        password = password.encode()
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(input=password), timeout)
+    except asyncio.TimeoutError as err:
+        await _kill_process_group(proc)
+        raise shell.ShellTimeoutError(cmd, timeout) from err
+
+    result = shell.ProcessResult(cmd, proc.returncode, out, err)
+    shell.log_command_results(out, err)
+
+    return result
+
+
+def _runs_in_subprocess(instance):
+    """
+    Check if the instance commands can be run with asyncio subprocesses. The shell sessions,
+    sidadm environments and custom executors are synchronous, so they run in a worker thread
+    """
+    return not (instance.shell_session or instance.sidadm_env) and \
+        isinstance(instance.executor, executors.ShellExecutor)
+
+
+class AsyncHanaInstance(hana.HanaInstance):
+    """
+    SAP HANA instance with asynchronous read operations. The synchronous methods are still
+    available. The asynchronous methods honor the command_timeout, cache, shell_session,
+    sidadm_env and executor options. The commands of the default executor run in asyncio
+    subprocesses, and the rest in a worker thread
+
+    Args:
+        sid (str): SAP HANA sid to enable
+        inst (str): SAP HANA instance number
+        password (str): HANA instance password
+        remote_host (str, opt): Remote host where the command will be executed
+    """
+
+    async def _run_hana_command_async(self, cmd, exception=True):
+        """
+        Run hana command asynchronously
+
+        Args:
+            cmd (str): HANA command
+            exception (boolean): Raise HanaError non-zero return code (default true)
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode,
+                stdout and stderr
+        """
+        if not _runs_in_subprocess(self):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None, lambda: self._run_hana_command(cmd, exception=exception))
+
+        user = self.sidadm_user(self.sid)
+        result = self._cache_lookup(user, cmd)
+        if result is None:
+            result = await execute_cmd_async(
+                cmd, user, self._password, self.remote_host, timeout=self.command_timeout)
+            self._cache_store(user, cmd, result)
+
+        return self._check_result(result, exception)
+
+    async def is_running_async(self):
+        """
+        Check if SAP HANA daemon is running
+
+        Returns:
+            bool: True if running, False otherwise
+        """
+        result = await self._run_hana_command_async(self._is_running_cmd(), exception=False)
+        return not result.returncode
+
+    async def get_version_async(self):
+        """
+        Get SAP HANA version
+        """
+        result = await self._run_hana_command_async('HDB version')
+        return self._parse_version(result.output)
+
+    async def get_sr_state_async(self):
+        """
+        Get system replication state for the current node
+
+        Returns:
+            str: String between PRIMARY, SECONDARY and DISABLED
+        """
+        result = await self._run_hana_command_async('hdbnsutil -sr_state')
+        return self._parse_sr_state(result.output)
+
+
+class AsyncNetweaverInstance(netweaver.NetweaverInstance):
+    """
+    SAP Netweaver instance with asynchronous read operations. The synchronous methods are still
+    available. The asynchronous methods honor the command_timeout, cache, shell_session,
+    sidadm_env and executor options. The commands of the default executor run in asyncio
+    subprocesses, and the rest in a worker thread
+
+    Args:
+        sid (str): SAP Netweaver sid
+        inst (str): SAP Netweaver instance number
+        password (str): Netweaver instance password
+        remote_host (str, opt): Remote host where the command will be executed
+    """
+
+    async def _execute_sapcontrol_async(self, sapcontrol_function, **kwargs):
+        """
+        Execute sapcontrol commands asynchronously and return result
+
+        Args:
+            sapcontrol_function (str): sapcontrol function
+            exception (boolean): Raise NetweaverError non-zero return code (default true)
+            host (str, optional): Host where the command will be executed
+            inst (str, optional): Use a different instance number
+            user (str, optional): Define a different user for the command
+            password (str, optional): The new user password
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode,
+                stdout and stderr
+        """
+        if not _runs_in_subprocess(self):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None, lambda: self._execute_sapcontrol(sapcontrol_function, **kwargs))
+
+        exception = kwargs.get('exception', True)
+        cmd = self._sapcontrol_cmd(sapcontrol_function, **kwargs)
+        user = self.NETWEAVER_USER.format(sid=self.sid)
+
+        result = self._cache_lookup(user, cmd, sapcontrol_function)
+        if result is None:
+            result = await execute_cmd_async(
+                cmd, user, self._password, self.remote_host, timeout=self.command_timeout)
+            self._cache_store(user, cmd, sapcontrol_function, result)
+
+        return self._check_result(result, exception)
+
+    async def get_process_list_async(self, exception=True, **kwargs):
+        """
+        Get SAP processes list
+        """
+        kwargs['exception'] = False
+        result = await self._execute_sapcontrol_async('GetProcessList', **kwargs)
+        if exception and result.returncode not in self.GETPROCESSLIST_SUCCESS_CODES:
+            raise netweaver.NetweaverError(
+                'Error running sapcontrol command: {}'.format(result.cmd))
+        return result
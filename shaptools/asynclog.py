@@ -0,0 +1,208 @@
+"""
+Non blocking logging
+
+QueueHandler puts the log records in a bounded queue, and QueueListener writes them with the
+real handlers in a background thread, so the logging I/O doesn't block the threads running the
+commands. If the queue is full the records below WARNING are dropped instead of waiting, and
+the number of dropped records is logged at exit. The WARNING and higher records are never
+dropped, they wait until the queue has room.
+
+The logging.handlers equivalents are not used, as they are not available in python 2.
+
+Example:
+    listener = asynclog.setup_async_logging(logging.getLogger(), [logging.StreamHandler()])
+    ...
+    listener.stop()
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import atexit
+import copy
+import logging
+import threading
+
+# python2 and python3 compatibility for queue usage
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+# Maximum number of records waiting to be written
+DEFAULT_QUEUE_SIZE = 10000
+# Records with this level or higher wait for room in the queue instead of being dropped
+BLOCKING_LEVEL = logging.WARNING
+
+_SENTINEL = None
+
+# Active listeners by logger name, as (logger, listener, queue handler)
+_LISTENERS = {}
+_LISTENERS_LOCK = threading.Lock()
+
+
+class QueueHandler(logging.Handler):
+    """
+    Handler which puts the records in a queue. Only the WARNING and higher records block if the
+    queue is full
+
+    Args:
+        record_queue (queue.Queue): Queue where the records are put
+    """
+
+    def __init__(self, record_queue):
+        super(QueueHandler, self).__init__()
+        self.queue = record_queue
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        """
+        Merge the message arguments and the exception traceback in a copy of the record, so
+        the arguments can't be modified before the record is written and the traceback objects
+        are not kept in the queue
+        """
+        message = self.format(record)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def emit(self, record):
+        try:
+            if record.levelno >= BLOCKING_LEVEL:
+                self.queue.put(self.prepare(record))
+            else:
+                self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+        except Exception:  # pylint:disable=broad-except
+            self.handleError(record)
+
+
+class QueueListener(object):
+    """
+    Background thread which writes the queued records with the given handlers. The level of
+    every handler is respected
+
+    Args:
+        record_queue (queue.Queue): Queue where the records are read
+        handlers (list): Handlers used to write the records
+    """
+
+    def __init__(self, record_queue, handlers):
+        self.queue = record_queue
+        self.handlers = handlers
+        self._thread = None
+
+    def start(self):
+        """
+        Start the listener thread
+        """
+        self._thread = threading.Thread(target=self._monitor, name='shaptools-logging')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def handle(self, record):
+        """
+        Write a record with the handlers
+        """
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _monitor(self):
+        """
+        Write the records until the sentinel is received
+        """
+        while True:
+            record = self.queue.get()
+            if record is _SENTINEL:
+                return
+            self.handle(record)
+
+    def stop(self):
+        """
+        Write the pending records and stop the listener thread. The records logged after
+        stopping it are not written
+        """
+        if self._thread is None:
+            return
+        self.queue.put(_SENTINEL)
+        self._thread.join()
+        self._thread = None
+
+
+def _stop_listener(logger, listener, queue_handler):
+    """
+    Remove the queue handler from the logger and stop its listener. The number of dropped
+    records is reported with the listener handlers
+    """
+    logger.removeHandler(queue_handler)
+    listener.stop()
+    if queue_handler.dropped:
+        for handler in listener.handlers:
+            handler.handle(logging.makeLogRecord({
+                'name': logger.name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': '{} log records were dropped'.format(queue_handler.dropped)}))
+
+
+def setup_async_logging(logger=None, handlers=None, maxsize=DEFAULT_QUEUE_SIZE):
+    """
+    Make a logger non blocking. The handlers are moved to a listener thread and the logger
+    only puts the records in a queue. The listeners are stopped at exit.
+    Calling it again for the same logger stops the previous listener before starting the new one
+
+    Args:
+        logger (logging.Logger, opt): Logger to update. The root logger by default
+        handlers (list, opt): Handlers used to write the records. Only these handlers are
+            removed from the logger, the rest are kept. The current handlers of the logger
+            (or the handlers of the previous listener) by default
+        maxsize (int, opt): Maximum number of records waiting to be written
+
+    Returns:
+        QueueListener: Started listener
+    """
+    logger = logger or logging.getLogger()
+    with _LISTENERS_LOCK:
+        previous = _LISTENERS.pop(logger.name, None)
+        if previous is not None:
+            _stop_listener(*previous)
+            if handlers is None:
+                handlers = previous[1].handlers
+        if handlers is None:
+            handlers = list(logger.handlers)
+        for handler in handlers:
+            logger.removeHandler(handler)
+
+        record_queue = queue.Queue(maxsize)
+        queue_handler = QueueHandler(record_queue)
+        listener = QueueListener(record_queue, handlers)
+        logger.addHandler(queue_handler)
+        listener.start()
+        _LISTENERS[logger.name] = (logger, listener, queue_handler)
+    return listener
+
+
+def stop_async_logging():
+    """
+    Write the pending records and stop all the listeners, restoring the logger handlers.
+    Registered to run at exit
+    """
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS.values())
+        _LISTENERS.clear()
+    for logger, listener, queue_handler in listeners:
+        _stop_listener(logger, listener, queue_handler)
+        for handler in listener.handlers:
+            logger.addHandler(handler)
+
+
+atexit.register(stop_async_logging)
@@ -0,0 +1,242 @@
+"""
+Record and replay of command executions
+
+RecordingExecutor runs the commands and saves every (command, user, host) execution result
+(return code, stdout, stderr and duration) in a cassette file. ReplayExecutor serves the results
+stored in a cassette without running anything, so real sessions can be replayed offline.
+
+Both are executors, so they can be passed to the instances with the executor option, or
+replace shell.execute_cmd globally with patch_execute_cmd.
+
+The credentials embedded in the commands are masked before recording them: the hdbsql -p and
+the -u user,password options, the PASS and PASSWORD variables (ssh askpass), hdbuserstore set and
+sapcontrol -user. Only these positions are masked, the rest of the text is kept as it is. The
+password provided to the executor is sent to su through stdin, so it's never recorded. The
+replayed commands are masked in the same way to find them in the cassette.
+
+Example:
+    with cassette.RecordingExecutor('primary.json') as recorder:
+        hana_instance = hana.HanaInstance('prd', '00', 'pass', executor=recorder)
+        hana_instance.sr_enable_primary('site1')
+
+    with cassette.patch_execute_cmd(cassette.ReplayExecutor('primary.json')):
+        hana_instance.sr_enable_primary('site1')
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import contextlib
+import io
+import json
+import logging
+import re
+import threading
+import time
+
+from shaptools import shell
+from shaptools import executors
+
+LOGGER = logging.getLogger('cassette')
+CASSETTE_VERSION = 1
+MASK = '******'
+# Command fragments carrying credentials. The second group is replaced by the mask
+CREDENTIAL_PATTERNS = [
+    re.compile(r'(\bhdbsql\b[^;|&]*?\s-p\s+)(\S+)'),
+    re.compile(r'(\s-u\s+[^\s,]+,)(\S+)'),
+    re.compile(r'(\b(?:[A-Z]+_)*PASS(?:WORD)?=)([^;\s]+)'),
+    re.compile(r'(\bhdbuserstore\s+set\s+\S+\s+\S+\s+\S+\s+)(\S+)'),
+    re.compile(r'(\s-user\s+\S+\s+)(\S+)')
+]
+
+
+class CassetteError(shell.ShellError):
+    """
+    Error when a command is not found in the cassette
+    """
+
+
+def mask_credentials(cmd):
+    """
+    Mask the credentials embedded in a command. Only the credential positions are masked
+
+    Args:
+        cmd (str): Command to mask
+
+    Returns:
+        str: Masked command
+    """
+    if not cmd:
+        return cmd
+    for pattern in CREDENTIAL_PATTERNS:
+        cmd = pattern.sub(lambda match: match.group(1) + MASK, cmd)
+    return cmd
+
+
+class Cassette(object):
+    """
+    Ordered list of recorded command executions
+
+    Args:
+        path (str): Cassette file path
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the interactions from the cassette file
+        """
+        with io.open(self.path, 'r', encoding='utf-8') as cassette_file:
+            data = json.load(cassette_file)
+        if data.get('version', None) != CASSETTE_VERSION:
+            raise CassetteError('unsupported cassette version: {}'.format(data.get('version')))
+        self.interactions = data['interactions']
+        return self
+
+    def save(self):
+        """
+        Save the interactions in the cassette file
+        """
+        with self._lock:
+            data = {'version': CASSETTE_VERSION, 'interactions': list(self.interactions)}
+        # json.dumps escapes the non ascii characters, so the encoded text is valid in python 2
+        with io.open(self.path, 'wb') as cassette_file:
+            cassette_file.write(json.dumps(data, indent=2).encode('utf-8'))
+
+    def append(self, cmd, user, host, result, duration):
+        """
+        Add a command execution. The command credentials are masked with mask_credentials
+
+        Args:
+            cmd (str): Command, as provided to execute_cmd
+            user (str): User that executed the command
+            host (str): Host where the command was executed. None for local commands
+            result (ProcessResult): Command result
+            duration (float): Execution time in seconds
+        """
+        with self._lock:
+            self.interactions.append({
+                'cmd': mask_credentials(cmd),
+                'user': user,
+                'host': host,
+                'executed_cmd': mask_credentials(result.cmd),
+                'returncode': result.returncode,
+                'stdout': result.output,
+                'stderr': result.err,
+                'duration': duration
+            })
+
+
+class RecordingExecutor(executors.Executor):
+    """
+    Executor which runs the commands and records their results in a cassette. It has the same
+    interface as shell.execute_cmd. The cassette is saved when it's used as context manager
+    or calling save
+
+    Args:
+        path (str): Cassette file path. It's overwritten
+        execute (callable, opt): Function used to run the commands. shell.execute_cmd by
+            default
+    """
+
+    def __init__(self, path, execute=None):
+        self.cassette = Cassette(path)
+        self._execute = execute or shell.execute_cmd
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        """
+        Run a command and record its result. See shell.execute_cmd
+        """
+        start_time = time.time()
+        if timeout is None:
+            result = self._execute(cmd, user, password, remote_host)
+        else:
+            result = self._execute(cmd, user, password, remote_host, timeout=timeout)
+        self.cassette.append(cmd, user, remote_host, result, time.time() - start_time)
+        return result
+
+    def save(self):
+        """
+        Save the recorded executions
+        """
+        self.cassette.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.save()
+
+
+class ReplayExecutor(executors.Executor):
+    """
+    Executor which serves the results recorded in a cassette. It has the same interface as
+    shell.execute_cmd. The results of each (command, user, host) are served in the recorded
+    order, and the last one is repeated once they are exhausted
+
+    Args:
+        path (str): Cassette file path
+        latency (bool, opt): Sleep the recorded duration before returning each result
+    """
+
+    def __init__(self, path, latency=False):
+        self.latency = latency
+        self._interactions = collections.defaultdict(collections.deque)
+        self._last = {}
+        self._lock = threading.Lock()
+        for interaction in Cassette(path).load().interactions:
+            key = (interaction['cmd'], interaction['user'], interaction['host'])
+            self._interactions[key].append(interaction)
+
+    def _next_interaction(self, key):
+        """
+        Get the next recorded interaction of a command
+        """
+        with self._lock:
+            pending = self._interactions.get(key, None)
+            if pending:
+                self._last[key] = pending.popleft()
+            interaction = self._last.get(key, None)
+        if interaction is None:
+            raise CassetteError(
+                'command "{}" with user {} in host {} not found in the cassette'.format(*key))
+        return interaction
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        """
+        Get the recorded result of a command. See shell.execute_cmd
+        """
+        def _replay():
+            interaction = self._next_interaction(
+                (mask_credentials(cmd), user, remote_host))
+            if self.latency:
+                time.sleep(interaction['duration'])
+            return shell.ProcessResult(
+                interaction['executed_cmd'], interaction['returncode'],
+                interaction['stdout'].encode(), interaction['stderr'].encode())
+
+        return shell.instrument(cmd, user, remote_host, _replay)
+
+
+@contextlib.contextmanager
+def patch_execute_cmd(executor):
+    """
+    Replace shell.execute_cmd with a recording or replay executor inside the block
+
+    Args:
+        executor (callable): Executor with the shell.execute_cmd interface
+    """
+    original = shell.execute_cmd
+    shell.execute_cmd = executor
+    try:
+        yield executor
+    finally:
+        shell.execute_cmd = original
@@ -0,0 +1,143 @@
+"""
+Commands batch execution
+
+execute_batch runs an ordered list of commands in a single login shell invocation, so a
+remote batch only needs one ssh connection.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import logging
+import re
+import shlex
+import subprocess
+import uuid
+
+from shaptools import shell
+
+LOGGER = logging.getLogger('shell')
+
+
+def _batch_script(cmds, marker, stop_on_failure):
+    """
+    Create the script that runs a commands batch. The output of each command is framed with
+    the marker in both streams, and the stdout frame carries the command index and return code
+    """
+    lines = ['printf "{marker}\\n"', 'printf "{marker}\\n" >&2']
+    for index, cmd in enumerate(cmds):
+        lines.append('(\n{cmd}\n) </dev/null'.format(cmd=cmd))
+        lines.append('rc=$?')
+        lines.append('printf "\\n{{marker}} {index} %d\\n" $rc'.format(index=index))
+        lines.append('printf "\\n{{marker}} {index}\\n" >&2'.format(index=index))
+        if stop_on_failure:
+            lines.append('[ $rc -eq 0 ] || exit $rc')
+    lines.append('exit 0')
+    return '\n'.join(lines).format(marker=marker) + '\n'
+
+
+def _split_batch_output(data, marker):
+    """
+    Split a batch stream output by command
+
+    Returns:
+        tuple: Dictionary with the (output, return code) of each finished command by index,
+            and the output written after the last finished command
+    """
+    start = '{}\n'.format(marker).encode()
+    position = data.find(start)
+    if position != -1:
+        # Drop the login shell banners written before the first command
+        data = data[position+len(start):]
+    parts = re.split(b'\n' + marker.encode() + b' ([0-9]+)(?: ([0-9]+))?\n', data)
+    outputs = {}
+    for index in range(0, len(parts) - 1, 3):
+        returncode = parts[index+2]
+        outputs[int(parts[index+1])] = (
+            parts[index], int(returncode) if returncode is not None else None)
+    return outputs, parts[-1]
+
+
+def execute_batch(
+        cmds, user=None, remote_host=None, stop_on_failure=True, timeout=None, ssh_options=None):
+    """
+    Execute an ordered list of commands in a single shell invocation. The script is sent to
+    one login shell through its stdin, so a remote batch only needs one ssh connection. The
+    commands stdin is attached to /dev/null
+
+    Args:
+        cmds (list): Commands to be executed
+        user (str, opt): User to execute the commands
+        remote_host (str, opt): Remote host where the commands will be executed
+        stop_on_failure (bool, opt): Don't execute the remaining commands after the first one
+            finished with a non zero return code
+        timeout (float, opt): Timeout in seconds of the whole batch, with the same behaviour
+            as in shell.execute_cmd
+        ssh_options (str, opt): ssh command line options used for remote commands
+
+    Returns:
+        list: ProcessResult instances of the executed commands, in the same order. If the
+            shell finishes unexpectedly, the result of the interrupted command stores the
+            shell return code and its remaining output
+
+    Raises:
+        ShellTimeoutError: If the batch or the active deadline times out
+    """
+    cmds = list(cmds)
+    if not cmds:
+        return []
+    return shell.instrument_batch(
+        cmds, user, remote_host,
+        lambda: _execute_batch(cmds, user, remote_host, stop_on_failure, timeout, ssh_options))
+
+
+def _execute_batch(cmds, user, remote_host, stop_on_failure, timeout, ssh_options):
+    """
+    Execute a commands batch. See execute_batch
+    """
+    if not cmds:
+        return []
+    LOGGER.debug('Executing batch of %d commands with user %s', len(cmds), user)
+    timeout = shell.get_timeout(timeout)
+    if remote_host or user:
+        shell_cmd = shell.format_cmd('exec bash -s', user, remote_host, ssh_options)
+        cmds = [shell.unwrap_cmd(cmd) for cmd in cmds]
+    else:
+        shell_cmd = 'bash -s'
+    marker = '__SHAPTOOLS_BATCH_{}__'.format(uuid.uuid4().hex)
+    script = _batch_script(cmds, marker, stop_on_failure)
+
+    popen_kwargs = {}
+    if timeout is not None:
+        popen_kwargs['preexec_fn'] = shell.new_session_preexec()
+    proc = subprocess.Popen(
+        shlex.split(shell_cmd),
+        stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+        **popen_kwargs)
+    with shell.Watchdog(proc, timeout) as watchdog:
+        out, err = proc.communicate(input=script.encode())
+
+    if watchdog.expired:
+        shell.log_command_results(out, err)
+        raise shell.ShellTimeoutError('; '.join(cmds), timeout)
+
+    outputs, out_tail = _split_batch_output(out, marker)
+    errors, err_tail = _split_batch_output(err, marker)
+    results = []
+    for index, cmd in enumerate(cmds):
+        if index not in outputs:
+            break
+        output, returncode = outputs[index]
+        output_err = errors.get(index, (b'',))[0]
+        shell.log_command_results(output, output_err)
+        results.append(shell.ProcessResult(cmd, returncode, output, output_err))
+
+    if len(results) < len(cmds) and (not results or not results[-1].returncode):
+        # The shell finished before running all the commands without a command failure
+        shell.log_command_results(out_tail, err_tail)
+        results.append(shell.ProcessResult(
+            cmds[len(results)], proc.returncode or 1, out_tail, err_tail))
+    return results
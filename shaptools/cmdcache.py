@@ -0,0 +1,121 @@
+"""
+Cache of read-only command results
+
+The higher level flows run the same read-only commands (hdbnsutil -sr_state, HDB version,
+sapcontrol GetProcessList, etc) many times in a short period. CommandCache stores their results
+by (host, user, command) for a limited time, so they are only executed once.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger('cmdcache')
+
+
+class CommandCache(object):
+    """
+    Thread safe TTL and LRU cache of command results. The same cache can be shared by multiple
+    instances
+
+    Args:
+        ttl (float, opt): Time in seconds that a result is valid
+        max_size (int, opt): Maximum number of stored results. The least recently used result
+            is evicted when the cache is full
+    """
+
+    def __init__(self, ttl=30, max_size=128):
+        if max_size < 1:
+            raise ValueError('max_size must be greater than 0')
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, host, user, cmd):
+        """
+        Get a stored result
+
+        Args:
+            host (str): Host where the command was executed. None for local commands
+            user (str): User that executed the command
+            cmd (str): Executed command
+
+        Returns:
+            ProcessResult: Stored result. None if it's not found or it's expired
+        """
+        key = (host, user, cmd)
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry[0] > time.time():
+                # Move the entry to the end to keep the LRU order
+                del self._entries[key]
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, host, user, cmd, result):
+        """
+        Store a command result
+
+        Args:
+            host (str): Host where the command was executed. None for local commands
+            user (str): User that executed the command
+            cmd (str): Executed command
+            result (ProcessResult): Command result
+        """
+        key = (host, user, cmd)
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = (time.time() + self.ttl, result)
+
+    def invalidate(self, host=None):
+        """
+        Remove the stored results
+
+        Args:
+            host (str, opt): Only remove the results of this host. All of them are removed
+                if it's not set
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == host]:
+                    del self._entries[key]
+        LOGGER.debug('Command cache invalidated for host %s', host)
+
+    def stats(self):
+        """
+        Get the cache usage counters
+
+        Returns:
+            dict: hits, misses, evictions and current size
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)
+            }
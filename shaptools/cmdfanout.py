@@ -0,0 +1,126 @@
+"""
+Commands fan-out execution
+
+execute_fanout runs commands in multiple hosts using a bounded pool of worker threads, with a
+limit of concurrent jobs by host.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import threading
+import time
+
+# python2 and python3 compatibility for queue usage
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+from shaptools import shell
+
+
+class FanoutResult(object):
+    """
+    Class to store the result of a fan-out job
+
+    Args:
+        host (str): Host where the command was executed. None for local commands
+        user (str): User that executed the command
+        cmd (str): Executed command
+        result (ProcessResult): Command result. None if the execution raised an error
+        error (Exception): Error raised during the execution. None if there was no error
+        duration (float): Job execution time in seconds
+    """
+
+    def __init__(self, host, user, cmd, result, error, duration):
+        self.host = host
+        self.user = user
+        self.cmd = cmd
+        self.result = result
+        self.error = error
+        self.duration = duration
+
+
+def _fanout_worker(jobs_queue, results_queue, context=None):
+    """
+    Execute the fan-out jobs until the stop sentinel (None) is received. The execution context
+    (deadline and operation) of the thread which started the fan-out is applied to the jobs
+    """
+    shell.set_context(context)
+    while True:
+        job = jobs_queue.get()
+        if job is None:
+            return
+        host, user, cmd, password = job
+        start_time = time.time()
+        result = error = None
+        try:
+            result = shell.execute_cmd(cmd, user, password, host)
+        except Exception as err: # pylint:disable=W0703
+            error = err
+        results_queue.put(
+            FanoutResult(host, user, cmd, result, error, time.time() - start_time))
+
+
+def execute_fanout(jobs, password=None, max_workers=10, max_per_host=1):
+    """
+    Execute commands in multiple hosts using a bounded pool of worker threads. The results are
+    yielded as the jobs are completed
+
+    Args:
+        jobs (list): List of (host, user, cmd) tuples. host is None for local commands.
+            A fourth element can be added to set the job password
+        password (str, opt): Password used by the jobs without a specific password
+        max_workers (int, opt): Maximum number of jobs running at the same time
+        max_per_host (int, opt): Maximum number of jobs running at the same time in each host
+
+    Yields:
+        FanoutResult: Completed jobs results
+    """
+    if max_workers < 1 or max_per_host < 1:
+        raise ValueError('max_workers and max_per_host must be greater than 0')
+
+    pending = collections.OrderedDict()
+    for job in jobs:
+        host, user, cmd = job[:3]
+        job_password = job[3] if len(job) > 3 else password
+        pending.setdefault(host, collections.deque()).append((host, user, cmd, job_password))
+
+    jobs_queue = queue.Queue()
+    results_queue = queue.Queue()
+    workers = []
+    for _ in range(min(max_workers, sum(len(host_jobs) for host_jobs in pending.values()))):
+        worker = threading.Thread(
+            target=_fanout_worker,
+            args=(jobs_queue, results_queue, shell.get_context()))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    running = 0
+    running_per_host = collections.defaultdict(int)
+    try:
+        while pending or running:
+            # Dispatch the jobs of the hosts that have free slots
+            for host in list(pending.keys()):
+                host_jobs = pending[host]
+                while host_jobs and running < max_workers and \
+                        running_per_host[host] < max_per_host:
+                    jobs_queue.put(host_jobs.popleft())
+                    running += 1
+                    running_per_host[host] += 1
+                if not host_jobs:
+                    del pending[host]
+
+            fanout_result = results_queue.get()
+            running -= 1
+            running_per_host[fanout_result.host] -= 1
+            yield fanout_result
+    finally:
+        for _ in workers:
+            jobs_queue.put(None)
@@ -0,0 +1,190 @@
+"""
+Streaming commands execution
+
+CommandStream and execute_cmd_stream process the command output line by line while it's
+running, so the memory usage doesn't depend on the output size.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import logging
+import os
+import select
+import shlex
+import subprocess
+
+from shaptools import shell
+
+LOGGER = logging.getLogger('shell')
+
+
+class CommandStream(object):
+    """
+    Class to execute a command reading its output incrementally. Iterating the instance yields
+    (stream, line) tuples as soon as the lines are written by the process, where stream is
+    'stdout' or 'stderr'. Only the last lines of each stream are kept in memory
+
+    Args:
+        cmd (str): Command to be executed
+        user (str, opt): User to execute the command
+        password (str, opt): User password
+        remote_host (str, opt): Remote host where the command will be executed
+        tail (int, opt): Number of last lines of each stream kept to create the result.
+            None to keep all the lines
+        timeout (float, opt): Timeout in seconds, with the same behaviour as in
+            shell.execute_cmd. ShellTimeoutError is raised by the iteration when it expires
+        ssh_options (str, opt): ssh command line options used for remote commands
+    """
+
+    STREAMS = ('stdout', 'stderr')
+
+    def __init__(
+            self, cmd, user=None, password=None, remote_host=None, tail=100, timeout=None,
+            ssh_options=None):
+        LOGGER.debug('Executing command "%s" with user %s in streaming mode', cmd, user)
+        self.timeout = shell.get_timeout(timeout)
+        if remote_host or user:
+            cmd = shell.format_cmd(cmd, user, remote_host, ssh_options)
+            LOGGER.debug('Command updated to "%s"', cmd)
+        self.cmd = cmd
+        self.returncode = None
+        self._user = user
+        self._password = password
+        self._tails = dict(
+            (stream, collections.deque(maxlen=tail)) for stream in self.STREAMS)
+
+    def _read_lines(self, proc):
+        """
+        Read the process stdout and stderr lines as they are available
+        """
+        streams = {proc.stdout.fileno(): 'stdout', proc.stderr.fileno(): 'stderr'}
+        buffers = dict((file_d, b'') for file_d in streams)
+        while streams:
+            ready, _, _ = select.select(list(streams.keys()), [], [])
+            for file_d in ready:
+                chunk = os.read(file_d, shell.READ_SIZE)
+                if not chunk:
+                    if buffers[file_d]:
+                        yield streams[file_d], buffers[file_d]
+                    del streams[file_d]
+                    continue
+                lines = (buffers[file_d] + chunk).split(b'\n')
+                buffers[file_d] = lines.pop()
+                for line in lines:
+                    yield streams[file_d], line
+
+    def __iter__(self):
+        preexec_fn = shell.new_session_preexec() if self.timeout is not None else None
+        proc = subprocess.Popen(
+            shlex.split(self.cmd), preexec_fn=preexec_fn,
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            if self._password:
+                proc.stdin.write(self._password.encode())
+            proc.stdin.close()
+        except (IOError, OSError):
+            # The process finished or closed its stdin without reading the password
+            pass
+
+        with shell.Watchdog(proc, self.timeout) as watchdog:
+            try:
+                for stream, line in self._read_lines(proc):
+                    self._tails[stream].append(line)
+                    yield stream, line.decode('utf-8', 'replace')
+            finally:
+                proc.stdout.close()
+                proc.stderr.close()
+                self.returncode = proc.wait()
+        if watchdog.expired:
+            raise shell.ShellTimeoutError(self.cmd, self.timeout)
+
+    def result(self):
+        """
+        Create the ProcessResult of the executed command with the kept lines
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode and the last
+                stdout and stderr lines
+        """
+        output, err = [
+            b''.join(line + b'\n' for line in self._tails[stream]) for stream in self.STREAMS]
+        return shell.ProcessResult(self.cmd, self.returncode, output, err)
+
+
+def log_command_line(stream, line):
+    """
+    Log a command output line as it's received. stdout lines are logged as info and stderr
+    lines as error
+    """
+    logger = logging.getLogger(shell.__name__)
+    if stream == 'stdout':
+        logger.info(line)
+    else:
+        logger.error(line)
+
+
+def bounded_line_logger(max_lines=None):
+    """
+    Get a callback like log_command_line which only logs the first lines of each stream of a
+    command
+
+    Args:
+        max_lines (int, opt): Maximum number of lines logged of each stream.
+            shell.MAX_LOGGED_LINES by default
+
+    Returns:
+        callable: Callback with the execute_cmd_stream interface
+    """
+    max_lines = shell.MAX_LOGGED_LINES if max_lines is None else max_lines
+    counters = {'stdout': 0, 'stderr': 0}
+
+    def _log(stream, line):
+        counters[stream] += 1
+        if max_lines is None or counters[stream] <= max_lines:
+            log_command_line(stream, line)
+        elif counters[stream] == max_lines + 1:
+            logging.getLogger(shell.__name__).warning(
+                'More than %d %s lines, the next ones are not logged', max_lines, stream)
+    return _log
+
+
+def execute_cmd_stream(
+        cmd, user=None, password=None, remote_host=None, callback=log_command_line, tail=100,
+        timeout=None, ssh_options=None):
+    """
+    Execute a shell command processing its output line by line while it's running. The memory
+    usage doesn't depend on the output size, as only the last lines are kept. Recommended for
+    long running commands with big outputs (installations for example)
+
+    Args:
+        cmd (str): Command to be executed
+        user (str, opt): User to execute the command
+        password (str, opt): User password
+        remote_host (str, opt): Remote host where the command will be executed
+        callback (callable, opt): Function called with the stream name ('stdout' or 'stderr')
+            and the decoded line for every output line. The first shell.MAX_LOGGED_LINES
+            lines of each stream are logged by default
+        tail (int, opt): Number of last lines of each stream stored in the result
+        timeout (float, opt): Timeout in seconds, with the same behaviour as in
+            shell.execute_cmd
+        ssh_options (str, opt): ssh command line options used for remote commands
+
+    Returns:
+        ProcessResult: ProcessResult instance storing subprocess returncode, and the last
+            stdout and stderr lines
+    """
+    def _execute():
+        stream = CommandStream(
+            cmd, user, password, remote_host, tail=tail, timeout=timeout, ssh_options=ssh_options)
+        line_callback = bounded_line_logger() if callback is log_command_line else callback
+        for stream_name, line in stream:
+            if line_callback:
+                line_callback(stream_name, line)
+        return stream.result()
+
+    return shell.instrument(cmd, user, remote_host, _execute)
@@ -0,0 +1,329 @@
+"""
+Command executors
+
+An executor is the transport used to run the commands of a SAP instance. HanaInstance,
+NetweaverInstance and saputils.extract_sapcar_file accept an executor, so the way the commands
+are executed (su, ssh, multiplexed ssh, etc) can be changed per instance. ShellExecutor, which
+uses shell.execute_cmd, is the default one.
+
+Example:
+    executor = executors.PooledExecutor()
+    hana_instance = hana.HanaInstance('prd', '00', 'pass', remote_host='hana02', executor=executor)
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import logging
+import threading
+
+from shaptools import cmdbatch
+from shaptools import cmdstream
+from shaptools import shell
+from shaptools import sshpool
+
+LOGGER = logging.getLogger('executors')
+
+
+class ExecutorError(shell.ShellError):
+    """
+    Error when a command cannot be executed by the executor
+    """
+
+
+class Executor(object):
+    """
+    Executor interface. The executors are callables with the shell.execute_cmd interface
+    """
+
+    def __call__(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        return self.execute(cmd, user, password, remote_host, timeout)
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        """
+        Execute a command
+
+        Args:
+            cmd (str): Command to be executed
+            user (str, opt): User to execute the command
+            password (str, opt): User password
+            remote_host (str, opt): Remote host where the command will be executed
+            timeout (float, opt): Timeout in seconds
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode,
+                stdout and stderr
+        """
+        raise NotImplementedError
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        """
+        Execute a command processing its output line by line while it's running. See
+        cmdstream.execute_cmd_stream. The executors without streaming support run the command with
+        execute
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode,
+                stdout and stderr
+        """
+        return self.execute(cmd, user, password, remote_host, kwargs.get('timeout', None))
+
+    def execute_batch(
+            self, cmds, user=None, password=None, remote_host=None, stop_on_failure=True,
+            timeout=None):
+        """
+        Execute an ordered list of commands. See cmdbatch.execute_batch. The executors without
+        batch support run the commands one by one with execute
+
+        Args:
+            cmds (list): Commands to be executed
+            user (str, opt): User to execute the commands
+            password (str, opt): User password
+            remote_host (str, opt): Remote host where the commands will be executed
+            stop_on_failure (bool, opt): Don't execute the remaining commands after the first
+                one finished with a non zero return code
+            timeout (float, opt): Timeout in seconds of the whole batch
+
+        Returns:
+            list: ProcessResult instances of the executed commands
+        """
+        results = []
+        with shell.deadline(timeout):
+            for cmd in cmds:
+                result = self.execute(cmd, user, password, remote_host)
+                results.append(result)
+                if stop_on_failure and result.returncode:
+                    break
+        return results
+
+    def close(self):
+        """
+        Release the executor resources
+        """
+
+
+class ShellExecutor(Executor):
+    """
+    Default executor. The commands are executed with shell.execute_cmd, using su to run them
+    with other user and ssh to run them in remote hosts
+    """
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        if timeout is None:
+            return shell.execute_cmd(cmd, user, password, remote_host)
+        return shell.execute_cmd(cmd, user, password, remote_host, timeout=timeout)
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        return cmdstream.execute_cmd_stream(cmd, user, password, remote_host, **kwargs)
+
+    def execute_batch(
+            self, cmds, user=None, password=None, remote_host=None, stop_on_failure=True,
+            timeout=None):
+        # The password is not used, as the batch script is sent through the shell stdin
+        return cmdbatch.execute_batch(
+            cmds, user, remote_host, stop_on_failure=stop_on_failure, timeout=timeout)
+
+
+def _check_local(remote_host):
+    """
+    Raise an error if a remote host is requested to a local executor
+    """
+    if remote_host:
+        raise ExecutorError(
+            'remote host {} is not supported by local executors'.format(remote_host))
+
+
+class LocalExecutor(Executor):
+    """
+    Executor which runs the commands in the local machine with the current process user. The
+    user and password are ignored, so it can be used when the process is already running with
+    the SAP user, avoiding the cost of a new login shell for each command
+    """
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        _check_local(remote_host)
+        return shell.execute_cmd(cmd, timeout=timeout)
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        _check_local(remote_host)
+        return cmdstream.execute_cmd_stream(cmd, **kwargs)
+
+    def execute_batch(
+            self, cmds, user=None, password=None, remote_host=None, stop_on_failure=True,
+            timeout=None):
+        _check_local(remote_host)
+        return cmdbatch.execute_batch(cmds, stop_on_failure=stop_on_failure, timeout=timeout)
+
+
+class SuExecutor(Executor):
+    """
+    Executor which runs the commands in the local machine, switching to the requested user
+    with `su -lc`
+    """
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        _check_local(remote_host)
+        return shell.execute_cmd(cmd, user, password, timeout=timeout)
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        _check_local(remote_host)
+        return cmdstream.execute_cmd_stream(cmd, user, password, **kwargs)
+
+    def execute_batch(
+            self, cmds, user=None, password=None, remote_host=None, stop_on_failure=True,
+            timeout=None):
+        _check_local(remote_host)
+        return cmdbatch.execute_batch(
+            cmds, user, stop_on_failure=stop_on_failure, timeout=timeout)
+
+
+class SshExecutor(Executor):
+    """
+    Executor which runs the commands in a remote host using ssh
+
+    Args:
+        remote_host (str, opt): Host used when the command doesn't set its own remote host
+        ssh_options (str, opt): Additional ssh command line options
+    """
+
+    def __init__(self, remote_host=None, ssh_options=None):
+        self.remote_host = remote_host
+        self.ssh_options = ssh_options
+
+    def _get_host(self, remote_host):
+        """
+        Get the host where the command is executed
+        """
+        remote_host = remote_host or self.remote_host
+        if not remote_host:
+            raise ExecutorError('remote host must be provided to run commands using ssh')
+        return remote_host
+
+    def _get_ssh_options(self, user, remote_host):
+        """
+        Get the ssh options used to run a command
+        """
+        # pylint:disable=W0613
+        return self.ssh_options
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        remote_host = self._get_host(remote_host)
+        return shell.execute_cmd(
+            cmd, user, password, remote_host, timeout=timeout,
+            ssh_options=self._get_ssh_options(user, remote_host))
+
+    def execute_stream(self, cmd, user=None, password=None, remote_host=None, **kwargs):
+        remote_host = self._get_host(remote_host)
+        return cmdstream.execute_cmd_stream(
+            cmd, user, password, remote_host,
+            ssh_options=self._get_ssh_options(user, remote_host), **kwargs)
+
+    def execute_batch(
+            self, cmds, user=None, password=None, remote_host=None, stop_on_failure=True,
+            timeout=None):
+        remote_host = self._get_host(remote_host)
+        return cmdbatch.execute_batch(
+            cmds, user, remote_host, stop_on_failure=stop_on_failure, timeout=timeout,
+            ssh_options=self._get_ssh_options(user, remote_host))
+
+
+class PooledExecutor(SshExecutor):
+    """
+    Executor which runs the commands in a remote host using multiplexed ssh connections, so
+    only the first command of each (user, host) pair pays the connection cost. Unlike
+    shell.enable_ssh_pool, the pool is owned by the executor
+
+    Args:
+        remote_host (str, opt): Host used when the command doesn't set its own remote host
+        pool (sshpool.SshSessionPool, opt): Pool of ssh connections. A new pool is created
+            if it's not set
+        kwargs (opt): sshpool.SshSessionPool parameters used to create the new pool
+            (control_dir, max_sessions, idle_timeout)
+    """
+
+    def __init__(self, remote_host=None, pool=None, **kwargs):
+        super(PooledExecutor, self).__init__(remote_host)
+        self.pool = pool or sshpool.SshSessionPool(**kwargs)
+
+    def _get_ssh_options(self, user, remote_host):
+        return self.pool.ssh_options(user, remote_host)
+
+    def close(self):
+        self.pool.close_all()
+
+
+class FakeExecutor(Executor):
+    """
+    Executor which doesn't run anything. It returns the results registered for each command
+    and stores the received calls. Useful to test the code using the instances
+
+    Args:
+        results (dict, opt): Results by command. The values are (returncode, output, err)
+            tuples, or lists of tuples to return different results in consecutive calls
+        default (tuple, opt): (returncode, output, err) returned for the commands without
+            registered results. ExecutorError is raised for them if it's not set
+    """
+
+    def __init__(self, results=None, default=None):
+        self.default = default
+        self.calls = []
+        self._results = {}
+        self._lock = threading.Lock()
+        for cmd, result in (results or {}).items():
+            for item in result if isinstance(result, list) else [result]:
+                self.add_result(cmd, *item)
+
+    def add_result(self, cmd, returncode=0, output='', err=''):
+        """
+        Register a command result. The results of the same command are returned in the
+        registration order, and the last one is repeated once they are exhausted
+
+        Args:
+            cmd (str): Command
+            returncode (int, opt): Command return code
+            output (str, opt): Command stdout
+            err (str, opt): Command stderr
+        """
+        with self._lock:
+            self._results.setdefault(cmd, collections.deque()).append((returncode, output, err))
+
+    def _next_result(self, cmd):
+        """
+        Get the next registered result of a command
+        """
+        with self._lock:
+            results = self._results.get(cmd, None)
+            if results:
+                return results.popleft() if len(results) > 1 else results[0]
+        if self.default is None:
+            raise ExecutorError('command "{}" not registered in the fake executor'.format(cmd))
+        return self.default
+
+    def execute(self, cmd, user=None, password=None, remote_host=None, timeout=None):
+        def _execute():
+            with self._lock:
+                self.calls.append((cmd, user, remote_host))
+            returncode, output, err = self._next_result(cmd)
+            return shell.ProcessResult(cmd, returncode, output.encode(), err.encode())
+
+        return shell.instrument(cmd, user, remote_host, _execute)
+
+
+DEFAULT_EXECUTOR = ShellExecutor()
+
+
+def get_executor(executor=None):
+    """
+    Get the executor to be used
+
+    Args:
+        executor (Executor, opt): Requested executor
+
+    Returns:
+        Executor: The requested executor, or the default one if it's not set
+    """
+    return executor or DEFAULT_EXECUTOR
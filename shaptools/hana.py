@@ -17,11 +17,21 @@ from __future__ import print_function
 import logging
 import fileinput
 import re
-import time
 import platform
 import os
 
 from shaptools import shell
+from shaptools import agent
+from shaptools import retry
+from shaptools import cmdcache
+from shaptools import executors
+from shaptools import shellsession
+from shaptools import srstate
+from shaptools import userenv
+from shaptools import hanasql
+# The errors are available in this module too
+from shaptools.hanaerrors import (  # pylint:disable=W0611
+    HanaError, HanaSqlError, FileDoesNotExistError, HanaSoftwareNotFoundError)
 
 # python2 and python3 compatibility for string usage
 try:
@@ -30,21 +40,6 @@ except NameError:  # pragma: no cover
     basestring = str
 
 
-class HanaError(Exception):
-    """
-    Error during HANA command execution
-    """
-
-class FileDoesNotExistError(HanaError):
-    """
-    Error when the specified files does not exist
-    """
-
-class HanaSoftwareNotFoundError(HanaError):
-    """
-    HANA installation software not found
-    """
-
 # System replication states
 # Random value used
 SR_STATES = {
@@ -66,7 +61,7 @@ SR_STATUS = {
 }
 
 
-class HanaInstance(object):
+class HanaInstance(hanasql.HanaSqlMixin):
     """
     SAP HANA instance implementation
 
@@ -75,9 +70,27 @@ class HanaInstance(object):
         inst (str): SAP HANA instance number
         password (str): HANA instance password
         remote_host (str, opt): Remote host where the command will be executed
+        shell_session (bool, opt): Run the HANA commands in a long-lived sidadm login shell
+            instead of spawning a new one for each command
+        sidadm_env (bool, opt): Capture the sidadm login environment once and run the HANA
+            commands directly by absolute path with it (only for local instances). The
+            environment is captured again if the HANA version changes
+        command_timeout (float, opt): Timeout in seconds of each HANA command. The command
+            process group is killed and shell.ShellTimeoutError raised when it expires
+        cache (cmdcache.CommandCache, opt): Cache used to store the results of the read-only
+            commands (CACHED_COMMANDS). Any command not listed in CACHED_COMMANDS or
+            READ_ONLY_COMMANDS invalidates it
+        cache_ttl (float, opt): Create a new cache with this TTL in seconds if cache is not set
+        executor (executors.Executor, opt): Executor used to run the commands.
+            executors.ShellExecutor by default. shell_session and sidadm_env options take
+            precedence for the HANA commands
+        hdb_connector (base_connector.BaseConnector, opt): Database connection used to run the
+            SQL statements (backups, ini parameters). The session is reused across the calls.
+            hdbsql is spawned for every statement if it's not set. See connect_db
     """
 
     PATH = '/usr/sap/{sid}/HDB{inst}/'
+    MANIFEST = 'exe/manifest'
     INSTALL_EXEC = 'hdblcm'
     HANA_PLATFORM = '^HDB:HANA:.*:{platform}:.*'
     SUPPORTED_PLATFORMS = [
@@ -85,6 +98,16 @@ class HanaInstance(object):
     ]
     SUPPORTED_SYSTEMS = ['Linux']
     SYNCMODES = ['sync', 'syncmem', 'async']
+    SR_STATE_SCANNER = shell.PatternScanner([
+        ('primary', '.*mode: primary.*'),
+        ('secondary', '.*mode: ({})'.format('|'.join(SYNCMODES)))
+    ])
+    VERSION_SCANNER = shell.PatternScanner([('version', r'\s+version:\s+(\d+.\d+.\d+).*')])
+    # Commands whose results are cached
+    CACHED_COMMANDS = ('hdbnsutil -sr_state', 'HDB version')
+    # Commands that are not cached but don't change the instance state
+    READ_ONLY_COMMANDS = (
+        'pidof ', 'HDBSettings.sh systemReplicationStatus.py', 'hdbuserstore list ')
     SUCCESSFULLY_REGISTERED = 0 # Node correctly registered as secondary node
     SSFS_DIFFERENT_ERROR = 149 # ssfs files are different in the two nodes error return code
 
@@ -100,6 +123,17 @@ class HanaInstance(object):
         self.inst = inst
         self._password = password
         self.remote_host = kwargs.get('remote_host', None)
+        self.shell_session = kwargs.get('shell_session', False)
+        self.sidadm_env = kwargs.get('sidadm_env', False)
+        if self.sidadm_env and self.remote_host:
+            raise ValueError('sidadm_env option is only available for local instances')
+        self._sidadm_env = None
+        self.command_timeout = kwargs.get('command_timeout', None)
+        self.cache = kwargs.get('cache', None)
+        if self.cache is None and kwargs.get('cache_ttl', None):
+            self.cache = cmdcache.CommandCache(ttl=kwargs['cache_ttl'])
+        self.executor = executors.get_executor(kwargs.get('executor', None))
+        self.hdb_connector = kwargs.get('hdb_connector', None)
 
     @staticmethod
     def sidadm_user(sid):
@@ -127,44 +161,51 @@ class HanaInstance(object):
         return '{}_{}'.format(current_system.upper(), current_platform.upper())
 
     @classmethod
-    def find_hana_hdblcm(cls, software_path):
+    def find_hana_hdblcm(cls, software_path, agent_client=None):
         """
         Find a HANA installation executable in a folder (and subfolders)
 
         Args:
             software_path (str): Path of a folder where the HANA installation software is
             available
+            agent_client (agent.AgentClient, opt): Agent used to check the files in its host.
+                The local files are checked if it's not set
         """
         logger = logging.getLogger('__name__')
+        exists = agent_client.exists if agent_client else os.path.exists
         # hdbclm in the provider folder
         hdblcm_path = os.path.join(software_path, cls.INSTALL_EXEC)
-        if os.path.exists(hdblcm_path):
+        if exists(hdblcm_path):
             logger.info('HANA installer found: %s', hdblcm_path)
             return hdblcm_path
 
         # HANA platform folder
         label_file = os.path.join(software_path, 'LABEL.ASC')
-        if os.path.exists(label_file):
-            with open(label_file) as file_ptr:
-                hana_platform = cls.get_platform()
-                hana_pattern = cls.HANA_PLATFORM.format(platform=hana_platform)
-                if re.match(hana_pattern, file_ptr.read()):
-                    hdblcm_path = os.path.join(
-                        software_path, 'DATA_UNITS',
-                        'HDB_LCM_{}'.format(hana_platform), cls.INSTALL_EXEC)
-                    hdbserver_path = os.path.join(
-                        software_path, 'DATA_UNITS',
-                        'HDB_SERVER_{}'.format(hana_platform), cls.INSTALL_EXEC)
-                    if os.path.exists(hdblcm_path):
-                        logger.info('HANA installer found: %s', hdblcm_path)
-                        return hdblcm_path
-                    elif os.path.exists(hdbserver_path):
-                        logger.info('HANA installer found: %s', hdbserver_path)
-                        return hdbserver_path
+        if exists(label_file):
+            if agent_client:
+                label = agent_client.read_file(label_file)
+            else:
+                with open(label_file) as file_ptr:
+                    label = file_ptr.read()
+            hana_platform = cls.get_platform()
+            hana_pattern = cls.HANA_PLATFORM.format(platform=hana_platform)
+            if re.match(hana_pattern, label):
+                hdblcm_path = os.path.join(
+                    software_path, 'DATA_UNITS',
+                    'HDB_LCM_{}'.format(hana_platform), cls.INSTALL_EXEC)
+                hdbserver_path = os.path.join(
+                    software_path, 'DATA_UNITS',
+                    'HDB_SERVER_{}'.format(hana_platform), cls.INSTALL_EXEC)
+                if exists(hdblcm_path):
+                    logger.info('HANA installer found: %s', hdblcm_path)
+                    return hdblcm_path
+                elif exists(hdbserver_path):
+                    logger.info('HANA installer found: %s', hdbserver_path)
+                    return hdbserver_path
 
         # HANA server SAR patch
         hana_server_path = os.path.join(software_path, 'SAP_HANA_DATABASE', cls.INSTALL_EXEC)
-        if os.path.exists(hana_server_path):
+        if exists(hana_server_path):
             logger.info('HANA installer found: %s', hana_server_path)
             return hana_server_path
 
@@ -182,15 +223,101 @@ class HanaInstance(object):
             ProcessResult: ProcessResult instance storing subprocess returncode,
                 stdout and stderr
         """
-        #TODO: Add absolute paths to hana commands using sid and inst number
         user = self.sidadm_user(self.sid)
-        result = shell.execute_cmd(cmd, user, self._password, self.remote_host)
+        result = self._cache_lookup(user, cmd)
+        if result is None:
+            with shell.deadline(self.command_timeout):
+                if self.shell_session:
+                    result = shellsession.get_session(user, self.remote_host).execute(cmd)
+                elif self.sidadm_env:
+                    result = self._get_sidadm_env().execute(cmd)
+                else:
+                    result = self.executor.execute(cmd, user, self._password, self.remote_host)
+            self._cache_store(user, cmd, result)
+
+        return self._check_result(result, exception)
+
+    def _run_hana_commands(self, cmds, exception=True):
+        """
+        Run an ordered list of hana commands in a single shell invocation, stopping on the
+        first failure. The command_timeout applies to the whole batch
+
+        Args:
+            cmds (list): HANA commands
+            exception (boolean): Raise HanaError non-zero return code (default true)
+
+        Returns:
+            list: ProcessResult instances of the executed commands
+        """
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.shell_session or self.sidadm_env:
+            # The commands already share the same login shell or environment
+            results = []
+            for cmd in cmds:
+                results.append(self._run_hana_command(cmd, exception=False))
+                if results[-1].returncode:
+                    break
+        else:
+            with shell.deadline(self.command_timeout):
+                results = self.executor.execute_batch(
+                    cmds, self.sidadm_user(self.sid), self._password, self.remote_host)
+
+        for result in results:
+            self._check_result(result, exception)
+
+        return results
+
+    def _cache_lookup(self, user, cmd):
+        """
+        Get the cached result of a command. The cache is invalidated if the command might
+        change the instance state
+
+        Returns:
+            ProcessResult: Cached result. None if the command must be executed
+        """
+        if self.cache is None:
+            return None
+        if cmd.startswith(self.CACHED_COMMANDS):
+            return self.cache.get(self.remote_host, user, cmd)
+        if not cmd.startswith(self.READ_ONLY_COMMANDS):
+            self.cache.invalidate()
+        return None
 
+    def _cache_store(self, user, cmd, result):
+        """
+        Store the result of a cached command. The failed results are not cached, so transient
+        errors are not repeated
+        """
+        if self.cache is not None and cmd.startswith(self.CACHED_COMMANDS) and \
+                result.returncode == 0:
+            self.cache.put(self.remote_host, user, cmd, result)
+
+    @staticmethod
+    def _check_result(result, exception=True):
+        """
+        Raise HanaError if the command failed and exception is set
+
+        Returns:
+            ProcessResult: The checked result
+        """
         if exception and result.returncode != 0:
             raise HanaError('Error running hana command: {}'.format(result.cmd))
-
         return result
 
+    def _get_sidadm_env(self):
+        """
+        Get the sidadm environment snapshot. The HANA manifest file is watched to detect
+        version changes
+        """
+        if self._sidadm_env is None:
+            manifest = os.path.join(
+                self.PATH.format(sid=self.sid.upper(), inst=self.inst), self.MANIFEST)
+            self._sidadm_env = userenv.UserEnvironment(
+                self.sidadm_user(self.sid), self._password, watch_paths=[manifest])
+        return self._sidadm_env
+
+    @shell.tag_operation
     def is_installed(self):
         """
         Check if SAP HANA is installed
@@ -200,7 +327,7 @@ class HanaInstance(object):
         """
         user = self.sidadm_user(self.sid)
         try:
-            result = shell.execute_cmd('HDB info', user, self._password, self.remote_host)
+            result = self.executor.execute('HDB info', user, self._password, self.remote_host)
             return not result.returncode
         except EnvironmentError as err: #FileNotFoundError is not compatible with python2
             self._logger.error(err)
@@ -251,8 +378,10 @@ class HanaInstance(object):
         return hdb_pwd_file
 
     @classmethod
+    @shell.tag_operation
     def create_conf_file(
-            cls, software_path, conf_file, root_user, root_password, remote_host=None):
+            cls, software_path, conf_file, root_user, root_password, remote_host=None,
+            executor=None):
         """
         Create SAP HANA configuration file
 
@@ -262,21 +391,25 @@ class HanaInstance(object):
             root_user (str): Root user name
             root_password (str): Root user password
             remote_host (str, opt): Remote host where the command will be executed
+            executor (executors.Executor, opt): Executor used to run the command
 
         """
-        executable = cls.find_hana_hdblcm(software_path)
+        executable = cls.find_hana_hdblcm(
+            software_path, agent.get_client(executor, remote_host))
         cmd = '{executable} --action=install '\
             '--dump_configfile_template={conf_file}'.format(
                 executable=executable, conf_file=conf_file)
-        result = shell.execute_cmd(cmd, root_user, root_password, remote_host)
+        result = executors.get_executor(executor).execute(
+            cmd, root_user, root_password, remote_host)
         if result.returncode:
             raise HanaError('SAP HANA configuration file creation failed')
         return conf_file
 
     @classmethod
+    @shell.tag_operation
     def install(
             cls, software_path, conf_file, root_user, password,
-            hdb_pwd_file=None, remote_host=None):
+            hdb_pwd_file=None, remote_host=None, stream=False, executor=None):
         """
         Install SAP HANA platform providing a configuration file
 
@@ -287,6 +420,9 @@ class HanaInstance(object):
             password (str): Root user password
             hdb_pwd_file (str, opt): Path to the XML password file
             remote_host (str, opt): Remote host where the command will be executed
+            stream (bool, opt): Log the installation output while it's running, keeping only
+                the last lines in memory
+            executor (executors.Executor, opt): Executor used to run the command
         """
         # TODO: mount partition if needed
         # TODO: do some integrity check stuff
@@ -297,7 +433,8 @@ class HanaInstance(object):
         if hdb_pwd_file is not None and not os.path.isfile(hdb_pwd_file):
             raise FileDoesNotExistError(
                 'The XML password file \'{}\' does not exist'.format(hdb_pwd_file))
-        executable = cls.find_hana_hdblcm(software_path)
+        executable = cls.find_hana_hdblcm(
+            software_path, agent.get_client(executor, remote_host))
         if hdb_pwd_file:
             cmd = 'cat {hdb_pwd_file} | {executable} -b '\
                 '--read_password_from_stdin=xml --configfile={conf_file}'.format(
@@ -305,10 +442,15 @@ class HanaInstance(object):
         else:
             cmd = '{executable} -b --configfile={conf_file}'.format(
                 executable=executable, conf_file=conf_file)
-        result = shell.execute_cmd(cmd, root_user, password, remote_host)
+        executor = executors.get_executor(executor)
+        if stream:
+            result = executor.execute_stream(cmd, root_user, password, remote_host)
+        else:
+            result = executor.execute(cmd, root_user, password, remote_host)
         if result.returncode:
             raise HanaError('SAP HANA installation failed')
 
+    @shell.tag_operation
     def uninstall(self, root_user, password, installation_folder='/hana/shared'):
         """
         Uninstall SAP HANA platform
@@ -316,13 +458,17 @@ class HanaInstance(object):
         cmd = '{installation_folder}/{sid}/hdblcm/hdblcm '\
             '--uninstall -b'.format(
                 installation_folder=installation_folder, sid=self.sid.upper())
-        result = shell.execute_cmd(cmd, root_user, password, self.remote_host)
+        if self.cache is not None:
+            self.cache.invalidate()
+        result = self.executor.execute(cmd, root_user, password, self.remote_host)
         if result.returncode:
             raise HanaError('SAP HANA uninstallation failed')
 
     @classmethod
+    @shell.tag_operation
     def add_hosts(
-            cls, add_hosts, hdblcm_folder, root_user, root_password, hdb_pwd_file, remote_host=None):
+            cls, add_hosts, hdblcm_folder, root_user, root_password, hdb_pwd_file, remote_host=None,
+            executor=None):
         """
         Add additional hosts to SAP HANA system
 
@@ -333,44 +479,69 @@ class HanaInstance(object):
             root_password (str): Root user password
             hdb_pwd_file (str): Path to the XML password file
             remote_host (str, opt): Remote host where the command will be executed
+            executor (executors.Executor, opt): Executor used to run the command
         """
 
         if not os.path.isfile(hdb_pwd_file):
             raise FileDoesNotExistError(
                 'The XML password file \'{}\' does not exist'.format(hdb_pwd_file))
-        executable = cls.find_hana_hdblcm(hdblcm_folder)
+        executable = cls.find_hana_hdblcm(
+            hdblcm_folder, agent.get_client(executor, remote_host))
         cmd = 'cat {hdb_pwd_file} | {executable} -b '\
             '--read_password_from_stdin=xml --action=add_hosts --addhosts={add_hosts}'.format(
                 hdb_pwd_file=hdb_pwd_file, executable=executable, add_hosts=add_hosts)
-        result = shell.execute_cmd(cmd, root_user, root_password, remote_host)
+        result = executors.get_executor(executor).execute(
+            cmd, root_user, root_password, remote_host)
         if result.returncode:
             raise HanaError('SAP HANA add_hosts failed')
 
+    @shell.tag_operation
     def is_running(self):
         """
-        Check if SAP HANA daemon is running
+        Check if SAP HANA daemon is running. The process is looked up by the agent without
+        running any command if the executor uses agents
 
         Returns:
             bool: True if running, False otherwise
         """
-        cmd = 'pidof hdb.sap{sid}_HDB{inst}'.format(
-            sid=self.sid.upper(), inst=self.inst)
-        result = self._run_hana_command(cmd, exception=False)
+        agent_client = agent.get_client(self.executor, self.remote_host)
+        if agent_client is not None:
+            return bool(agent_client.pidof(self._daemon_name()))
+        result = self._run_hana_command(self._is_running_cmd(), exception=False)
         return not result.returncode
 
-    # pylint:disable=W1401
+    def _daemon_name(self):
+        """
+        Get the SAP HANA daemon process name
+        """
+        return 'hdb.sap{sid}_HDB{inst}'.format(sid=self.sid.upper(), inst=self.inst)
+
+    def _is_running_cmd(self):
+        """
+        Get the command to check if SAP HANA daemon is running
+        """
+        return 'pidof {}'.format(self._daemon_name())
+
+    @shell.tag_operation
     def get_version(self):
         """
         Get SAP HANA version
         """
         cmd = 'HDB version'
         result = self._run_hana_command(cmd)
-        version_pattern = shell.find_pattern(
-            r'\s+version:\s+(\d+.\d+.\d+).*', result.output)
+        return self._parse_version(result.output)
+
+    @classmethod
+    def _parse_version(cls, output):
+        """
+        Parse SAP HANA version from `HDB version` output
+        """
+        version_pattern = cls.VERSION_SCANNER.scan(output).get('version', None)
         if version_pattern is None:
             raise HanaError('Version pattern not found in command output')
         return version_pattern.group(1)
 
+    @shell.tag_operation
     def start(self):
         """
         Start hana instance.
@@ -386,6 +557,7 @@ class HanaInstance(object):
         cmd = 'sapcontrol -nr {} -function WaitforStarted {} {}'.format(self.inst, timeout, delay)
         self._run_hana_command(cmd)
 
+    @shell.tag_operation
     def stop(self):
         """
         Stop hana instance.
@@ -401,6 +573,7 @@ class HanaInstance(object):
         cmd = 'sapcontrol -nr {} -function WaitforStopped {} {}'.format(self.inst, timeout, delay)
         self._run_hana_command(cmd)
 
+    @shell.tag_operation
     def get_sr_state(self):
         """
         Get system replication state for the current node.
@@ -417,14 +590,34 @@ class HanaInstance(object):
         """
         cmd = 'hdbnsutil -sr_state'
         result = self._run_hana_command(cmd)
+        return self._parse_sr_state(result.output)
 
-        if shell.find_pattern('.*mode: primary.*', result.output) is not None:
+    @classmethod
+    def _parse_sr_state(cls, output):
+        """
+        Parse system replication state from `hdbnsutil -sr_state` output
+        """
+        found = cls.SR_STATE_SCANNER.scan(output)
+        if 'primary' in found:
             return 'PRIMARY'
-        if shell.find_pattern('.*mode: ({})'.format('|'.join(self.SYNCMODES)),
-                              result.output) is not None:
+        if 'secondary' in found:
             return 'SECONDARY'
         return 'DISABLED'
 
+    @shell.tag_operation
+    def get_sr_snapshot(self):
+        """
+        Get the system replication state of the current node and the complete site and host
+        mappings of the landscape, running `hdbnsutil -sr_state` only once
+
+        Returns:
+            srstate.SrState: Immutable state snapshot
+        """
+        cmd = 'hdbnsutil -sr_state --sapcontrol=1'
+        result = self._run_hana_command(cmd)
+        return srstate.SrState.parse(result.output)
+
+    @shell.tag_operation
     def get_sr_state_details(self):
         """
         Get system replication state details for the current node.
@@ -450,6 +643,7 @@ class HanaInstance(object):
                 state[data.group(1)] = data.group(2)
         return state
 
+    @shell.tag_operation
     def sr_enable_primary(self, name):
         """
         Enable SAP HANA system replication as primary node
@@ -460,6 +654,7 @@ class HanaInstance(object):
         cmd = 'hdbnsutil -sr_enable --name={}'.format(name)
         self._run_hana_command(cmd)
 
+    @shell.tag_operation
     def sr_disable_primary(self):
         """
         Disable SAP HANA system replication as primary node
@@ -467,6 +662,7 @@ class HanaInstance(object):
         cmd = 'hdbnsutil -sr_disable'
         self._run_hana_command(cmd)
 
+    @shell.tag_operation
     def copy_ssfs_files(self, remote_host, primary_pass):
         """
         Copy the ssfs data and key files to the secondary node
@@ -476,22 +672,23 @@ class HanaInstance(object):
         """
         user = self.sidadm_user(self.sid)
         sid_upper = self.sid.upper()
-        cmd = \
+        data_cmd = \
             "scp -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "\
             "{user}@{remote_host}:/usr/sap/{sid}/SYS/global/security/rsecssfs/data/SSFS_{sid}.DAT "\
             "/usr/sap/{sid}/SYS/global/security/rsecssfs/data/SSFS_{sid}.DAT".format(
                 user=user, remote_host=remote_host, sid=sid_upper)
-        cmd = shell.create_ssh_askpass(primary_pass, cmd)
-        self._run_hana_command(cmd)
 
-        cmd = \
+        key_cmd = \
             "scp -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "\
             "{user}@{remote_host}:/usr/sap/{sid}/SYS/global/security/rsecssfs/key/SSFS_{sid}.KEY "\
             "/usr/sap/{sid}/SYS/global/security/rsecssfs/key/SSFS_{sid}.KEY".format(
                 user=user, remote_host=remote_host, sid=sid_upper)
-        cmd = shell.create_ssh_askpass(primary_pass, cmd)
-        self._run_hana_command(cmd)
+        # Both files are copied in the same shell invocation
+        self._run_hana_commands([
+            shell.create_ssh_askpass(primary_pass, data_cmd),
+            shell.create_ssh_askpass(primary_pass, key_cmd)])
 
+    @shell.tag_operation
     def sr_register_secondary(
             self, name, remote_host, remote_instance,
             replication_mode, operation_mode, **kwargs):
@@ -508,35 +705,48 @@ class HanaInstance(object):
                 replicationis is enabled. Current node password will be used by
                 default (xxxadm sap user password)
             timeout (int, optional): Timeout to try to register the node in seconds
-            interval (int, optional): Retry interval in seconds
+            interval (int, optional): Delay after the first failed attempt in seconds. It's
+                doubled after every failed attempt
+            max_interval (int, optional): Maximum delay between attempts in seconds
+            max_attempts (int, optional): Maximum number of attempts
+            deadline (float, optional): Global time limit in seconds for the whole process,
+                including the running commands. shell.ShellTimeoutError is raised when it
+                expires. The deadline set by the caller with shell.deadline is also applied
 
+        Returns:
+            retry.RetryStats: Statistics of the registration attempts
         """
-        timeout = kwargs.get('timeout', 0)
-        interval = kwargs.get('interval', 5)
         primary_pass = kwargs.get('primary_password', self._password)
 
         remote_instance = '{:0>2}'.format(remote_instance)
         cmd = 'hdbnsutil -sr_register --name={} --remoteHost={} '\
               '--remoteInstance={} --replicationMode={} --operationMode={}'.format(
                   name, remote_host, remote_instance, replication_mode, operation_mode)
-
-        current_time = time.time()
-        current_timeout = current_time + timeout
-        while current_time <= current_timeout:
-            return_code = self._run_hana_command(cmd, False).returncode
-            if return_code == self.SUCCESSFULLY_REGISTERED:
-                break
-            elif return_code == self.SSFS_DIFFERENT_ERROR:
+        retrier = retry.Retry(
+            interval=kwargs.get('interval', 5), max_interval=kwargs.get('max_interval', 60),
+            max_attempts=kwargs.get('max_attempts', None), timeout=kwargs.get('timeout', 0),
+            success_codes=(self.SUCCESSFULLY_REGISTERED,))
+        ssfs_copied = []
+
+        def _register():
+            result = self._run_hana_command(cmd, False)
+            if result.returncode == self.SSFS_DIFFERENT_ERROR and not ssfs_copied:
+                # The registration is retried right after copying the primary keys, only once
                 self.copy_ssfs_files(remote_host, primary_pass)
-                continue
-            time.sleep(interval)
-            current_time = time.time()
-            continue
-        else:
-            raise HanaError(
-                'System replication registration process failed after {} seconds'.format(
-                    timeout))
-
+                ssfs_copied.append(True)
+                result = self._run_hana_command(cmd, False)
+            return result
+
+        with shell.deadline(kwargs.get('deadline', None)):
+            try:
+                retrier.run(_register)
+            except retry.RetryError:
+                raise HanaError(  # pylint:disable=W0707
+                    'System replication registration process failed after {} seconds'.format(
+                        kwargs.get('timeout', 0)))
+        return retrier.stats
+
+    @shell.tag_operation
     def sr_unregister_secondary(self, primary_name):
         """
         Unegister SAP HANA system replication from primary node
@@ -547,6 +757,7 @@ class HanaInstance(object):
         cmd = 'hdbnsutil -sr_unregister --name={}'.format(primary_name)
         self._run_hana_command(cmd)
 
+    @shell.tag_operation
     def sr_changemode_secondary(self, new_mode):
         """
         Change secondary mode replication mode
@@ -558,6 +769,7 @@ class HanaInstance(object):
         self._run_hana_command(cmd)
 
 
+    @shell.tag_operation
     def check_user_key(self, key_name):
         """
         Check the use key existence
@@ -574,6 +786,7 @@ class HanaInstance(object):
         except HanaError:
             return False
 
+    @shell.tag_operation
     def create_user_key(
             self, key_name, environment, user_name, user_password, database=None):
         """
@@ -591,49 +804,7 @@ class HanaInstance(object):
             user=user_name, passwd=user_password)
         self._run_hana_command(cmd)
 
-    def _hdbsql_connect(self, **kwargs):
-        """
-        Create hdbsql connection string
-
-        Args:
-            key_name (str, optional): Keystore to connect to sap hana db
-            user_name (str, optional): User to connect to sap hana db
-            user_password (str, optional): Password to connect to sap hana db
-        """
-        if kwargs.get('key_name', None):
-            cmd = 'hdbsql -i {} -U {}'.format(self.inst, kwargs['key_name'])
-        elif kwargs.get('user_name', None) and kwargs.get('user_password', None):
-            cmd = 'hdbsql -i {} -u {} -p {}'.format(
-                self.inst, kwargs['user_name'], kwargs['user_password'])
-        else:
-            raise ValueError(
-                'key_name or user_name/user_password parameters must be used')
-        return cmd
-
-    def create_backup(
-            self, database, backup_name,
-            key_name=None, user_name=None, user_password=None):
-        """
-        Create the primary node backup. key_name or user_name/user_password
-        combination, one of them must be provided
-
-        Args:
-            database (str): Database name
-            backup_name (str): Backup name
-            key_name (str): Key name
-            user_name (str): User
-            user_password (str): User password
-        """
-        #TODO: Version check
-
-        hdbsql_cmd = self._hdbsql_connect(
-            key_name=key_name, user_name=user_name, user_password=user_password)
-
-        cmd = '{} -d {} '\
-              '\\"BACKUP DATA FOR FULL SYSTEM USING FILE (\'{}\')\\"'.format(
-                  hdbsql_cmd, database, backup_name)
-        self._run_hana_command(cmd)
-
+    @shell.tag_operation
     def sr_cleanup(self, force=False):
         """
         Clean system replication state
@@ -644,162 +815,22 @@ class HanaInstance(object):
         cmd = 'hdbnsutil -sr_cleanup{}'.format(' --force' if force else '')
         self._run_hana_command(cmd)
 
-    def _parse_replication_output(self, output):
-        """
-        Utility function to parse output of
-        systemReplicationStatus.py
-        TODO: Parse table data
-        TODO: Parse local state
-        """
-        return {}
-
+    @shell.tag_operation
     def get_sr_status(self):
         """
         Get system replication status (parsed output
         of systemReplicationStatus.py).
 
         Returns:
-            str: Strings from SR_STATUS dictionary (UNKNOWN if the return code
-            is not defined)
+            dict: status (string from SR_STATUS dictionary, UNKNOWN if the return code
+            is not defined), services (per service replication records), sites and the
+            global entries. See srstate.parse_replication_status
         """
-        cmd = 'HDBSettings.sh systemReplicationStatus.py'
+        cmd = 'HDBSettings.sh systemReplicationStatus.py --sapcontrol=1'
         result = self._run_hana_command(cmd, exception=False)
-        status = self._parse_replication_output(result.output)
+        status = srstate.parse_replication_status(result.output)
         # TODO: Handle HANA bug where non-working SR resulted in RC 15
         # (see SAPHana RA)
         status["status"] = SR_STATUS.get(result.returncode, SR_STATUS[12])
         return status
 
-    def _manage_ini_file(
-            self, parameter_str, database, file_name, layer,
-            **kwargs):
-        """
-        Construct command with HANA SQL to update configuration parameters in ini file
-
-        key_name or user_name/user_password parameters must be used
-        Args:
-            parameter_str (list): List containing HANA parameter details in a dict format
-            database (str): Database name
-            file_name (str): INI configuration file name
-            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
-            layer_name (str, optional): Target either a tenant name or a target host name
-            reconfig (bool, optional): If apply changes to running HANA instance
-            set_value (bool, optional): Choose SET or UNSET operation to update parameters
-            key_name (str, optional): Keystore to connect to sap hana db
-            user_name (str, optional): User to connect to sap hana db
-            user_password (str, optional): Password to connect to sap hana db
-        """
-        layer_name = kwargs.get('layer_name', None)
-        reconfig = kwargs.get('reconfig', False)
-        set_value = kwargs.get('set_value', True)
-        key_name = kwargs.get('key_name', None)
-        user_name = kwargs.get('user_name', None)
-        user_password = kwargs.get('user_password', None)
-
-        hdbsql_cmd = self._hdbsql_connect(
-            key_name=key_name, user_name=user_name, user_password=user_password)
-
-        if layer in ('HOST', 'DATABASE') and layer_name is not None:
-            layer_name_str = ', \'{}\''.format(layer_name)
-        else:
-            layer_name_str = ''
-
-        set_str = 'SET' if set_value else 'UNSET'
-        reconfig_option = ' WITH RECONFIGURE' if reconfig else ''
-
-        cmd = ('{hdbsql_cmd} -d {db} '
-               '\\"ALTER SYSTEM ALTER CONFIGURATION(\'{file_name}\', \'{layer}\'{layer_name}) '
-               '{set_str}{parameter_str}{reconfig};\\"'.format(
-                   hdbsql_cmd=hdbsql_cmd, db=database, file_name=file_name, layer=layer,
-                   layer_name=layer_name_str, set_str=set_str, parameter_str=parameter_str,
-                   reconfig=reconfig_option))
-
-        # TODO: return the HANA SQL Statement error if sql fails
-        self._run_hana_command(cmd)
-
-    def set_ini_parameter(
-            self, ini_parameter_values, database, file_name, layer,
-            **kwargs):
-        """
-        Set HANA configuration parameters in ini file
-
-        SQL syntax:
-        ALTER SYSTEM ALTER CONFIGURATION (<filename>, <layer>[, <layer_name>])
-        SET (<section_name_1>,<parameter_name_1>) = <parameter_value_1>,
-            (<section_name_2>,<parameter_name_2>) = <parameter_value_2>
-        WITH RECONFIGURE
-
-        key_name or user_name/user_password parameters must be used
-        Args:
-            ini_parameter_values (list): List containing HANA parameter details
-            where each entry is a dictionary like below:
-            {'section_name':'name', 'parameter_name':'param_name', 'parameter_value':'value'}
-                section_name (str): Section name of parameter in ini file
-                parameter_name (str): Name of the parameter to be modified
-                parameter_value (str): The value of the parameter to be set
-            database (str): Database name
-            file_name (str): INI configuration file name
-            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
-            layer_name (str, optional): Target either a tenant name or a target host name
-            reconfig (bool, optional): If apply changes to running HANA instance
-            key_name (str, optional): Keystore to connect to sap hana db
-            user_name (str, optional): User to connect to sap hana db
-            user_password (str, optional): Password to connect to sap hana db
-        """
-
-        parameter_str = ', '.join("(\'{}\',\'{}\')=\'{}\'".format(
-            params['section_name'], params['parameter_name'],
-            params['parameter_value']) for params in ini_parameter_values)
-
-        layer_name = kwargs.get('layer_name', None)
-        reconfig = kwargs.get('reconfig', False)
-        key_name = kwargs.get('key_name', None)
-        user_name = kwargs.get('user_name', None)
-        user_password = kwargs.get('user_password', None)
-
-        self._manage_ini_file(
-            parameter_str=parameter_str, database=database,
-            file_name=file_name, layer=layer, layer_name=layer_name,
-            set_value=True, reconfig=reconfig, key_name=key_name,
-            user_name=user_name, user_password=user_password)
-
-    def unset_ini_parameter(
-            self, ini_parameter_names, database, file_name, layer,
-            **kwargs):
-        """
-        Unset HANA configuration parameters in ini file
-
-        SQL syntax:
-        ALTER SYSTEM ALTER CONFIGURATION (<filename>, <layer>[, <layer_name>])
-        UNSET (<section_name>,<parameter_name>);
-
-        key_name or user_name/user_password parameters must be used
-        Args:
-            ini_parameter_names (list): List containing HANA parameter details
-            where each entry is a dictionary like below:
-            {'section_name':'name', 'parameter_name':'param_name'}
-                section_name (str): Section name of parameter in ini file
-                parameter_name (str): Name of the parameter to be modified
-            database (str): Database name
-            file_name (str): INI configuration file name
-            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
-            layer_name (str, optional): Target either a tenant name or a target host name
-            reconfig (bool, optional): If apply changes to running HANA instance
-            key_name (str, optional): Keystore to connect to sap hana db
-            user_name (str, optional): User to connect to sap hana db
-            user_password (str, optional): Password to connect to sap hana db
-        """
-        parameter_str = ', '.join("(\'{}\',\'{}\')".format(
-            params['section_name'], params['parameter_name']) for params in ini_parameter_names)
-
-        layer_name = kwargs.get('layer_name', None)
-        reconfig = kwargs.get('reconfig', False)
-        key_name = kwargs.get('key_name', None)
-        user_name = kwargs.get('user_name', None)
-        user_password = kwargs.get('user_password', None)
-
-        self._manage_ini_file(
-            parameter_str=parameter_str, database=database,
-            file_name=file_name, layer=layer, layer_name=layer_name,
-            set_value=False, reconfig=reconfig, key_name=key_name,
-            user_name=user_name, user_password=user_password)
@@ -0,0 +1,41 @@
+"""
+SAP HANA errors
+
+The errors are defined apart from the hana module, so the modules which implement part of
+HanaInstance (as hanasql) can raise them. They are available in the hana module too.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+
+class HanaError(Exception):
+    """
+    Error during HANA command execution
+    """
+
+class HanaSqlError(HanaError):
+    """
+    Error returned by the database when a SQL statement or the connection fails
+
+    Args:
+        message (str): Error message, including the database error
+        statement (str, opt): Failed SQL statement
+    """
+
+    def __init__(self, message, statement=None):
+        super(HanaSqlError, self).__init__(message)
+        self.statement = statement
+
+class FileDoesNotExistError(HanaError):
+    """
+    Error when the specified files does not exist
+    """
+
+class HanaSoftwareNotFoundError(HanaError):
+    """
+    HANA installation software not found
+    """
@@ -0,0 +1,391 @@
+"""
+SAP HANA SQL statements
+
+HanaSqlMixin implements the SQL statements execution of HanaInstance, through the
+hdb_connector database connection or hdbsql, and the ini parameters management built on it.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+
+from shaptools import hanaerrors
+from shaptools import hdb_connector
+from shaptools import shell
+from shaptools.hdb_connector.connectors import base_connector
+
+
+def escape_sql(value):
+    """
+    Escape a value to be used inside a single quoted SQL string
+    """
+    return value.replace("'", "''")
+
+
+class HanaSqlMixin(object):
+    """
+    SQL statements execution of HanaInstance. The class using it must set the inst,
+    remote_host, hdb_connector and _logger attributes and implement _run_hana_command
+    """
+
+    # HdbConnector returns an instance of the available connector class
+    # pylint:disable=E1101
+
+    def _hdbsql_connect(self, **kwargs):
+        """
+        Create hdbsql connection string
+
+        Args:
+            key_name (str, optional): Keystore to connect to sap hana db
+            user_name (str, optional): User to connect to sap hana db
+            user_password (str, optional): Password to connect to sap hana db
+        """
+        if kwargs.get('key_name', None):
+            cmd = 'hdbsql -i {} -U {}'.format(self.inst, kwargs['key_name'])
+        elif kwargs.get('user_name', None) and kwargs.get('user_password', None):
+            cmd = 'hdbsql -i {} -u {} -p {}'.format(
+                self.inst, kwargs['user_name'], kwargs['user_password'])
+        else:
+            raise ValueError(
+                'key_name or user_name/user_password parameters must be used')
+        return cmd
+
+    def connect_db(self, user_name, user_password, host=None, port=None, **kwargs):
+        """
+        Open the database connection used to run the SQL statements. The connection is kept
+        until disconnect_db is called
+
+        Args:
+            user_name (str): User to connect to sap hana db
+            user_password (str): Password to connect to sap hana db
+            host (str, opt): Database host. remote_host or localhost by default
+            port (int, opt): Database SQL port. 3{inst}15 by default
+            database (str, opt): Database name in MDC environment (only for dbapi)
+            properties: Additional connection properties, used as named parameters
+
+        Raises:
+            HanaSqlError: If the connection fails
+        """
+        if self.hdb_connector is None:
+            self.hdb_connector = hdb_connector.HdbConnector()
+        host = host or self.remote_host or 'localhost'
+        port = port or int('3{}15'.format(self.inst))
+        database = kwargs.pop('database', None)
+        if database:
+            kwargs['databaseName'] = database
+        try:
+            self.hdb_connector.connect(
+                host, port, user=user_name, password=user_password, **kwargs)
+        except base_connector.ConnectionError as err:
+            raise hanaerrors.HanaSqlError(str(err))
+
+    def disconnect_db(self):
+        """
+        Close the database connection if it's open
+        """
+        if self.hdb_connector is not None and self.hdb_connector.isconnected():
+            self.hdb_connector.disconnect()
+
+    def run_sql(self, statement, database=None, **kwargs):
+        """
+        Run a SQL statement. The hdb_connector connection is used if it's set (reconnecting if
+        the connection was lost), otherwise hdbsql is spawned with the given credentials. The
+        database parameter is only used by hdbsql, as the connection is already open against
+        a database
+
+        Args:
+            statement (str): SQL statement
+            database (str, opt): Database name
+            key_name (str, optional): Keystore to connect to sap hana db
+            user_name (str, optional): User to connect to sap hana db
+            user_password (str, optional): Password to connect to sap hana db
+
+        Returns:
+            base_connector.QueryResult: Query result if the connection is used
+            shell.ProcessResult: hdbsql command result otherwise
+
+        Raises:
+            HanaSqlError: If the statement fails in the database connection
+        """
+        if self.hdb_connector is None:
+            hdbsql_cmd = self._hdbsql_connect(
+                key_name=kwargs.get('key_name', None),
+                user_name=kwargs.get('user_name', None),
+                user_password=kwargs.get('user_password', None))
+            cmd = '{} {}\\"{}\\"'.format(
+                hdbsql_cmd, '-d {} '.format(database) if database else '', statement)
+            return self._run_hana_command(cmd)
+
+        statement = statement.rstrip().rstrip(';')
+        try:
+            if not self.hdb_connector.isconnected():
+                self.hdb_connector.reconnect()
+            return self.hdb_connector.query(statement)
+        except (base_connector.QueryError, base_connector.ConnectionError) as err:
+            raise hanaerrors.HanaSqlError(str(err), statement)
+
+    @shell.tag_operation
+    def create_backup(
+            self, database, backup_name,
+            key_name=None, user_name=None, user_password=None):
+        """
+        Create the primary node backup. key_name or user_name/user_password
+        combination, one of them must be provided
+
+        Args:
+            database (str): Database name
+            backup_name (str): Backup name
+            key_name (str): Key name
+            user_name (str): User
+            user_password (str): User password
+        """
+        #TODO: Version check
+
+        statement = 'BACKUP DATA FOR FULL SYSTEM USING FILE (\'{}\')'.format(backup_name)
+        self.run_sql(
+            statement, database, key_name=key_name, user_name=user_name,
+            user_password=user_password)
+
+    def _manage_ini_file(
+            self, parameter_str, database, file_name, layer,
+            **kwargs):
+        """
+        Construct command with HANA SQL to update configuration parameters in ini file
+
+        key_name or user_name/user_password parameters must be used
+        Args:
+            parameter_str (list): List containing HANA parameter details in a dict format
+            database (str): Database name
+            file_name (str): INI configuration file name
+            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
+            layer_name (str, optional): Target either a tenant name or a target host name
+            reconfig (bool, optional): If apply changes to running HANA instance
+            set_value (bool, optional): Choose SET or UNSET operation to update parameters
+            key_name (str, optional): Keystore to connect to sap hana db
+            user_name (str, optional): User to connect to sap hana db
+            user_password (str, optional): Password to connect to sap hana db
+        """
+        layer_name = kwargs.get('layer_name', None)
+        reconfig = kwargs.get('reconfig', False)
+        set_value = kwargs.get('set_value', True)
+        key_name = kwargs.get('key_name', None)
+        user_name = kwargs.get('user_name', None)
+        user_password = kwargs.get('user_password', None)
+
+        if layer in ('HOST', 'DATABASE') and layer_name is not None:
+            layer_name_str = ', \'{}\''.format(layer_name)
+        else:
+            layer_name_str = ''
+
+        set_str = 'SET' if set_value else 'UNSET'
+        reconfig_option = ' WITH RECONFIGURE' if reconfig else ''
+
+        statement = (
+            'ALTER SYSTEM ALTER CONFIGURATION(\'{file_name}\', \'{layer}\'{layer_name}) '
+            '{set_str}{parameter_str}{reconfig};'.format(
+                file_name=file_name, layer=layer, layer_name=layer_name_str, set_str=set_str,
+                parameter_str=parameter_str, reconfig=reconfig_option))
+
+        self.run_sql(
+            statement, database, key_name=key_name, user_name=user_name,
+            user_password=user_password)
+
+    @shell.tag_operation
+    def set_ini_parameter(
+            self, ini_parameter_values, database, file_name, layer,
+            **kwargs):
+        """
+        Set HANA configuration parameters in ini file
+
+        SQL syntax:
+        ALTER SYSTEM ALTER CONFIGURATION (<filename>, <layer>[, <layer_name>])
+        SET (<section_name_1>,<parameter_name_1>) = <parameter_value_1>,
+            (<section_name_2>,<parameter_name_2>) = <parameter_value_2>
+        WITH RECONFIGURE
+
+        key_name or user_name/user_password parameters must be used
+        Args:
+            ini_parameter_values (list): List containing HANA parameter details
+            where each entry is a dictionary like below:
+            {'section_name':'name', 'parameter_name':'param_name', 'parameter_value':'value'}
+                section_name (str): Section name of parameter in ini file
+                parameter_name (str): Name of the parameter to be modified
+                parameter_value (str): The value of the parameter to be set
+            database (str): Database name
+            file_name (str): INI configuration file name
+            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
+            layer_name (str, optional): Target either a tenant name or a target host name
+            reconfig (bool, optional): If apply changes to running HANA instance
+            key_name (str, optional): Keystore to connect to sap hana db
+            user_name (str, optional): User to connect to sap hana db
+            user_password (str, optional): Password to connect to sap hana db
+        """
+
+        parameter_str = ', '.join("(\'{}\',\'{}\')=\'{}\'".format(
+            params['section_name'], params['parameter_name'],
+            params['parameter_value']) for params in ini_parameter_values)
+
+        layer_name = kwargs.get('layer_name', None)
+        reconfig = kwargs.get('reconfig', False)
+        key_name = kwargs.get('key_name', None)
+        user_name = kwargs.get('user_name', None)
+        user_password = kwargs.get('user_password', None)
+
+        self._manage_ini_file(
+            parameter_str=parameter_str, database=database,
+            file_name=file_name, layer=layer, layer_name=layer_name,
+            set_value=True, reconfig=reconfig, key_name=key_name,
+            user_name=user_name, user_password=user_password)
+
+    @shell.tag_operation
+    def unset_ini_parameter(
+            self, ini_parameter_names, database, file_name, layer,
+            **kwargs):
+        """
+        Unset HANA configuration parameters in ini file
+
+        SQL syntax:
+        ALTER SYSTEM ALTER CONFIGURATION (<filename>, <layer>[, <layer_name>])
+        UNSET (<section_name>,<parameter_name>);
+
+        key_name or user_name/user_password parameters must be used
+        Args:
+            ini_parameter_names (list): List containing HANA parameter details
+            where each entry is a dictionary like below:
+            {'section_name':'name', 'parameter_name':'param_name'}
+                section_name (str): Section name of parameter in ini file
+                parameter_name (str): Name of the parameter to be modified
+            database (str): Database name
+            file_name (str): INI configuration file name
+            layer (str): Target layer for the configuration change 'SYSTEM', 'HOST' or 'DATABASE'
+            layer_name (str, optional): Target either a tenant name or a target host name
+            reconfig (bool, optional): If apply changes to running HANA instance
+            key_name (str, optional): Keystore to connect to sap hana db
+            user_name (str, optional): User to connect to sap hana db
+            user_password (str, optional): Password to connect to sap hana db
+        """
+        parameter_str = ', '.join("(\'{}\',\'{}\')".format(
+            params['section_name'], params['parameter_name']) for params in ini_parameter_names)
+
+        layer_name = kwargs.get('layer_name', None)
+        reconfig = kwargs.get('reconfig', False)
+        key_name = kwargs.get('key_name', None)
+        user_name = kwargs.get('user_name', None)
+        user_password = kwargs.get('user_password', None)
+
+        self._manage_ini_file(
+            parameter_str=parameter_str, database=database,
+            file_name=file_name, layer=layer, layer_name=layer_name,
+            set_value=False, reconfig=reconfig, key_name=key_name,
+            user_name=user_name, user_password=user_password)
+
+    def _current_ini_values(self, file_names):
+        """
+        Get the current values of the ini files parameters from M_INIFILE_CONTENTS, with
+        only one query
+
+        Returns:
+            dict: Values by (file_name, layer, layer_name, section_name, parameter_name)
+        """
+        statement = (
+            'SELECT FILE_NAME, LAYER_NAME, TENANT_NAME, HOST, SECTION, KEY, VALUE '
+            'FROM SYS.M_INIFILE_CONTENTS WHERE FILE_NAME IN ({})'.format(', '.join(
+                "'{}'".format(escape_sql(file_name)) for file_name in file_names)))
+        result = self.run_sql(statement)
+        values = {}
+        for file_name, layer, tenant, host, section, key, value in result.records:
+            if layer == 'DATABASE':
+                layer_name = tenant or None
+            elif layer == 'HOST':
+                layer_name = host or None
+            else:
+                layer_name = None
+            values[(file_name, layer, layer_name, section, key)] = value
+        return values
+
+    @shell.tag_operation
+    def apply_ini_parameters(self, ini_parameters, reconfig=False, dry_run=False):
+        """
+        Apply the desired ini parameters values, changing only the parameters which don't
+        have the desired value. The current values are read from M_INIFILE_CONTENTS in one
+        query and the changes are applied with one SET and one UNSET statement by file and
+        layer. If reconfig is set only the last statement is run WITH RECONFIGURE, so the
+        services reload the configuration once with all the changes
+
+        The database connection is required (hdb_connector or connect_db)
+
+        Args:
+            ini_parameters (list): Desired parameters, where each entry is a dictionary like:
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'name',
+             'parameter_name': 'param_name', 'parameter_value': 'value'}
+                layer_name (str, optional): Tenant name or host name for the 'DATABASE' and
+                    'HOST' layers
+                parameter_value (str): Value to set. None to unset the parameter
+            reconfig (bool, optional): If apply changes to running HANA instance
+            dry_run (bool, optional): Only compute the changes, without applying them
+
+        Returns:
+            list: Applied changes, as dictionaries with the parameter details plus
+            old_value and new_value (None if the parameter is not set or unset)
+        """
+        if self.hdb_connector is None:
+            raise hanaerrors.HanaError(
+                'a database connection is required to apply the ini parameters')
+
+        desired = collections.OrderedDict()
+        for params in ini_parameters:
+            layer = params['layer']
+            layer_name = params.get('layer_name', None) if layer in ('HOST', 'DATABASE') else None
+            if layer in ('HOST', 'DATABASE') and not layer_name:
+                raise hanaerrors.HanaError(
+                    'layer_name is required for the {} layer parameter {}'.format(
+                        layer, params['parameter_name']))
+            key = (params['file_name'], layer, layer_name, params['section_name'],
+                   params['parameter_name'])
+            value = params.get('parameter_value', None)
+            desired[key] = None if value is None else str(value)
+        if not desired:
+            return []
+
+        current = self._current_ini_values(
+            sorted(set(key[0] for key in desired)))
+        changes = []
+        groups = collections.OrderedDict()
+        for key, value in desired.items():
+            old_value = current.get(key, None)
+            if old_value == value:
+                continue
+            file_name, layer, layer_name, section_name, parameter_name = key
+            changes.append({
+                'file_name': file_name, 'layer': layer, 'layer_name': layer_name,
+                'section_name': section_name, 'parameter_name': parameter_name,
+                'old_value': old_value, 'new_value': value
+            })
+            set_values, unset_values = groups.setdefault(key[:3], ([], []))
+            if value is None:
+                unset_values.append("(\'{}\',\'{}\')".format(
+                    escape_sql(section_name), escape_sql(parameter_name)))
+            else:
+                set_values.append("(\'{}\',\'{}\')=\'{}\'".format(
+                    escape_sql(section_name), escape_sql(parameter_name), escape_sql(value)))
+
+        self._logger.info('%d ini parameters must be changed', len(changes))
+        if dry_run:
+            return changes
+
+        statements = []
+        for (file_name, layer, layer_name), (set_values, unset_values) in groups.items():
+            for set_value, values in ((True, set_values), (False, unset_values)):
+                if values:
+                    statements.append((file_name, layer, layer_name, set_value, values))
+        for index, (file_name, layer, layer_name, set_value, values) in enumerate(statements):
+            self._manage_ini_file(
+                parameter_str=', '.join(values), database=None,
+                file_name=escape_sql(file_name), layer=layer,
+                layer_name=layer_name and escape_sql(layer_name), set_value=set_value,
+                reconfig=reconfig and index == len(statements) - 1)
+        return changes
@@ -8,8 +8,43 @@ Base connector
 :since: 2019-05-08
 """
 
+import array
 import logging
 
+# numpy is optional, the columnar results use array.array if it's not available
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Maximum number of query records logged in debug level
+MAX_LOGGED_RECORDS = 10
+# Number of records fetched in every fetchmany call of the streaming results
+DEFAULT_BATCH_SIZE = 1000
+
+# Signed 64 bits array type code. 'q' is not available in python 2
+try:
+    array.array('q')
+    INT_TYPECODE = 'q'
+except ValueError:  # pragma: no cover
+    INT_TYPECODE = 'l'
+FLOAT_TYPECODE = 'd'
+# Array type codes of the numeric SAP HANA column type codes (cursor description type_code)
+NUMERIC_TYPE_CODES = {
+    1: INT_TYPECODE,  # TINYINT
+    2: INT_TYPECODE,  # SMALLINT
+    3: INT_TYPECODE,  # INTEGER
+    4: INT_TYPECODE,  # BIGINT
+    6: FLOAT_TYPECODE,  # REAL
+    7: FLOAT_TYPECODE  # DOUBLE
+}
+
+# python2 and python3 compatibility for integers
+try:
+    INTEGER_TYPES = (int, long)
+except NameError:  # pragma: no cover
+    INTEGER_TYPES = (int,)
+
 
 class BaseError(Exception):
     """
@@ -56,12 +91,348 @@ class QueryResult(object):
         Args:
             cursor (obj): Cursor object created by the connector (dbapi or pydhb)
         """
-        records = cursor.fetchall() # TODO: catch any exceptions raised by fetchall()
         metadata = cursor.description
+        # Statements without result set (BACKUP, ALTER SYSTEM, etc) don't have description
+        if metadata is None:
+            records = []
+        else:
+            records = cursor.fetchall() # TODO: catch any exceptions raised by fetchall()
         instance = cls(records, metadata)
-        instance._logger.info('query records: %s', instance.records)
+        instance._logger.info('query returned %d records', len(records))
+        if instance._logger.isEnabledFor(logging.DEBUG):
+            instance._logger.debug(
+                'first query records: %s', records[:MAX_LOGGED_RECORDS])
         return instance
 
+class StreamingQueryResult(object):
+    """
+    Query result which fetches the records on demand, in batches of batch_size records. The
+    cursor is kept open until all the records are read or the result is closed
+
+    Args:
+        cursor (obj): Cursor object with the executed query, created by the connector
+        batch_size (int, opt): Number of records fetched in every fetchmany call
+        errors (tuple, opt): Connector exceptions raised as QueryError when fetching the records
+    """
+
+    def __init__(self, cursor, batch_size=DEFAULT_BATCH_SIZE, errors=()):
+        if batch_size < 1:
+            raise ValueError('batch_size must be greater than 0')
+        self._logger = logging.getLogger(__name__)
+        self._cursor = cursor
+        self._errors = errors
+        self.batch_size = batch_size
+        self.metadata = cursor.description
+        self.rowcount = 0
+        # Statements without result set don't have records to fetch
+        if self.metadata is None:
+            self.close()
+
+    @property
+    def closed(self):
+        """
+        True if the cursor is already closed
+        """
+        return self._cursor is None
+
+    def fetch_batch(self):
+        """
+        Fetch the next batch of records
+
+        Returns:
+            list: Fetched records. Empty list when the result is exhausted
+        """
+        if self._cursor is None:
+            return []
+        try:
+            records = self._cursor.fetchmany(self.batch_size)
+        except self._errors as err:
+            self.close()
+            raise QueryError('query failed: {}'.format(err))  # pylint:disable=W0707
+        if records:
+            self.rowcount += len(records)
+        else:
+            self._logger.info('query returned %d records', self.rowcount)
+            self.close()
+        return list(records)
+
+    def __iter__(self):
+        while True:
+            records = self.fetch_batch()
+            if not records:
+                return
+            for record in records:
+                yield record
+
+    def close(self):
+        """
+        Close the cursor. The pending records are discarded
+        """
+        if self._cursor is not None:
+            cursor = self._cursor
+            self._cursor = None
+            cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class _ColumnBuilder(object):
+    """
+    Column values storage. The column type is chosen with the cursor description type code:
+    int array for the integer types, float array for REAL and DOUBLE and list for the rest
+    (strings, decimals, dates, booleans, etc). If the type code is not available (no metadata
+    or drivers with other type codes) the type is guessed from the first not NULL values.
+    The NULL values of the arrays are stored as 0 and their positions are kept apart. If a
+    later value doesn't fit in the array the column is converted to list
+
+    Args:
+        type_code (int, opt): Column type code of the cursor description
+    """
+
+    def __init__(self, type_code=None):
+        self.values = None
+        self.nulls = []
+        self._size = 0
+        if isinstance(type_code, INTEGER_TYPES) and not isinstance(type_code, bool):
+            typecode = NUMERIC_TYPE_CODES.get(type_code, None)
+            self.values = array.array(typecode) if typecode else []
+
+    @staticmethod
+    def _typecode(values):
+        if not values:
+            return None
+        if all(isinstance(value, INTEGER_TYPES) and not isinstance(value, bool)
+               for value in values):
+            return INT_TYPECODE
+        if all(isinstance(value, INTEGER_TYPES + (float,)) and not isinstance(value, bool)
+               for value in values):
+            return FLOAT_TYPECODE
+        return None
+
+    def _tolist(self):
+        """
+        Convert the array to list, restoring the NULL values
+        """
+        values = self.values.tolist()
+        for index in self.nulls:
+            values[index] = None
+        self.nulls = []
+        return values
+
+    def extend(self, values):
+        """
+        Append a batch of values
+        """
+        not_null = [value for value in values if value is not None]
+        if self.values is None:
+            if not not_null:
+                # The type is guessed when the first not NULL value comes
+                self.nulls.extend(range(self._size, self._size + len(values)))
+                self._size += len(values)
+                return
+            typecode = self._typecode(not_null)
+            if typecode:
+                self.values = array.array(typecode, [0]) * self._size
+            else:
+                self.values = [None] * self._size
+                self.nulls = []
+        if isinstance(self.values, array.array):
+            typecode = self._typecode(not_null)
+            if not not_null or typecode == self.values.typecode or (
+                    typecode == INT_TYPECODE and self.values.typecode == FLOAT_TYPECODE):
+                try:
+                    batch = array.array(
+                        self.values.typecode, [0 if value is None else value for value in values])
+                    self.nulls.extend(
+                        self._size + index for index, value in enumerate(values) if value is None)
+                    self.values.extend(batch)
+                    self._size += len(values)
+                    return
+                except OverflowError:
+                    pass
+            self.values = self._tolist()
+        self.values.extend(values)
+        self._size += len(values)
+
+    def build(self, use_numpy):
+        """
+        Get the column values. The arrays are converted to numpy arrays without copy if
+        use_numpy is set, masking the NULL values
+        """
+        if self.values is None:
+            self.nulls = []
+            return [None] * self._size
+        if use_numpy and isinstance(self.values, array.array):
+            dtype = 'float64' if self.values.typecode == FLOAT_TYPECODE else 'int64'
+            values = numpy.frombuffer(self.values, dtype=dtype)
+            if self.nulls:
+                mask = numpy.zeros(len(self.values), dtype=bool)
+                mask[self.nulls] = True
+                values = numpy.ma.masked_array(values, mask=mask)
+            return values
+        return self.values
+
+
+class ColumnarQueryResult(object):
+    """
+    Query result stored by columns. The numeric columns are stored in array.array (or numpy
+    arrays if numpy is available) and the rest of columns in lists, so the big results use
+    less memory than the records tuples and the aggregations run over contiguous values.
+    The NULL values of the numeric arrays are stored as 0 (masked in the numpy arrays) and
+    their positions are available with the nulls method
+
+    Args:
+        columns (list): Values of every column, in the metadata order
+        metadata (tuple): Sequence of 7-item sequences that describe one result column
+        nulls (list, opt): Positions of the NULL values of every numeric array column
+    """
+
+    def __init__(self, columns, metadata, nulls=None):
+        self.metadata = metadata
+        self.names = [item[0] for item in metadata] if metadata else []
+        self._columns = columns
+        self._nulls = nulls or [[] for _ in columns]
+        self._indexes = dict((name, index) for index, name in enumerate(self.names))
+
+    @classmethod
+    def from_batches(cls, batches, metadata, use_numpy=None):
+        """
+        Create the result from batches of records
+
+        Args:
+            batches (iterable): Lists of records
+            metadata (tuple): Sequence of 7-item sequences that describe one result column
+            use_numpy (bool, opt): Store the numeric columns in numpy arrays. Used by default
+                if numpy is available
+        """
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError('numpy is not available')
+        builders = [_ColumnBuilder(item[1]) for item in (metadata or ())]
+        for batch in batches:
+            for builder, values in zip(builders, zip(*batch)):
+                builder.extend(values)
+        columns = [builder.build(use_numpy) for builder in builders]
+        return cls(columns, metadata, [builder.nulls for builder in builders])
+
+    @classmethod
+    def load_stream(cls, stream, use_numpy=None):
+        """
+        Create the result from a StreamingQueryResult, reading it in batches. The stream is
+        closed afterwards
+
+        Args:
+            stream (StreamingQueryResult): Streaming result
+            use_numpy (bool, opt): Store the numeric columns in numpy arrays. Used by default
+                if numpy is available
+        """
+        with stream:
+            return cls.from_batches(
+                iter(stream.fetch_batch, []), stream.metadata, use_numpy)
+
+    @property
+    def rowcount(self):
+        """
+        Number of records
+        """
+        return len(self._columns[0]) if self._columns else 0
+
+    def __len__(self):
+        return self.rowcount
+
+    def column(self, name):
+        """
+        Get the values of a column
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            array.array, numpy.ndarray or list with the values
+        """
+        index = self._indexes.get(name, None)
+        if index is None:
+            raise KeyError('column {} not found'.format(name))
+        return self._columns[index]
+
+    __getitem__ = column
+
+    def is_numeric(self, name):
+        """
+        Check if a column is stored as numeric array
+        """
+        return not isinstance(self.column(name), list)
+
+    def nulls(self, name):
+        """
+        Get the positions of the NULL values of a column
+
+        Args:
+            name (str): Column name
+
+        Returns:
+            list: Indexes of the NULL values
+        """
+        values = self.column(name)
+        if isinstance(values, list):
+            return [index for index, value in enumerate(values) if value is None]
+        return self._nulls[self._indexes[name]]
+
+    def _aggregate(self, name, function):
+        """
+        Run min, max or sum over a column, ignoring the NULL values. The numpy arrays use
+        their own method. If the column doesn't have any value min and max return None and
+        sum returns 0
+        """
+        values = self.column(name)
+        nulls = self.nulls(name)
+        if len(nulls) == self.rowcount:
+            return 0 if function is sum else None
+        if isinstance(values, list):
+            return function(value for value in values if value is not None)
+        if numpy is not None and isinstance(values, numpy.ndarray):
+            return getattr(values, function.__name__)()
+        if nulls:
+            nulls = set(nulls)
+            return function(
+                value for index, value in enumerate(values) if index not in nulls)
+        return function(values)
+
+    def min(self, name):
+        """
+        Get the minimum value of a column, ignoring the NULL values
+        """
+        return self._aggregate(name, min)
+
+    def max(self, name):
+        """
+        Get the maximum value of a column, ignoring the NULL values
+        """
+        return self._aggregate(name, max)
+
+    def sum(self, name):
+        """
+        Get the sum of a column values, ignoring the NULL values
+        """
+        return self._aggregate(name, sum)
+
+    def rows(self):
+        """
+        Iterate the result as records tuples, with None in the NULL values
+        """
+        columns = []
+        for values, nulls in zip(self._columns, self._nulls):
+            if nulls:
+                values = list(values)
+                for index in nulls:
+                    values[index] = None
+            columns.append(values)
+        return zip(*columns)
+
 class BaseConnector(object):
     """
     Base SAP HANA database connector
@@ -96,6 +467,25 @@ class BaseConnector(object):
         raise NotImplementedError(
             'method must be implemented in inherited connectors')
 
+    def query_stream(self, sql_statement, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Query a sql statement and return a streaming result, which fetches the records in
+        batches while it's iterated
+        """
+        raise NotImplementedError(
+            'method must be implemented in inherited connectors')
+
+    def query_columnar(self, sql_statement, batch_size=DEFAULT_BATCH_SIZE, use_numpy=None):
+        """
+        Query a sql statement and return a columnar result. The records are fetched in batches
+        and stored by columns
+
+        Returns:
+            ColumnarQueryResult: Query result
+        """
+        return ColumnarQueryResult.load_stream(
+            self.query_stream(sql_statement, batch_size), use_numpy)
+
     def disconnect(self):
         """
         Disconnect from SAP HANA database
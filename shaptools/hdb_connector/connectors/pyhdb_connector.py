@@ -70,6 +70,27 @@ class PyhdbConnector(base_connector.BaseConnector):
                 cursor.close()
         return result
 
+    def query_stream(self, sql_statement, batch_size=base_connector.DEFAULT_BATCH_SIZE):
+        """
+        Query a sql statement and return a streaming result. The records are fetched in
+        batches of batch_size records while the result is iterated
+
+        Returns:
+            base_connector.StreamingQueryResult: Result, which must be closed if it's not
+            completely iterated
+        """
+        self._logger.info('executing sql query: %s', sql_statement)
+        cursor = None
+        try:
+            cursor = self._connection.cursor()
+            cursor.execute(sql_statement)
+        except pyhdb.exceptions.DatabaseError as err:
+            if cursor:
+                cursor.close()
+            raise base_connector.QueryError('query failed: {}'.format(err))
+        return base_connector.StreamingQueryResult(
+            cursor, batch_size, errors=(pyhdb.exceptions.DatabaseError,))
+
     def disconnect(self):
         """
         Disconnect from SAP HANA database
@@ -0,0 +1,394 @@
+"""
+Thread safe pool of SAP HANA database connections
+
+The pool keeps between min_size and max_size connectors open and hands them out to the calling
+threads. The idle connections are checked before reusing them with isconnected and a query to
+the DUMMY table, but the check is skipped if the connection was checked in the last
+probe_interval seconds. The connections are closed when they reach max_lifetime or stay unused
+more than idle_timeout.
+
+Example:
+    db_pool = pool.ConnectorPool('hana01', 30015, user='SYSTEM', password='pass', max_size=4)
+    with db_pool.connection() as connector:
+        connector.query('SELECT * FROM M_SERVICES')
+    db_pool.close()
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import contextlib
+import logging
+import threading
+import time
+
+from shaptools import hdb_connector
+from shaptools.hdb_connector.connectors import base_connector
+
+LOGGER = logging.getLogger('hdb_connector.pool')
+
+PROBE_STATEMENT = 'SELECT * FROM DUMMY'
+
+
+class PoolTimeoutError(base_connector.BaseError):
+    """
+    No connection was available before the checkout timeout
+    """
+
+
+class PoolClosedError(base_connector.BaseError):
+    """
+    The pool is already closed
+    """
+
+
+class PooledConnection(object):
+    """
+    Pool connection data
+
+    Args:
+        connector (base_connector.BaseConnector): Connected connector
+    """
+
+    __slots__ = ('connector', 'created', 'last_used', 'last_checked')
+
+    def __init__(self, connector):
+        self.connector = connector
+        self.created = time.time()
+        self.last_used = self.created
+        self.last_checked = self.created
+
+
+class PoolStats(object):
+    """
+    Pool usage counters
+    """
+
+    __slots__ = (
+        'created', 'closed', 'checkouts', 'waits', 'timeouts', 'probes', 'probe_failures',
+        'evicted_idle', 'evicted_lifetime')
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.evicted_idle = 0
+        self.evicted_lifetime = 0
+
+    def to_dict(self):
+        """
+        Get the counters as dictionary
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class ConnectorPool(object):
+    """
+    Thread safe pool of database connectors
+
+    Args:
+        host (str): Host where the database is running
+        port (int, opt): Database port (3{inst_number}15 by default)
+        min_size (int, opt): Connections opened when the pool is created and kept open even if
+            they are idle
+        max_size (int, opt): Maximum number of open connections
+        timeout (float, opt): Default checkout timeout in seconds. None waits forever
+        probe_interval (float, opt): Seconds during which a successful liveness check is valid
+        max_lifetime (float, opt): Seconds after which a connection is closed. None to disable
+        idle_timeout (float, opt): Seconds an unused connection is kept open. None to disable
+        connector_factory (callable, opt): Function returning a new not connected connector.
+            hdb_connector.HdbConnector by default
+        kwargs: Connection parameters (user, password, timeout, properties) used by connect
+    """
+
+    def __init__(
+            self, host, port=30015, min_size=0, max_size=5, timeout=30, probe_interval=10,
+            max_lifetime=3600, idle_timeout=300, connector_factory=None, **kwargs):
+        if max_size < 1:
+            raise ValueError('max_size must be greater than 0')
+        if min_size < 0 or min_size > max_size:
+            raise ValueError('min_size must be between 0 and max_size')
+        self.host = host
+        self.port = port
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self._connector_factory = connector_factory or hdb_connector.HdbConnector
+        self._connect_kwargs = kwargs
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self.stats = PoolStats()
+        for _ in range(min_size):
+            pooled = self._open()
+            with self._condition:
+                self._size += 1
+                self._idle.append(pooled)
+
+    @property
+    def size(self):
+        """
+        Number of open connections
+        """
+        with self._condition:
+            return self._size
+
+    def get_stats(self):
+        """
+        Get the pool statistics
+
+        Returns:
+            dict: Usage counters plus the current size, idle and in_use connections
+        """
+        with self._condition:
+            stats = self.stats.to_dict()
+            stats.update(size=self._size, idle=len(self._idle), in_use=len(self._in_use))
+        return stats
+
+    def _open(self):
+        """
+        Create and connect a new connector
+        """
+        connector = self._connector_factory()
+        connector.connect(self.host, self.port, **self._connect_kwargs)
+        with self._condition:
+            self.stats.created += 1
+        LOGGER.debug('new connection opened to %s:%s', self.host, self.port)
+        return PooledConnection(connector)
+
+    def _discard(self, pooled):
+        """
+        Close a connection and open new ones if the pool is under min_size. The pool size must
+        be already decreased
+        """
+        try:
+            pooled.connector.disconnect()
+        except Exception as err:  # pylint:disable=broad-except
+            LOGGER.debug('error closing connection: %s', err)
+        with self._condition:
+            self.stats.closed += 1
+        self._refill()
+
+    def _refill(self):
+        """
+        Open idle connections until the pool has min_size connections. The errors are only
+        logged, the next discarded connection tries again
+        """
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_size:
+                    return
+                # Reserve the slot of the new connection
+                self._size += 1
+            try:
+                pooled = self._open()
+            except Exception as err:  # pylint:disable=broad-except
+                LOGGER.debug('error opening connection to keep min_size: %s', err)
+                self._release_slot()
+                return
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def _is_expired(self, pooled, current_time):
+        """
+        Check if the connection reached its maximum lifetime
+        """
+        return self.max_lifetime is not None and current_time - pooled.created >= self.max_lifetime
+
+    def _evict(self, current_time):
+        """
+        Remove the expired and idle connections from the idle list. Lock must be already acquired
+
+        Returns:
+            list: Removed connections, to be closed without the lock
+        """
+        evicted = []
+        for pooled in list(self._idle):
+            if self._is_expired(pooled, current_time):
+                self.stats.evicted_lifetime += 1
+            elif (self.idle_timeout is not None and self._size > self.min_size and
+                  current_time - pooled.last_used >= self.idle_timeout):
+                self.stats.evicted_idle += 1
+            else:
+                continue
+            self._idle.remove(pooled)
+            self._size -= 1
+            evicted.append(pooled)
+        return evicted
+
+    def _is_alive(self, pooled):
+        """
+        Check the connection with isconnected and a DUMMY query. The result is cached during
+        probe_interval seconds
+        """
+        current_time = time.time()
+        if current_time - pooled.last_checked < self.probe_interval:
+            return True
+        with self._condition:
+            self.stats.probes += 1
+        try:
+            alive = pooled.connector.isconnected()
+            if alive:
+                pooled.connector.query(PROBE_STATEMENT)
+        # The driver errors (hdbcli.dbapi.Error for example) are not base_connector errors
+        except Exception as err:  # pylint:disable=broad-except
+            LOGGER.debug('connection liveness check failed: %s', err)
+            alive = False
+        if alive:
+            pooled.last_checked = current_time
+        else:
+            with self._condition:
+                self.stats.probe_failures += 1
+        return alive
+
+    def _release_slot(self):
+        """
+        Free a reserved or discarded connection slot
+        """
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def acquire(self, timeout=-1):
+        """
+        Check out a connector. It must be returned with release
+
+        Args:
+            timeout (float, opt): Seconds to wait for a free connection. The pool timeout by
+                default. None waits forever
+
+        Returns:
+            base_connector.BaseConnector: Connected connector
+
+        Raises:
+            PoolTimeoutError: If no connection is available before the timeout
+            PoolClosedError: If the pool is closed
+            base_connector.ConnectionError: If a new connection fails
+        """
+        timeout = self.timeout if timeout == -1 else timeout
+        limit = None if timeout is None else time.time() + timeout
+        while True:
+            pooled = None
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolClosedError('the connection pool is closed')
+                    # The evicted connections decrease the size, so they always end the wait
+                    evicted = self._evict(time.time())
+                    if self._idle or self._size < self.max_size:
+                        break
+                    remaining = None if limit is None else limit - time.time()
+                    if remaining is not None and remaining <= 0:
+                        self.stats.timeouts += 1
+                        raise PoolTimeoutError(
+                            'no connection available after {} seconds'.format(timeout))
+                    self.stats.waits += 1
+                    self._condition.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    # Reserve the slot of the new connection
+                    self._size += 1
+            for item in evicted:
+                self._discard(item)
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._is_alive(pooled):
+                self._release_slot()
+                self._discard(pooled)
+                continue
+
+            with self._condition:
+                pooled.last_used = time.time()
+                self._in_use[id(pooled.connector)] = pooled
+                self.stats.checkouts += 1
+            return pooled.connector
+
+    def release(self, connector, discard=False):
+        """
+        Return a checked out connector to the pool
+
+        Args:
+            connector (base_connector.BaseConnector): Connector returned by acquire
+            discard (bool, opt): Close the connection instead of reusing it
+        """
+        with self._condition:
+            pooled = self._in_use.pop(id(connector), None)
+            if pooled is None:
+                raise ValueError('the connector was not checked out from this pool')
+            current_time = time.time()
+            pooled.last_used = current_time
+            if self._is_expired(pooled, current_time):
+                self.stats.evicted_lifetime += 1
+                discard = True
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(pooled)
+                pooled = None
+            self._condition.notify()
+        if pooled is not None:
+            self._discard(pooled)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=-1):
+        """
+        Check out a connector during the context. The connector is closed if the context
+        raises base_connector.ConnectionError
+
+        Args:
+            timeout (float, opt): Seconds to wait for a free connection. The pool timeout by
+                default. None waits forever
+        """
+        connector = self.acquire(timeout)
+        discard = False
+        try:
+            yield connector
+        except base_connector.ConnectionError:
+            discard = True
+            raise
+        finally:
+            self.release(connector, discard)
+
+    def evict(self):
+        """
+        Close the expired and idle connections
+        """
+        with self._condition:
+            evicted = self._evict(time.time())
+            if evicted:
+                self._condition.notify_all()
+        for pooled in evicted:
+            self._discard(pooled)
+
+    def close(self):
+        """
+        Close the idle connections and the checked out connections when they are released.
+        The pool can't be used anymore
+        """
+        with self._condition:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
@@ -0,0 +1,216 @@
+"""
+Command execution metrics collector
+
+MetricsCollector is a shell command hook which keeps latency histograms by operation and
+command. The metrics can be exported in Prometheus text format or JSON.
+
+Example:
+    collector = metrics.MetricsCollector()
+    shell.add_hook(collector)
+    hana_instance.sr_register_secondary(...)
+    print(collector.to_prometheus())
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import json
+import threading
+
+from shaptools import shell
+
+# Latency histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600)
+METRIC_PREFIX = 'shaptools_command'
+
+
+def command_name(cmd):
+    """
+    Get a low cardinality name of a command to be used as metric label. It's composed by the
+    executable and its first option or subcommand (the sapcontrol function for sapcontrol
+    commands)
+
+    Args:
+        cmd (str): Command
+
+    Returns:
+        str: Command name
+    """
+    tokens = cmd.split()
+    if not tokens:
+        return ''
+    if tokens[0] == 'sapcontrol' and '-function' in tokens[:-1]:
+        return 'sapcontrol {}'.format(tokens[tokens.index('-function') + 1])
+    if len(tokens) > 1 and '=' not in tokens[1] and '/' not in tokens[1]:
+        return '{} {}'.format(tokens[0], tokens[1])
+    return tokens[0]
+
+
+def _escape_label(value):
+    """
+    Escape a Prometheus label value
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    """
+    Format a histogram bucket bound
+    """
+    return repr(float(bound))
+
+
+class CommandMetrics(object):
+    """
+    Metrics of an (operation, command) pair
+
+    Args:
+        buckets (tuple): Latency histogram upper bounds in seconds
+    """
+
+    __slots__ = ('bucket_counts', 'count', 'duration_sum', 'failures', 'errors', 'output_bytes')
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.failures = 0
+        self.errors = 0
+        self.output_bytes = 0
+
+
+class MetricsCollector(shell.CommandHook):
+    """
+    Command hook which collects the commands latency histograms, failures (non zero return
+    code), errors (exceptions as timeouts) and output size, by operation and command name
+
+    Args:
+        buckets (tuple, opt): Latency histogram upper bounds in seconds
+        name_func (callable, opt): Function to get the command label from the command.
+            command_name by default
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, name_func=command_name):
+        self.buckets = tuple(sorted(buckets))
+        self._name_func = name_func
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_metrics(self, event):
+        """
+        Get the metrics entry of an event. Must be called with the lock acquired
+        """
+        key = (event.operation or '', self._name_func(event.cmd))
+        entry = self._metrics.get(key, None)
+        if entry is None:
+            entry = CommandMetrics(self.buckets)
+            self._metrics[key] = entry
+        return entry
+
+    def _observe(self, entry, duration):
+        """
+        Add a duration to the histogram
+        """
+        entry.count += 1
+        entry.duration_sum += duration
+        for index, bound in enumerate(self.buckets):
+            if duration <= bound:
+                entry.bucket_counts[index] += 1
+
+    def on_end(self, event):
+        with self._lock:
+            entry = self._get_metrics(event)
+            self._observe(entry, event.duration)
+            if event.returncode:
+                entry.failures += 1
+            entry.output_bytes += event.output_size or 0
+
+    def on_error(self, event):
+        with self._lock:
+            entry = self._get_metrics(event)
+            self._observe(entry, event.duration)
+            entry.errors += 1
+
+    def reset(self):
+        """
+        Remove the collected metrics
+        """
+        with self._lock:
+            self._metrics = {}
+
+    def to_dict(self):
+        """
+        Get the collected metrics
+
+        Returns:
+            list: Dictionaries with the metrics of each operation and command
+        """
+        with self._lock:
+            data = []
+            for (operation, command), entry in sorted(self._metrics.items()):
+                data.append({
+                    'operation': operation,
+                    'command': command,
+                    'count': entry.count,
+                    'sum': entry.duration_sum,
+                    'buckets': dict(
+                        (_format_bound(bound), count)
+                        for bound, count in zip(self.buckets, entry.bucket_counts)),
+                    'failures': entry.failures,
+                    'errors': entry.errors,
+                    'output_bytes': entry.output_bytes
+                })
+            return data
+
+    def to_json(self, **kwargs):
+        """
+        Export the collected metrics as JSON
+
+        Args:
+            kwargs: json.dumps options
+
+        Returns:
+            str: JSON document
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self):
+        """
+        Export the collected metrics in Prometheus text exposition format
+
+        Returns:
+            str: Metrics text
+        """
+        data = self.to_dict()
+        lines = [
+            '# HELP {}_duration_seconds Command execution time'.format(METRIC_PREFIX),
+            '# TYPE {}_duration_seconds histogram'.format(METRIC_PREFIX)
+        ]
+        for entry in data:
+            labels = 'operation="{}",command="{}"'.format(
+                _escape_label(entry['operation']), _escape_label(entry['command']))
+            for bound in self.buckets:
+                lines.append('{}_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                    METRIC_PREFIX, labels, _format_bound(bound),
+                    entry['buckets'][_format_bound(bound)]))
+            lines.append('{}_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                METRIC_PREFIX, labels, entry['count']))
+            lines.append('{}_duration_seconds_sum{{{}}} {}'.format(
+                METRIC_PREFIX, labels, repr(entry['sum'])))
+            lines.append('{}_duration_seconds_count{{{}}} {}'.format(
+                METRIC_PREFIX, labels, entry['count']))
+
+        for metric, key, help_text in [
+                ('failures_total', 'failures', 'Commands finished with non zero return code'),
+                ('errors_total', 'errors', 'Commands which raised an error'),
+                ('output_bytes_total', 'output_bytes', 'Commands output size in bytes')]:
+            lines.append('# HELP {}_{} {}'.format(METRIC_PREFIX, metric, help_text))
+            lines.append('# TYPE {}_{} counter'.format(METRIC_PREFIX, metric))
+            for entry in data:
+                lines.append('{}_{}{{operation="{}",command="{}"}} {}'.format(
+                    METRIC_PREFIX, metric, _escape_label(entry['operation']),
+                    _escape_label(entry['command']), entry[key]))
+        return '\n'.join(lines) + '\n'
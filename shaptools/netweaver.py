@@ -11,11 +11,16 @@ SAP Netweaver management module
 from __future__ import print_function
 
 import logging
-import time
 import fileinput
 import re
 
 from shaptools import shell
+from shaptools import agent
+from shaptools import retry
+from shaptools import cmdcache
+from shaptools import executors
+from shaptools import shellsession
+from shaptools import userenv
 
 # python2 and python3 compatibility for string usage
 try:
@@ -24,6 +29,20 @@ except NameError:  # pragma: no cover
     basestring = str
 
 
+# GetProcessList output lines used to detect the installed SAP instances
+PROCESSES_SCANNER = shell.PatternScanner([
+    ('msg_server', r'msg_server, MessageServer,.*'),
+    ('enserver', r'enserver, EnqueueServer,.*'),
+    ('enq_server', r'enq_server, Enqueue Server 2,.*'),
+    ('enrepserver', r'enrepserver, EnqueueReplicator,.*'),
+    ('enq_replicator', r'enq_replicator, Enqueue Replicator 2,.*'),
+    ('disp', r'disp\+work, Dispatcher,.*'),
+    ('igswd', r'igswd_mt, IGS Watchdog,.*'),
+    ('gwrd', r'gwrd, Gateway,.*'),
+    ('icman', r'icman, ICM,.*')
+])
+
+
 class NetweaverError(Exception):
     """
     Error during Netweaver command execution
@@ -39,6 +58,19 @@ class NetweaverInstance(object):
         inst (str): SAP Netweaver instance number
         password (str): Netweaver instance password
         remote_host (str, opt): Remote host where the command will be executed
+        shell_session (bool, opt): Run the sapcontrol commands in a long-lived sidadm login
+            shell instead of spawning a new one for each command
+        sidadm_env (bool, opt): Capture the sidadm login environment once and run the
+            sapcontrol commands directly by absolute path with it (only for local instances).
+            The environment is captured again if the SAP kernel changes
+        command_timeout (float, opt): Timeout in seconds of each sapcontrol command. The
+            command process group is killed and shell.ShellTimeoutError raised when it expires
+        cache (cmdcache.CommandCache, opt): Cache used to store the results of the read-only
+            sapcontrol functions (CACHED_FUNCTIONS). Any other function invalidates it
+        cache_ttl (float, opt): Create a new cache with this TTL in seconds if cache is not set
+        executor (executors.Executor, opt): Executor used to run the commands.
+            executors.ShellExecutor by default. shell_session and sidadm_env options take
+            precedence for the sapcontrol commands
     """
 
     # SID is usually written uppercased, but the OS user is always created lower case.
@@ -47,6 +79,9 @@ class NetweaverInstance(object):
     GETPROCESSLIST_SUCCESS_CODES = [0, 3, 4]
     SUCCESSFULLY_INSTALLED = 0
     UNSPECIFIED_ERROR = 111
+    KERNEL_PATH = '/usr/sap/{sid}/SYS/exe/run'
+    # sapcontrol functions whose results are cached
+    CACHED_FUNCTIONS = ['GetProcessList', 'GetSystemInstanceList', 'GetInstanceProperties']
 
     def __init__(self, sid, inst, password, **kwargs):
         # Force instance nr always with 2 positions.
@@ -60,6 +95,27 @@ class NetweaverInstance(object):
         self.inst = inst
         self._password = password
         self.remote_host = kwargs.get('remote_host', None)
+        self.shell_session = kwargs.get('shell_session', False)
+        self.sidadm_env = kwargs.get('sidadm_env', False)
+        if self.sidadm_env and self.remote_host:
+            raise ValueError('sidadm_env option is only available for local instances')
+        self._sidadm_env = None
+        self.command_timeout = kwargs.get('command_timeout', None)
+        self.cache = kwargs.get('cache', None)
+        if self.cache is None and kwargs.get('cache_ttl', None):
+            self.cache = cmdcache.CommandCache(ttl=kwargs['cache_ttl'])
+        self.executor = executors.get_executor(kwargs.get('executor', None))
+
+    def _get_sidadm_env(self):
+        """
+        Get the sidadm environment snapshot. The SAP kernel folder is watched to detect
+        version changes
+        """
+        if self._sidadm_env is None:
+            self._sidadm_env = userenv.UserEnvironment(
+                self.NETWEAVER_USER.format(sid=self.sid), self._password,
+                watch_paths=[self.KERNEL_PATH.format(sid=self.sid.upper())])
+        return self._sidadm_env
 
     def _execute_sapcontrol(self, sapcontrol_function, **kwargs):
         """
@@ -78,6 +134,115 @@ class NetweaverInstance(object):
                 stdout and stderr
         """
         exception = kwargs.get('exception', True)
+        cmd = self._sapcontrol_cmd(sapcontrol_function, **kwargs)
+        user = self.NETWEAVER_USER.format(sid=self.sid)
+
+        result = self._cache_lookup(user, cmd, sapcontrol_function)
+        if result is None:
+            with shell.deadline(self.command_timeout):
+                if self.shell_session:
+                    result = shellsession.get_session(user, self.remote_host).execute(cmd)
+                elif self.sidadm_env:
+                    result = self._get_sidadm_env().execute(cmd)
+                else:
+                    result = self.executor.execute(cmd, user, self._password, self.remote_host)
+            self._cache_store(user, cmd, sapcontrol_function, result)
+
+        return self._check_result(result, exception)
+
+    def _cache_lookup(self, user, cmd, sapcontrol_function):
+        """
+        Get the cached result of a sapcontrol command. The cache is invalidated if the
+        function is not cached, as it might change the instance state
+
+        Returns:
+            ProcessResult: Cached result. None if the command must be executed
+        """
+        if self.cache is None:
+            return None
+        if sapcontrol_function.split(' ')[0] in self.CACHED_FUNCTIONS:
+            return self.cache.get(self.remote_host, user, cmd)
+        self.cache.invalidate()
+        return None
+
+    def _cache_store(self, user, cmd, sapcontrol_function, result):
+        """
+        Store the result of a cached sapcontrol function. The failed results are not cached,
+        so transient sapstartsrv errors are not repeated. GetProcessList succeeds with any of
+        GETPROCESSLIST_SUCCESS_CODES
+        """
+        function_name = sapcontrol_function.split(' ')[0]
+        if self.cache is None or function_name not in self.CACHED_FUNCTIONS:
+            return
+        if function_name == 'GetProcessList':
+            success = result.returncode in self.GETPROCESSLIST_SUCCESS_CODES
+        else:
+            success = result.returncode == 0
+        if success:
+            self.cache.put(self.remote_host, user, cmd, result)
+
+    @staticmethod
+    def _check_result(result, exception=True):
+        """
+        Raise NetweaverError if the command failed and exception is set
+
+        Returns:
+            ProcessResult: The checked result
+        """
+        if exception and result.returncode != 0:
+            raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
+        return result
+
+    def _execute_sapcontrol_batch(self, sapcontrol_functions, **kwargs):
+        """
+        Execute an ordered list of sapcontrol functions in a single shell invocation, stopping
+        on the first failure. The command_timeout applies to the whole batch
+
+        Args:
+            sapcontrol_functions (list): sapcontrol functions
+            exception (boolean): Raise NetweaverError non-zero return code (default true)
+            host (str, optional): Host where the commands will be executed
+            inst (str, optional): Use a different instance number
+            user (str, optional): Define a different user for the commands
+            password (str, optional): The new user password
+
+        Returns:
+            list: ProcessResult instances of the executed commands
+        """
+        exception = kwargs.get('exception', True)
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.shell_session or self.sidadm_env:
+            # The commands already share the same login shell or environment
+            kwargs['exception'] = False
+            results = []
+            for sapcontrol_function in sapcontrol_functions:
+                results.append(self._execute_sapcontrol(sapcontrol_function, **kwargs))
+                if results[-1].returncode:
+                    break
+        else:
+            cmds = [self._sapcontrol_cmd(function, **kwargs) for function in sapcontrol_functions]
+            with shell.deadline(self.command_timeout):
+                results = self.executor.execute_batch(
+                    cmds, self.NETWEAVER_USER.format(sid=self.sid), self._password,
+                    self.remote_host)
+
+        for result in results:
+            self._check_result(result, exception)
+
+        return results
+
+    def _sapcontrol_cmd(self, sapcontrol_function, **kwargs):
+        """
+        Create sapcontrol command
+
+        Args:
+            sapcontrol_function (str): sapcontrol function
+            host (str, optional): Host where the command will be executed
+            inst (str, optional): Use a different instance number
+            user (str, optional): Define a different user for the command
+            password (str, optional): The new user password
+        """
         # The -host and -user parameters are used in sapcontrol to authorize commands execution
         # in remote host Netweaver instances
         host = kwargs.get('host', None)
@@ -90,22 +255,22 @@ class NetweaverInstance(object):
         host_str = '-host {} '.format(host) if host else ''
         user_str = '-user {} {} '.format(user, password) if user else ''
 
-        user = self.NETWEAVER_USER.format(sid=self.sid)
-        cmd = 'sapcontrol {host}{user}-nr {instance} -function {sapcontrol_function}'.format(
+        return 'sapcontrol {host}{user}-nr {instance} -function {sapcontrol_function}'.format(
             host=host_str, user=user_str, instance=inst, sapcontrol_function=sapcontrol_function)
 
-        result = shell.execute_cmd(cmd, user, self._password, self.remote_host)
-
-        if exception and result.returncode != 0:
-            raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
-
-        return result
-
     @staticmethod
-    def get_attribute_from_file(conf_file, attribute_pattern):
+    def get_attribute_from_file(conf_file, attribute_pattern, agent_client=None):
         """
         Get attribute from file using a pattern
+
+        Args:
+            conf_file (str): Path to the file
+            attribute_pattern (str): Regular expression pattern
+            agent_client (agent.AgentClient, opt): Agent used to read the file in its host. The
+                local file is read if it's not set
         """
+        if agent_client:
+            return shell.find_pattern(attribute_pattern, agent_client.read_file(conf_file))
         with open(conf_file, 'r') as file_content:
             attribute_data = shell.find_pattern(attribute_pattern, file_content.read())
         return attribute_data
@@ -115,33 +280,26 @@ class NetweaverInstance(object):
         """
         Check if ASCS instance is installed
         """
-        msg_server = shell.find_pattern(r'msg_server, MessageServer,.*', processes.output)
-        enserver_ensa1 = shell.find_pattern(r'enserver, EnqueueServer,.*', processes.output)
-        enq_server_ensa2 = shell.find_pattern(r'enq_server, Enqueue Server 2,.*', processes.output)
-        return bool(msg_server and (enserver_ensa1 or enq_server_ensa2))
+        found = PROCESSES_SCANNER.scan(processes.output)
+        return 'msg_server' in found and ('enserver' in found or 'enq_server' in found)
 
     @staticmethod
     def _is_ers_installed(processes):
         """
         Check if ERS instance is installed
         """
-        enrepserver_ensa1 = shell.find_pattern(
-            r'enrepserver, EnqueueReplicator,.*', processes.output)
-        enq_replicator_ensa2 = shell.find_pattern(
-            r'enq_replicator, Enqueue Replicator 2,.*', processes.output)
-        return bool(enrepserver_ensa1 or enq_replicator_ensa2)
+        found = PROCESSES_SCANNER.scan(processes.output)
+        return 'enrepserver' in found or 'enq_replicator' in found
 
     @staticmethod
     def _is_app_server_installed(processes):
         """
         Check if an application server (PAS or AAS) instance is installed
         """
-        disp = shell.find_pattern(r'disp\+work, Dispatcher,.*', processes.output)
-        igswd = shell.find_pattern(r'igswd_mt, IGS Watchdog,.*', processes.output)
-        gwrd = shell.find_pattern(r'gwrd, Gateway,.*', processes.output)
-        icman = shell.find_pattern(r'icman, ICM,.*', processes.output)
-        return bool(disp and igswd and gwrd and icman)
+        found = PROCESSES_SCANNER.scan(processes.output)
+        return all(process in found for process in ['disp', 'igswd', 'gwrd', 'icman'])
 
+    @shell.tag_operation
     def is_installed(self, sap_instance=None):
         """
         Check if SAP Netweaver is installed
@@ -174,9 +332,10 @@ class NetweaverInstance(object):
         """
         Get ASCS ENSA version
         """
-        if shell.find_pattern(r'enserver, EnqueueServer,.*', processes.output):
+        found = PROCESSES_SCANNER.scan(processes.output)
+        if 'enserver' in found:
             return 1
-        elif shell.find_pattern(r'enq_server, Enqueue Server 2,.*', processes.output):
+        elif 'enq_server' in found:
             return 2
         raise ValueError('ASCS not installed or found')
 
@@ -185,12 +344,14 @@ class NetweaverInstance(object):
         """
         Get ERS ENSA version
         """
-        if shell.find_pattern(r'enrepserver, EnqueueReplicator,.*', processes.output):
+        found = PROCESSES_SCANNER.scan(processes.output)
+        if 'enrepserver' in found:
             return 1
-        elif shell.find_pattern(r'enq_replicator, Enqueue Replicator 2,.*', processes.output):
+        elif 'enq_replicator' in found:
             return 2
         raise ValueError('ERS not installed or found')
 
+    @shell.tag_operation
     def get_ensa_version(self, sap_instance):
         """
         Get currently installed ENSA version
@@ -213,17 +374,16 @@ class NetweaverInstance(object):
         raise ValueError('provided sap instance type is not valid: {}'.format(sap_instance))
 
     @staticmethod
-    def _remove_old_files(cwd, root_user, password, remote_host):
+    def _remove_old_files(cwd, root_user, password, remote_host, executor=None):
         """
         Remove old files from SAP installation cwd folder. Only start_dir.cd must remain
         """
         # TODO: check start_dir.cd exists
-        remove_files_cmd = "printf '%q ' {}/*".format(cwd)
-        remove_files = shell.execute_cmd(
-            remove_files_cmd, root_user, password, remote_host)
-        remove_files = remove_files.output.replace('{}/start_dir.cd'.format(cwd), '')
-        cmd = 'rm -rf {}'.format(remove_files)
-        shell.execute_cmd(cmd, root_user, password, remote_host)
+        # The files are listed and removed by the same command, in one shell invocation.
+        # The hidden files are kept, as the previous glob based removal did
+        cmd = "find {} -mindepth 1 -maxdepth 1 ! -name start_dir.cd ! -name '.*' "\
+            "-exec rm -rf {{}} +".format(cwd)
+        executors.get_executor(executor).execute(cmd, root_user, password, remote_host)
 
     @classmethod
     def update_conf_file(cls, conf_file, **kwargs):
@@ -252,6 +412,7 @@ class NetweaverInstance(object):
         return conf_file
 
     @classmethod
+    @shell.tag_operation
     def install(
             cls, software_path, virtual_host, product_id, conf_file, root_user, password, **kwargs):
         """
@@ -270,14 +431,19 @@ class NetweaverInstance(object):
             exception (bool, opt): Raise and exception in case of error if True, return result
                 object otherwise
             remote_host (str, opt): Remote host where the command will be executed
+            stream (bool, opt): Log the installation output while it's running, keeping only
+                the last lines in memory
+            executor (executors.Executor, opt): Executor used to run the commands
         """
         cwd = kwargs.get('cwd', None)
         raise_exception = kwargs.get('exception', True)
         remote_host = kwargs.get('remote_host', None)
+        stream = kwargs.get('stream', False)
+        executor = executors.get_executor(kwargs.get('executor', None))
 
         if cwd:
             # This operation must be done in order to avoid incorrect files usage
-            cls._remove_old_files(cwd, root_user, password, remote_host)
+            cls._remove_old_files(cwd, root_user, password, remote_host, executor)
 
         cmd = '{software_path}/sapinst SAPINST_USE_HOSTNAME={virtual_host} '\
             'SAPINST_EXECUTE_PRODUCT_ID={product_id} '\
@@ -288,7 +454,10 @@ class NetweaverInstance(object):
                 product_id=product_id,
                 conf_file=conf_file,
                 cwd=' SAPINST_CWD={}'.format(cwd) if cwd else '')
-        result = shell.execute_cmd(cmd, root_user, password, remote_host)
+        if stream:
+            result = executor.execute_stream(cmd, root_user, password, remote_host)
+        else:
+            result = executor.execute(cmd, root_user, password, remote_host)
         if result.returncode and raise_exception:
             if cwd:
                 raise NetweaverError(
@@ -324,7 +493,7 @@ class NetweaverInstance(object):
         return False
 
     @classmethod
-    def _restart_ascs(cls, conf_file, ers_pass, ascs_pass, remote_host=None):
+    def _restart_ascs(cls, conf_file, ers_pass, ascs_pass, remote_host=None, executor=None):
         """
         Restart ascs from the ERS host.
 
@@ -332,13 +501,16 @@ class NetweaverInstance(object):
             conf_file (str): Path to the configuration file
             ascs_pass (str): ASCS instance password
             remote_host (str, optional): Remote host where the command will be executed
+            executor (executors.Executor, opt): Executor used to run the commands
         """
         # Get sid and instance number from configuration file
+        agent_client = agent.get_client(executor, remote_host)
         sid = cls.get_attribute_from_file(
-            conf_file, 'NW_readProfileDir.profileDir += +.*/(.*)/profile').group(1).lower()
+            conf_file, 'NW_readProfileDir.profileDir += +.*/(.*)/profile',
+            agent_client).group(1).lower()
         instance_number = cls.get_attribute_from_file(
-            conf_file, 'nw_instance_ers.ersInstanceNumber += +(.*)').group(1)
-        ers = cls(sid, instance_number, ers_pass, remote_host=remote_host)
+            conf_file, 'nw_instance_ers.ersInstanceNumber += +(.*)', agent_client).group(1)
+        ers = cls(sid, instance_number, ers_pass, remote_host=remote_host, executor=executor)
         result = ers.get_system_instances(exception=False)
         ascs_data = shell.find_pattern(
             '(.*), (.*), (.*), (.*), (.*), MESSAGESERVER|ENQUE, GREEN', result.output)
@@ -347,10 +519,13 @@ class NetweaverInstance(object):
         ascs_hostname = ascs_data.group(1)
         ascs_instance_number = ascs_data.group(2)
 
-        ers.stop(host=ascs_hostname, inst=ascs_instance_number, user=ascs_user, password=ascs_pass)
-        ers.start(host=ascs_hostname, inst=ascs_instance_number, user=ascs_user, password=ascs_pass)
+        # Stop and start in the same shell invocation. Start is not executed if stop fails
+        ers._execute_sapcontrol_batch(
+            ['StopWait 15 0', 'StartWait 15 0'], host=ascs_hostname, inst=ascs_instance_number,
+            user=ascs_user, password=ascs_pass)
 
     @classmethod
+    @shell.tag_operation
     def install_ers(
             cls, software_path, virtual_host, product_id, conf_file, root_user, password, **kwargs):
         """
@@ -368,36 +543,57 @@ class NetweaverInstance(object):
                 ASCS instance. If it's not set the same password used to install ERS will be used
             timeout (int, optional): Timeout of the installation process. If 0 it will try to
                 install the instance only once
-            interval (int, optional): Retry interval in seconds
+            interval (int, optional): Delay after the first failed attempt in seconds. It's
+                doubled after every failed attempt
+            max_interval (int, optional): Maximum delay between attempts in seconds
+            max_attempts (int, optional): Maximum number of attempts
             remote_host (str, opt): Remote host where the command will be executed
+            stream (bool, opt): Log the installation output while it's running, keeping only
+                the last lines in memory
+            deadline (float, optional): Global time limit in seconds for the whole process,
+                including the running commands. shell.ShellTimeoutError is raised when it
+                expires. The deadline set by the caller with shell.deadline is also applied
+            executor (executors.Executor, opt): Executor used to run the commands
+
+        Returns:
+            retry.RetryStats: Statistics of the installation attempts
         """
         timeout = kwargs.get('timeout', 0)
-        interval = kwargs.get('interval', 5)
+        remote_host = kwargs.get('remote_host', None)
         ers_pass = cls.get_attribute_from_file(
-            conf_file, 'nwUsers.sidadmPassword += +(.*)').group(1)
+            conf_file, 'nwUsers.sidadmPassword += +(.*)',
+            agent.get_client(kwargs.get('executor', None), remote_host)).group(1)
         ascs_pass = kwargs.get('ascs_password', ers_pass)
-        remote_host = kwargs.get('remote_host', None)
-        cwd = kwargs.get('cwd', None)
-
-        current_time = time.time()
-        current_timeout = current_time + timeout
-        while current_time <= current_timeout:
-            result = cls.install(
-                software_path, virtual_host, product_id, conf_file, root_user, password,
-                exception=False, remote_host=remote_host, cwd=cwd)
-
+        executor = kwargs.get('executor', None)
+        install_kwargs = {
+            'remote_host': remote_host, 'cwd': kwargs.get('cwd', None), 'executor': executor}
+        if kwargs.get('stream', False):
+            install_kwargs['stream'] = True
+        retrier = retry.Retry(
+            interval=kwargs.get('interval', 5), max_interval=kwargs.get('max_interval', 60),
+            max_attempts=kwargs.get('max_attempts', None), timeout=timeout)
+
+        def _is_installed(result):
             if result.returncode == cls.SUCCESSFULLY_INSTALLED:
-                break
+                return True
             elif cls._ascs_restart_needed(result):
-                cls._restart_ascs(conf_file, ers_pass, ascs_pass, remote_host)
-                break
-
-            time.sleep(interval)
-            current_time = time.time()
-        else:
-            raise NetweaverError(
-                'SAP Netweaver ERS installation failed after {} seconds'.format(timeout))
-
+                cls._restart_ascs(conf_file, ers_pass, ascs_pass, remote_host, executor)
+                return True
+            return False
+
+        with shell.deadline(kwargs.get('deadline', None)):
+            try:
+                retrier.run(
+                    lambda: cls.install(
+                        software_path, virtual_host, product_id, conf_file, root_user, password,
+                        exception=False, **install_kwargs),
+                    _is_installed)
+            except retry.RetryError:
+                raise NetweaverError(  # pylint:disable=W0707
+                    'SAP Netweaver ERS installation failed after {} seconds'.format(timeout))
+        return retrier.stats
+
+    @shell.tag_operation
     def uninstall(self, software_path, virtual_host, conf_file, root_user, password, **kwargs):
         """
         Uninstall SAP Netweaver instance
@@ -412,11 +608,14 @@ class NetweaverInstance(object):
         """
         remote_host = kwargs.get('remote_host', None)
         user = self.NETWEAVER_USER.format(sid=self.sid)
+        if self.cache is not None:
+            self.cache.invalidate()
         self.install(
             software_path, virtual_host, self.UNINSTALL_PRODUCT, conf_file, root_user, password,
-            remote_host=remote_host)
-        shell.remove_user(user, True, root_user, password, remote_host)
+            remote_host=remote_host, executor=self.executor)
+        shell.remove_user(user, True, root_user, password, remote_host, executor=self.executor)
 
+    @shell.tag_operation
     def get_process_list(self, exception=True, **kwargs):
         """
         Get SAP processes list
@@ -426,6 +625,7 @@ class NetweaverInstance(object):
             raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
         return result
 
+    @shell.tag_operation
     def get_system_instances(self, exception=True, **kwargs):
         """
         Get SAP system instances list
@@ -435,6 +635,7 @@ class NetweaverInstance(object):
             raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
         return result
 
+    @shell.tag_operation
     def get_instance_properties(self, exception=True, **kwargs):
         """
         Get SAP instance properties
@@ -444,6 +645,7 @@ class NetweaverInstance(object):
             raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
         return result
 
+    @shell.tag_operation
     def start(self, wait=15, delay=0, exception=True, **kwargs):
         """
         Start SAP instance
@@ -459,6 +661,7 @@ class NetweaverInstance(object):
             raise NetweaverError('Error running sapcontrol command: {}'.format(result.cmd))
         return result
 
+    @shell.tag_operation
     def stop(self, wait=15, delay=0, exception=True, **kwargs):
         """
         Stop SAP instance
@@ -0,0 +1,237 @@
+"""
+Retry engine for the polling loops
+
+Retry runs an operation until its result is successful, waiting between the attempts with
+exponential backoff and jitter. The attempts are limited by a maximum number of attempts, a
+time window and the active shell.deadline. The duration and result of every attempt are kept
+in the retry statistics.
+
+Example:
+    retrier = retry.Retry(interval=5, max_interval=60, timeout=3600)
+    result = retrier.run(lambda: shell.execute_cmd('hdbnsutil -sr_state'))
+    print(retrier.stats.to_dict())
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import logging
+import random
+import time
+
+from shaptools import shell
+
+LOGGER = logging.getLogger('retry')
+
+
+class RetryError(shell.ShellError):
+    """
+    Error when the operation doesn't succeed in the allowed attempts
+
+    Args:
+        message (str): Error message
+        result: Result of the last attempt
+        stats (RetryStats): Attempts statistics
+    """
+
+    def __init__(self, message, result=None, stats=None):
+        super(RetryError, self).__init__(message)
+        self.result = result
+        self.stats = stats
+
+
+class Attempt(object):
+    """
+    Data of an executed attempt
+
+    Args:
+        number (int): Attempt number, starting by 1
+        duration (float): Operation time in seconds
+        returncode (int): Return code of the attempt result. None if the result doesn't have it
+        delay (float): Seconds waited after the attempt. None for the last attempt
+    """
+
+    __slots__ = ('number', 'duration', 'returncode', 'delay')
+
+    def __init__(self, number, duration, returncode, delay=None):
+        self.number = number
+        self.duration = duration
+        self.returncode = returncode
+        self.delay = delay
+
+    def to_dict(self):
+        """
+        Get the attempt data as dictionary
+        """
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+
+
+class RetryStats(object):
+    """
+    Statistics of a retried operation
+    """
+
+    def __init__(self):
+        self.attempts = []
+        self.succeeded = False
+
+    @property
+    def attempt_count(self):
+        """
+        Number of executed attempts
+        """
+        return len(self.attempts)
+
+    @property
+    def operation_time(self):
+        """
+        Seconds spent running the operation
+        """
+        return sum(attempt.duration for attempt in self.attempts)
+
+    @property
+    def wait_time(self):
+        """
+        Seconds spent waiting between the attempts
+        """
+        return sum(attempt.delay or 0 for attempt in self.attempts)
+
+    def to_dict(self):
+        """
+        Get the statistics as dictionary
+        """
+        return {
+            'succeeded': self.succeeded,
+            'attempt_count': self.attempt_count,
+            'operation_time': self.operation_time,
+            'wait_time': self.wait_time,
+            'attempts': [attempt.to_dict() for attempt in self.attempts]
+        }
+
+
+def _returncode(result):
+    """
+    Get the return code of a result. The results without return code are used as is
+    """
+    return getattr(result, 'returncode', result)
+
+
+class Retry(object):
+    """
+    Retry policy and engine
+
+    Args:
+        interval (float, opt): Delay after the first failed attempt in seconds
+        backoff (float, opt): Multiplier applied to the delay after every failed attempt
+        max_interval (float, opt): Maximum delay between attempts in seconds
+        jitter (float, opt): Random variation of the delay, as fraction of it (0.1 is +-10%)
+        max_attempts (int, opt): Maximum number of attempts. No limit if it's not set
+        timeout (float, opt): Time window in seconds to start new attempts. 0 runs the
+            operation only once. No limit if it's not set
+        success_codes (tuple, opt): Return codes of the successful results
+        retry_codes (tuple, opt): Return codes of the failed results which can be retried. All
+            the failed results are retried if it's not set
+    """
+
+    def __init__(
+            self, interval=5, backoff=2, max_interval=60, jitter=0.1, max_attempts=None,
+            timeout=None, success_codes=(0,), retry_codes=None):
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.success_codes = success_codes
+        self.retry_codes = retry_codes
+        self.stats = RetryStats()
+
+    def get_delay(self, attempt):
+        """
+        Get the delay after a failed attempt
+
+        Args:
+            attempt (int): Failed attempt number, starting by 1
+
+        Returns:
+            float: Seconds to wait before the next attempt
+        """
+        delay = min(self.interval * self.backoff ** (attempt - 1), self.max_interval)
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+    def is_success(self, result):
+        """
+        Check if an attempt result is successful
+        """
+        return _returncode(result) in self.success_codes
+
+    def is_retryable(self, result):
+        """
+        Check if a failed attempt can be retried
+        """
+        return self.retry_codes is None or _returncode(result) in self.retry_codes
+
+    def run(self, operation, is_success=None):
+        """
+        Run the operation until it succeeds or the limits are reached. The statistics of the
+        execution are stored in the stats attribute
+
+        Args:
+            operation (callable): Function executed in every attempt, without arguments. It
+                returns a ProcessResult, or other object with returncode attribute, or a return
+                code
+            is_success (callable, opt): Function to check if a result is successful, used
+                instead of success_codes
+
+        Returns:
+            The successful result
+
+        Raises:
+            RetryError: If the operation doesn't succeed in the allowed attempts or the result
+                can't be retried
+            shell.ShellTimeoutError: If the active shell.deadline expires
+        """
+        is_success = is_success or self.is_success
+        self.stats = RetryStats()
+        start_time = time.time()
+        limit = None if self.timeout is None else start_time + self.timeout
+        attempt_start = start_time
+        while True:
+            number = self.stats.attempt_count + 1
+            result = operation()
+            now = time.time()
+            attempt = Attempt(number, now - attempt_start, _returncode(result))
+            self.stats.attempts.append(attempt)
+            if is_success(result):
+                self.stats.succeeded = True
+                LOGGER.debug('Operation succeeded after %d attempts', number)
+                return result
+
+            if not self.is_retryable(result):
+                reason = 'return code {} is not retryable'.format(attempt.returncode)
+            elif self.max_attempts is not None and number >= self.max_attempts:
+                reason = 'maximum attempts reached'
+            elif limit is not None and now >= limit:
+                reason = 'timeout reached'
+            else:
+                reason = None
+            if reason:
+                raise RetryError(
+                    'operation failed after {} attempts: {}'.format(number, reason),
+                    result, self.stats)
+
+            attempt.delay = self.get_delay(number)
+            if limit is not None:
+                attempt.delay = min(attempt.delay, limit - now)
+            LOGGER.debug(
+                'Attempt %d failed with return code %s, retrying in %.2f seconds',
+                number, attempt.returncode, attempt.delay)
+            shell.bounded_sleep(attempt.delay)
+            # Raise ShellTimeoutError if the active deadline expired while sleeping
+            shell.get_timeout()
+            attempt_start = time.time()
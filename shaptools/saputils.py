@@ -11,7 +11,7 @@ Module to utilize SAP Technology components
 
 import os
 
-from shaptools import shell
+from shaptools import executors
 
 
 class SapUtilsError(Exception):
@@ -40,6 +40,10 @@ def extract_sapcar_file(sapcar_exe, sar_file, **kwargs):
         user (str, opt): User to execute the SAPCAR command
         password (str, opt): User password
         remote_host (str, opt): Remote host where the command will be executed
+        stream (bool, opt): Log the extraction output while it's running, keeping only the
+            last lines in memory
+        executor (executors.Executor, opt): Executor used to run the SAPCAR command.
+            executors.ShellExecutor by default
     """
     if not os.path.isfile(sapcar_exe):
         raise FileDoesNotExistError('SAPCAR executable \'{}\' does not exist'.format(sapcar_exe))
@@ -51,6 +55,8 @@ def extract_sapcar_file(sapcar_exe, sar_file, **kwargs):
     user = kwargs.get('user', None)
     password = kwargs.get('password', None)
     remote_host = kwargs.get('remote_host', None)
+    stream = kwargs.get('stream', False)
+    executor = executors.get_executor(kwargs.get('executor', None))
 
     output_dir_str = ' -R {}'.format(output_dir) if output_dir else ''
     options_str = ' {}'.format(options) if options else ''
@@ -59,7 +65,10 @@ def extract_sapcar_file(sapcar_exe, sar_file, **kwargs):
         sapcar_exe=sapcar_exe, sar_file=sar_file,
         options_str=options_str, output_dir_str=output_dir_str)
 
-    result = shell.execute_cmd(cmd, user=user, password=password, remote_host=remote_host)
+    if stream:
+        result = executor.execute_stream(cmd, user, password, remote_host)
+    else:
+        result = executor.execute(cmd, user, password, remote_host)
     if result.returncode:
         raise SapUtilsError('Error running SAPCAR command')
     return result
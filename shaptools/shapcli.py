@@ -13,6 +13,8 @@ import argparse
 import json
 
 from shaptools import hana
+from shaptools import shell
+from shaptools import asynclog
 
 PROG = 'shapcli'
 LOGGING_FORMAT = '%(message)s'
@@ -49,13 +51,14 @@ class ConfigData(object):
 
 def setup_logger(level):
     """
-    Setup logging
+    Setup logging. The records are written by a background thread, so the commands output
+    logging doesn't block the execution
     """
     logger = logging.getLogger()
     handler = logging.StreamHandler()
     formatter = DecodedFormatter(LOGGING_FORMAT)
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    asynclog.setup_async_logging(logger, [handler])
     logger.setLevel(level=level)
     return logger
 
@@ -132,6 +135,10 @@ def parse_hana_arguments(hana_subparser):
         '--user_password', help='Password to connect to sap hana db')
     dummy.add_argument(
         '--database', help='Database name to connect')
+    dummy.add_argument(
+        '--connector', action='store_true',
+        help='Run the query with the python database connector (dbapi or pyhdb) instead of '\
+        'hdbsql. user_name and user_password are required')
 
     hdbsql = subcommands.add_parser(
         'hdbsql', help='Run a sql command with hdbsql')
@@ -145,6 +152,10 @@ def parse_hana_arguments(hana_subparser):
         '--user_password', help='Password to connect to sap hana db')
     hdbsql.add_argument(
         '--database', help='Database name to connect')
+    hdbsql.add_argument(
+        '--connector', action='store_true',
+        help='Run the query with the python database connector (dbapi or pyhdb) instead of '\
+        'hdbsql. user_name and user_password are required')
     hdbsql.add_argument(
         '--query', help='Query to execute')
 
@@ -236,19 +247,26 @@ def uninstall(hana_instance, logger):
         logger.info('Command execution canceled')
 
 
-def run_hdbsql(hana_instance, hana_args, cmd):
+def run_hdbsql(hana_instance, hana_args, cmd, logger=None):
     """
-    Run hdbsql command
+    Run hdbsql command, or the query using the database connector
     """
-    hdbsql_cmd = hana_instance._hdbsql_connect(
-        key_name=hana_args.key_name,
-        user_name=hana_args.user_name,
-        user_password=hana_args.user_password)
-    cmd = '{hdbsql_cmd} {database}\\"{cmd}\\"'.format(
-        hdbsql_cmd=hdbsql_cmd,
-        database='-d {} '.format(hana_args.database) if hana_args.database else '',
-        cmd=cmd)
-    hana_instance._run_hana_command(cmd)
+    if not getattr(hana_args, 'connector', False):
+        hana_instance.run_sql(
+            cmd, hana_args.database, key_name=hana_args.key_name,
+            user_name=hana_args.user_name, user_password=hana_args.user_password)
+        return
+
+    logger = logger or logging.getLogger(PROG)
+    hana_instance.connect_db(
+        hana_args.user_name, hana_args.user_password, database=hana_args.database)
+    try:
+        result = hana_instance.run_sql(cmd)
+        logger.info('query returned %d records', len(result.records))
+        for record in result.records[:shell.MAX_LOGGED_LINES]:
+            logger.info(record)
+    finally:
+        hana_instance.disconnect_db()
 
 def run_hana_subcommands(hana_instance, hana_args, logger):
     """
@@ -275,9 +293,9 @@ def run_hana_subcommands(hana_instance, hana_args, logger):
     elif str_args == 'uninstall':
         uninstall(hana_instance, logger)
     elif str_args == 'dummy':
-        run_hdbsql(hana_instance, hana_args, 'SELECT * FROM DUMMY')
+        run_hdbsql(hana_instance, hana_args, 'SELECT * FROM DUMMY', logger)
     elif str_args == 'hdbsql':
-        run_hdbsql(hana_instance, hana_args, hana_args.query)
+        run_hdbsql(hana_instance, hana_args, hana_args.query, logger)
     elif str_args == 'user':
         hana_instance.create_user_key(
             hana_args.key_name, hana_args.environment, hana_args.user_name,
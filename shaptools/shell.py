@@ -8,14 +8,41 @@ Module to interact with the shell commands.
 :since: 2018-11-15
 """
 
+import contextlib
+import functools
 import logging
+import mmap
 import os
+import signal
 import subprocess
 import shlex
 import re
+import tempfile
+import threading
+import time
+
+from shaptools import sshpool
 
 LOGGER = logging.getLogger('shell')
 ASKPASS_SCRIPT = 'support/ssh_askpass'
+READ_SIZE = 65536
+
+# Multiplexed ssh session pool used by execute_cmd for remote commands. Disabled by default
+SSH_POOL = None
+# Timeout in seconds applied to the commands that don't set their own one. None to disable it
+DEFAULT_TIMEOUT = None
+# Seconds between the SIGTERM and SIGKILL signals sent to a timed out process group
+KILL_GRACE_PERIOD = 5
+# Seconds between the checks of the user processes in remove_user
+USER_PROCESSES_POLL_INTERVAL = 0.5
+# Thread specific execution context (active deadline)
+_CONTEXT = threading.local()
+# Command outputs bigger than this size in bytes are stored in temporary files
+SPILL_THRESHOLD = 1024 * 1024
+# Maximum number of output lines of each stream logged per command. None to log all of them
+MAX_LOGGED_LINES = 1000
+# Registered command execution hooks (CommandHook instances)
+HOOKS = []
 
 
 class ShellError(Exception):
@@ -24,36 +51,585 @@ class ShellError(Exception):
     """
 
 
-class ProcessResult:
+class ShellTimeoutError(ShellError):
+    """
+    Error when a command, or the active deadline, times out
+
+    Args:
+        cmd (str): Command that timed out. None if the deadline expired before running it
+        timeout (float): Timeout in seconds
+    """
+
+    def __init__(self, cmd, timeout):
+        if cmd is None:
+            message = 'deadline exceeded'
+        else:
+            message = 'command "{}" timed out after {} seconds'.format(cmd, timeout)
+        super(ShellTimeoutError, self).__init__(message)
+        self.cmd = cmd
+        self.timeout = timeout
+
+
+def iter_lines(data, errors='strict'):
+    """
+    Iterate the lines of a text without splitting it at once
+
+    Args:
+        data (str, bytes or mmap.mmap): Text to iterate
+        errors (str, opt): Error handling scheme used to decode the binary lines
+
+    Yields:
+        str: Text lines without the line break
+    """
+    binary = isinstance(data, (bytes, bytearray, mmap.mmap))
+    newline = b'\n' if binary else '\n'
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(newline, start)
+        if end == -1:
+            end = size
+        line = data[start:end]
+        start = end + 1
+        yield line.decode('utf-8', errors) if binary else line
+
+
+def _store_output(data):
+    """
+    Store a command output. The outputs bigger than SPILL_THRESHOLD are written in a temporary
+    file to free the memory
+    """
+    if data is None or len(data) <= SPILL_THRESHOLD:
+        return data
+    spill_file = tempfile.TemporaryFile(prefix='shaptools-')
+    spill_file.write(data)
+    spill_file.flush()
+    return spill_file
+
+
+class ProcessResult(object):
     """
     Class to store subprocess.Popen output information and offer some
-    functionalities
+    functionalities. The raw outputs are decoded the first time they are accessed. The outputs
+    bigger than SPILL_THRESHOLD are stored in temporary files and memory mapped on access (their
+    decoded text is not kept)
 
     Args:
         cmd (str): Executed command
         returncode (int): Subprocess return code
-        output (str): Subprocess output string
-        err (str): Subprocess error string
+        output (bytes): Subprocess output
+        err (bytes): Subprocess error output
+
+    Attributes:
+        output_size (int): Size of the raw output and error output in bytes
     """
 
+    __slots__ = (
+        'cmd', 'returncode', 'output_size', '_output', '_err', '_output_text', '_err_text')
+
     def __init__(self, cmd, returncode, output, err):
         self.cmd = cmd
         self.returncode = returncode
-        self.output = output.decode() # Make it compatible with python2 and 3
-        self.err = err.decode()
+        self.output_size = len(output or b'') + len(err or b'')
+        self._output = _store_output(output)
+        self._err = _store_output(err)
+        self._output_text = None
+        self._err_text = None
+
+    @staticmethod
+    def _decode(stored):
+        """
+        Decode a stored output
+        """
+        if not hasattr(stored, 'fileno'):
+            return stored.decode() # Make it compatible with python2 and 3
+        mapped = mmap.mmap(stored.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return mapped[:].decode()
+        finally:
+            mapped.close()
+
+    @property
+    def output(self):
+        """
+        Subprocess output string
+        """
+        if self._output_text is not None:
+            return self._output_text
+        text = self._decode(self._output)
+        if not hasattr(self._output, 'fileno'):
+            self._output_text = text
+            self._output = None
+        return text
+
+    @output.setter
+    def output(self, value):
+        self._output_text = value
+        self._output = None
+
+    @property
+    def err(self):
+        """
+        Subprocess error string
+        """
+        if self._err_text is not None:
+            return self._err_text
+        text = self._decode(self._err)
+        if not hasattr(self._err, 'fileno'):
+            self._err_text = text
+            self._err = None
+        return text
+
+    @err.setter
+    def err(self, value):
+        self._err_text = value
+        self._err = None
+
+    def iter_lines(self, err=False):
+        """
+        Iterate the output lines without decoding or splitting the whole output
+
+        Args:
+            err (bool, opt): Iterate the error output lines instead of the standard output
+
+        Yields:
+            str: Output lines without the line break
+        """
+        text, stored = (self._err_text, self._err) if err else (self._output_text, self._output)
+        if text is not None:
+            data = text
+        elif hasattr(stored, 'fileno'):
+            data = mmap.mmap(stored.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = stored
+        try:
+            for line in iter_lines(data):
+                yield line
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+class UserRemovalResult(object):
+    """
+    Class to store the result of a user removal
+
+    Args:
+        user (str): Removed user
+        killed (int): Number of the user processes killed before removing it
+        duration (float): Removal time in seconds, including the processes termination
+    """
+
+    def __init__(self, user, killed, duration):
+        self.user = user
+        self.killed = killed
+        self.duration = duration
 
 
-def log_command_results(stdout, stderr):
+class CommandEvent(object):
     """
-    Log process stdout and stderr text
+    Command execution data provided to the hooks
+
+    Args:
+        cmd (str): Command, before being formatted to run with other user or remotely
+        user (str): User executing the command
+        host (str): Host where the command is executed. None for local commands
+        operation (str): Name of the operation running the command (HanaInstance or
+            NetweaverInstance method for example). None if it's not set
+    """
+
+    __slots__ = (
+        'cmd', 'user', 'host', 'operation', 'start_time', 'duration', 'returncode',
+        'output_size', 'error')
+
+    def __init__(self, cmd, user, host, operation):
+        self.cmd = cmd
+        self.user = user
+        self.host = host
+        self.operation = operation
+        self.start_time = time.time()
+        self.duration = None
+        self.returncode = None
+        self.output_size = None
+        self.error = None
+
+
+class CommandHook(object):
+    """
+    Base class of the command execution hooks. Registered with add_hook, the methods are
+    called with a CommandEvent when a command starts, ends (duration, returncode and
+    output_size are set) or raises an error (duration and error are set)
+    """
+
+    def on_start(self, event):
+        """
+        Command execution started
+        """
+
+    def on_end(self, event):
+        """
+        Command execution finished
+        """
+
+    def on_error(self, event):
+        """
+        Command execution raised an error
+        """
+
+
+@contextlib.contextmanager
+def deadline(timeout):
+    """
+    Set a deadline for all the commands executed by the current thread inside the block.
+    Nested deadlines can only shorten the active one. The retry loops (as
+    HanaInstance.sr_register_secondary) stop when the deadline expires
+
+    Args:
+        timeout (float): Seconds from now to the deadline. None to keep the active deadline
+
+    Yields:
+        float: Active deadline as epoch time. None if there is no deadline
+    """
+    previous = getattr(_CONTEXT, 'deadline', None)
+    if timeout is None:
+        yield previous
+        return
+    new_deadline = time.time() + timeout
+    if previous is not None:
+        new_deadline = min(previous, new_deadline)
+    _CONTEXT.deadline = new_deadline
+    try:
+        yield new_deadline
+    finally:
+        _CONTEXT.deadline = previous
+
+
+def get_timeout(timeout=None):
+    """
+    Get the time available to run a command, combining the command timeout, DEFAULT_TIMEOUT
+    and the active deadline
+
+    Args:
+        timeout (float, opt): Command timeout in seconds. DEFAULT_TIMEOUT is used if it's None
+
+    Returns:
+        float: Seconds available to run the command. None if there is no limit
+    """
+    return remaining_timeout(timeout, getattr(_CONTEXT, 'deadline', None))
+
+
+def remaining_timeout(timeout=None, active_deadline=None):
+    """
+    Get the time available to run a command, combining the command timeout, DEFAULT_TIMEOUT
+    and the given deadline. get_timeout uses the deadline of the current thread
+
+    Args:
+        timeout (float, opt): Command timeout in seconds. DEFAULT_TIMEOUT is used if it's None
+        active_deadline (float, opt): Deadline as epoch time. None if there is no deadline
+
+    Returns:
+        float: Seconds available to run the command. None if there is no limit
+
+    Raises:
+        ShellTimeoutError: If the deadline is already expired
+    """
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    if active_deadline is None:
+        return timeout
+    remaining = active_deadline - time.time()
+    if remaining <= 0:
+        raise ShellTimeoutError(None, 0)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def bounded_sleep(seconds):
+    """
+    Sleep the given time without going beyond the active deadline
+
+    Args:
+        seconds (float): Seconds to sleep
+
+    Raises:
+        ShellTimeoutError: If the deadline is already expired
+    """
+    time.sleep(get_timeout(seconds))
+
+
+def new_session_preexec(preexec_fn=None):
+    """
+    Get a Popen preexec_fn which runs the process in a new session, so all of its children
+    are in its process group and they can be killed at once
+
+    Args:
+        preexec_fn (callable, opt): Function executed in the child after creating the session
+    """
+    def _preexec():
+        os.setsid()
+        if preexec_fn:
+            preexec_fn()
+    return _preexec
+
+
+def kill_process_group(proc, grace_period=None):
+    """
+    Kill the process group of a process started with new_session_preexec. SIGTERM is sent first,
+    so su can forward it to its children, and SIGKILL after the grace period
+
+    Args:
+        proc (subprocess.Popen): Process leading the group
+        grace_period (float, opt): Seconds to wait before sending SIGKILL. KILL_GRACE_PERIOD
+            by default
+    """
+    if grace_period is None:
+        grace_period = KILL_GRACE_PERIOD
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except OSError:
+        return
+    limit = time.time() + grace_period
+    while proc.poll() is None and time.time() < limit:
+        time.sleep(0.1)
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+class Watchdog(object):
+    """
+    Context manager which kills the process group of a process if the block is not finished
+    in time
+
+    Args:
+        proc (subprocess.Popen): Process to watch
+        timeout (float): Timeout in seconds. None to disable the watchdog
+    """
+
+    def __init__(self, proc, timeout):
+        self.proc = proc
+        self.timeout = timeout
+        self.expired = False
+        self._timer = None
+
+    def _expire(self):
+        self.expired = True
+        LOGGER.error('Process %d timed out after %s seconds', self.proc.pid, self.timeout)
+        kill_process_group(self.proc)
+
+    def __enter__(self):
+        if self.timeout is not None:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *args):
+        if self._timer:
+            self._timer.cancel()
+
+
+def add_hook(hook):
+    """
+    Register a command execution hook
+
+    Args:
+        hook (CommandHook): Hook to register
+    """
+    if hook not in HOOKS:
+        HOOKS.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregister a command execution hook
+
+    Args:
+        hook (CommandHook): Hook to unregister
+    """
+    if hook in HOOKS:
+        HOOKS.remove(hook)
+
+
+def _notify_hooks(method, event):
+    """
+    Run a method of the registered hooks. The hook errors are logged, but they don't stop the
+    command execution
+    """
+    for hook in list(HOOKS):
+        try:
+            getattr(hook, method)(event)
+        except Exception: # pylint:disable=W0703
+            LOGGER.exception('Error running %s hook', method)
+
+
+def instrument(cmd, user, remote_host, execute):
+    """
+    Run a command execution function notifying the registered hooks
+
+    Args:
+        cmd (str): Command to be executed
+        user (str): User to execute the command
+        remote_host (str): Remote host where the command will be executed
+        execute (callable): Function without arguments executing the command and returning a
+            ProcessResult
+
+    Returns:
+        ProcessResult: The result returned by execute
+    """
+    if not HOOKS:
+        return execute()
+    event = CommandEvent(cmd, user, remote_host, get_operation())
+    _notify_hooks('on_start', event)
+    try:
+        result = execute()
+    except Exception as err:
+        event.duration = time.time() - event.start_time
+        event.error = err
+        _notify_hooks('on_error', event)
+        raise
+    event.duration = time.time() - event.start_time
+    event.returncode = result.returncode
+    event.output_size = result.output_size
+    _notify_hooks('on_end', event)
+    return result
+
+
+def instrument_batch(cmds, user, remote_host, execute):
+    """
+    Run a batch execution function notifying the registered hooks with one event by command.
+    The events are notified when the batch finishes, as the commands run in the same shell.
+    The batch duration is split between the executed commands, and the commands not executed
+    (stop_on_failure) are not notified. If the batch raises an error, on_error is notified for
+    every command
+
+    Args:
+        cmds (list): Commands to be executed
+        user (str): User to execute the commands
+        remote_host (str): Remote host where the commands will be executed
+        execute (callable): Function without arguments executing the commands and returning a
+            list of ProcessResult
+
+    Returns:
+        list: The results returned by execute
+    """
+    if not HOOKS:
+        return execute()
+    operation = get_operation()
+    start_time = time.time()
+    try:
+        results = execute()
+    except Exception as err:
+        duration = time.time() - start_time
+        for cmd in cmds:
+            event = CommandEvent(cmd, user, remote_host, operation)
+            event.start_time = start_time
+            _notify_hooks('on_start', event)
+            event.duration = duration
+            event.error = err
+            _notify_hooks('on_error', event)
+        raise
+    duration = (time.time() - start_time) / max(len(results), 1)
+    for cmd, result in zip(cmds, results):
+        event = CommandEvent(cmd, user, remote_host, operation)
+        event.start_time = start_time
+        _notify_hooks('on_start', event)
+        event.duration = duration
+        event.returncode = result.returncode
+        event.output_size = result.output_size
+        _notify_hooks('on_end', event)
+    return results
+
+
+@contextlib.contextmanager
+def tagged_operation(name):
+    """
+    Tag the commands executed by the current thread inside the block with an operation name.
+    The innermost operation is used
+
+    Args:
+        name (str): Operation name
+    """
+    previous = getattr(_CONTEXT, 'operation', None)
+    _CONTEXT.operation = name
+    try:
+        yield
+    finally:
+        _CONTEXT.operation = previous
+
+
+def get_operation():
+    """
+    Get the active operation name
+
+    Returns:
+        str: Operation name. None if there is no active operation
+    """
+    return getattr(_CONTEXT, 'operation', None)
+
+
+def tag_operation(func):
+    """
+    Decorator to tag the commands executed by the function with its name
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tagged_operation(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def get_context():
+    """
+    Get a copy of the thread execution context (active deadline and operation), to apply it
+    in other threads with set_context
+
+    Returns:
+        dict: Execution context values
+    """
+    return dict(_CONTEXT.__dict__)
+
+
+def set_context(context):
+    """
+    Apply an execution context got with get_context in the current thread
+
+    Args:
+        context (dict): Execution context values
+    """
+    _CONTEXT.__dict__.update(context or {})
+
+
+def _log_lines(log, data, max_lines):
+    """
+    Log the first max_lines lines of a process output with the given logger method
+    """
+    skipped = 0
+    for index, line in enumerate(iter_lines(data, 'replace')):
+        if max_lines is not None and index >= max_lines:
+            skipped += 1
+            continue
+        log(line)
+    if skipped:
+        log('... %d more lines not logged', skipped)
+
+
+def log_command_results(stdout, stderr, max_lines=None):
+    """
+    Log process stdout and stderr text. The lines are not processed if the level is disabled
+
+    Args:
+        stdout (str): Process stdout
+        stderr (str): Process stderr
+        max_lines (int, opt): Maximum number of lines logged of each stream. MAX_LOGGED_LINES
+            by default
     """
     logger = logging.getLogger(__name__)
-    if stdout:
-        for line in stdout.splitlines():
-            logger.info(line)
-    if stderr:
-        for line in stderr.splitlines():
-            logger.error(line)
+    max_lines = MAX_LOGGED_LINES if max_lines is None else max_lines
+    if stdout and logger.isEnabledFor(logging.INFO):
+        _log_lines(logger.info, stdout, max_lines)
+    if stderr and logger.isEnabledFor(logging.ERROR):
+        _log_lines(logger.error, stderr, max_lines)
 
 
 def find_pattern(pattern, text):
@@ -74,6 +650,49 @@ def find_pattern(pattern, text):
     return None
 
 
+class PatternScanner(object):
+    """
+    Precompiled set of named patterns matched against a multiline text in a single pass. Each
+    line is checked with one combined regular expression, so the cost doesn't depend on the
+    number of patterns. The patterns are matched at the beginning of the lines, as in
+    find_pattern, and they cannot use numbered backreferences
+
+    Args:
+        patterns (list): List of (name, pattern) tuples
+    """
+
+    def __init__(self, patterns):
+        self.names = [name for name, _ in patterns]
+        self._patterns = [re.compile(pattern) for _, pattern in patterns]
+        self._combined = re.compile('|'.join(
+            '(?:{})'.format(pattern) for _, pattern in patterns))
+
+    def scan(self, text):
+        """
+        Find the first line matching each pattern
+
+        Args:
+            text (str): string to search in
+
+        Returns:
+            dict: Match objects of the found patterns by name
+        """
+        found = {}
+        for line in text.splitlines():
+            if not self._combined.match(line):
+                continue
+            # Only the lines matching some pattern are checked individually, to get the match
+            # objects with the pattern groups
+            for name, pattern in zip(self.names, self._patterns):
+                if name not in found:
+                    match = pattern.match(line)
+                    if match:
+                        found[name] = match
+            if len(found) == len(self.names):
+                break
+        return found
+
+
 def format_su_cmd(cmd, user):
     """
     Format the command to be executed by other user using su option
@@ -88,7 +707,7 @@ def format_su_cmd(cmd, user):
     return 'su -lc "{cmd}" {user}'.format(cmd=cmd, user=user)
 
 
-def format_remote_cmd(cmd, remote_host, user):
+def format_remote_cmd(cmd, remote_host, user, ssh_options=None):
     """
     Format cmd to run remotely using ssh
 
@@ -96,6 +715,7 @@ def format_remote_cmd(cmd, remote_host, user):
         cmd (str): Command to be executed
         remote_host (str): User password
         user (str): User to execute the command
+        ssh_options (str, opt): Additional ssh command line options
 
     Returns:
         str: cmd adapted to be executed remotely
@@ -103,11 +723,66 @@ def format_remote_cmd(cmd, remote_host, user):
     if not user:
         raise ValueError('user must be provided')
 
-    cmd = 'ssh {user}@{remote_host} "bash --login -c \'{cmd}\'"'.format(
+    cmd = 'ssh {options}{user}@{remote_host} "bash --login -c \'{cmd}\'"'.format(
+        options='{} '.format(ssh_options) if ssh_options else '',
         user=user, remote_host=remote_host, cmd=cmd)
     return cmd
 
 
+def enable_ssh_pool(**kwargs):
+    """
+    Enable the multiplexed ssh session pool. Once enabled, execute_cmd reuses the ssh master
+    connection of each (user, remote_host) pair for all the remote commands
+
+    Args:
+        kwargs (opt): sshpool.SshSessionPool parameters (control_dir, max_sessions,
+            idle_timeout)
+
+    Returns:
+        sshpool.SshSessionPool: Enabled pool
+    """
+    global SSH_POOL # pylint:disable=W0603
+    disable_ssh_pool()
+    SSH_POOL = sshpool.SshSessionPool(**kwargs)
+    return SSH_POOL
+
+
+def disable_ssh_pool():
+    """
+    Disable the multiplexed ssh session pool closing all the opened master connections
+    """
+    global SSH_POOL # pylint:disable=W0603
+    if SSH_POOL is not None:
+        SSH_POOL.close_all()
+        SSH_POOL = None
+
+
+def format_cmd(cmd, user=None, remote_host=None, ssh_options=None):
+    """
+    Format cmd to be executed by other user or in a remote host. The ssh session pool options
+    are added if the pool is enabled and no ssh options are provided
+
+    Args:
+        cmd (str): Command to be formatted
+        user (str, opt): User to execute the command
+        remote_host (str, opt): Remote host where the command will be executed
+        ssh_options (str, opt): ssh command line options used for remote commands
+
+    Returns:
+        str: Formatted command
+    """
+    if remote_host:
+        if ssh_options:
+            return format_remote_cmd(cmd, remote_host, user, ssh_options=ssh_options)
+        if SSH_POOL is not None:
+            return format_remote_cmd(
+                cmd, remote_host, user, ssh_options=SSH_POOL.ssh_options(user, remote_host))
+        return format_remote_cmd(cmd, remote_host, user)
+    elif user:
+        return format_su_cmd(cmd, user)
+    return cmd
+
+
 def create_ssh_askpass(password, cmd):
     """
     Create ask pass command
@@ -124,7 +799,7 @@ def create_ssh_askpass(password, cmd):
     return ssh_askpass_str
 
 
-def execute_cmd(cmd, user=None, password=None, remote_host=None):
+def execute_cmd(cmd, user=None, password=None, remote_host=None, timeout=None, ssh_options=None):
     """
     Execute a shell command. If user and password are provided it will be
     executed with this user.
@@ -134,56 +809,116 @@ def execute_cmd(cmd, user=None, password=None, remote_host=None):
         user (str, opt): User to execute the command
         password (str, opt): User password
         remote_host (str, opt): Remote host where the command will be executed
+        timeout (float, opt): Timeout in seconds. The whole process group (including the su
+            and ssh children) is killed when it expires. DEFAULT_TIMEOUT and the active
+            deadline are applied if it's not set
+        ssh_options (str, opt): ssh command line options used for remote commands. The ssh
+            session pool options are used by default if the pool is enabled
 
     Returns:
         ProcessResult: ProcessResult instance storing subprocess returncode,
             stdout and stderr
+
+    Raises:
+        ShellTimeoutError: If the command or the active deadline times out
     """
 
-    LOGGER.debug('Executing command "%s" with user %s', cmd, user)
+    return instrument(
+        cmd, user, remote_host,
+        lambda: _execute_cmd(cmd, user, password, remote_host, timeout, ssh_options))
 
-    if remote_host:
-        cmd = format_remote_cmd(cmd, remote_host, user)
-        LOGGER.debug('Command updated to "%s"', cmd)
 
-    elif user:
-        cmd = format_su_cmd(cmd, user)
+def _execute_cmd(cmd, user, password, remote_host, timeout, ssh_options=None):
+    """
+    Execute a shell command. See execute_cmd
+    """
+
+    LOGGER.debug('Executing command "%s" with user %s', cmd, user)
+    timeout = get_timeout(timeout)
+
+    if remote_host or user:
+        cmd = format_cmd(cmd, user, remote_host, ssh_options)
         LOGGER.debug('Command updated to "%s"', cmd)
 
+    popen_kwargs = {}
+    if timeout is not None:
+        popen_kwargs['preexec_fn'] = new_session_preexec()
     proc = subprocess.Popen(
         shlex.split(cmd),
-        stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+        **popen_kwargs)
 
     # Make it compatible with python2 and 3
     if password:
         password = password.encode()
-    out, err = proc.communicate(input=password)
+    with Watchdog(proc, timeout) as watchdog:
+        out, err = proc.communicate(input=password)
 
-    result = ProcessResult(cmd, proc.returncode, out, err)
     log_command_results(out, err)
+    if watchdog.expired:
+        raise ShellTimeoutError(cmd, timeout)
+    result = ProcessResult(cmd, proc.returncode, out, err)
 
     return result
 
-def remove_user(user, force=False, root_user=None, root_password=None, remote_host=None):
+def unwrap_cmd(cmd):
+    """
+    Get the command as the login shell would receive it using `su -lc` or ssh. The commands
+    are escaped to be wrapped in double quotes by these methods
+    """
+    return shlex.split('"{}"'.format(cmd))[0]
+
+
+def _wait_user_processes(user, root_user, root_password, remote_host, wait, execute):
+    """
+    Wait until the user doesn't have any running process or the wait time expires
+    """
+    limit = time.time() + wait
+    while True:
+        # pgrep returns 1 if there is not any process
+        result = execute('pgrep -u {}'.format(user), root_user, root_password, remote_host)
+        if result.returncode or time.time() >= limit:
+            return
+        bounded_sleep(USER_PROCESSES_POLL_INTERVAL)
+
+
+def remove_user(
+        user, force=False, root_user=None, root_password=None, remote_host=None, wait=10,
+        executor=None):
     """
-    Remove user from system
+    Remove user from system. If the user is used by some process and force is set, all the
+    processes of the user are killed at once before trying to remove it again
+
     Args:
         user (str): User to remove
         force (bool): Force the remove process even though the user is used in some process
         remote_host (str, opt): Remote host where the command will be executed
+        wait (float, opt): Maximum time in seconds to wait for the killed processes to finish
+        executor (executors.Executor, opt): Executor used to run the commands. execute_cmd is
+            used by default
+
+    Returns:
+        UserRemovalResult: Number of killed processes and removal time
     """
+    execute = executor.execute if executor is not None else execute_cmd
+    start_time = time.time()
     cmd = 'userdel {}'.format(user)
-    process_executing = r'userdel: user {} is currently used by process (.*)'.format(user)
-    while True:
-        result = execute_cmd(cmd, root_user, root_password, remote_host)
-        if result.returncode == 0:
-            return
-        elif force:
-            process_pid = find_pattern(process_executing, result.err)
-            if not process_pid:
-                break
-            kill_cmd = 'kill -9 {}'.format(process_pid.group(1))
-            execute_cmd(kill_cmd, root_user, root_password, remote_host)
-        else:
-            break
-    raise ShellError('error removing user {}'.format(user))
+    process_executing = r'userdel: user {} is currently used by process'.format(user)
+    result = execute(cmd, root_user, root_password, remote_host)
+    killed = 0
+    if result.returncode and force and find_pattern(process_executing, result.err):
+        # pkill -e prints a line for every killed process
+        kill_result = execute(
+            'pkill -9 -e -u {}'.format(user), root_user, root_password, remote_host)
+        killed = len([line for line in kill_result.output.splitlines() if 'killed' in line])
+        _wait_user_processes(user, root_user, root_password, remote_host, wait, execute)
+        result = execute(cmd, root_user, root_password, remote_host)
+
+    if result.returncode:
+        raise ShellError('error removing user {}'.format(user))
+    removal = UserRemovalResult(user, killed, time.time() - start_time)
+    if killed:
+        LOGGER.info(
+            'User %s removed after killing %d processes in %.2f seconds',
+            user, killed, removal.duration)
+    return removal
@@ -0,0 +1,245 @@
+"""
+Module to run commands in long-lived login shells
+
+Running a command with `su -lc` or ssh spawns a new login shell every time, sourcing the whole
+SAP environment (HDBSettings, sapenv, etc). A ShellSession keeps one login shell per
+(user, remote_host) running and sends the commands to it through pipes.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import logging
+import os
+import re
+import select
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+
+from shaptools import shell
+
+LOGGER = logging.getLogger('shellsession')
+READ_SIZE = 65536
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+class ShellSession(object):
+    """
+    Long-lived login shell session. Each command runs in a subshell with its stdin attached to
+    /dev/null, and its output is framed with an unique marker that also carries the return code
+
+    Args:
+        user (str, opt): User owning the login shell
+        remote_host (str, opt): Remote host where the login shell is started
+    """
+
+    SHELL_CMD = 'exec bash -s'
+    LOCAL_SHELL_CMD = 'bash -s'
+
+    def __init__(self, user=None, remote_host=None):
+        self.user = user
+        self.remote_host = remote_host
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        """
+        Check if the login shell process is running
+
+        Returns:
+            bool: True if running, False otherwise
+        """
+        return self._proc is not None and self._proc.poll() is None
+
+    def _spawn(self):
+        """
+        Start the login shell process
+        """
+        if self.user or self.remote_host:
+            cmd = shell.format_cmd(self.SHELL_CMD, self.user, self.remote_host)
+        else:
+            cmd = self.LOCAL_SHELL_CMD
+        LOGGER.debug('Starting shell session with command "%s"', cmd)
+        # The session runs in its own process group, so it can be killed when a command times out
+        self._proc = subprocess.Popen(
+            shlex.split(cmd), preexec_fn=shell.new_session_preexec(),
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _send(self, script):
+        """
+        Send the script to the login shell, respawning it if it's not running
+        """
+        if not self.is_alive():
+            if self._proc is not None:
+                LOGGER.warning(
+                    'shell session for user %s finished with return code %s. Respawning',
+                    self.user, self._proc.returncode)
+                self._close()
+            self._spawn()
+        try:
+            self._proc.stdin.write(script.encode())
+            self._proc.stdin.flush()
+        except (IOError, OSError):
+            # The shell finished after the liveness check, so the script was not received
+            self._close()
+            self._spawn()
+            self._proc.stdin.write(script.encode())
+            self._proc.stdin.flush()
+
+    def _read_output(self, marker, cmd, timeout=None):
+        """
+        Read stdout and stderr until both framing markers are found. The output written
+        before the start marker is dropped. If the timeout expires the session is killed, as the
+        shell state is unknown, and ShellTimeoutError is raised with the executed cmd
+
+        Returns:
+            tuple: Return code, stdout and stderr
+        """
+        limit = time.time() + timeout if timeout is not None else None
+        out_pattern = re.compile(
+            b'\n' + marker.encode() + b' ([0-9]+)\n$')
+        err_marker = b'\n' + marker.encode() + b'\n'
+        stdout_fd = self._proc.stdout.fileno()
+        stderr_fd = self._proc.stderr.fileno()
+        buffers = {stdout_fd: bytearray(), stderr_fd: bytearray()}
+        pending = [stdout_fd, stderr_fd]
+        returncode = None
+        while pending:
+            if limit is None:
+                ready, _, _ = select.select(pending, [], [])
+            else:
+                ready, _, _ = select.select(pending, [], [], max(limit - time.time(), 0))
+                if not ready:
+                    shell.kill_process_group(self._proc)
+                    self._close()
+                    raise shell.ShellTimeoutError(cmd, timeout)
+            for file_d in ready:
+                chunk = os.read(file_d, READ_SIZE)
+                if not chunk:
+                    self._close()
+                    raise shell.ShellError('shell session finished while running the command')
+                buffer_data = buffers[file_d]
+                buffer_data += chunk
+                if file_d == stdout_fd:
+                    # The marker line is short, so only the buffer tail needs to be checked
+                    found = out_pattern.search(bytes(buffer_data[-len(marker)-32:]))
+                    if found:
+                        returncode = int(found.group(1))
+                        del buffer_data[len(buffer_data)-len(found.group(0)):]
+                        pending.remove(file_d)
+                elif buffer_data.endswith(err_marker):
+                    del buffer_data[len(buffer_data)-len(err_marker):]
+                    pending.remove(file_d)
+        return (
+            returncode, _strip_start(bytes(buffers[stdout_fd]), marker),
+            _strip_start(bytes(buffers[stderr_fd]), marker))
+
+    def execute(self, cmd, timeout=None):
+        """
+        Execute a command in the login shell
+
+        Args:
+            cmd (str): Command to be executed
+            timeout (float, opt): Timeout in seconds, with the same behaviour as in
+                shell.execute_cmd. The session is restarted if it expires
+
+        Returns:
+            ProcessResult: ProcessResult instance storing the command returncode,
+                stdout and stderr
+        """
+        return shell.instrument(
+            cmd, self.user, self.remote_host, lambda: self._execute(cmd, timeout))
+
+    def _execute(self, cmd, timeout):
+        """
+        Execute a command in the login shell. See execute
+        """
+        timeout = shell.get_timeout(timeout)
+        marker = '__SHAPTOOLS_{}__'.format(uuid.uuid4().hex)
+        shell_cmd = shell.unwrap_cmd(cmd) if self.user or self.remote_host else cmd
+        script = 'printf "{marker}_START\\n"\nprintf "{marker}_START\\n" >&2\n'\
+            '(\n{cmd}\n) </dev/null\nprintf "\\n{marker} %d\\n" $?\n'\
+            'printf "\\n{marker}\\n" >&2\n'.format(cmd=shell_cmd, marker=marker)
+
+        LOGGER.debug('Executing command "%s" in shell session of user %s', cmd, self.user)
+        with self._lock:
+            self._send(script)
+            returncode, out, err = self._read_output(marker, cmd, timeout)
+
+        result = shell.ProcessResult(cmd, returncode, out, err)
+        shell.log_command_results(out, err)
+        return result
+
+    def close(self):
+        """
+        Stop the login shell process. It waits until the running command finishes
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        """
+        Stop the login shell process. The session lock must be held
+        """
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+        for pipe in (self._proc.stdin, self._proc.stdout, self._proc.stderr):
+            try:
+                pipe.close()
+            except (IOError, OSError):
+                # Closing stdin flushes it, which fails if the shell already finished
+                pass
+        self._proc = None
+
+
+def _strip_start(data, marker):
+    """
+    Drop the output written before the command start marker, as the login shell banners and
+    profile messages of a new session
+    """
+    start = '{}_START\n'.format(marker).encode()
+    position = data.find(start)
+    if position != -1:
+        return data[position+len(start):]
+    return data
+
+
+def get_session(user=None, remote_host=None):
+    """
+    Get the (user, remote_host) shell session. It's created if it doesn't exist
+
+    Args:
+        user (str, opt): User owning the login shell
+        remote_host (str, opt): Remote host where the login shell is started
+
+    Returns:
+        ShellSession: Shell session
+    """
+    key = (user, remote_host)
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key, None)
+        if session is None:
+            session = ShellSession(user, remote_host)
+            _SESSIONS[key] = session
+    return session
+
+
+def close_sessions():
+    """
+    Stop all the opened shell sessions
+    """
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
@@ -0,0 +1,335 @@
+"""
+SAP HANA system replication state snapshot
+
+SrState stores the parsed output of `hdbnsutil -sr_state --sapcontrol=1`: the local node mode,
+site and operation mode, and the whole site and host mappings of the (multi-tier or
+multi-target) system replication landscape. The instances are immutable and the lookups use
+indexes created once when parsing the output. parse_replication_status parses the output of
+`systemReplicationStatus.py --sapcontrol=1` with the replication status of every service.
+
+Example:
+    state = hana_instance.get_sr_snapshot()
+    state.primary_site.name
+    state.hosts_in_tier(3)
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import collections
+import datetime
+
+# Site data. source is the name of the site which replicates to this one (None for the primary)
+Site = collections.namedtuple(
+    'Site', 'name tier replication_mode operation_mode source targets hosts')
+
+# Replication record keys with their systemReplicationStatus.py fields
+SR_STATUS_FIELDS = (
+    ('database', 'DATABASE'),
+    ('service_name', 'SERVICE_NAME'),
+    ('site_id', 'SITE_ID'),
+    ('site_name', 'SITE_NAME'),
+    ('secondary_host', 'SECONDARY_HOST'),
+    ('secondary_port', 'SECONDARY_PORT'),
+    ('secondary_site_id', 'SECONDARY_SITE_ID'),
+    ('secondary_site_name', 'SECONDARY_SITE_NAME'),
+    ('secondary_active_status', 'SECONDARY_ACTIVE_STATUS'),
+    ('replication_mode', 'REPLICATION_MODE'),
+    ('status', 'REPLICATION_STATUS'),
+    ('status_details', 'REPLICATION_STATUS_DETAILS'),
+    ('shipped_log_position', 'SHIPPED_LOG_POSITION'),
+    ('shipped_log_position_time', 'SHIPPED_LOG_POSITION_TIME'),
+    ('last_log_position', 'LAST_LOG_POSITION'),
+    ('last_log_position_time', 'LAST_LOG_POSITION_TIME')
+)
+
+
+class SrState(object):
+    """
+    Immutable system replication state
+
+    Args:
+        entries (dict): Local node entries (mode, site id, site name, operation mode, etc)
+        sites (dict): Site instances by site name
+        host_mappings (dict): Host of every site by local host name
+    """
+
+    __slots__ = ('_entries', '_sites', '_host_mappings', '_tiers', '_frozen')
+
+    def __init__(self, entries, sites, host_mappings):
+        tiers = collections.defaultdict(list)
+        for site in sites.values():
+            tiers[site.tier].append(site)
+        self._entries = dict(entries)
+        self._sites = dict(sites)
+        self._host_mappings = dict(
+            (host, dict(mapping)) for host, mapping in host_mappings.items())
+        self._tiers = dict((tier, tuple(items)) for tier, items in tiers.items())
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError('SrState instances are immutable')
+        super(SrState, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError('SrState instances are immutable')
+
+    @classmethod
+    def parse(cls, output):
+        """
+        Parse the output of `hdbnsutil -sr_state --sapcontrol=1`
+
+        Args:
+            output (str): Command output
+
+        Returns:
+            SrState: Parsed state
+        """
+        entries = {}
+        tiers = {}
+        replication_modes = {}
+        operation_modes = {}
+        targets = collections.defaultdict(list)
+        host_mappings = collections.defaultdict(dict)
+        for line in output.splitlines():
+            key, separator, value = line.strip().partition('=')
+            if not separator:
+                continue
+            kind, _, name = key.partition('/')
+            if not name:
+                entries[key] = value
+            elif kind == 'siteTier':
+                tiers[name] = int(value)
+            elif kind == 'siteReplicationMode':
+                replication_modes[name] = value
+            elif kind == 'siteOperationMode':
+                operation_modes[name] = value
+            elif kind == 'siteMapping':
+                targets[name].append(value)
+            elif kind == 'mapping':
+                site, _, host = value.partition('/')
+                host_mappings[name][site] = host
+
+        site_hosts = collections.defaultdict(set)
+        for mapping in host_mappings.values():
+            for site, host in mapping.items():
+                site_hosts[site].add(host)
+        sources = dict(
+            (target, source) for source, items in targets.items() for target in items)
+        names = set(tiers) | set(replication_modes) | set(targets) | set(sources)
+        sites = {}
+        for name in names:
+            sites[name] = Site(
+                name=name, tier=tiers.get(name, None),
+                replication_mode=replication_modes.get(name, None),
+                operation_mode=operation_modes.get(name, None),
+                source=sources.get(name, None), targets=tuple(targets.get(name, ())),
+                hosts=frozenset(site_hosts.get(name, ())))
+        return cls(entries, sites, host_mappings)
+
+    def get(self, key, default=None):
+        """
+        Get a local node entry of the command output (`online` or `isSource` for example)
+        """
+        return self._entries.get(key, default)
+
+    @property
+    def mode(self):
+        """
+        Local node mode (none, primary, sync, syncmem, async)
+        """
+        return self._entries.get('mode', None)
+
+    @property
+    def site_id(self):
+        """
+        Local site id
+        """
+        return self._entries.get('site id', None)
+
+    @property
+    def site_name(self):
+        """
+        Local site name
+        """
+        return self._entries.get('site name', None)
+
+    @property
+    def operation_mode(self):
+        """
+        Local operation mode (primary, delta_datashipping, logreplay, logreplay_readaccess)
+        """
+        return self._entries.get('operation mode', None)
+
+    @property
+    def is_primary(self):
+        """
+        True if the local node is the primary
+        """
+        return self.mode == 'primary'
+
+    @property
+    def sites(self):
+        """
+        All the sites sorted by tier and name
+        """
+        return tuple(sorted(
+            self._sites.values(),
+            key=lambda site: (site.tier is None, site.tier, site.name)))
+
+    @property
+    def primary_site(self):
+        """
+        Site in the tier 1. None if the system replication is not configured
+        """
+        primary = self._tiers.get(1, ())
+        return primary[0] if primary else None
+
+    @property
+    def local_site(self):
+        """
+        Site of the local node. None if it's not in the mappings
+        """
+        return self._sites.get(self.site_name, None)
+
+    def site(self, name):
+        """
+        Get a site by name. None if it doesn't exist
+        """
+        return self._sites.get(name, None)
+
+    def sites_in_tier(self, tier):
+        """
+        Get the sites of a tier
+        """
+        return self._tiers.get(tier, ())
+
+    def hosts_in_tier(self, tier):
+        """
+        Get the hosts of the sites of a tier
+        """
+        return frozenset(host for site in self.sites_in_tier(tier) for host in site.hosts)
+
+    def host_mapping(self, host):
+        """
+        Get the hosts of every site mapped to a local host
+
+        Returns:
+            dict: Hosts by site name
+        """
+        return dict(self._host_mappings.get(host, {}))
+
+    def to_dict(self):
+        """
+        Get the state as dictionary
+        """
+        data = dict(self._entries)
+        data['sites'] = dict((site.name, {
+            'tier': site.tier,
+            'replication_mode': site.replication_mode,
+            'operation_mode': site.operation_mode,
+            'source': site.source,
+            'targets': list(site.targets),
+            'hosts': sorted(site.hosts)
+        }) for site in self._sites.values())
+        data['host_mappings'] = self.host_mapping_dict()
+        return data
+
+    def host_mapping_dict(self):
+        """
+        Get the hosts of every site by local host
+        """
+        return dict((host, dict(mapping)) for host, mapping in self._host_mappings.items())
+
+    def __repr__(self):
+        return 'SrState(mode={}, site_name={}, sites={})'.format(
+            self.mode, self.site_name, [site.name for site in self.sites])
+
+
+def _day_seconds(value):
+    """
+    Get the seconds since midnight of a `2020-03-10 10:38:13.284573` like timestamp
+    """
+    return int(value[11:13]) * 3600 + int(value[14:16]) * 60 + float(value[17:])
+
+
+def _shipping_delay(last_time, shipped_time):
+    """
+    Get the seconds between the last written log position and the last one shipped to the
+    secondary site. None if any of the times is not available. strptime is only used if
+    the dates are different, as it's much slower
+    """
+    if not last_time or not shipped_time:
+        return None
+    if last_time == shipped_time:
+        return 0.0
+    try:
+        if last_time[:10] == shipped_time[:10]:
+            return _day_seconds(last_time) - _day_seconds(shipped_time)
+        time_format = '%Y-%m-%d %H:%M:%S.%f'
+        delta = datetime.datetime.strptime(last_time, time_format) - \
+            datetime.datetime.strptime(shipped_time, time_format)
+    except ValueError:
+        return None
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1000000.0
+
+
+def _replication_record(host, port, fields):
+    """
+    Create the replication record of a service from its systemReplicationStatus.py fields
+    """
+    get = fields.get
+    record = {key: get(field) for key, field in SR_STATUS_FIELDS}
+    record['host'] = host
+    record['port'] = int(port)
+    for key in ('secondary_port', 'shipped_log_position', 'last_log_position'):
+        if record[key] and record[key].isdigit():
+            record[key] = int(record[key])
+    record['shipping_delay'] = _shipping_delay(
+        record['last_log_position_time'], record['shipped_log_position_time'])
+    return record
+
+
+def parse_replication_status(output):
+    """
+    Parse the output of `systemReplicationStatus.py --sapcontrol=1` in a single pass
+
+    Returns:
+        dict: services (list of per service replication records with the host, port,
+            secondary site, replication mode, status, log positions and shipping delay in
+            seconds), sites (site data by site id) and the global entries (as
+            overall_replication_status and local_site_id)
+    """
+    # The entries are grouped by their prefix (service/host/port or site/id), so every
+    # line is split only once
+    groups = collections.OrderedDict()
+    status = {}
+    for line in output.splitlines():
+        key, separator, value = line.partition('=')
+        if not separator:
+            continue
+        prefix, _, field = key.rpartition('/')
+        if not prefix:
+            status[field] = value
+            continue
+        fields = groups.get(prefix, None)
+        if fields is None:
+            fields = groups[prefix] = {}
+        fields[field] = value
+
+    services = []
+    sites = {}
+    for prefix, fields in groups.items():
+        kind, _, name = prefix.partition('/')
+        if kind == 'service':
+            host, _, port = name.rpartition('/')
+            services.append(_replication_record(host, port, fields))
+        elif kind == 'site':
+            sites[name] = dict((field.lower(), value) for field, value in fields.items())
+    status['services'] = services
+    status['sites'] = sites
+    return status
@@ -0,0 +1,198 @@
+"""
+Module to keep multiplexed ssh master connections alive between remote commands
+
+Every remote command executed by the shell module creates a new ssh connection by default. The
+pool uses the OpenSSH ControlMaster feature to share one master connection per (user, host)
+pair, so only the first command pays the connection and authentication cost.
+
+The idle and least recently used masters are evicted with `ssh -O stop`: they stop accepting new
+commands and exit once the running ones finish, so the commands in progress are never killed.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import logging
+import os
+import hashlib
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+LOGGER = logging.getLogger('sshpool')
+
+
+class SshSession(object):
+    """
+    Multiplexed ssh session data
+
+    Args:
+        user (str): User used in the ssh connection
+        remote_host (str): Remote host
+        control_path (str): Path of the ssh control socket
+    """
+
+    def __init__(self, user, remote_host, control_path):
+        self.user = user
+        self.remote_host = remote_host
+        self.control_path = control_path
+        self.created = time.time()
+        self.last_used = self.created
+        self.uses = 0
+
+    def touch(self):
+        """
+        Update the session usage data
+        """
+        self.last_used = time.time()
+        self.uses += 1
+
+
+class SshSessionPool(object):
+    """
+    Pool of multiplexed ssh master connections keyed by (user, remote_host)
+
+    Args:
+        control_dir (str, opt): Folder where the ssh control sockets are created. A temporary
+            folder is created if it's not set
+        max_sessions (int, opt): Maximum number of master connections kept alive. The least
+            recently used session is stopped when the limit is reached
+        idle_timeout (int, opt): Time in seconds a master connection is kept alive without usage
+    """
+
+    def __init__(self, control_dir=None, max_sessions=10, idle_timeout=300):
+        if max_sessions < 1:
+            raise ValueError('max_sessions must be greater than 0')
+        self._control_dir = control_dir
+        self._temporary_dir = False
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def control_dir(self):
+        """
+        Folder where the control sockets are stored. Created on demand
+        """
+        if self._control_dir is None:
+            self._control_dir = tempfile.mkdtemp(prefix='shaptools-ssh-')
+            self._temporary_dir = True
+        return self._control_dir
+
+    @property
+    def sessions(self):
+        """
+        Currently registered sessions keys
+        """
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def _control_path(self, user, remote_host):
+        """
+        Get the control socket path. A hash is used as unix socket paths are length limited
+        """
+        digest = hashlib.sha1('{}@{}'.format(user, remote_host).encode()).hexdigest()
+        return os.path.join(self.control_dir, digest[:16])
+
+    def ssh_options(self, user, remote_host):
+        """
+        Get the ssh options to run a command through the (user, remote_host) master connection.
+        The master connection is created by ssh on first usage
+
+        Args:
+            user (str): User used in the ssh connection
+            remote_host (str): Remote host
+
+        Returns:
+            str: ssh command line options
+        """
+        key = (user, remote_host)
+        with self._lock:
+            evicted = self._evict_idle()
+            session = self._sessions.get(key, None)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions.values(), key=lambda item: item.last_used)
+                    evicted.append(self._remove(oldest))
+                session = SshSession(user, remote_host, self._control_path(user, remote_host))
+                self._sessions[key] = session
+                LOGGER.debug('new ssh session registered for %s@%s', user, remote_host)
+            session.touch()
+        for item in evicted:
+            self._close(item, 'stop')
+        return '-o ControlMaster=auto -o ControlPath={} -o ControlPersist={}'.format(
+            session.control_path, self.idle_timeout)
+
+    def _evict_idle(self):
+        """
+        Remove the sessions not used during the idle timeout. Lock must be already acquired
+
+        Returns:
+            list: Removed sessions, to be closed without the lock
+        """
+        current_time = time.time()
+        return [
+            self._remove(session) for session in list(self._sessions.values())
+            if current_time - session.last_used > self.idle_timeout]
+
+    def _remove(self, session):
+        """
+        Remove the session from the pool. Lock must be already acquired
+        """
+        return self._sessions.pop((session.user, session.remote_host))
+
+    @staticmethod
+    def _close(session, operation='exit'):
+        """
+        Send a control command to the session master connection. exit stops the master at
+        once, and stop lets the running commands finish. It's executed without the lock, so
+        the other sessions are not blocked
+        """
+        LOGGER.debug(
+            'closing ssh session for %s@%s (%s)', session.user, session.remote_host, operation)
+        if not os.path.exists(session.control_path):
+            return
+        cmd = ['ssh', '-O', operation, '-o', 'ControlPath={}'.format(session.control_path),
+               '{}@{}'.format(session.user, session.remote_host)]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        proc.communicate()
+
+    def evict_idle(self):
+        """
+        Stop the sessions not used during the idle timeout
+        """
+        with self._lock:
+            evicted = self._evict_idle()
+        for session in evicted:
+            self._close(session, 'stop')
+
+    def close(self, user, remote_host):
+        """
+        Close the (user, remote_host) session if it exists
+        """
+        with self._lock:
+            session = self._sessions.pop((user, remote_host), None)
+        if session:
+            self._close(session)
+
+    def close_all(self):
+        """
+        Close all of the sessions. The control sockets folder is removed if the pool created it
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            control_dir = self._control_dir if self._temporary_dir else None
+            if control_dir is not None:
+                self._control_dir = None
+                self._temporary_dir = False
+        for session in sessions:
+            self._close(session)
+        if control_dir is not None:
+            shutil.rmtree(control_dir, ignore_errors=True)
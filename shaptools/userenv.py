@@ -0,0 +1,189 @@
+"""
+Module to run commands directly with a captured user login environment
+
+The SAP commands (hdbnsutil, HDB, sapcontrol, hdbsql, etc) only need the sidadm login shell to
+get environment variables as PATH, LD_LIBRARY_PATH or DIR_INSTANCE. UserEnvironment captures this
+environment once, and runs the later commands by absolute path under the user uid, without any
+shell.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+import logging
+import os
+import pwd
+import re
+import shlex
+import subprocess
+
+from shaptools import shell
+
+LOGGER = logging.getLogger('userenv')
+
+# Characters that need a shell to be interpreted. Commands using them are run with su
+SHELL_SYNTAX = re.compile(r'[|&;<>()$`*?~\\\n]')
+# Variables bound to the capture session that must not be reused
+SESSION_VARIABLES = ['_', 'SHLVL', 'OLDPWD']
+
+
+class UserEnvironment(object):
+    """
+    Snapshot of a user login environment
+
+    Args:
+        user (str): User owning the environment
+        password (str, opt): User password. Used in the commands that fall back to su
+        watch_paths (list, opt): Paths checked to invalidate the snapshot. If the modification
+            time of any of them changes (a software update for example), the environment is
+            captured again
+    """
+
+    CAPTURE_CMD = 'env -0'
+
+    def __init__(self, user, password=None, watch_paths=None):
+        self.user = user
+        self._password = password
+        self.watch_paths = watch_paths or []
+        self.env = None
+        self._fingerprint = None
+        self._executables = {}
+        user_data = pwd.getpwnam(user)
+        self._uid = user_data.pw_uid
+        self._gid = user_data.pw_gid
+        self._home = user_data.pw_dir
+
+    def _get_fingerprint(self):
+        """
+        Get the modification time of the watched paths
+        """
+        fingerprint = []
+        for path in self.watch_paths:
+            try:
+                fingerprint.append(os.stat(path).st_mtime)
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+
+    def is_valid(self):
+        """
+        Check if the captured environment is still valid
+
+        Returns:
+            bool: True if the environment is captured and the watched paths didn't change
+        """
+        return self.env is not None and self._fingerprint == self._get_fingerprint()
+
+    def capture(self):
+        """
+        Capture the user login environment. The output is not logged, as the environment might
+        contain secrets exported by the user profile
+        """
+        cmd = shell.format_cmd(self.CAPTURE_CMD, self.user)
+        proc = subprocess.Popen(
+            shlex.split(cmd),
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        password = self._password.encode() if self._password else None
+        out, _ = proc.communicate(input=password)
+        if proc.returncode:
+            raise shell.ShellError('error capturing {} environment'.format(self.user))
+        env = {}
+        for entry in out.decode('utf-8', 'replace').split('\0'):
+            key, separator, value = entry.partition('=')
+            if separator and key not in SESSION_VARIABLES:
+                env[key] = value
+        self.env = env
+        self._executables = {}
+        self._fingerprint = self._get_fingerprint()
+        LOGGER.debug('%s environment captured', self.user)
+
+    def which(self, executable):
+        """
+        Find the absolute path of an executable using the captured PATH
+
+        Args:
+            executable (str): Executable name
+
+        Returns:
+            str: Absolute path of the executable. None if it's not found
+        """
+        if os.path.isabs(executable):
+            return executable
+        if executable not in self._executables:
+            self._executables[executable] = None
+            for folder in self.env.get('PATH', '').split(os.pathsep):
+                path = os.path.join(folder, executable)
+                if os.path.isfile(path) and os.access(path, os.X_OK):
+                    self._executables[executable] = path
+                    break
+        return self._executables[executable]
+
+    def _demote(self):
+        """
+        Change the process user and groups to run the command. Executed in the child process
+        """
+        os.initgroups(self.user, self._gid)
+        os.setgid(self._gid)
+        os.setuid(self._uid)
+
+    def execute(self, cmd, timeout=None):
+        """
+        Execute a command with the captured environment. The commands using shell syntax or
+        whose executable is not found are run using su
+
+        Args:
+            cmd (str): Command to be executed. It uses the same escaping as the commands
+                provided to shell.execute_cmd with user
+            timeout (float, opt): Timeout in seconds, with the same behaviour as in
+                shell.execute_cmd
+
+        Returns:
+            ProcessResult: ProcessResult instance storing subprocess returncode,
+                stdout and stderr
+        """
+        timeout = shell.get_timeout(timeout)
+        if not self.is_valid():
+            self.capture()
+
+        # Remove the escaping used to wrap the command in `su -lc "{cmd}"`
+        unwrapped_cmd = shlex.split('"{}"'.format(cmd))[0]
+        args = shlex.split(unwrapped_cmd)
+        executable = self.which(args[0]) if args else None
+        current_uid = os.getuid()
+        if SHELL_SYNTAX.search(unwrapped_cmd) or executable is None or \
+                current_uid not in (0, self._uid):
+            LOGGER.debug('Command "%s" cannot be executed directly', cmd)
+            if timeout is not None:
+                return shell.execute_cmd(cmd, self.user, self._password, timeout=timeout)
+            return shell.execute_cmd(cmd, self.user, self._password)
+
+        args[0] = executable
+        return shell.instrument(
+            cmd, self.user, None, lambda: self._execute_direct(cmd, args, current_uid, timeout))
+
+    def _execute_direct(self, cmd, args, current_uid, timeout):
+        """
+        Execute the command arguments directly with the captured environment. The stdin is
+        closed without writing the password, as the command doesn't run under su. The result
+        stores the same command as the su fallback
+        """
+        LOGGER.debug('Executing command "%s" directly with user %s', args, self.user)
+        preexec_fn = self._demote if current_uid != self._uid else None
+        if timeout is not None:
+            preexec_fn = shell.new_session_preexec(preexec_fn)
+        proc = subprocess.Popen(
+            args, env=self.env, cwd=self._home, preexec_fn=preexec_fn,
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        with shell.Watchdog(proc, timeout) as watchdog:
+            out, err = proc.communicate()
+
+        shell.log_command_results(out, err)
+        cmd = shell.format_cmd(cmd, self.user)
+        if watchdog.expired:
+            raise shell.ShellTimeoutError(cmd, timeout)
+        result = shell.ProcessResult(cmd, proc.returncode, out, err)
+        return result
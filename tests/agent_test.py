@@ -0,0 +1,314 @@
+"""
+Unitary tests for agent.py and agentserver.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import errno
+import io
+import json
+import logging
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import agent
+from shaptools import agentserver
+from shaptools import executors
+from shaptools import shell
+
+
+class TestAgentServer(unittest.TestCase):
+    """
+    Unitary tests for agentserver.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._events = []
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _send_event(self, stream, line):
+        self._events.append((stream, line))
+
+    def _serve(self, *requests):
+        output = io.StringIO()
+        agentserver.serve(
+            io.StringIO(u''.join(json.dumps(request) + u'\n' for request in requests)), output)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_run(self):
+        result = agentserver.run({'cmd': 'echo out; echo err >&2; exit 3'}, self._send_event)
+        self.assertEqual(result, {'returncode': 3, 'stdout': 'out\n', 'stderr': 'err\n'})
+        self.assertEqual(self._events, [])
+
+    def test_run_stream(self):
+        result = agentserver.run(
+            {'cmd': 'echo line1; echo line2; printf last', 'stream': True}, self._send_event)
+        self.assertEqual(result['stdout'], 'line1\nline2\nlast')
+        self.assertEqual(
+            self._events, [('stdout', 'line1'), ('stdout', 'line2'), ('stdout', 'last')])
+
+    def test_run_timeout(self):
+        with self.assertRaises(agentserver.RequestError) as err:
+            agentserver.run({'cmd': 'sleep 10', 'timeout': 0.2}, self._send_event)
+        self.assertEqual(err.exception.error_type, 'timeout')
+
+    @mock.patch('pwd.getpwuid')
+    def test_run_args(self, mock_getpwuid):
+        mock_getpwuid.return_value = mock.Mock(pw_name='root')
+        self.assertEqual(agentserver._run_args('ls', None), ['/bin/sh', '-c', 'ls'])
+        self.assertEqual(agentserver._run_args('ls', 'root'), ['/bin/sh', '-c', 'ls'])
+        self.assertEqual(agentserver._run_args('ls', 'prdadm'), ['su', '-lc', 'ls', 'prdadm'])
+
+    def test_files(self):
+        folder = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(folder, 'file'), 'w') as file_ptr:
+                file_ptr.write('content')
+            os.mkdir(os.path.join(folder, 'dir'))
+            os.symlink(os.path.join(folder, 'missing'), os.path.join(folder, 'link'))
+
+            self.assertEqual(
+                agentserver.read({'path': os.path.join(folder, 'file')}, None),
+                {'content': 'content'})
+            file_stat = agentserver.stat_path({'path': os.path.join(folder, 'file')}, None)
+            self.assertEqual(file_stat['size'], 7)
+            self.assertTrue(file_stat['is_file'])
+            self.assertFalse(file_stat['is_dir'])
+
+            entries = agentserver.scandir({'path': folder}, None)['entries']
+            self.assertEqual([entry['name'] for entry in entries], ['dir', 'file', 'link'])
+            self.assertTrue(entries[0]['is_dir'])
+            self.assertTrue(entries[1]['is_file'])
+            self.assertTrue(entries[2]['is_link'])
+            self.assertFalse(entries[2]['is_file'])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_pidof(self):
+        name = os.path.basename(open('/proc/self/cmdline', 'rb').read().split(b'\0')[0])
+        pids = agentserver.pidof({'name': name.decode()}, None)['pids']
+        self.assertIn(os.getpid(), pids)
+        self.assertEqual(agentserver.pidof({'name': 'missing_process_name'}, None)['pids'], [])
+
+    def test_serve(self):
+        responses = self._serve(
+            {'id': 1, 'op': 'ping'},
+            {'id': 2, 'op': 'read', 'path': '/missing/file'},
+            {'id': 3, 'op': 'unknown'},
+            {'id': 4, 'op': 'read'},
+            {'id': 5, 'op': 'run', 'cmd': 'echo line', 'stream': True},
+            {'id': 6, 'op': 'exit'},
+            {'id': 7, 'op': 'ping'})
+
+        self.assertEqual(responses[0]['id'], 1)
+        self.assertEqual(responses[0]['result']['version'], agentserver.PROTOCOL_VERSION)
+        self.assertEqual(responses[1], {
+            'id': 2, 'ok': False, 'error': 'No such file or directory', 'type': 'OSError',
+            'errno': errno.ENOENT, 'filename': '/missing/file'})
+        self.assertEqual(responses[2], {
+            'id': 3, 'ok': False, 'error': 'unknown operation: unknown', 'type': 'error'})
+        self.assertEqual(responses[3], {
+            'id': 4, 'ok': False, 'error': "missing parameter: 'path'", 'type': 'error'})
+        self.assertEqual(responses[4], {
+            'id': 5, 'event': 'line', 'stream': 'stdout', 'line': 'line'})
+        self.assertEqual(responses[5]['result']['stdout'], 'line\n')
+        self.assertEqual(responses[6], {'id': 6, 'ok': True, 'result': {}})
+        self.assertEqual(len(responses), 7)
+
+    def test_serve_invalid(self):
+        output = io.StringIO()
+        agentserver.serve(io.StringIO(u'invalid\n'), output)
+        self.assertEqual(json.loads(output.getvalue()), {
+            'id': None, 'ok': False, 'error': 'invalid request', 'type': 'error'})
+
+
+class TestAgent(unittest.TestCase):
+    """
+    Unitary tests for agent.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._client = agent.AgentClient()
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        self._client.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_args(self):
+        self.assertEqual(
+            self._client._args(), [sys.executable, '-u', '-c', agent.AgentClient.BOOTSTRAP])
+        client = agent.AgentClient('host', 'prdadm', ssh_options='-o Port=2222')
+        self.assertEqual(client._args(), [
+            'ssh', '-o', 'Port=2222', 'prdadm@host',
+            "python3 -u -c '{}'".format(agent.AgentClient.BOOTSTRAP)])
+
+    def test_ping(self):
+        self.assertFalse(self._client.is_alive())
+        first = self._client.ping()
+        second = self._client.ping()
+        self.assertTrue(self._client.is_alive())
+        self.assertEqual(first['version'], agentserver.PROTOCOL_VERSION)
+        # The same process serves all the requests
+        self.assertEqual(first['pid'], second['pid'])
+        self._client.close()
+        self.assertFalse(self._client.is_alive())
+
+    def test_restart(self):
+        first = self._client.ping()
+        os.kill(first['pid'], 9)
+        self._client._proc.wait()
+        self.assertNotEqual(self._client.ping()['pid'], first['pid'])
+
+    def test_run(self):
+        result = self._client.run('echo out; echo err >&2; exit 2')
+        self.assertEqual(result.cmd, 'echo out; echo err >&2; exit 2')
+        self.assertEqual(result.returncode, 2)
+        self.assertEqual(result.output, 'out\n')
+        self.assertEqual(result.err, 'err\n')
+
+    def test_run_stream(self):
+        lines = []
+        result = self._client.run(
+            'echo line1; echo line2 >&2', callback=lambda stream, line: lines.append(
+                (stream, line)))
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(sorted(lines), [('stderr', 'line2'), ('stdout', 'line1')])
+
+    def test_run_timeout(self):
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            self._client.run('sleep 10', timeout=0.2)
+        self.assertEqual(err.exception.cmd, 'sleep 10')
+        # The agent is still usable
+        self.assertEqual(self._client.run('true').returncode, 0)
+
+    def test_files(self):
+        self.assertTrue(self._client.exists(os.path.abspath(__file__)))
+        self.assertFalse(self._client.exists('/missing/file'))
+        with open(os.path.abspath(__file__)) as file_ptr:
+            self.assertEqual(self._client.read_file(os.path.abspath(__file__)), file_ptr.read())
+        with self.assertRaises(OSError) as err:
+            self._client.read_file('/missing/file')
+        self.assertEqual(err.exception.errno, errno.ENOENT)
+        self.assertEqual(err.exception.filename, '/missing/file')
+        names = [entry['name'] for entry in self._client.scandir(os.path.dirname(__file__))]
+        self.assertIn(os.path.basename(__file__), names)
+
+    def test_pidof(self):
+        pid = self._client.ping()['pid']
+        self.assertIn(pid, self._client.pidof(os.path.basename(sys.executable)))
+
+    def test_error(self):
+        with self.assertRaises(agent.AgentError) as err:
+            self._client.request('unknown')
+        self.assertEqual(str(err.exception), 'unknown operation: unknown')
+
+    def test_agent_finished(self):
+        self._client.python = 'false'
+        with self.assertRaises(agent.AgentError):
+            self._client.ping()
+        self.assertFalse(self._client.is_alive())
+
+    def test_agent_finished_stderr(self):
+        bootstrap = 'import sys; sys.stderr.write("line1\\nline2\\n"); sys.exit(1)'
+        with mock.patch.object(agent.AgentClient, 'BOOTSTRAP', bootstrap):
+            with self.assertRaises(agent.AgentError) as err:
+                self._client.ping()
+        self.assertEqual(str(err.exception), 'agent finished unexpectedly: line1\nline2')
+        self.assertFalse(self._client.is_alive())
+
+    def test_agent_stderr_drained(self):
+        # More output than the pipe buffer doesn't block the agent
+        bootstrap = 'sys.stderr.write("warning\\n" * 100000); ' + agent.AgentClient.BOOTSTRAP
+        with mock.patch.object(agent.AgentClient, 'BOOTSTRAP', 'import sys; ' + bootstrap):
+            self.assertEqual(
+                self._client.ping()['version'], agentserver.PROTOCOL_VERSION)
+        stderr = self._client._stderr
+        self._client.close()
+        self.assertEqual(stderr.tail(), '\n'.join(['warning'] * 20))
+
+    def test_context_manager(self):
+        with agent.AgentClient() as client:
+            client.ping()
+        self.assertFalse(client.is_alive())
+
+    def test_executor(self):
+        executor = agent.AgentExecutor()
+        try:
+            client = executor.get_client()
+            self.assertIs(executor.get_client(), client)
+            self.assertIsNot(executor.get_client('host'), client)
+            self.assertEqual(executor.get_client('host').remote_host, 'host')
+
+            result = executor('echo out')
+            self.assertEqual(result.output, 'out\n')
+            lines = []
+            result = executor.execute_stream(
+                'echo line', callback=lambda stream, line: lines.append(line))
+            self.assertEqual(lines, ['line'])
+            results = executor.execute_batch(['true', 'false', 'true'])
+            self.assertEqual([result.returncode for result in results], [0, 1])
+        finally:
+            executor.close()
+        self.assertEqual(executor._clients, {})
+
+    def test_get_client(self):
+        executor = agent.AgentExecutor()
+        self.assertIs(agent.get_client(executor, 'host'), executor.get_client('host'))
+        self.assertIsNone(agent.get_client(executors.ShellExecutor(), 'host'))
+        self.assertIsNone(agent.get_client(None, 'host'))
@@ -0,0 +1,263 @@
+"""
+Unitary tests for aio.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio API requires python 3.5 or newer')
+class TestAio(unittest.TestCase):
+    """
+    Unitary tests for aio.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+        import asyncio
+        from shaptools import aio, hana, netweaver, shell
+        cls._asyncio = asyncio
+        cls._shell = shell
+        cls._aio = aio
+        cls._hana_module = hana
+        cls._netweaver_module = netweaver
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._loop = self._asyncio.new_event_loop()
+        self._hana = self._aio.AsyncHanaInstance('prd', '00', 'pass')
+        self._netweaver = self._aio.AsyncNetweaverInstance('ha1', '00', 'pass')
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        self._loop.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _future(self, value):
+        future = self._loop.create_future()
+        future.set_result(value)
+        return future
+
+    def test_execute_cmd_async_popen(self):
+        # This test is used to check the asyncio subprocess correct usage
+        result = self._loop.run_until_complete(
+            self._aio.execute_cmd_async('sh -c "echo out; echo err >&2; exit 3"'))
+        self.assertEqual(3, result.returncode)
+        self.assertEqual('out\n', result.output)
+        self.assertEqual('err\n', result.err)
+
+    def test_execute_cmd_async_timeout(self):
+        with self.assertRaises(self._shell.ShellTimeoutError) as err:
+            self._loop.run_until_complete(
+                self._aio.execute_cmd_async('sh -c "sleep 30 | cat"', timeout=0.5))
+        self.assertEqual(0.5, err.exception.timeout)
+
+    @mock.patch('shaptools.shell.log_command_results')
+    @mock.patch('shaptools.shell.format_cmd')
+    @mock.patch('asyncio.create_subprocess_exec', new_callable=mock.Mock)
+    def test_execute_cmd_async(self, mock_exec, mock_format, mock_log):
+        mock_format.return_value = 'su -lc "ls" user'
+        mock_proc = mock.Mock(returncode=0)
+        mock_proc.communicate.return_value = self._future((b'out', b'err'))
+        mock_exec.return_value = self._future(mock_proc)
+
+        result = self._loop.run_until_complete(
+            self._aio.execute_cmd_async('ls', 'user', 'pass'))
+
+        mock_format.assert_called_once_with('ls', 'user', None)
+        mock_exec.assert_called_once_with(
+            'su', '-lc', 'ls', 'user', stdout=self._asyncio.subprocess.PIPE,
+            stdin=self._asyncio.subprocess.PIPE, stderr=self._asyncio.subprocess.PIPE)
+        mock_proc.communicate.assert_called_once_with(input=b'pass')
+        mock_log.assert_called_once_with(b'out', b'err')
+        self.assertEqual('su -lc "ls" user', result.cmd)
+        self.assertEqual('out', result.output)
+        self.assertEqual('err', result.err)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_run_hana_command_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        result = self._loop.run_until_complete(
+            self._hana._run_hana_command_async('test command'))
+        mock_execute.assert_called_once_with('test command', 'prdadm', 'pass', None, timeout=None)
+        self.assertEqual(0, result.returncode)
+
+    def test_execute_cmd_async_hooks(self):
+        hook = mock.Mock()
+        self._shell.add_hook(hook)
+        try:
+            result = self._loop.run_until_complete(
+                self._aio.execute_cmd_async('sh -c "echo out; exit 2"'))
+        finally:
+            self._shell.remove_hook(hook)
+        event = hook.on_end.call_args[0][0]
+        hook.on_start.assert_called_once_with(event)
+        self.assertEqual('sh -c "echo out; exit 2"', event.cmd)
+        self.assertEqual(2, event.returncode)
+        self.assertEqual(result.output_size, event.output_size)
+
+    @mock.patch('time.time')
+    def test_execute_cmd_async_deadline(self, mock_time):
+        mock_time.return_value = 100
+        with self.assertRaises(self._shell.ShellTimeoutError):
+            self._loop.run_until_complete(
+                self._aio.execute_cmd_async('true', deadline=90))
+
+    @mock.patch('shaptools.shell.get_timeout')
+    @mock.patch('shaptools.aio._execute_cmd_async', new_callable=mock.Mock)
+    def test_execute_cmd_async_thread_deadline(self, mock_execute, mock_get_timeout):
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        with self._shell.deadline(0):
+            self._loop.run_until_complete(self._aio.execute_cmd_async('true', timeout=5))
+        mock_execute.assert_called_once_with('true', None, None, None, 5, None)
+        self.assertFalse(mock_get_timeout.called)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_run_hana_command_async_options(self, mock_execute):
+        cache = mock.Mock()
+        cache.get.return_value = None
+        hana_instance = self._aio.AsyncHanaInstance(
+            'prd', '00', 'pass', command_timeout=10, cache=cache)
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        result = self._loop.run_until_complete(
+            hana_instance._run_hana_command_async('HDB version'))
+        mock_execute.assert_called_once_with(
+            'HDB version', 'prdadm', 'pass', None, timeout=10)
+        cache.put.assert_called_once_with(None, 'prdadm', 'HDB version', result)
+
+        cache.get.return_value = mock.Mock(returncode=0)
+        self.assertEqual(
+            cache.get.return_value,
+            self._loop.run_until_complete(hana_instance._run_hana_command_async('HDB version')))
+        self.assertEqual(1, mock_execute.call_count)
+
+    def test_run_hana_command_async_executor(self):
+        from shaptools import executors
+        executor = executors.FakeExecutor()
+        executor.add_result('HDB version', output='version')
+        hana_instance = self._aio.AsyncHanaInstance('prd', '00', 'pass', executor=executor)
+        result = self._loop.run_until_complete(
+            hana_instance._run_hana_command_async('HDB version'))
+        self.assertEqual('version', result.output)
+        self.assertEqual([('HDB version', 'prdadm', None)], executor.calls)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_run_hana_command_async_error(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(returncode=1, cmd='updated'))
+        with self.assertRaises(self._hana_module.HanaError) as err:
+            self._loop.run_until_complete(self._hana._run_hana_command_async('test command'))
+        self.assertTrue('Error running hana command: updated' in str(err.exception))
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_is_running_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        self.assertTrue(self._loop.run_until_complete(self._hana.is_running_async()))
+        mock_execute.assert_called_once_with('pidof hdb.sapPRD_HDB00', 'prdadm', 'pass', None, timeout=None)
+
+        mock_execute.return_value = self._future(mock.Mock(returncode=1))
+        self.assertFalse(self._loop.run_until_complete(self._hana.is_running_async()))
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_get_version_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(
+            returncode=0, output='  version:  2.00.040.00.1553674765\n'))
+        self.assertEqual(
+            '2.00.040', self._loop.run_until_complete(self._hana.get_version_async()))
+        mock_execute.assert_called_once_with('HDB version', 'prdadm', 'pass', None, timeout=None)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_get_sr_state_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(
+            returncode=0, output='online: true\nmode: primary\n'))
+        self.assertEqual(
+            'PRIMARY', self._loop.run_until_complete(self._hana.get_sr_state_async()))
+        mock_execute.assert_called_once_with('hdbnsutil -sr_state', 'prdadm', 'pass', None, timeout=None)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_execute_sapcontrol_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        self._loop.run_until_complete(
+            self._netweaver._execute_sapcontrol_async('mycommand', host='otherhost'))
+        mock_execute.assert_called_once_with(
+            'sapcontrol -host otherhost -nr 00 -function mycommand', 'ha1adm', 'pass', None, timeout=None)
+
+        mock_execute.return_value = self._future(mock.Mock(returncode=1, cmd='cmd'))
+        with self.assertRaises(self._netweaver_module.NetweaverError) as err:
+            self._loop.run_until_complete(
+                self._netweaver._execute_sapcontrol_async('mycommand'))
+        self.assertTrue('Error running sapcontrol command: cmd' in str(err.exception))
+
+    def test_execute_sapcontrol_async_executor(self):
+        from shaptools import executors
+        executor = executors.FakeExecutor()
+        executor.add_result('sapcontrol -nr 00 -function GetVersionInfo', returncode=1)
+        netweaver_instance = self._aio.AsyncNetweaverInstance(
+            'ha1', '00', 'pass', executor=executor)
+        with self.assertRaises(self._netweaver_module.NetweaverError):
+            self._loop.run_until_complete(
+                netweaver_instance._execute_sapcontrol_async('GetVersionInfo'))
+        self.assertEqual(
+            [('sapcontrol -nr 00 -function GetVersionInfo', 'ha1adm', None)], executor.calls)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_execute_sapcontrol_async_cache(self, mock_execute):
+        from shaptools import cmdcache
+        self._netweaver.cache = cmdcache.CommandCache()
+        mock_execute.return_value = self._future(mock.Mock(returncode=1))
+        self._loop.run_until_complete(
+            self._netweaver._execute_sapcontrol_async('GetSystemInstanceList', exception=False))
+        mock_execute.return_value = self._future(mock.Mock(returncode=0))
+        for _ in range(2):
+            self._loop.run_until_complete(
+                self._netweaver._execute_sapcontrol_async('GetSystemInstanceList'))
+        self.assertEqual(2, mock_execute.call_count)
+        self.assertEqual(1, self._netweaver.cache.hits)
+
+    @mock.patch('shaptools.aio.execute_cmd_async', new_callable=mock.Mock)
+    def test_get_process_list_async(self, mock_execute):
+        mock_execute.return_value = self._future(mock.Mock(returncode=3))
+        result = self._loop.run_until_complete(self._netweaver.get_process_list_async())
+        self.assertEqual(3, result.returncode)
+        mock_execute.assert_called_once_with(
+            'sapcontrol -nr 00 -function GetProcessList', 'ha1adm', 'pass', None, timeout=None)
+
+        mock_execute.return_value = self._future(mock.Mock(returncode=1, cmd='cmd'))
+        with self.assertRaises(self._netweaver_module.NetweaverError) as err:
+            self._loop.run_until_complete(self._netweaver.get_process_list_async())
+        self.assertTrue('Error running sapcontrol command: cmd' in str(err.exception))
+
+        mock_execute.return_value = self._future(mock.Mock(returncode=1))
+        result = self._loop.run_until_complete(
+            self._netweaver.get_process_list_async(exception=False))
+        self.assertEqual(1, result.returncode)
@@ -0,0 +1,169 @@
+"""
+Unitary tests for asynclog.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from shaptools import asynclog
+
+
+class RecordsHandler(logging.Handler):
+
+    def __init__(self, level=logging.NOTSET):
+        super(RecordsHandler, self).__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestAsyncLog(unittest.TestCase):
+    """
+    Unitary tests for asynclog.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._logger = logging.Logger('asynclog_test', logging.DEBUG)
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_queue_handler(self):
+        record_queue = queue.Queue(1)
+        handler = asynclog.QueueHandler(record_queue)
+        self._logger.addHandler(handler)
+        args = ['value']
+
+        self._logger.info('message %s', args)
+        self._logger.info('dropped')
+        args.append('modified')
+
+        record = record_queue.get_nowait()
+        self.assertEqual(record.msg, "message ['value']")
+        self.assertIsNone(record.args)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_queue_handler_blocking(self):
+        record_queue = mock.Mock()
+        record_queue.put_nowait.side_effect = queue.Full
+        handler = asynclog.QueueHandler(record_queue)
+        self._logger.addHandler(handler)
+
+        self._logger.info('dropped')
+        self._logger.warning('warning')
+
+        self.assertEqual(handler.dropped, 1)
+        record_queue.put.assert_called_once_with(mock.ANY)
+        self.assertEqual(record_queue.put.call_args[0][0].msg, 'warning')
+
+    def test_queue_handler_exception(self):
+        record_queue = queue.Queue()
+        self._logger.addHandler(asynclog.QueueHandler(record_queue))
+
+        try:
+            raise ValueError('failure')
+        except ValueError:
+            self._logger.exception('error')
+
+        record = record_queue.get_nowait()
+        self.assertTrue(record.msg.startswith('error\nTraceback'))
+        self.assertTrue('ValueError: failure' in record.msg)
+        self.assertIsNone(record.exc_info)
+        self.assertIsNone(record.exc_text)
+
+    def test_listener(self):
+        record_queue = queue.Queue()
+        info_handler = RecordsHandler()
+        error_handler = RecordsHandler(logging.ERROR)
+        listener = asynclog.QueueListener(record_queue, [info_handler, error_handler])
+        self._logger.addHandler(asynclog.QueueHandler(record_queue))
+
+        listener.start()
+        self._logger.info('info')
+        self._logger.error('error')
+        listener.stop()
+        listener.stop()
+
+        self.assertEqual([record.msg for record in info_handler.records], ['info', 'error'])
+        self.assertEqual([record.msg for record in error_handler.records], ['error'])
+
+    def test_setup_async_logging(self):
+        handler = RecordsHandler()
+        self._logger.addHandler(handler)
+
+        listener = asynclog.setup_async_logging(self._logger, maxsize=1)
+
+        self.assertEqual(listener.handlers, [handler])
+        self.assertEqual(len(self._logger.handlers), 1)
+        queue_handler = self._logger.handlers[0]
+        self.assertIsInstance(queue_handler, asynclog.QueueHandler)
+
+        listener.stop()
+        self._logger.info('message1')
+        self._logger.info('message2')
+        listener.queue.get_nowait()
+
+        # The dropped records are reported at exit, and the handlers are restored
+        asynclog.stop_async_logging()
+        self.assertEqual([record.msg for record in handler.records], [
+            '1 log records were dropped'])
+        self.assertEqual(self._logger.handlers, [handler])
+
+    def test_setup_async_logging_handlers(self):
+        other_handler = RecordsHandler()
+        handler = RecordsHandler()
+        self._logger.addHandler(other_handler)
+
+        first = asynclog.setup_async_logging(self._logger, [handler])
+        second = asynclog.setup_async_logging(self._logger, [handler])
+        self._logger.info('message')
+        asynclog.stop_async_logging()
+
+        # The previous listener is stopped and the other handlers are kept
+        self.assertIsNone(first._thread)
+        self.assertIsNot(first, second)
+        self.assertEqual(['message'], [record.msg for record in handler.records])
+        self.assertEqual(['message'], [record.msg for record in other_handler.records])
+        self.assertEqual(self._logger.handlers, [other_handler, handler])
@@ -0,0 +1,193 @@
+"""
+Unitary tests for cassette.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import logging
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import cassette, hana, shell
+
+class TestCassette(unittest.TestCase):
+    """
+    Unitary tests for cassette.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._folder = tempfile.mkdtemp()
+        self._path = os.path.join(self._folder, 'cassette.json')
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        shutil.rmtree(self._folder)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _write_cassette(self, interactions, version=1):
+        with open(self._path, 'w') as cassette_file:
+            json.dump({'version': version, 'interactions': interactions}, cassette_file)
+
+    def _interaction(self, cmd, stdout, returncode=0, duration=0.5):
+        return {
+            'cmd': cmd, 'user': 'prdadm', 'host': None, 'executed_cmd': 'su -lc "{}"'.format(cmd),
+            'returncode': returncode, 'stdout': stdout, 'stderr': '', 'duration': duration
+        }
+
+    def test_record_replay(self):
+        # This test is used to check the whole flow with a real command
+        with cassette.RecordingExecutor(self._path) as recorder:
+            result = recorder('sh -c "echo out; echo err >&2; exit 2"')
+        self.assertEqual(2, result.returncode)
+
+        with open(self._path) as cassette_file:
+            data = json.load(cassette_file)
+        self.assertEqual(1, data['version'])
+        self.assertEqual(1, len(data['interactions']))
+        interaction = data['interactions'][0]
+        self.assertEqual('sh -c "echo out; echo err >&2; exit 2"', interaction['cmd'])
+        self.assertEqual('out\n', interaction['stdout'])
+        self.assertEqual('err\n', interaction['stderr'])
+
+        replayed = cassette.ReplayExecutor(self._path)('sh -c "echo out; echo err >&2; exit 2"')
+        self.assertEqual(2, replayed.returncode)
+        self.assertEqual('out\n', replayed.output)
+        self.assertEqual('err\n', replayed.err)
+
+    def test_recording_executor(self):
+        mock_execute = mock.Mock(return_value=mock.Mock(
+            cmd='su -lc "ls" prdadm', returncode=0, output='out', err=''))
+        recorder = cassette.RecordingExecutor(self._path, mock_execute)
+
+        self.assertEqual(
+            mock_execute.return_value, recorder('ls', 'prdadm', 'pass', 'host', timeout=5))
+        recorder.execute('ls', 'prdadm', 'pass')
+
+        mock_execute.assert_has_calls([
+            mock.call('ls', 'prdadm', 'pass', 'host', timeout=5),
+            mock.call('ls', 'prdadm', 'pass', None)
+        ])
+        self.assertEqual(['host', None], [
+            interaction['host'] for interaction in recorder.cassette.interactions])
+        self.assertFalse(os.path.exists(self._path))
+        recorder.save()
+        self.assertEqual(2, len(cassette.Cassette(self._path).load().interactions))
+
+    def test_mask_credentials(self):
+        self.assertEqual(
+            'hdbsql -i 00 -u SYSTEM -p ****** -d PRD \\"SELECT 1\\"',
+            cassette.mask_credentials('hdbsql -i 00 -u SYSTEM -p Secret1 -d PRD \\"SELECT 1\\"'))
+        self.assertEqual(
+            'hdbuserstore set key host:30013@PRD SYSTEM ******',
+            cassette.mask_credentials('hdbuserstore set key host:30013@PRD SYSTEM Secret1'))
+        self.assertEqual(
+            'sapcontrol -user ha1adm ****** -nr 00 -function Stop',
+            cassette.mask_credentials('sapcontrol -user ha1adm Secret1 -nr 00 -function Stop'))
+        self.assertEqual(
+            'export SSH_ASKPASS=file;export PASS=******;export DISPLAY=:0;setsid scp a b',
+            cassette.mask_credentials(
+                'export SSH_ASKPASS=file;export PASS=Secret1;export DISPLAY=:0;setsid scp a b'))
+        self.assertEqual(
+            'hdbsql -n host:30013 -u SYSTEM,****** \\"SELECT 1\\"',
+            cassette.mask_credentials('hdbsql -n host:30013 -u SYSTEM,Secret1 \\"SELECT 1\\"'))
+        self.assertEqual(
+            'DB_PASSWORD=****** tool', cassette.mask_credentials('DB_PASSWORD=Secret1 tool'))
+        # Only the credential positions are masked
+        self.assertEqual(
+            'ssh -p 22 host sapcontrol -nr 00 -function GetProcessList',
+            cassette.mask_credentials('ssh -p 22 host sapcontrol -nr 00 -function GetProcessList'))
+        self.assertEqual('', cassette.mask_credentials(''))
+
+    def test_recording_executor_mask(self):
+        mock_execute = mock.Mock(return_value=mock.Mock(
+            cmd='su -lc "hdbsql -i 00 -u SYSTEM -p Secret1 \\"SELECT 1\\"" prdadm', returncode=0,
+            output='instance 00', err=''))
+        recorder = cassette.RecordingExecutor(self._path, mock_execute)
+        recorder('hdbsql -i 00 -u SYSTEM -p Secret1 \\"SELECT 1\\"', 'prdadm', '00')
+        recorder.save()
+
+        with open(self._path) as cassette_file:
+            content = cassette_file.read()
+        self.assertFalse('Secret1' in content)
+
+        # A short password doesn't change the recorded command and output
+        replayed = cassette.ReplayExecutor(self._path)(
+            'hdbsql -i 00 -u SYSTEM -p Secret1 \\"SELECT 1\\"', 'prdadm', '00')
+        self.assertEqual('instance 00', replayed.output)
+        self.assertEqual(
+            'su -lc "hdbsql -i 00 -u SYSTEM -p ****** \\"SELECT 1\\"" prdadm', replayed.cmd)
+
+    @mock.patch('time.sleep')
+    def test_replay_executor(self, mock_sleep):
+        self._write_cassette([
+            self._interaction('hdbnsutil -sr_state', 'mode: none', duration=1),
+            self._interaction('hdbnsutil -sr_state', 'mode: primary', duration=2)
+        ])
+        replay = cassette.ReplayExecutor(self._path, latency=True)
+
+        outputs = [replay('hdbnsutil -sr_state', 'prdadm', 'pass').output for _ in range(3)]
+        self.assertEqual(['mode: none', 'mode: primary', 'mode: primary'], outputs)
+        mock_sleep.assert_has_calls([mock.call(1), mock.call(2), mock.call(2)])
+
+        with self.assertRaises(cassette.CassetteError) as err:
+            replay('hdbnsutil -sr_state', 'other', 'pass')
+        self.assertTrue(
+            'command "hdbnsutil -sr_state" with user other in host None not found' in
+            str(err.exception))
+
+    @mock.patch('time.sleep')
+    def test_replay_executor_no_latency(self, mock_sleep):
+        self._write_cassette([self._interaction('HDB version', 'text')])
+        result = cassette.ReplayExecutor(self._path).execute('HDB version', 'prdadm')
+        self.assertEqual('su -lc "HDB version"', result.cmd)
+        self.assertEqual(0, mock_sleep.call_count)
+
+    def test_load_error(self):
+        self._write_cassette([], version=2)
+        with self.assertRaises(cassette.CassetteError) as err:
+            cassette.Cassette(self._path).load()
+        self.assertTrue('unsupported cassette version: 2' in str(err.exception))
+
+    def test_patch_execute_cmd(self):
+        self._write_cassette([
+            self._interaction('HDB version', '  version:  2.00.040.00.1553674765\n')])
+        original = shell.execute_cmd
+        with cassette.patch_execute_cmd(cassette.ReplayExecutor(self._path)):
+            instance = hana.HanaInstance('prd', '00', 'pass')
+            self.assertEqual('2.00.040', instance.get_version())
+        self.assertEqual(original, shell.execute_cmd)
@@ -0,0 +1,126 @@
+"""
+Unitary tests for cmdbatch.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+import subprocess
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import cmdbatch, shell
+
+class TestCommandBatch(unittest.TestCase):
+    """
+    Unitary tests for cmdbatch.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_execute_batch_popen(self):
+        # This test is used to check the framing of the outputs in a real shell
+        results = cmdbatch.execute_batch(
+            ['echo out; echo err >&2', 'printf "no newline"', 'false', 'echo skipped'])
+        self.assertEqual(3, len(results))
+        self.assertEqual('echo out; echo err >&2', results[0].cmd)
+        self.assertEqual((0, 'out\n', 'err\n'), (
+            results[0].returncode, results[0].output, results[0].err))
+        self.assertEqual((0, 'no newline', ''), (
+            results[1].returncode, results[1].output, results[1].err))
+        self.assertEqual(1, results[2].returncode)
+
+        results = cmdbatch.execute_batch(['exit 3', 'echo run'], stop_on_failure=False)
+        self.assertEqual([3, 0], [result.returncode for result in results])
+        self.assertEqual('run\n', results[1].output)
+
+        self.assertEqual([], cmdbatch.execute_batch([]))
+
+    def test_execute_batch_interrupted(self):
+        results = cmdbatch.execute_batch(['echo first', 'echo partial; kill -9 $$', 'echo never'])
+        self.assertEqual(2, len(results))
+        self.assertEqual(0, results[0].returncode)
+        self.assertEqual('echo partial; kill -9 $$', results[1].cmd)
+        self.assertEqual(-9, results[1].returncode)
+        self.assertEqual('partial\n', results[1].output)
+
+    def test_execute_batch_timeout(self):
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            cmdbatch.execute_batch(['echo first', 'sleep 30 | cat'], timeout=0.5)
+        self.assertEqual(0.5, err.exception.timeout)
+        self.assertEqual('echo first; sleep 30 | cat', err.exception.cmd)
+
+    @mock.patch('uuid.uuid4')
+    @mock.patch('subprocess.Popen')
+    def test_execute_batch_remote(self, mock_popen, mock_uuid):
+        mock_uuid.return_value = mock.Mock(hex='id')
+        mock_popen.return_value.returncode = 0
+        marker = '__SHAPTOOLS_BATCH_id__'
+        mock_popen.return_value.communicate.return_value = (
+            'banner\n{0}\nout\n\n{0} 0 0\n'.format(marker).encode(),
+            '{0}\n\n{0} 0\n'.format(marker).encode())
+
+        results = cmdbatch.execute_batch(
+            ['ls \\"a b\\"'], 'user', 'remote', ssh_options='-o Port=2222')
+
+        mock_popen.assert_called_once_with(
+            ['ssh', '-o', 'Port=2222', 'user@remote', "bash --login -c 'exec bash -s'"],
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        script = mock_popen.return_value.communicate.call_args[1]['input'].decode()
+        self.assertTrue('(\nls "a b"\n) </dev/null\n' in script)
+        self.assertTrue('[ $rc -eq 0 ] || exit $rc\n' in script)
+        self.assertEqual(1, len(results))
+        self.assertEqual('ls "a b"', results[0].cmd)
+        self.assertEqual('out\n', results[0].output)
+
+    def test_execute_batch_hooks(self):
+        hook = mock.Mock()
+        with mock.patch('shaptools.shell.HOOKS', [hook]):
+            with shell.tagged_operation('operation'):
+                results = cmdbatch.execute_batch(['echo out', 'false', 'echo skipped'])
+            self.assertEqual([], cmdbatch.execute_batch([]))
+
+        self.assertEqual(2, len(results))
+        self.assertEqual(2, hook.on_start.call_count)
+        events = [call[0][0] for call in hook.on_end.call_args_list]
+        self.assertEqual(
+            [('echo out', 0, 4, 'operation'), ('false', 1, 0, 'operation')],
+            [(event.cmd, event.returncode, event.output_size, event.operation)
+             for event in events])
+        self.assertEqual(0, hook.on_error.call_count)
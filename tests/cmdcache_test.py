@@ -0,0 +1,99 @@
+"""
+Unitary tests for cmdcache.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import cmdcache
+
+class TestCommandCache(unittest.TestCase):
+    """
+    Unitary tests for cmdcache.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._cache = cmdcache.CommandCache(ttl=10, max_size=2)
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_init_error(self):
+        with self.assertRaises(ValueError) as err:
+            cmdcache.CommandCache(max_size=0)
+        self.assertTrue('max_size must be greater than 0' in str(err.exception))
+
+    @mock.patch('time.time')
+    def test_get_put(self, mock_time):
+        mock_time.return_value = 100
+        self.assertIsNone(self._cache.get('host', 'prdadm', 'HDB version'))
+        self._cache.put('host', 'prdadm', 'HDB version', 'result')
+        self.assertEqual('result', self._cache.get('host', 'prdadm', 'HDB version'))
+        self.assertIsNone(self._cache.get(None, 'prdadm', 'HDB version'))
+        self.assertIsNone(self._cache.get('host', 'other', 'HDB version'))
+
+        mock_time.return_value = 110
+        self.assertIsNone(self._cache.get('host', 'prdadm', 'HDB version'))
+        self.assertEqual(0, len(self._cache))
+        self.assertEqual(
+            {'hits': 1, 'misses': 4, 'evictions': 0, 'size': 0}, self._cache.stats())
+
+    def test_lru_eviction(self):
+        self._cache.put('host', 'prdadm', 'cmd1', 'result1')
+        self._cache.put('host', 'prdadm', 'cmd2', 'result2')
+        self._cache.get('host', 'prdadm', 'cmd1')
+        self._cache.put('host', 'prdadm', 'cmd3', 'result3')
+
+        self.assertEqual('result1', self._cache.get('host', 'prdadm', 'cmd1'))
+        self.assertIsNone(self._cache.get('host', 'prdadm', 'cmd2'))
+        self.assertEqual('result3', self._cache.get('host', 'prdadm', 'cmd3'))
+        self.assertEqual(1, self._cache.evictions)
+
+        self._cache.put('host', 'prdadm', 'cmd3', 'new_result')
+        self.assertEqual('new_result', self._cache.get('host', 'prdadm', 'cmd3'))
+        self.assertEqual(1, self._cache.evictions)
+
+    def test_invalidate(self):
+        self._cache.put('host1', 'prdadm', 'cmd', 'result1')
+        self._cache.put('host2', 'prdadm', 'cmd', 'result2')
+        self._cache.invalidate('host1')
+        self.assertIsNone(self._cache.get('host1', 'prdadm', 'cmd'))
+        self.assertEqual('result2', self._cache.get('host2', 'prdadm', 'cmd'))
+        self._cache.invalidate()
+        self.assertEqual(0, len(self._cache))
@@ -0,0 +1,125 @@
+"""
+Unitary tests for cmdfanout.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import cmdfanout, shell
+
+class TestCommandFanout(unittest.TestCase):
+    """
+    Unitary tests for cmdfanout.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_fanout(self, mock_execute_cmd):
+        lock = threading.Lock()
+        running = {'total': 0, 'max_total': 0}
+        running_hosts = {}
+        max_hosts = {}
+
+        def execute(cmd, user, password, host):
+            with lock:
+                running['total'] += 1
+                running['max_total'] = max(running['max_total'], running['total'])
+                running_hosts[host] = running_hosts.get(host, 0) + 1
+                max_hosts[host] = max(max_hosts.get(host, 0), running_hosts[host])
+            time.sleep(0.01)
+            with lock:
+                running['total'] -= 1
+                running_hosts[host] -= 1
+            if cmd == 'error':
+                raise ValueError('execution error')
+            return mock.Mock(returncode=0, cmd=cmd)
+
+        mock_execute_cmd.side_effect = execute
+        jobs = [('host{}'.format(index % 3), 'user', 'cmd{}'.format(index))
+                for index in range(12)]
+        jobs.append(('host0', 'root', 'error', 'other_pass'))
+
+        results = list(cmdfanout.execute_fanout(jobs, 'pass', max_workers=4, max_per_host=2))
+
+        self.assertEqual(13, len(results))
+        self.assertEqual(13, mock_execute_cmd.call_count)
+        self.assertTrue(running['max_total'] <= 4)
+        self.assertTrue(all(value <= 2 for value in max_hosts.values()))
+        mock_execute_cmd.assert_any_call('cmd0', 'user', 'pass', 'host0')
+        mock_execute_cmd.assert_any_call('error', 'root', 'other_pass', 'host0')
+        error_result = [result for result in results if result.cmd == 'error'][0]
+        self.assertIsNone(error_result.result)
+        self.assertTrue(isinstance(error_result.error, ValueError))
+        ok_results = [result for result in results if result.cmd != 'error']
+        self.assertTrue(all(result.error is None for result in ok_results))
+        self.assertTrue(all(result.duration >= 0.01 for result in ok_results))
+        self.assertEqual(
+            sorted(job[2] for job in jobs), sorted(result.cmd for result in results))
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_fanout_local(self, mock_execute_cmd):
+        mock_execute_cmd.return_value = mock.Mock(returncode=0)
+        results = list(cmdfanout.execute_fanout([(None, None, 'ls')]))
+        mock_execute_cmd.assert_called_once_with('ls', None, None, None)
+        self.assertEqual(1, len(results))
+        self.assertIsNone(results[0].host)
+        self.assertEqual(mock_execute_cmd.return_value, results[0].result)
+
+    def test_execute_fanout_empty(self):
+        self.assertEqual([], list(cmdfanout.execute_fanout([])))
+
+    def test_execute_fanout_error(self):
+        with self.assertRaises(ValueError) as err:
+            list(cmdfanout.execute_fanout([], max_per_host=0))
+        self.assertTrue(
+            'max_workers and max_per_host must be greater than 0' in str(err.exception))
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_fanout_deadline(self, mock_execute_cmd):
+        deadlines = []
+        mock_execute_cmd.side_effect = lambda *args: deadlines.append(shell._CONTEXT.deadline)
+        with shell.deadline(100) as active_deadline:
+            list(cmdfanout.execute_fanout([('host1', 'user', 'cmd')]))
+        self.assertEqual([active_deadline], deadlines)
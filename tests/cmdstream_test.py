@@ -0,0 +1,126 @@
+"""
+Unitary tests for cmdstream.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import cmdstream, shell
+
+class TestCommandStream(unittest.TestCase):
+    """
+    Unitary tests for cmdstream.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_command_stream_popen(self):
+        # This test is used to check the incremental reading with a real process
+        stream = cmdstream.CommandStream(
+            'sh -c "echo line1; echo err >&2; echo line2; printf last; exit 4"', tail=2)
+        lines = list(stream)
+        self.assertEqual(4, stream.returncode)
+        self.assertEqual(
+            [('stdout', 'line1'), ('stdout', 'line2'), ('stdout', 'last')],
+            [line for line in lines if line[0] == 'stdout'])
+        self.assertEqual([('stderr', 'err')], [line for line in lines if line[0] == 'stderr'])
+
+        result = stream.result()
+        self.assertEqual(4, result.returncode)
+        self.assertEqual('line2\nlast\n', result.output)
+        self.assertEqual('err\n', result.err)
+
+    @mock.patch('shaptools.shell.format_cmd')
+    def test_command_stream_user(self, mock_format_cmd):
+        mock_format_cmd.return_value = 'cat'
+        stream = cmdstream.CommandStream('ls', 'user', 'pass', 'remote')
+        mock_format_cmd.assert_called_once_with('ls', 'user', 'remote', None)
+        # The password is written in the command stdin
+        self.assertEqual([('stdout', 'pass')], list(stream))
+        self.assertEqual(0, stream.returncode)
+        self.assertEqual('cat', stream.result().cmd)
+
+    def test_command_stream_timeout(self):
+        stream = cmdstream.CommandStream('sh -c "echo first; sleep 30"', timeout=0.5)
+        lines = []
+        with self.assertRaises(shell.ShellTimeoutError):
+            for line in stream:
+                lines.append(line)
+        self.assertEqual([('stdout', 'first')], lines)
+
+    @mock.patch('shaptools.cmdstream.CommandStream')
+    def test_execute_cmd_stream(self, mock_stream):
+        mock_callback = mock.Mock()
+        mock_stream.return_value.__iter__ = mock.Mock(
+            return_value=iter([('stdout', 'out'), ('stderr', 'err')]))
+
+        result = cmdstream.execute_cmd_stream(
+            'ls', 'user', 'pass', 'remote', callback=mock_callback, tail=10)
+
+        mock_stream.assert_called_once_with(
+            'ls', 'user', 'pass', 'remote', tail=10, timeout=None, ssh_options=None)
+        mock_callback.assert_has_calls([mock.call('stdout', 'out'), mock.call('stderr', 'err')])
+        self.assertEqual(mock_stream.return_value.result.return_value, result)
+
+    @mock.patch('logging.Logger.info')
+    @mock.patch('logging.Logger.error')
+    def test_log_command_line(self, logger_error, logger_info):
+        cmdstream.log_command_line('stdout', 'out')
+        cmdstream.log_command_line('stderr', 'err')
+        logger_info.assert_called_once_with('out')
+        logger_error.assert_called_once_with('err')
+
+    @mock.patch('logging.Logger.warning')
+    @mock.patch('shaptools.cmdstream.log_command_line')
+    def test_bounded_line_logger(self, mock_log_line, mock_warning):
+        callback = cmdstream.bounded_line_logger(2)
+        for line in ['out1', 'out2', 'out3', 'out4']:
+            callback('stdout', line)
+        callback('stderr', 'err1')
+
+        self.assertEqual(mock_log_line.call_args_list, [
+            mock.call('stdout', 'out1'),
+            mock.call('stdout', 'out2'),
+            mock.call('stderr', 'err1')
+        ])
+        mock_warning.assert_called_once_with(
+            'More than %d %s lines, the next ones are not logged', 2, 'stdout')
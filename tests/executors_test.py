@@ -0,0 +1,207 @@
+"""
+Unitary tests for executors.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import executors
+
+class TestExecutors(unittest.TestCase):
+    """
+    Unitary tests for executors.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_executor(self):
+        executor = executors.Executor()
+        with self.assertRaises(NotImplementedError):
+            executor('ls')
+
+        executor.execute = mock.Mock()
+        result = executor.execute_stream('ls', 'user', 'pass', 'remote', timeout=5)
+        executor.execute.assert_called_once_with('ls', 'user', 'pass', 'remote', 5)
+        self.assertEqual(executor.execute.return_value, result)
+
+    @mock.patch('shaptools.shell.deadline')
+    def test_executor_batch(self, mock_deadline):
+        executor = executors.FakeExecutor({'cmd1': (0, '', ''), 'cmd2': (1, '', '')})
+        results = executor.execute_batch(['cmd1', 'cmd2', 'cmd3'], 'user', 'pass', timeout=5)
+        mock_deadline.assert_called_once_with(5)
+        self.assertEqual([0, 1], [result.returncode for result in results])
+
+        executor.add_result('cmd3')
+        results = executor.execute_batch(['cmd1', 'cmd2', 'cmd3'], stop_on_failure=False)
+        self.assertEqual([0, 1, 0], [result.returncode for result in results])
+
+    @mock.patch('shaptools.cmdbatch.execute_batch')
+    def test_executors_batch(self, mock_batch):
+        executors.ShellExecutor().execute_batch(['ls'], 'user', 'pass', 'remote')
+        executors.LocalExecutor().execute_batch(['ls'], 'user', 'pass', timeout=5)
+        executors.SuExecutor().execute_batch(['ls'], 'user', 'pass', stop_on_failure=False)
+        executors.SshExecutor('remote', '-o Port=2222').execute_batch(['ls'], 'user')
+        mock_batch.assert_has_calls([
+            mock.call(['ls'], 'user', 'remote', stop_on_failure=True, timeout=None),
+            mock.call(['ls'], stop_on_failure=True, timeout=5),
+            mock.call(['ls'], 'user', stop_on_failure=False, timeout=None),
+            mock.call(['ls'], 'user', 'remote', stop_on_failure=True, timeout=None,
+                      ssh_options='-o Port=2222')
+        ])
+
+        with self.assertRaises(executors.ExecutorError):
+            executors.LocalExecutor().execute_batch(['ls'], remote_host='remote')
+
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_shell_executor(self, mock_execute_cmd, mock_execute_stream):
+        executor = executors.ShellExecutor()
+        result = executor('ls', 'user', 'pass', 'remote')
+        executor.execute('ls', 'user', 'pass', 'remote', timeout=5)
+        self.assertEqual(mock_execute_cmd.return_value, result)
+        mock_execute_cmd.assert_has_calls([
+            mock.call('ls', 'user', 'pass', 'remote'),
+            mock.call('ls', 'user', 'pass', 'remote', timeout=5)
+        ])
+
+        self.assertEqual(
+            mock_execute_stream.return_value,
+            executor.execute_stream('ls', 'user', 'pass', 'remote', tail=10))
+        mock_execute_stream.assert_called_once_with('ls', 'user', 'pass', 'remote', tail=10)
+
+    def test_local_executor_popen(self):
+        # This test is used to check the command runs with the current user without su
+        result = executors.LocalExecutor().execute('sh -c "echo out"', 'otheruser', 'pass')
+        self.assertEqual(0, result.returncode)
+        self.assertEqual('out\n', result.output)
+        self.assertEqual('sh -c "echo out"', result.cmd)
+
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_local_executor(self, mock_execute_cmd, mock_execute_stream):
+        executor = executors.LocalExecutor()
+        executor.execute('ls', 'user', 'pass')
+        mock_execute_cmd.assert_called_once_with('ls', timeout=None)
+        executor.execute_stream('ls', 'user', 'pass', tail=10)
+        mock_execute_stream.assert_called_once_with('ls', tail=10)
+
+        with self.assertRaises(executors.ExecutorError) as err:
+            executor.execute('ls', 'user', 'pass', 'remote')
+        self.assertTrue(
+            'remote host remote is not supported by local executors' in str(err.exception))
+
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_su_executor(self, mock_execute_cmd, mock_execute_stream):
+        executor = executors.SuExecutor()
+        executor.execute('ls', 'user', 'pass', timeout=5)
+        mock_execute_cmd.assert_called_once_with('ls', 'user', 'pass', timeout=5)
+        executor.execute_stream('ls', 'user', 'pass')
+        mock_execute_stream.assert_called_once_with('ls', 'user', 'pass')
+
+        with self.assertRaises(executors.ExecutorError):
+            executor.execute_stream('ls', 'user', 'pass', 'remote')
+
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_ssh_executor(self, mock_execute_cmd, mock_execute_stream):
+        executor = executors.SshExecutor('host1', ssh_options='-o Port=2222')
+        executor.execute('ls', 'user', 'pass')
+        executor.execute('ls', 'user', 'pass', 'host2', timeout=5)
+        mock_execute_cmd.assert_has_calls([
+            mock.call('ls', 'user', 'pass', 'host1', timeout=None, ssh_options='-o Port=2222'),
+            mock.call('ls', 'user', 'pass', 'host2', timeout=5, ssh_options='-o Port=2222')
+        ])
+        executor.execute_stream('ls', 'user', 'pass', tail=10)
+        mock_execute_stream.assert_called_once_with(
+            'ls', 'user', 'pass', 'host1', ssh_options='-o Port=2222', tail=10)
+
+        with self.assertRaises(executors.ExecutorError) as err:
+            executors.SshExecutor().execute('ls', 'user', 'pass')
+        self.assertTrue(
+            'remote host must be provided to run commands using ssh' in str(err.exception))
+
+    @mock.patch('shaptools.sshpool.SshSessionPool')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_pooled_executor(self, mock_execute_cmd, mock_pool):
+        mock_pool.return_value.ssh_options.return_value = '-o ControlPath=path'
+        executor = executors.PooledExecutor(max_sessions=2)
+        mock_pool.assert_called_once_with(max_sessions=2)
+
+        executor.execute('ls', 'user', 'pass', 'remote')
+        mock_pool.return_value.ssh_options.assert_called_once_with('user', 'remote')
+        mock_execute_cmd.assert_called_once_with(
+            'ls', 'user', 'pass', 'remote', timeout=None, ssh_options='-o ControlPath=path')
+
+        executor.close()
+        mock_pool.return_value.close_all.assert_called_once_with()
+
+        pool = mock.Mock()
+        self.assertEqual(pool, executors.PooledExecutor(pool=pool).pool)
+
+    def test_fake_executor(self):
+        executor = executors.FakeExecutor({
+            'ls': (0, 'out', ''),
+            'HDB info': [(1, '', 'err'), (0, 'info', '')]
+        })
+        executor.add_result('HDB info', 3)
+
+        self.assertEqual('out', executor('ls', 'user').output)
+        results = [executor.execute('HDB info', 'user', 'pass', 'remote') for _ in range(4)]
+        self.assertEqual([1, 0, 3, 3], [result.returncode for result in results])
+        self.assertEqual('err', results[0].err)
+        self.assertEqual('info', results[1].output)
+        self.assertEqual(
+            [('ls', 'user', None)] + [('HDB info', 'user', 'remote')] * 4, executor.calls)
+
+        with self.assertRaises(executors.ExecutorError) as err:
+            executor.execute('pwd')
+        self.assertTrue('command "pwd" not registered in the fake executor' in str(err.exception))
+
+        executor.default = (5, 'default', '')
+        self.assertEqual(5, executor.execute('pwd').returncode)
+
+    def test_get_executor(self):
+        self.assertEqual(executors.DEFAULT_EXECUTOR, executors.get_executor())
+        self.assertIsInstance(executors.DEFAULT_EXECUTOR, executors.ShellExecutor)
+        executor = executors.FakeExecutor()
+        self.assertEqual(executor, executors.get_executor(executor))
@@ -24,7 +24,8 @@ try:
 except ImportError:
     import mock
 
-from shaptools import hana, shell
+from shaptools import hana, shell, cmdcache, executors
+
 
 class TestHana(unittest.TestCase):
     """
@@ -180,6 +181,27 @@ class TestHana(unittest.TestCase):
         mock_info.assert_called_once_with(
             'HANA installer found: %s', 'software_path/SAP_HANA_DATABASE/hdblcm')
 
+    @mock.patch('logging.Logger.info')
+    @mock.patch('shaptools.hana.HanaInstance.get_platform')
+    @mock.patch('os.path.exists')
+    def test_find_hana_hdblcm_agent(self, mock_exists, mock_get_platform, mock_info):
+        mock_get_platform.return_value = 'LINUX_X86_64'
+        mock_agent = mock.Mock()
+        mock_agent.exists.side_effect = [False, True, True]
+        mock_agent.read_file.return_value = \
+            'HDB:HANA:2.0:LINUX_X86_64:SAP HANA PLATFORM EDITION 2.0::BD51053787\n'
+
+        hdblcm = hana.HanaInstance.find_hana_hdblcm('software_path', mock_agent)
+
+        assert hdblcm == 'software_path/DATA_UNITS/HDB_LCM_LINUX_X86_64/hdblcm'
+        mock_agent.exists.assert_has_calls([
+            mock.call('software_path/hdblcm'),
+            mock.call('software_path/LABEL.ASC'),
+            mock.call('software_path/DATA_UNITS/HDB_LCM_LINUX_X86_64/hdblcm')
+        ])
+        mock_agent.read_file.assert_called_once_with('software_path/LABEL.ASC')
+        mock_exists.assert_not_called()
+
     @mock.patch('os.path.exists')
     def test_find_hana_hdblcm_error(self, mock_exists):
         mock_exists.side_effect = [False, False, False]
@@ -207,6 +229,123 @@ class TestHana(unittest.TestCase):
         mock_execute.assert_called_once_with('test command', 'prdadm', 'pass', None)
         self.assertEqual(proc_mock, result)
 
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_run_hana_command_timeout(self, mock_execute):
+        timeouts = []
+        mock_execute.side_effect = lambda *args: timeouts.append(shell.get_timeout()) or \
+            mock.Mock(returncode=0)
+        self._hana.command_timeout = 10
+
+        self._hana._run_hana_command('test command')
+
+        mock_execute.assert_called_once_with('test command', 'prdadm', 'pass', None)
+        self.assertTrue(0 < timeouts[0] <= 10)
+        self.assertIsNone(shell.get_timeout())
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_run_hana_command_cache(self, mock_execute):
+        mock_execute.return_value = mock.Mock(returncode=0, output='mode: primary')
+        self._hana.cache = cmdcache.CommandCache()
+
+        self.assertEqual('PRIMARY', self._hana.get_sr_state())
+        self.assertEqual('PRIMARY', self._hana.get_sr_state())
+        self.assertEqual(1, mock_execute.call_count)
+        self.assertEqual(1, self._hana.cache.hits)
+
+        # Read-only commands keep the cache
+        self._hana.is_running()
+        self._hana.get_sr_state()
+        self.assertEqual(2, mock_execute.call_count)
+
+        # Mutating commands invalidate the cache
+        self._hana.sr_enable_primary('test')
+        self._hana.get_sr_state()
+        self.assertEqual(4, mock_execute.call_count)
+        mock_execute.assert_called_with('hdbnsutil -sr_state', 'prdadm', 'pass', None)
+        self.assertEqual(2, self._hana.cache.misses)
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_run_hana_command_cache_error(self, mock_execute):
+        mock_execute.side_effect = [
+            mock.Mock(returncode=1, output=''),
+            mock.Mock(returncode=0, output='mode: primary')]
+        self._hana.cache = cmdcache.CommandCache()
+
+        self.assertEqual(1, self._hana._run_hana_command(
+            'hdbnsutil -sr_state', exception=False).returncode)
+        self.assertEqual('PRIMARY', self._hana.get_sr_state())
+        self.assertEqual(2, mock_execute.call_count)
+        self.assertEqual(0, self._hana.cache.hits)
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_operation_tag(self, mock_execute):
+        operations = []
+        mock_execute.side_effect = lambda *args: operations.append(shell.get_operation()) or \
+            mock.Mock(returncode=0)
+        self._hana.sr_enable_primary('test')
+        self._hana._run_hana_command('ls')
+        self.assertEqual(['sr_enable_primary', None], operations)
+
+    def test_init_cache(self):
+        instance = hana.HanaInstance('prd', '00', 'pass', cache_ttl=5)
+        self.assertEqual(5, instance.cache.ttl)
+        cache = cmdcache.CommandCache()
+        instance = hana.HanaInstance('prd', '00', 'pass', cache=cache, cache_ttl=5)
+        self.assertEqual(cache, instance.cache)
+        self.assertIsNone(hana.HanaInstance('prd', '00', 'pass').cache)
+
+    def test_executor(self):
+        self.assertEqual(executors.DEFAULT_EXECUTOR, self._hana.executor)
+        executor = executors.FakeExecutor({
+            'HDB version': (0, '  version:  2.00.040.00.1553674765\n', ''),
+            'HDB info': (0, '', '')
+        })
+        instance = hana.HanaInstance('prd', '00', 'pass', remote_host='host', executor=executor)
+
+        self.assertEqual('2.00.040', instance.get_version())
+        self.assertTrue(instance.is_installed())
+        self.assertEqual(
+            [('HDB version', 'prdadm', 'host'), ('HDB info', 'prdadm', 'host')], executor.calls)
+
+    def test_run_hana_commands(self):
+        executor = executors.FakeExecutor({'cmd1': (0, '', ''), 'cmd2': (1, '', '')})
+        self._hana.executor = executor
+        self._hana.cache = mock.Mock()
+
+        results = self._hana._run_hana_commands(['cmd1', 'cmd2', 'cmd3'], exception=False)
+        self.assertEqual([0, 1], [result.returncode for result in results])
+        self.assertEqual([('cmd1', 'prdadm', None), ('cmd2', 'prdadm', None)], executor.calls)
+        self._hana.cache.invalidate.assert_called_once_with()
+
+        with self.assertRaises(hana.HanaError) as err:
+            self._hana._run_hana_commands(['cmd1', 'cmd2'])
+        self.assertTrue('Error running hana command: cmd2' in str(err.exception))
+
+    def test_run_hana_commands_session(self):
+        self._hana.shell_session = True
+        self._hana._run_hana_command = mock.Mock(side_effect=[
+            mock.Mock(returncode=0), mock.Mock(returncode=1, cmd='cmd2')])
+
+        with self.assertRaises(hana.HanaError):
+            self._hana._run_hana_commands(['cmd1', 'cmd2', 'cmd3'])
+        self._hana._run_hana_command.assert_has_calls([
+            mock.call('cmd1', exception=False), mock.call('cmd2', exception=False)])
+
+    @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
+    @mock.patch('os.path.isfile')
+    def test_install_executor(self, mock_conf_file, mock_find_hana):
+        mock_conf_file.side_effect = [True, True]
+        mock_find_hana.return_value = 'my_path/hdblcm'
+        executor = executors.FakeExecutor(default=(0, '', ''))
+
+        hana.HanaInstance.install(
+            'software_path', 'conf_file.conf', 'root', 'pass', remote_host='remote',
+            stream=True, executor=executor)
+
+        self.assertEqual(
+            [('my_path/hdblcm -b --configfile=conf_file.conf', 'root', 'remote')],
+            executor.calls)
+
     @mock.patch('shaptools.shell.execute_cmd')
     def test_run_hana_command_uppercase(self, mock_execute):
         proc_mock = mock.Mock()
@@ -235,6 +374,45 @@ class TestHana(unittest.TestCase):
             'Error running hana command: {}'.format(
                 'updated command') in str(err.exception))
 
+    @mock.patch('shaptools.shellsession.get_session')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_run_hana_command_session(self, mock_execute, mock_get_session):
+        proc_mock = mock.Mock()
+        proc_mock.returncode = 0
+        mock_get_session.return_value.execute.return_value = proc_mock
+
+        self._hana = hana.HanaInstance('prd', '00', 'pass', shell_session=True)
+        result = self._hana._run_hana_command('test command')
+
+        mock_get_session.assert_called_once_with('prdadm', None)
+        mock_get_session.return_value.execute.assert_called_once_with('test command')
+        self.assertEqual(0, mock_execute.call_count)
+        self.assertEqual(proc_mock, result)
+
+    @mock.patch('shaptools.userenv.UserEnvironment')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_run_hana_command_sidadm_env(self, mock_execute, mock_userenv):
+        proc_mock = mock.Mock()
+        proc_mock.returncode = 0
+        mock_userenv.return_value.execute.return_value = proc_mock
+
+        self._hana = hana.HanaInstance('prd', '00', 'pass', sidadm_env=True)
+        result = self._hana._run_hana_command('test command')
+        self._hana._run_hana_command('test command')
+
+        mock_userenv.assert_called_once_with(
+            'prdadm', 'pass', watch_paths=['/usr/sap/PRD/HDB00/exe/manifest'])
+        mock_userenv.return_value.execute.assert_has_calls([
+            mock.call('test command'), mock.call('test command')])
+        self.assertEqual(0, mock_execute.call_count)
+        self.assertEqual(proc_mock, result)
+
+    def test_sidadm_env_remote(self):
+        with self.assertRaises(ValueError) as err:
+            hana.HanaInstance('prd', '00', 'pass', sidadm_env=True, remote_host='remote')
+        self.assertTrue(
+            'sidadm_env option is only available for local instances' in str(err.exception))
+
     @mock.patch('shaptools.shell.execute_cmd')
     def test_is_installed(self, mock_execute):
         proc_mock = mock.Mock()
@@ -311,7 +489,7 @@ class TestHana(unittest.TestCase):
             'my_path/hdblcm '
             '--action=install --dump_configfile_template={conf_file}'.format(
                 conf_file='conf_file.conf'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('software_path')
+        mock_find_hana.assert_called_once_with('software_path', None)
         self.assertEqual('conf_file.conf', conf_file)
 
     @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
@@ -331,7 +509,7 @@ class TestHana(unittest.TestCase):
             '--action=install --dump_configfile_template={conf_file}'.format(
                 conf_file='conf_file.conf'), 'root', 'pass', None)
 
-        mock_find_hana.assert_called_once_with('software_path')
+        mock_find_hana.assert_called_once_with('software_path', None)
 
         self.assertTrue(
             'SAP HANA configuration file creation failed' in str(err.exception))
@@ -353,7 +531,21 @@ class TestHana(unittest.TestCase):
             'my_path/hdblcm '
             '-b --configfile={conf_file}'.format(
                 conf_file='conf_file.conf'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('software_path')
+        mock_find_hana.assert_called_once_with('software_path', None)
+
+    @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('os.path.isfile')
+    def test_install_stream(self, mock_conf_file, mock_execute, mock_find_hana):
+        mock_conf_file.side_effect = [True, True]
+        mock_execute.return_value = mock.Mock(returncode=0)
+        mock_find_hana.return_value = 'my_path/hdblcm'
+
+        hana.HanaInstance.install(
+            'software_path', 'conf_file.conf', 'root', 'pass', stream=True)
+
+        mock_execute.assert_called_once_with(
+            'my_path/hdblcm -b --configfile=conf_file.conf', 'root', 'pass', None)
 
     @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
     @mock.patch('shaptools.shell.execute_cmd')
@@ -374,7 +566,7 @@ class TestHana(unittest.TestCase):
             '-b --read_password_from_stdin=xml --configfile={conf_file}'.format(
                 hdb_pwd_file='hdb_passwords.xml',
                 conf_file='conf_file.conf'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('software_path')
+        mock_find_hana.assert_called_once_with('software_path', None)
 
     @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
     @mock.patch('shaptools.shell.execute_cmd')
@@ -394,7 +586,7 @@ class TestHana(unittest.TestCase):
             'my_path/hdblcm '
             '-b --configfile={conf_file}'.format(
                 conf_file='conf_file.conf'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('software_path')
+        mock_find_hana.assert_called_once_with('software_path', None)
 
         self.assertTrue(
             'SAP HANA installation failed' in str(err.exception))
@@ -465,7 +657,7 @@ class TestHana(unittest.TestCase):
             'cat {hdb_pwd_file} | {executable} -b '
             '--read_password_from_stdin=xml --action=add_hosts --addhosts={add_hosts}'.format(
                 hdb_pwd_file='hdb_pwd_file', executable='my_path/hdblcm', add_hosts='add_hosts'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('hdblcm_folder')
+        mock_find_hana.assert_called_once_with('hdblcm_folder', None)
 
     @mock.patch('shaptools.hana.HanaInstance.find_hana_hdblcm')
     @mock.patch('shaptools.shell.execute_cmd')
@@ -485,7 +677,7 @@ class TestHana(unittest.TestCase):
             'cat {hdb_pwd_file} | {executable} -b '
             '--read_password_from_stdin=xml --action=add_hosts --addhosts={add_hosts}'.format(
                 hdb_pwd_file='hdb_pwd_file', executable='my_path/hdblcm', add_hosts='add_hosts'), 'root', 'pass', None)
-        mock_find_hana.assert_called_once_with('hdblcm_folder')
+        mock_find_hana.assert_called_once_with('hdblcm_folder', None)
 
         self.assertTrue(
             'SAP HANA add_hosts failed' in str(err.exception))
@@ -511,6 +703,17 @@ class TestHana(unittest.TestCase):
         mock_command.assert_called_once_with('pidof hdb.sapPRD_HDB00', exception=False)
         self.assertTrue(result)
 
+    @mock.patch('shaptools.agent.get_client')
+    def test_is_running_agent(self, mock_get_client):
+        mock_command = mock.Mock()
+        self._hana._run_hana_command = mock_command
+        mock_get_client.return_value.pidof.side_effect = [[1234], []]
+        self.assertTrue(self._hana.is_running())
+        self.assertFalse(self._hana.is_running())
+        mock_get_client.assert_called_with(self._hana.executor, None)
+        mock_get_client.return_value.pidof.assert_called_with('hdb.sapPRD_HDB00')
+        mock_command.assert_not_called()
+
     @mock.patch('subprocess.Popen')
     def test_get_version(self, mock_popen):
         out = (b"Output text\n"
@@ -561,30 +764,42 @@ class TestHana(unittest.TestCase):
             mock.call('sapcontrol -nr {} -function WaitforStopped 2700 2'.format(self._hana.inst))
         ])
 
-    @mock.patch('shaptools.shell.find_pattern', mock.Mock(return_value=object()))
     def test_get_sr_state_primary(self):
-        mock_command = mock.Mock()
+        mock_command = mock.Mock(return_value=mock.Mock(
+            output='System Replication State\n\nonline: true\n\nmode: primary\n'))
         self._hana._run_hana_command = mock_command
         state = self._hana.get_sr_state()
         self.assertEqual('PRIMARY', state)
         mock_command.assert_called_once_with('hdbnsutil -sr_state')
 
-    @mock.patch('shaptools.shell.find_pattern', mock.Mock(side_effect = [None, object()]))
     def test_get_sr_state_secondary(self):
-        mock_command = mock.Mock()
+        mock_command = mock.Mock(return_value=mock.Mock(
+            output='System Replication State\n\nonline: true\n\nmode: syncmem\n'))
         self._hana._run_hana_command = mock_command
         state = self._hana.get_sr_state()
         self.assertEqual('SECONDARY', state)
         mock_command.assert_called_once_with('hdbnsutil -sr_state')
 
-    @mock.patch('shaptools.shell.find_pattern', mock.Mock(return_value=None))
     def test_get_sr_state_disabled(self):
-        mock_command = mock.Mock()
+        mock_command = mock.Mock(return_value=mock.Mock(
+            output='System Replication State\n\nonline: true\n\nmode: none\n'))
         self._hana._run_hana_command = mock_command
         state = self._hana.get_sr_state()
         self.assertEqual('DISABLED', state)
         mock_command.assert_called_once_with('hdbnsutil -sr_state')
 
+    def test_get_sr_snapshot(self):
+        mock_command = mock.Mock(return_value=mock.Mock(
+            output='online=true\nmode=primary\nsite name=NUREMBERG\n'
+                   'siteTier/NUREMBERG=1\nsiteTier/PRAGUE=2\nsiteMapping/NUREMBERG=PRAGUE\n'
+                   'mapping/hana01=NUREMBERG/hana01\nmapping/hana01=PRAGUE/hana02\n'))
+        self._hana._run_hana_command = mock_command
+        state = self._hana.get_sr_snapshot()
+        self.assertTrue(state.is_primary)
+        self.assertEqual(state.primary_site.name, 'NUREMBERG')
+        self.assertEqual(state.hosts_in_tier(2), frozenset(['hana02']))
+        mock_command.assert_called_once_with('hdbnsutil -sr_state --sapcontrol=1')
+
     def test_enable(self):
         mock_command = mock.Mock()
         self._hana._run_hana_command = mock_command
@@ -601,7 +816,7 @@ class TestHana(unittest.TestCase):
     @mock.patch('shaptools.shell.create_ssh_askpass')
     def test_copy_ssfs_files(self, mock_sshpass):
         mock_sshpass.side_effect = ['cmd1', 'cmd2']
-        self._hana._run_hana_command = mock.Mock()
+        self._hana._run_hana_commands = mock.Mock()
         self._hana.copy_ssfs_files('host', 'prim_pass')
         mock_sshpass.assert_has_calls([
             mock.call(
@@ -615,10 +830,7 @@ class TestHana(unittest.TestCase):
                 '/usr/sap/{sid}/SYS/global/security/rsecssfs/key/SSFS_{sid}.KEY'.format(
                     user='prdadm', remote_host='host', sid='PRD')),
         ])
-        self._hana._run_hana_command.assert_has_calls([
-            mock.call('cmd1'),
-            mock.call('cmd2'),
-        ])
+        self._hana._run_hana_commands.assert_called_once_with(['cmd1', 'cmd2'])
 
 
     @mock.patch('time.time')
@@ -654,10 +866,12 @@ class TestHana(unittest.TestCase):
         ])
         self._hana.copy_ssfs_files.assert_called_once_with('host', 'pass')
 
+    @mock.patch('random.uniform')
     @mock.patch('time.time')
     @mock.patch('time.sleep')
-    def test_register_loop(self, mock_sleep, mock_time):
-        mock_time.side_effect = [0, 1, 2, 3]
+    def test_register_loop(self, mock_sleep, mock_time, mock_uniform):
+        mock_time.return_value = 0
+        mock_uniform.return_value = 0
         self._hana._run_hana_command = mock.Mock()
         result_mock1 = mock.Mock(returncode=1)
         result_mock2 = mock.Mock(returncode=1)
@@ -665,7 +879,8 @@ class TestHana(unittest.TestCase):
 
         self._hana._run_hana_command.side_effect = [result_mock1, result_mock2, result_mock3]
 
-        self._hana.sr_register_secondary('test', 'host', 1, 'sync', 'ops', timeout=5, interval=2)
+        stats = self._hana.sr_register_secondary(
+            'test', 'host', 1, 'sync', 'ops', timeout=5, interval=2)
 
         self._hana._run_hana_command.assert_has_calls([
             mock.call(
@@ -681,18 +896,39 @@ class TestHana(unittest.TestCase):
                 '--remoteInstance={} --replicationMode={} --operationMode={}'.format(
                 'test', 'host', '01', 'sync', 'ops'), False)
         ])
-        mock_sleep.assert_has_calls([mock.call(2), mock.call(2)])
+        # The delay is doubled after every failed attempt
+        mock_sleep.assert_has_calls([mock.call(2), mock.call(4)])
+        self.assertEqual(stats.attempt_count, 3)
+        self.assertTrue(stats.succeeded)
+
+    @mock.patch('random.uniform')
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    def test_register_deadline(self, mock_sleep, mock_time, mock_uniform):
+        mock_time.side_effect = [0, 0, 1, 1, 6, 6, 7, 7, 10]
+        mock_uniform.return_value = 0
+        self._hana._run_hana_command = mock.Mock(return_value=mock.Mock(returncode=1))
+
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            self._hana.sr_register_secondary(
+                'test', 'host', 1, 'sync', 'ops', timeout=100, interval=5, deadline=10)
+
+        self.assertTrue('deadline exceeded' in str(err.exception))
+        self.assertEqual(2, self._hana._run_hana_command.call_count)
+        # The second sleep is shortened to the remaining time
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(3)])
 
+    @mock.patch('random.uniform')
     @mock.patch('time.time')
     @mock.patch('time.sleep')
-    def test_register_error(self, mock_sleep, mock_time):
-        mock_time.side_effect = [0, 1, 2, 3]
+    def test_register_error(self, mock_sleep, mock_time, mock_uniform):
+        mock_time.side_effect = [0, 1, 1, 3]
+        mock_uniform.return_value = 0
         self._hana._run_hana_command = mock.Mock()
         result_mock1 = mock.Mock(returncode=1)
         result_mock2 = mock.Mock(returncode=1)
-        result_mock3 = mock.Mock(returncode=1)
 
-        self._hana._run_hana_command.side_effect = [result_mock1, result_mock2, result_mock3]
+        self._hana._run_hana_command.side_effect = [result_mock1, result_mock2]
 
         with self.assertRaises(hana.HanaError) as err:
             self._hana.sr_register_secondary(
@@ -707,16 +943,38 @@ class TestHana(unittest.TestCase):
                 'hdbnsutil -sr_register --name={} --remoteHost={} '\
                 '--remoteInstance={} --replicationMode={} --operationMode={}'.format(
                 'test', 'host', '01', 'sync', 'ops'), False),
-            mock.call(
-                'hdbnsutil -sr_register --name={} --remoteHost={} '\
-                '--remoteInstance={} --replicationMode={} --operationMode={}'.format(
-                'test', 'host', '01', 'sync', 'ops'), False),
             mock.call(
                 'hdbnsutil -sr_register --name={} --remoteHost={} '\
                 '--remoteInstance={} --replicationMode={} --operationMode={}'.format(
                 'test', 'host', '01', 'sync', 'ops'), False)
         ])
-        mock_sleep.assert_has_calls([mock.call(2), mock.call(2), mock.call(2)])
+        # The delay is shortened to the timeout
+        mock_sleep.assert_called_once_with(1)
+
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    def test_register_max_attempts(self, mock_sleep, mock_time):
+        mock_time.return_value = 0
+        self._hana._run_hana_command = mock.Mock(return_value=mock.Mock(returncode=1))
+
+        with self.assertRaises(hana.HanaError):
+            self._hana.sr_register_secondary(
+                'test', 'host', 1, 'sync', 'ops', timeout=100, max_attempts=3)
+
+        self.assertEqual(3, self._hana._run_hana_command.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+
+    @mock.patch('time.time')
+    def test_register_copy_ssfs_once(self, mock_time):
+        mock_time.return_value = 0
+        self._hana._run_hana_command = mock.Mock(return_value=mock.Mock(returncode=149))
+        self._hana.copy_ssfs_files = mock.Mock()
+
+        with self.assertRaises(hana.HanaError):
+            self._hana.sr_register_secondary('test', 'host', 1, 'sync', 'ops')
+
+        self.assertEqual(2, self._hana._run_hana_command.call_count)
+        self.assertEqual(1, self._hana.copy_ssfs_files.call_count)
 
     def test_unregister(self):
         mock_command = mock.Mock()
@@ -814,6 +1072,198 @@ class TestHana(unittest.TestCase):
             'key_name or user_name/user_password parameters must be used' in str(
                 err.exception))
 
+    def test_run_sql(self):
+        mock_command = mock.Mock()
+        self._hana._run_hana_command = mock_command
+        result = self._hana.run_sql('SELECT * FROM DUMMY', key_name='key')
+        self.assertEqual(result, mock_command.return_value)
+        mock_command.assert_called_once_with(
+            'hdbsql -i {} -U key \\"SELECT * FROM DUMMY\\"'.format(self._hana.inst))
+
+    def test_run_sql_connector(self):
+        mock_connector = mock.Mock()
+        mock_connector.isconnected.return_value = True
+        self._hana.hdb_connector = mock_connector
+        self._hana._run_hana_command = mock.Mock()
+
+        result = self._hana.run_sql('ALTER SYSTEM ALTER CONFIGURATION(a) SET b; ', 'db')
+        self.assertEqual(result, mock_connector.query.return_value)
+        result = self._hana.run_sql('SELECT * FROM DUMMY')
+
+        mock_connector.reconnect.assert_not_called()
+        mock_connector.query.assert_has_calls([
+            mock.call('ALTER SYSTEM ALTER CONFIGURATION(a) SET b'),
+            mock.call('SELECT * FROM DUMMY')
+        ])
+        self._hana._run_hana_command.assert_not_called()
+
+    @mock.patch('shaptools.hdb_connector.connectors.base_connector.QueryError', Exception)
+    def test_run_sql_connector_error(self):
+        mock_connector = mock.Mock()
+        mock_connector.isconnected.return_value = False
+        mock_connector.query.side_effect = Exception('query failed: invalid table name')
+        self._hana.hdb_connector = mock_connector
+
+        with self.assertRaises(hana.HanaSqlError) as err:
+            self._hana.run_sql('SELECT * FROM OTHER')
+
+        self.assertEqual(str(err.exception), 'query failed: invalid table name')
+        self.assertEqual(err.exception.statement, 'SELECT * FROM OTHER')
+        mock_connector.reconnect.assert_called_once_with()
+
+    @mock.patch('shaptools.hdb_connector.HdbConnector')
+    def test_connect_db(self, mock_hdb_connector):
+        self._hana.connect_db('user', 'pass', database='db', RECONNECT='FALSE')
+        self.assertEqual(self._hana.hdb_connector, mock_hdb_connector.return_value)
+        mock_hdb_connector.return_value.connect.assert_called_once_with(
+            'localhost', int('3{}15'.format(self._hana.inst)), user='user', password='pass',
+            databaseName='db', RECONNECT='FALSE')
+
+        self._hana.hdb_connector.isconnected.return_value = True
+        self._hana.disconnect_db()
+        self._hana.hdb_connector.disconnect.assert_called_once_with()
+
+    @mock.patch('shaptools.hdb_connector.connectors.base_connector.ConnectionError', ValueError)
+    def test_connect_db_error(self):
+        mock_connector = mock.Mock()
+        mock_connector.connect.side_effect = ValueError('connection failed: refused')
+        self._hana.hdb_connector = mock_connector
+        self._hana.remote_host = 'remote'
+
+        with self.assertRaises(hana.HanaSqlError) as err:
+            self._hana.connect_db('user', 'pass', host=None, port=30113)
+
+        self.assertEqual(str(err.exception), 'connection failed: refused')
+        mock_connector.connect.assert_called_once_with(
+            'remote', 30113, user='user', password='pass')
+
+    def test_create_backup_connector(self):
+        self._hana.hdb_connector = mock.Mock()
+        self._hana.create_backup('db', 'backup')
+        self._hana.hdb_connector.query.assert_called_once_with(
+            'BACKUP DATA FOR FULL SYSTEM USING FILE (\'backup\')')
+
+    def test_apply_ini_parameters(self):
+        mock_connector = mock.Mock()
+        mock_connector.isconnected.return_value = True
+        mock_connector.query.side_effect = [mock.Mock(records=[
+            ('global.ini', 'DEFAULT', '', '', 'memorymanager', 'global_allocation_limit', '0'),
+            ('global.ini', 'SYSTEM', '', '', 'memorymanager', 'global_allocation_limit', '100'),
+            ('global.ini', 'SYSTEM', '', '', 'persistence', 'log_mode', 'normal'),
+            ('global.ini', 'SYSTEM', '', '', 'trace', 'level', 'info'),
+            ('indexserver.ini', 'DATABASE', 'PRD', '', 'sql', 'plan_cache_size', '100'),
+            ('indexserver.ini', 'HOST', '', 'hana01', 'sql', 'plan_cache_size', '100'),
+        ])] + [mock.Mock()] * 3
+        self._hana.hdb_connector = mock_connector
+        params = [
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'memorymanager',
+             'parameter_name': 'global_allocation_limit', 'parameter_value': 200},
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'persistence',
+             'parameter_name': 'log_mode', 'parameter_value': 'normal'},
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'trace',
+             'parameter_name': 'level', 'parameter_value': None},
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'trace',
+             'parameter_name': 'other', 'parameter_value': None},
+            {'file_name': 'indexserver.ini', 'layer': 'DATABASE', 'layer_name': 'PRD',
+             'section_name': 'sql', 'parameter_name': 'plan_cache_size',
+             'parameter_value': '200'},
+            {'file_name': 'indexserver.ini', 'layer': 'HOST', 'layer_name': 'hana01',
+             'section_name': 'sql', 'parameter_name': 'plan_cache_size',
+             'parameter_value': '100'},
+        ]
+
+        changes = self._hana.apply_ini_parameters(params, reconfig=True)
+
+        self.assertEqual(changes, [
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'layer_name': None,
+             'section_name': 'memorymanager', 'parameter_name': 'global_allocation_limit',
+             'old_value': '100', 'new_value': '200'},
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'layer_name': None,
+             'section_name': 'trace', 'parameter_name': 'level',
+             'old_value': 'info', 'new_value': None},
+            {'file_name': 'indexserver.ini', 'layer': 'DATABASE', 'layer_name': 'PRD',
+             'section_name': 'sql', 'parameter_name': 'plan_cache_size',
+             'old_value': '100', 'new_value': '200'},
+        ])
+        mock_connector.query.assert_has_calls([
+            mock.call(
+                'SELECT FILE_NAME, LAYER_NAME, TENANT_NAME, HOST, SECTION, KEY, VALUE '
+                'FROM SYS.M_INIFILE_CONTENTS WHERE FILE_NAME IN (\'global.ini\', '
+                '\'indexserver.ini\')'),
+            mock.call(
+                'ALTER SYSTEM ALTER CONFIGURATION(\'global.ini\', \'SYSTEM\') '
+                'SET(\'memorymanager\',\'global_allocation_limit\')=\'200\''),
+            mock.call(
+                'ALTER SYSTEM ALTER CONFIGURATION(\'global.ini\', \'SYSTEM\') '
+                'UNSET(\'trace\',\'level\')'),
+            mock.call(
+                'ALTER SYSTEM ALTER CONFIGURATION(\'indexserver.ini\', \'DATABASE\', '
+                '\'PRD\') SET(\'sql\',\'plan_cache_size\')=\'200\' WITH RECONFIGURE')
+        ])
+        self.assertEqual(mock_connector.query.call_count, 4)
+
+    def test_apply_ini_parameters_dry_run(self):
+        mock_connector = mock.Mock()
+        mock_connector.query.return_value = mock.Mock(records=[])
+        self._hana.hdb_connector = mock_connector
+        changes = self._hana.apply_ini_parameters([
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'section_name': 'trace',
+             'parameter_name': 'level', 'parameter_value': 'debug'}], dry_run=True)
+        self.assertEqual(changes, [
+            {'file_name': 'global.ini', 'layer': 'SYSTEM', 'layer_name': None,
+             'section_name': 'trace', 'parameter_name': 'level',
+             'old_value': None, 'new_value': 'debug'}])
+        mock_connector.query.assert_called_once_with(
+            'SELECT FILE_NAME, LAYER_NAME, TENANT_NAME, HOST, SECTION, KEY, VALUE '
+            'FROM SYS.M_INIFILE_CONTENTS WHERE FILE_NAME IN (\'global.ini\')')
+
+    def test_apply_ini_parameters_escape(self):
+        mock_connector = mock.Mock()
+        mock_connector.query.side_effect = [mock.Mock(records=[
+            ("it's.ini", 'DATABASE', "P'R", '', "sec'tion", "ot'her", '1'),
+        ]), mock.Mock(), mock.Mock()]
+        self._hana.hdb_connector = mock_connector
+        changes = self._hana.apply_ini_parameters([
+            {'file_name': "it's.ini", 'layer': 'DATABASE', 'layer_name': "P'R",
+             'section_name': "sec'tion", 'parameter_name': "na'me", 'parameter_value': "v'a"},
+            {'file_name': "it's.ini", 'layer': 'DATABASE', 'layer_name': "P'R",
+             'section_name': "sec'tion", 'parameter_name': "ot'her", 'parameter_value': None}])
+        self.assertEqual("v'a", changes[0]['new_value'])
+        mock_connector.query.assert_has_calls([
+            mock.call(
+                'SELECT FILE_NAME, LAYER_NAME, TENANT_NAME, HOST, SECTION, KEY, VALUE '
+                'FROM SYS.M_INIFILE_CONTENTS WHERE FILE_NAME IN (\'it\'\'s.ini\')'),
+            mock.call(
+                'ALTER SYSTEM ALTER CONFIGURATION(\'it\'\'s.ini\', \'DATABASE\', \'P\'\'R\') '
+                'SET(\'sec\'\'tion\',\'na\'\'me\')=\'v\'\'a\''),
+            mock.call(
+                'ALTER SYSTEM ALTER CONFIGURATION(\'it\'\'s.ini\', \'DATABASE\', \'P\'\'R\') '
+                'UNSET(\'sec\'\'tion\',\'ot\'\'her\')')
+        ])
+
+    def test_apply_ini_parameters_layer_name(self):
+        self._hana.hdb_connector = mock.Mock()
+        for layer in ('DATABASE', 'HOST'):
+            with self.assertRaises(hana.HanaError) as err:
+                self._hana.apply_ini_parameters([
+                    {'file_name': 'global.ini', 'layer': layer, 'section_name': 'trace',
+                     'parameter_name': 'level', 'parameter_value': 'debug'}])
+            self.assertEqual(
+                str(err.exception),
+                'layer_name is required for the {} layer parameter level'.format(layer))
+        self._hana.hdb_connector.query.assert_not_called()
+
+    def test_apply_ini_parameters_empty(self):
+        self._hana.hdb_connector = mock.Mock()
+        self.assertEqual(self._hana.apply_ini_parameters([]), [])
+        self._hana.hdb_connector.query.assert_not_called()
+
+    def test_apply_ini_parameters_error(self):
+        with self.assertRaises(hana.HanaError) as err:
+            self._hana.apply_ini_parameters([])
+        self.assertEqual(
+            str(err.exception), 'a database connection is required to apply the ini parameters')
+
     def test_create_backup(self):
         mock_command = mock.Mock()
         self._hana._run_hana_command = mock_command
@@ -872,8 +1322,8 @@ class TestHana(unittest.TestCase):
             self._hana._run_hana_command = mock.Mock(return_value=Ret(rc))
             status = self._hana.get_sr_status()
             self._hana._run_hana_command.assert_called_once_with(
-                'HDBSettings.sh systemReplicationStatus.py', exception=False)
-            self.assertEqual(status, {"status": expect})
+                'HDBSettings.sh systemReplicationStatus.py --sapcontrol=1', exception=False)
+            self.assertEqual(status, {"status": expect, "services": [], "sites": {}})
 
     def test_set_ini_parameter(self):
         mock_command = mock.Mock()
@@ -0,0 +1,54 @@
+"""
+Unitary tests for hanasql.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+from shaptools import hanasql
+
+class TestHanaSql(unittest.TestCase):
+    """
+    Unitary tests for hanasql.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_escape_sql(self):
+        self.assertEqual('value', hanasql.escape_sql('value'))
+        self.assertEqual("it''s", hanasql.escape_sql("it's"))
+        self.assertEqual("''''", hanasql.escape_sql("''"))
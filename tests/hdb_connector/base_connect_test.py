@@ -12,6 +12,7 @@ Unitary tests for hdb_connector/connector/base_connector.py.
 
 import os
 import sys
+import array
 import logging
 import unittest
 
@@ -54,16 +55,293 @@ class TestQueryResul(unittest.TestCase):
         Global tearDown.
         """
 
+    @mock.patch('logging.Logger.isEnabledFor', mock.Mock(return_value=False))
+    @mock.patch('logging.Logger.debug')
     @mock.patch('logging.Logger.info')
-    def test_load_cursor(self, logger):
+    def test_load_cursor(self, logger, logger_debug):
         mock_cursor = mock.Mock()
         mock_cursor.description = 'metadata'
         mock_cursor.fetchall.return_value = ['data1', 'data2']
         result = self._base_connector.QueryResult.load_cursor(mock_cursor)
-        logger.assert_called_once_with('query records: %s', ['data1', 'data2'])
+        logger.assert_called_once_with('query returned %d records', 2)
+        logger_debug.assert_not_called()
         self.assertEqual(result.records, ['data1', 'data2'])
         self.assertEqual(result.metadata, 'metadata')
 
+    def test_load_cursor_no_result_set(self):
+        mock_cursor = mock.Mock(description=None)
+        result = self._base_connector.QueryResult.load_cursor(mock_cursor)
+        mock_cursor.fetchall.assert_not_called()
+        self.assertEqual(result.records, [])
+        self.assertIsNone(result.metadata)
+
+    @mock.patch('logging.Logger.isEnabledFor', mock.Mock(return_value=True))
+    @mock.patch('logging.Logger.debug')
+    def test_load_cursor_debug(self, logger_debug):
+        mock_cursor = mock.Mock()
+        mock_cursor.fetchall.return_value = list(range(20))
+        self._base_connector.QueryResult.load_cursor(mock_cursor)
+        logger_debug.assert_called_once_with(
+            'first query records: %s', list(range(self._base_connector.MAX_LOGGED_RECORDS)))
+
+
+class TestStreamingQueryResult(unittest.TestCase):
+    """
+    Unitary tests for base_connector.py StreamingQueryResult class
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+        from shaptools.hdb_connector.connectors import base_connector
+        cls._base_connector = base_connector
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    @mock.patch('logging.Logger.info')
+    def test_iterate(self, logger):
+        mock_cursor = mock.Mock(description='metadata')
+        mock_cursor.fetchmany.side_effect = [[1, 2], [3], []]
+        result = self._base_connector.StreamingQueryResult(mock_cursor, batch_size=2)
+
+        self.assertEqual(result.metadata, 'metadata')
+        self.assertEqual(list(result), [1, 2, 3])
+        self.assertEqual(result.rowcount, 3)
+        self.assertTrue(result.closed)
+        mock_cursor.fetchmany.assert_has_calls([mock.call(2)] * 3)
+        mock_cursor.close.assert_called_once_with()
+        logger.assert_called_once_with('query returned %d records', 3)
+        self.assertEqual(list(result), [])
+
+    def test_close(self):
+        mock_cursor = mock.Mock(description='metadata')
+        mock_cursor.fetchmany.return_value = [1, 2]
+        with self._base_connector.StreamingQueryResult(mock_cursor) as result:
+            self.assertEqual(next(iter(result)), 1)
+        mock_cursor.fetchmany.assert_called_once_with(
+            self._base_connector.DEFAULT_BATCH_SIZE)
+        mock_cursor.close.assert_called_once_with()
+        result.close()
+        mock_cursor.close.assert_called_once_with()
+
+    def test_no_result_set(self):
+        mock_cursor = mock.Mock(description=None)
+        result = self._base_connector.StreamingQueryResult(mock_cursor)
+        self.assertEqual(list(result), [])
+        mock_cursor.fetchmany.assert_not_called()
+        mock_cursor.close.assert_called_once_with()
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            self._base_connector.StreamingQueryResult(mock.Mock(), batch_size=0)
+
+        mock_cursor = mock.Mock(description='metadata')
+        mock_cursor.fetchmany.side_effect = KeyError('error')
+        result = self._base_connector.StreamingQueryResult(mock_cursor, errors=(KeyError,))
+        with self.assertRaises(self._base_connector.QueryError) as err:
+            list(result)
+        self.assertEqual(str(err.exception), "query failed: 'error'")
+        mock_cursor.close.assert_called_once_with()
+
+
+class TestColumnarQueryResult(unittest.TestCase):
+    """
+    Unitary tests for base_connector.py ColumnarQueryResult class
+    """
+
+    METADATA = (
+        ('HOST', 11, None, 64, None, None, 1),
+        ('MEMORY', 4, None, 19, 0, None, 1),
+        ('CPU', 7, None, 15, None, None, 1),
+        ('STATUS', 11, None, 16, None, None, 1))
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+        from shaptools.hdb_connector.connectors import base_connector
+        cls._base_connector = base_connector
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _result(self, batches, **kwargs):
+        return self._base_connector.ColumnarQueryResult.from_batches(
+            batches, self.METADATA, use_numpy=False, **kwargs)
+
+    def test_columns(self):
+        result = self._result([
+            [('hana01', 100, 1.5, 'ok'), ('hana02', 300, 2, None)],
+            [('hana03', 200, 0.5, 'ok')]])
+
+        self.assertEqual(result.names, ['HOST', 'MEMORY', 'CPU', 'STATUS'])
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result.column('HOST'), ['hana01', 'hana02', 'hana03'])
+        self.assertEqual(result['MEMORY'].typecode, self._base_connector.INT_TYPECODE)
+        self.assertEqual(result['MEMORY'].tolist(), [100, 300, 200])
+        self.assertEqual(result['CPU'].typecode, 'd')
+        self.assertTrue(result.is_numeric('CPU'))
+        self.assertFalse(result.is_numeric('STATUS'))
+        self.assertEqual(list(result.rows())[1], ('hana02', 300, 2.0, None))
+
+        with self.assertRaises(KeyError) as err:
+            result.column('OTHER')
+        self.assertTrue('column OTHER not found' in str(err.exception))
+
+    def test_aggregates(self):
+        result = self._result([
+            [('hana01', 100, 1.5, 'b'), ('hana02', 300, 2.0, None), ('hana03', 200, 0.5, 'a')]])
+        self.assertEqual(result.min('MEMORY'), 100)
+        self.assertEqual(result.max('MEMORY'), 300)
+        self.assertEqual(result.sum('MEMORY'), 600)
+        self.assertEqual(result.sum('CPU'), 4.0)
+        self.assertEqual(result.min('STATUS'), 'a')
+        self.assertEqual(result.max('STATUS'), 'b')
+
+    def test_column_fallback(self):
+        result = self._result([
+            [('hana01', 1, 1, 'ok')],
+            [('hana02', None, 2.5, 'ok')],
+            [('hana03', 2 ** 70, 3, 'ok')]])
+        self.assertEqual(result['MEMORY'], [1, None, 2 ** 70])
+        self.assertEqual(result.sum('MEMORY'), 1 + 2 ** 70)
+
+        # Integers are stored in the float arrays
+        result = self._result([[('hana01', 1, 1.5, 'ok')], [('hana02', 2, 2, 'ok')]])
+        self.assertEqual(result['CPU'].tolist(), [1.5, 2.0])
+        result = self._result([[('hana01', 1, 1, 'ok')], [('hana02', 2, 2.5, 'ok')]])
+        self.assertEqual(result['CPU'].tolist(), [1.0, 2.5])
+        result = self._result([[('hana01', True, 1, 'ok')]])
+        self.assertEqual(result['MEMORY'], [True])
+
+    def test_column_nulls(self):
+        result = self._result([
+            [('hana01', None, None, None)],
+            [('hana02', 300, 2.5, 'ok'), ('hana03', None, 0.5, None)]])
+        self.assertEqual(result['MEMORY'].typecode, self._base_connector.INT_TYPECODE)
+        self.assertEqual(result['MEMORY'].tolist(), [0, 300, 0])
+        self.assertEqual(result['CPU'].tolist(), [0.0, 2.5, 0.5])
+        self.assertEqual(result.nulls('MEMORY'), [0, 2])
+        self.assertEqual(result.nulls('CPU'), [0])
+        self.assertEqual(result.nulls('STATUS'), [0, 2])
+        self.assertEqual(result.min('MEMORY'), 300)
+        self.assertEqual(result.min('CPU'), 0.5)
+        self.assertEqual(result.sum('MEMORY'), 300)
+        self.assertEqual(list(result.rows()), [
+            ('hana01', None, None, None), ('hana02', 300, 2.5, 'ok'),
+            ('hana03', None, 0.5, None)])
+
+    def test_column_type_guess(self):
+        metadata = tuple((item[0], None) + item[2:] for item in self.METADATA)
+        result = self._base_connector.ColumnarQueryResult.from_batches([
+            [('hana01', None, None, 'ok')],
+            [('hana02', 100, 1.5, 'ok'), ('hana03', 200, 2, None)]], metadata, use_numpy=False)
+        self.assertEqual(result['MEMORY'].typecode, self._base_connector.INT_TYPECODE)
+        self.assertEqual(result['MEMORY'].tolist(), [0, 100, 200])
+        self.assertEqual(result.nulls('MEMORY'), [0])
+        self.assertEqual(result['CPU'].tolist(), [0.0, 1.5, 2.0])
+        self.assertEqual(result['HOST'], ['hana01', 'hana02', 'hana03'])
+        self.assertEqual(result['STATUS'], ['ok', 'ok', None])
+
+        result = self._base_connector.ColumnarQueryResult.from_batches(
+            [[('hana01', None, None, 'ok')]], metadata, use_numpy=False)
+        self.assertEqual(result['MEMORY'], [None])
+        self.assertIsNone(result.max('MEMORY'))
+
+    def test_empty(self):
+        result = self._result([])
+        self.assertEqual(len(result), 0)
+        self.assertEqual(result['MEMORY'].tolist(), [])
+        self.assertEqual(result['HOST'], [])
+        self.assertEqual(result.sum('MEMORY'), 0)
+        self.assertIsNone(result.min('MEMORY'))
+        self.assertIsNone(result.max('CPU'))
+        self.assertIsNone(result.max('HOST'))
+
+        result = self._result([[('hana01', None, None, None)]])
+        self.assertIsNone(result.min('MEMORY'))
+        self.assertIsNone(result.max('STATUS'))
+        self.assertEqual(result.sum('CPU'), 0)
+
+        result = self._base_connector.ColumnarQueryResult.from_batches([], None)
+        self.assertEqual(result.names, [])
+        self.assertEqual(len(result), 0)
+
+    def test_numpy(self):
+        mock_numpy = mock.Mock(ndarray=mock.Mock)
+        with mock.patch.object(self._base_connector, 'numpy', mock_numpy):
+            result = self._base_connector.ColumnarQueryResult.from_batches(
+                [[('hana01', 100, 1.5, 'ok')]], self.METADATA)
+
+            mock_numpy.frombuffer.assert_has_calls([
+                mock.call(array.array(self._base_connector.INT_TYPECODE, [100]),
+                          dtype='int64'),
+                mock.call(array.array('d', [1.5]), dtype='float64')
+            ])
+            self.assertEqual(result['MEMORY'], mock_numpy.frombuffer.return_value)
+            self.assertEqual(result.max('MEMORY'), mock_numpy.frombuffer.return_value.max())
+            self.assertEqual(result['HOST'], ['hana01'])
+
+            mock_numpy.zeros.return_value = mock.MagicMock()
+            result = self._base_connector.ColumnarQueryResult.from_batches(
+                [[('hana01', None, 1.5, 'ok')], [('hana02', 100, 2.5, 'ok')]], self.METADATA)
+            mock_numpy.zeros.assert_called_once_with(2, dtype=bool)
+            mock_numpy.zeros.return_value.__setitem__.assert_called_once_with([0], True)
+            mock_numpy.ma.masked_array.assert_called_once_with(
+                mock_numpy.frombuffer.return_value, mask=mock_numpy.zeros.return_value)
+            self.assertEqual(result['MEMORY'], mock_numpy.ma.masked_array.return_value)
+
+        with mock.patch.object(self._base_connector, 'numpy', None):
+            with self.assertRaises(ValueError):
+                self._base_connector.ColumnarQueryResult.from_batches(
+                    [], self.METADATA, use_numpy=True)
+
+    def test_load_stream(self):
+        mock_cursor = mock.Mock(description=self.METADATA)
+        mock_cursor.fetchmany.side_effect = [
+            [('hana01', 100, 1.5, 'ok')], [('hana02', 200, 2.5, 'ok')], []]
+        stream = self._base_connector.StreamingQueryResult(mock_cursor, batch_size=1)
+
+        result = self._base_connector.ColumnarQueryResult.load_stream(stream, use_numpy=False)
+
+        self.assertEqual(result['HOST'], ['hana01', 'hana02'])
+        self.assertEqual(result.sum('CPU'), 4.0)
+        mock_cursor.close.assert_called_once_with()
+
 
 class TestHana(unittest.TestCase):
     """
@@ -116,6 +394,21 @@ class TestHana(unittest.TestCase):
                 'method must be implemented in inherited connectors'
                 in str(err.exception))
 
+    def test_query_stream(self):
+        with self.assertRaises(NotImplementedError) as err:
+            self._conn.query_stream('query')
+        self.assertTrue(
+            'method must be implemented in inherited connectors' in str(err.exception))
+
+    @mock.patch('shaptools.hdb_connector.connectors.base_connector.ColumnarQueryResult')
+    def test_query_columnar(self, mock_columnar):
+        self._conn.query_stream = mock.Mock()
+        result = self._conn.query_columnar('query', batch_size=10, use_numpy=False)
+        self._conn.query_stream.assert_called_once_with('query', 10)
+        mock_columnar.load_stream.assert_called_once_with(
+            self._conn.query_stream.return_value, False)
+        self.assertEqual(result, mock_columnar.load_stream.return_value)
+
     def test_disconnect(self):
         with self.assertRaises(NotImplementedError) as err:
             self._conn.disconnect()
@@ -130,6 +130,39 @@ class TestDbapiConnector(unittest.TestCase):
         self._conn._connection.cursor.assert_called_once_with()
         mock_logger.assert_called_once_with('executing sql query: %s', 'query')
 
+    @mock.patch('shaptools.hdb_connector.connectors.dbapi_connector.dbapi')
+    @mock.patch('logging.Logger.info')
+    def test_query_stream(self, mock_logger, mock_dbapi):
+        mock_dbapi.Error = DbapiException
+        mock_cursor = mock.Mock(description='metadata')
+        mock_cursor.fetchmany.side_effect = [['data1', 'data2'], []]
+        self._conn._connection = mock.Mock()
+        self._conn._connection.cursor.return_value = mock_cursor
+
+        result = self._conn.query_stream('query', batch_size=10)
+
+        mock_cursor.execute.assert_called_once_with('query')
+        mock_cursor.close.assert_not_called()
+        self.assertEqual(list(result), ['data1', 'data2'])
+        mock_cursor.fetchmany.assert_called_with(10)
+        mock_cursor.close.assert_called_once_with()
+        mock_logger.assert_any_call('executing sql query: %s', 'query')
+
+    @mock.patch('shaptools.hdb_connector.connectors.dbapi_connector.dbapi')
+    @mock.patch('logging.Logger.info')
+    def test_query_stream_error(self, mock_logger, mock_dbapi):
+        mock_dbapi.Error = DbapiException
+        mock_cursor = mock.Mock()
+        mock_cursor.execute.side_effect = DbapiException('error')
+        self._conn._connection = mock.Mock()
+        self._conn._connection.cursor.return_value = mock_cursor
+
+        with self.assertRaises(self._dbapi_connector.base_connector.QueryError) as err:
+            self._conn.query_stream('query')
+
+        self.assertEqual('query failed: error', str(err.exception))
+        mock_cursor.close.assert_called_once_with()
+
     @mock.patch('logging.Logger.info')
     def test_disconnect(self, mock_logger):
         self._conn._connection = mock.Mock()
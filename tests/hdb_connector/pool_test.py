@@ -0,0 +1,267 @@
+"""
+Unitary tests for hdb_connector/pool.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+import logging
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools.hdb_connector import pool
+from shaptools.hdb_connector.connectors import base_connector
+
+
+class TestConnectorPool(unittest.TestCase):
+    """
+    Unitary tests for pool.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._connectors = []
+        self._time = 0
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _factory(self):
+        connector = mock.Mock()
+        connector.isconnected.return_value = True
+        self._connectors.append(connector)
+        return connector
+
+    def _pool(self, **kwargs):
+        return pool.ConnectorPool(
+            'host', 30015, connector_factory=self._factory, user='user', password='pass',
+            **kwargs)
+
+    def test_init(self):
+        with self.assertRaises(ValueError):
+            pool.ConnectorPool('host', max_size=0)
+        with self.assertRaises(ValueError):
+            pool.ConnectorPool('host', min_size=3, max_size=2)
+
+        db_pool = self._pool(min_size=2)
+        self.assertEqual(db_pool.size, 2)
+        for connector in self._connectors:
+            connector.connect.assert_called_once_with(
+                'host', 30015, user='user', password='pass')
+
+    @mock.patch('time.time')
+    def test_acquire_release(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(max_size=2)
+
+        connector1 = db_pool.acquire()
+        connector2 = db_pool.acquire()
+        self.assertIsNot(connector1, connector2)
+        db_pool.release(connector1)
+        # The idle connection is reused and the probe is cached
+        self.assertIs(db_pool.acquire(), connector1)
+        connector1.query.assert_not_called()
+
+        self.assertEqual(db_pool.get_stats(), {
+            'created': 2, 'closed': 0, 'checkouts': 3, 'waits': 0, 'timeouts': 0, 'probes': 0,
+            'probe_failures': 0, 'evicted_idle': 0, 'evicted_lifetime': 0,
+            'size': 2, 'idle': 0, 'in_use': 2})
+
+        with self.assertRaises(ValueError):
+            db_pool.release(mock.Mock())
+
+    @mock.patch('time.time')
+    def test_acquire_timeout(self, mock_time):
+        mock_time.side_effect = [0, 0, 0, 0, 0, 0, 0, 5, 5]
+        db_pool = self._pool(max_size=1)
+        db_pool.acquire()
+
+        with mock.patch.object(db_pool._condition, 'wait') as mock_wait:
+            with self.assertRaises(pool.PoolTimeoutError) as err:
+                db_pool.acquire(timeout=5)
+
+        self.assertEqual(str(err.exception), 'no connection available after 5 seconds')
+        mock_wait.assert_called_once_with(5)
+        self.assertEqual(db_pool.stats.waits, 1)
+        self.assertEqual(db_pool.stats.timeouts, 1)
+
+    def test_acquire_wait(self):
+        db_pool = self._pool(max_size=1)
+        connector = db_pool.acquire()
+        result = []
+
+        thread = threading.Thread(target=lambda: result.append(db_pool.acquire(timeout=10)))
+        thread.start()
+        db_pool.release(connector)
+        thread.join()
+
+        self.assertEqual(result, [connector])
+        self.assertEqual(len(self._connectors), 1)
+
+    @mock.patch('time.time')
+    def test_probe(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(probe_interval=10)
+        connector = db_pool.acquire()
+        db_pool.release(connector)
+
+        mock_time.return_value = 20
+        self.assertIs(db_pool.acquire(), connector)
+        connector.query.assert_called_once_with('SELECT * FROM DUMMY')
+        db_pool.release(connector)
+
+        # Cached for probe_interval seconds
+        mock_time.return_value = 25
+        self.assertIs(db_pool.acquire(), connector)
+        db_pool.release(connector)
+        connector.query.assert_called_once_with('SELECT * FROM DUMMY')
+
+        # Failed probes close the connection and a new one is opened
+        mock_time.return_value = 40
+        connector.query.side_effect = base_connector.QueryError('query failed')
+        new_connector = db_pool.acquire()
+        self.assertIsNot(new_connector, connector)
+        connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.stats.probes, 2)
+        self.assertEqual(db_pool.stats.probe_failures, 1)
+        self.assertEqual(db_pool.size, 1)
+
+    @mock.patch('time.time')
+    def test_probe_disconnected(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(probe_interval=0)
+        connector = db_pool.acquire()
+        db_pool.release(connector)
+        connector.isconnected.return_value = False
+
+        self.assertIsNot(db_pool.acquire(), connector)
+        connector.query.assert_not_called()
+
+    @mock.patch('time.time')
+    def test_probe_driver_error(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(probe_interval=0)
+        connector = db_pool.acquire()
+        db_pool.release(connector)
+        connector.isconnected.side_effect = RuntimeError('driver error')
+
+        self.assertIsNot(db_pool.acquire(), connector)
+        connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.stats.probe_failures, 1)
+        self.assertEqual(db_pool.size, 1)
+
+    @mock.patch('time.time')
+    def test_eviction(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(min_size=1, idle_timeout=100, max_lifetime=1000, probe_interval=0)
+        connector1 = db_pool.acquire()
+        connector2 = db_pool.acquire()
+        db_pool.release(connector1)
+        db_pool.release(connector2)
+
+        # Only the connections over min_size are evicted when they are idle
+        mock_time.return_value = 200
+        db_pool.evict()
+        self.assertEqual(db_pool.size, 1)
+        self.assertEqual(db_pool.stats.evicted_idle, 1)
+
+        # Expired connections are closed when they are released or checked out, and a new
+        # connection is opened to keep min_size
+        connector = db_pool.acquire()
+        mock_time.return_value = 1000
+        db_pool.release(connector)
+        connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.size, 1)
+        self.assertEqual(db_pool.stats.evicted_lifetime, 1)
+        self.assertEqual(len(self._connectors), 3)
+        self.assertIs(db_pool.acquire(), self._connectors[-1])
+
+    @mock.patch('time.time')
+    def test_eviction_refill(self, mock_time):
+        mock_time.return_value = 0
+        db_pool = self._pool(min_size=2, max_lifetime=100, probe_interval=0)
+        self.assertEqual(len(self._connectors), 2)
+
+        mock_time.return_value = 100
+        db_pool.evict()
+        for connector in self._connectors[:2]:
+            connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.stats.evicted_lifetime, 2)
+        self.assertEqual(db_pool.get_stats()['idle'], 2)
+        self.assertEqual(len(self._connectors), 4)
+
+        # The connection errors are only logged and the slot is released
+        mock_time.return_value = 200
+        with mock.patch.object(db_pool, '_connector_factory', mock.Mock(
+                return_value=mock.Mock(connect=mock.Mock(
+                    side_effect=base_connector.ConnectionError('failed'))))):
+            db_pool.evict()
+        self.assertEqual(db_pool.size, 0)
+
+    def test_connection(self):
+        db_pool = self._pool()
+        with db_pool.connection() as connector:
+            self.assertEqual(db_pool.get_stats()['in_use'], 1)
+        self.assertEqual(db_pool.get_stats()['idle'], 1)
+
+        with self.assertRaises(base_connector.ConnectionError):
+            with db_pool.connection() as connector:
+                raise base_connector.ConnectionError('connection lost')
+        connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.size, 0)
+
+    def test_connect_error(self):
+        db_pool = pool.ConnectorPool(
+            'host', connector_factory=mock.Mock(return_value=mock.Mock(
+                connect=mock.Mock(side_effect=base_connector.ConnectionError('failed')))))
+        with self.assertRaises(base_connector.ConnectionError):
+            db_pool.acquire()
+        self.assertEqual(db_pool.size, 0)
+
+    def test_close(self):
+        db_pool = self._pool(min_size=1)
+        connector = db_pool.acquire()
+        idle = db_pool.acquire()
+        db_pool.release(idle)
+
+        db_pool.close()
+        idle.disconnect.assert_called_once_with()
+        connector.disconnect.assert_not_called()
+        db_pool.release(connector)
+        connector.disconnect.assert_called_once_with()
+        self.assertEqual(db_pool.size, 0)
+
+        with self.assertRaises(pool.PoolClosedError):
+            db_pool.acquire()
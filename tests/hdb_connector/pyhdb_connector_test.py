@@ -156,6 +156,35 @@ class TestHDBConnector(unittest.TestCase):
         mock_logger.assert_called_once_with('executing sql query: %s', 'query')
         cursor_mock.close.assert_called_once_with()
 
+    @mock.patch('shaptools.hdb_connector.connectors.pyhdb_connector.pyhdb')
+    @mock.patch('logging.Logger.info')
+    def test_query_stream(self, mock_logger, mock_pyhdb):
+        mock_pyhdb.exceptions.DatabaseError = KeyError
+        mock_cursor = mock.Mock(description='metadata')
+        mock_cursor.fetchmany.side_effect = [['data1'], KeyError('error')]
+        self._conn._connection = mock.Mock()
+        self._conn._connection.cursor.return_value = mock_cursor
+
+        result = self._conn.query_stream('query', batch_size=1)
+
+        mock_cursor.execute.assert_called_once_with('query')
+        iterator = iter(result)
+        self.assertEqual(next(iterator), 'data1')
+        with self.assertRaises(self._pyhdb_connector.base_connector.QueryError):
+            next(iterator)
+        mock_cursor.close.assert_called_once_with()
+        mock_logger.assert_called_once_with('executing sql query: %s', 'query')
+
+    @mock.patch('shaptools.hdb_connector.connectors.pyhdb_connector.pyhdb')
+    @mock.patch('logging.Logger.info')
+    def test_query_stream_error(self, mock_logger, mock_pyhdb):
+        mock_pyhdb.exceptions.DatabaseError = Exception
+        self._conn._connection = mock.Mock()
+        self._conn._connection.cursor.side_effect = Exception('error')
+        with self.assertRaises(self._pyhdb_connector.base_connector.QueryError) as err:
+            self._conn.query_stream('query')
+        self.assertEqual('query failed: error', str(err.exception))
+
     @mock.patch('logging.Logger.info')
     def test_disconnect(self, mock_logger):
         self._conn._connection = mock.Mock()
@@ -0,0 +1,137 @@
+"""
+Unitary tests for metrics.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import logging
+import unittest
+
+from shaptools import metrics, shell
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unitary tests for metrics.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._collector = metrics.MetricsCollector(buckets=(1, 0.1, 10))
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        shell.remove_hook(self._collector)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def _event(self, cmd, operation, duration, returncode=0, output_size=10):
+        event = shell.CommandEvent(cmd, 'prdadm', None, operation)
+        event.duration = duration
+        event.returncode = returncode
+        event.output_size = output_size
+        return event
+
+    def test_command_name(self):
+        self.assertEqual('hdbnsutil -sr_state', metrics.command_name('hdbnsutil -sr_state'))
+        self.assertEqual('HDB version', metrics.command_name('HDB version'))
+        self.assertEqual(
+            'hdbnsutil -sr_register',
+            metrics.command_name('hdbnsutil -sr_register --name=test --remoteHost=host'))
+        self.assertEqual(
+            'sapcontrol GetProcessList',
+            metrics.command_name('sapcontrol -host h -nr 00 -function GetProcessList'))
+        self.assertEqual('sapcontrol -function', metrics.command_name('sapcontrol -function'))
+        self.assertEqual('/path/sapinst', metrics.command_name('/path/sapinst SAPINST_A=b'))
+        self.assertEqual('ls', metrics.command_name('ls /tmp'))
+        self.assertEqual('', metrics.command_name(''))
+
+    def test_collect(self):
+        self._collector.on_start(self._event('HDB version', 'get_version', None))
+        self._collector.on_end(self._event('HDB version', 'get_version', 0.05))
+        self._collector.on_end(self._event('HDB version', 'get_version', 5, returncode=1))
+        error_event = self._event('hdbnsutil -sr_state', None, 20)
+        error_event.error = shell.ShellTimeoutError('cmd', 20)
+        self._collector.on_error(error_event)
+
+        self.assertEqual([
+            {
+                'operation': '',
+                'command': 'hdbnsutil -sr_state',
+                'count': 1,
+                'sum': 20.0,
+                'buckets': {'0.1': 0, '1.0': 0, '10.0': 0},
+                'failures': 0,
+                'errors': 1,
+                'output_bytes': 0
+            },
+            {
+                'operation': 'get_version',
+                'command': 'HDB version',
+                'count': 2,
+                'sum': 5.05,
+                'buckets': {'0.1': 1, '1.0': 1, '10.0': 2},
+                'failures': 1,
+                'errors': 0,
+                'output_bytes': 20
+            }
+        ], self._collector.to_dict())
+        self.assertEqual(self._collector.to_dict(), json.loads(self._collector.to_json()))
+
+        self._collector.reset()
+        self.assertEqual([], self._collector.to_dict())
+
+    def test_to_prometheus(self):
+        self._collector.on_end(self._event('HDB version', 'get_"version"', 0.5))
+        text = self._collector.to_prometheus()
+        labels = 'operation="get_\\"version\\"",command="HDB version"'
+        self.assertTrue('# TYPE shaptools_command_duration_seconds histogram\n' in text)
+        self.assertTrue(
+            'shaptools_command_duration_seconds_bucket{{{},le="0.1"}} 0\n'.format(labels) in text)
+        self.assertTrue(
+            'shaptools_command_duration_seconds_bucket{{{},le="1.0"}} 1\n'.format(labels) in text)
+        self.assertTrue(
+            'shaptools_command_duration_seconds_bucket{{{},le="+Inf"}} 1\n'.format(labels) in text)
+        self.assertTrue(
+            'shaptools_command_duration_seconds_sum{{{}}} 0.5\n'.format(labels) in text)
+        self.assertTrue(
+            'shaptools_command_duration_seconds_count{{{}}} 1\n'.format(labels) in text)
+        self.assertTrue('# TYPE shaptools_command_failures_total counter\n' in text)
+        self.assertTrue('shaptools_command_output_bytes_total{{{}}} 10\n'.format(labels) in text)
+
+    def test_hook(self):
+        # This test is used to check the collector with real commands
+        shell.add_hook(self._collector)
+        with shell.tagged_operation('test'):
+            shell.execute_cmd('echo text')
+        data = self._collector.to_dict()
+        self.assertEqual(1, len(data))
+        self.assertEqual('test', data[0]['operation'])
+        self.assertEqual('echo text', data[0]['command'])
+        self.assertEqual(5, data[0]['output_bytes'])
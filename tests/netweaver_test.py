@@ -18,13 +18,45 @@ import logging
 import unittest
 import filecmp
 import shutil
+import tempfile
 
 try:
     from unittest import mock
 except ImportError:
     import mock
 
-from shaptools import netweaver
+from shaptools import netweaver, shell, cmdcache, executors
+
+PROCESSES_ASCS1 = '''
+name, description, dispstatus, textstatus, starttime, elapsedtime, pid
+msg_server, MessageServer, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1234
+enserver, EnqueueServer, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1235
+'''
+
+PROCESSES_ASCS2 = '''
+name, description, dispstatus, textstatus, starttime, elapsedtime, pid
+msg_server, MessageServer, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1234
+enq_server, Enqueue Server 2, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1235
+'''
+
+PROCESSES_ERS1 = '''
+name, description, dispstatus, textstatus, starttime, elapsedtime, pid
+enrepserver, EnqueueReplicator, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1236
+'''
+
+PROCESSES_ERS2 = '''
+name, description, dispstatus, textstatus, starttime, elapsedtime, pid
+enq_replicator, Enqueue Replicator 2, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1236
+'''
+
+PROCESSES_APP = '''
+name, description, dispstatus, textstatus, starttime, elapsedtime, pid
+disp+work, Dispatcher, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1237
+igswd_mt, IGS Watchdog, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1238
+gwrd, Gateway, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1239
+icman, ICM, GREEN, Running, 2019 10 29 11:07:05, 0:05:36, 1240
+'''
+
 
 class TestNetweaver(unittest.TestCase):
     """
@@ -94,6 +126,68 @@ class TestNetweaver(unittest.TestCase):
         mock_execute.assert_called_once_with(cmd, 'ha1adm', 'pass', None)
         self.assertEqual(proc_mock, result)
 
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_sapcontrol_timeout(self, mock_execute):
+        timeouts = []
+        mock_execute.side_effect = lambda *args: timeouts.append(shell.get_timeout()) or \
+            mock.Mock(returncode=0)
+        self._netweaver.command_timeout = 10
+
+        self._netweaver._execute_sapcontrol('mycommand')
+
+        mock_execute.assert_called_once_with(
+            'sapcontrol -nr 00 -function mycommand', 'ha1adm', 'pass', None)
+        self.assertTrue(0 < timeouts[0] <= 10)
+        self.assertIsNone(shell.get_timeout())
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_sapcontrol_cache(self, mock_execute):
+        mock_execute.return_value = mock.Mock(returncode=3)
+        self._netweaver.cache = cmdcache.CommandCache()
+
+        self._netweaver.get_process_list()
+        self._netweaver.get_process_list()
+        self._netweaver.get_process_list(host='other')
+        self.assertEqual(2, mock_execute.call_count)
+        self.assertEqual(1, self._netweaver.cache.hits)
+
+        mock_execute.return_value = mock.Mock(returncode=0)
+        self._netweaver.stop()
+        self._netweaver.get_process_list()
+        self.assertEqual(4, mock_execute.call_count)
+        mock_execute.assert_called_with(
+            'sapcontrol -nr 00 -function GetProcessList', 'ha1adm', 'pass', None)
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_sapcontrol_cache_error(self, mock_execute):
+        mock_execute.side_effect = [
+            mock.Mock(returncode=1), mock.Mock(returncode=3), mock.Mock(returncode=1),
+            mock.Mock(returncode=0)]
+        self._netweaver.cache = cmdcache.CommandCache()
+
+        self._netweaver.get_process_list(exception=False)
+        self._netweaver.get_process_list()
+        self._netweaver.get_process_list()
+        self.assertEqual(2, mock_execute.call_count)
+        self.assertEqual(1, self._netweaver.cache.hits)
+
+        self._netweaver._execute_sapcontrol('GetSystemInstanceList', exception=False)
+        self._netweaver._execute_sapcontrol('GetSystemInstanceList')
+        self._netweaver._execute_sapcontrol('GetSystemInstanceList')
+        self.assertEqual(4, mock_execute.call_count)
+        self.assertEqual(2, self._netweaver.cache.hits)
+
+    def test_execute_sapcontrol_executor(self):
+        self.assertEqual(executors.DEFAULT_EXECUTOR, self._netweaver.executor)
+        executor = executors.FakeExecutor({
+            'sapcontrol -nr 00 -function GetProcessList': (3, 'processes', '')})
+        instance = netweaver.NetweaverInstance(
+            'ha1', '00', 'pass', remote_host='host', executor=executor)
+
+        self.assertEqual('processes', instance.get_process_list().output)
+        self.assertEqual(
+            [('sapcontrol -nr 00 -function GetProcessList', 'ha1adm', 'host')], executor.calls)
+
     @mock.patch('shaptools.shell.execute_cmd')
     def test_execute_sapcontrol_full(self, mock_execute):
         proc_mock = mock.Mock()
@@ -109,6 +203,46 @@ class TestNetweaver(unittest.TestCase):
         self.assertEqual(proc_mock, result)
 
 
+    @mock.patch('shaptools.shellsession.get_session')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_sapcontrol_session(self, mock_execute, mock_get_session):
+        proc_mock = mock.Mock()
+        proc_mock.returncode = 0
+        mock_get_session.return_value.execute.return_value = proc_mock
+
+        self._netweaver = netweaver.NetweaverInstance(
+            'ha1', '00', 'pass', remote_host='remote', shell_session=True)
+        result = self._netweaver._execute_sapcontrol('mycommand')
+
+        mock_get_session.assert_called_once_with('ha1adm', 'remote')
+        mock_get_session.return_value.execute.assert_called_once_with(
+            'sapcontrol -nr 00 -function mycommand')
+        self.assertEqual(0, mock_execute.call_count)
+        self.assertEqual(proc_mock, result)
+
+    @mock.patch('shaptools.userenv.UserEnvironment')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_execute_sapcontrol_sidadm_env(self, mock_execute, mock_userenv):
+        proc_mock = mock.Mock()
+        proc_mock.returncode = 0
+        mock_userenv.return_value.execute.return_value = proc_mock
+
+        self._netweaver = netweaver.NetweaverInstance('ha1', '00', 'pass', sidadm_env=True)
+        result = self._netweaver._execute_sapcontrol('mycommand')
+
+        mock_userenv.assert_called_once_with(
+            'ha1adm', 'pass', watch_paths=['/usr/sap/HA1/SYS/exe/run'])
+        mock_userenv.return_value.execute.assert_called_once_with(
+            'sapcontrol -nr 00 -function mycommand')
+        self.assertEqual(0, mock_execute.call_count)
+        self.assertEqual(proc_mock, result)
+
+        with self.assertRaises(ValueError) as err:
+            netweaver.NetweaverInstance(
+                'ha1', '00', 'pass', sidadm_env=True, remote_host='remote')
+        self.assertTrue(
+            'sidadm_env option is only available for local instances' in str(err.exception))
+
     def test_execute_sapcontrol_pass_missing(self):
 
         with self.assertRaises(netweaver.NetweaverError) as err:
@@ -153,100 +287,34 @@ class TestNetweaver(unittest.TestCase):
         self.assertEqual('found_attr', attr)
 
     @mock.patch('shaptools.shell.find_pattern')
-    def test_is_ascs_installed(self, mock_find_pattern):
-
-        mock_process = mock.Mock(output='output')
-        mock_find_pattern.side_effect = ['found', 'found', '']
-
-        self.assertTrue(self._netweaver._is_ascs_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'msg_server, MessageServer,.*', 'output'),
-            mock.call(r'enserver, EnqueueServer,.*', 'output')
-        ])
-
-        mock_find_pattern.reset_mock()
-
-        mock_find_pattern.side_effect = ['found', '', 'found']
-
-        self.assertTrue(self._netweaver._is_ascs_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'msg_server, MessageServer,.*', 'output'),
-            mock.call(r'enserver, EnqueueServer,.*', 'output'),
-            mock.call(r'enq_server, Enqueue Server 2,.*', 'output')
-        ])
-
-        mock_find_pattern.reset_mock()
-        mock_find_pattern.side_effect = ['found', '', '']
-
-        self.assertFalse(self._netweaver._is_ascs_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'msg_server, MessageServer,.*', 'output'),
-            mock.call(r'enserver, EnqueueServer,.*', 'output'),
-            mock.call(r'enq_server, Enqueue Server 2,.*', 'output')
-        ])
-
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_is_ers_installed(self, mock_find_pattern):
-
-        mock_process = mock.Mock(output='output')
-        mock_find_pattern.side_effect = ['found', '']
-
-        self.assertTrue(self._netweaver._is_ers_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enrepserver, EnqueueReplicator,.*', 'output'),
-            mock.call(r'enq_replicator, Enqueue Replicator 2,.*', 'output'),
-        ])
-
-        mock_find_pattern.reset_mock()
-        mock_find_pattern.side_effect = ['', 'found']
-
-        self.assertTrue(self._netweaver._is_ers_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enrepserver, EnqueueReplicator,.*', 'output'),
-            mock.call(r'enq_replicator, Enqueue Replicator 2,.*', 'output'),
-        ])
-
-        mock_find_pattern.reset_mock()
-        mock_find_pattern.side_effect = ['', '']
-
-        self.assertFalse(self._netweaver._is_ers_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enrepserver, EnqueueReplicator,.*', 'output'),
-            mock.call(r'enq_replicator, Enqueue Replicator 2,.*', 'output'),
-        ])
-
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_is_app_server_installed(self, mock_find_pattern):
-
-        mock_process = mock.Mock(output='output')
-        mock_find_pattern.side_effect = ['found', 'found', 'found', 'found']
-
-        self.assertTrue(self._netweaver._is_app_server_installed(mock_process))
-
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'disp\+work, Dispatcher,.*', 'output',),
-            mock.call(r'igswd_mt, IGS Watchdog,.*', 'output',),
-            mock.call(r'gwrd, Gateway,.*', 'output',),
-            mock.call(r'icman, ICM,.*', 'output')
-        ])
-
-        mock_find_pattern.reset_mock()
-        mock_find_pattern.side_effect = ['found', 'found', 'found', '']
-
-        self.assertFalse(self._netweaver._is_app_server_installed(mock_process))
+    def test_get_attribute_from_file_agent(self, mock_find_pattern):
+        mock_find_pattern.return_value = 'found_attr'
+        mock_agent = mock.Mock()
+        mock_agent.read_file.return_value = 'filecontent'
+        attr = netweaver.NetweaverInstance.get_attribute_from_file('file', 'attr', mock_agent)
+        mock_agent.read_file.assert_called_once_with('file')
+        mock_find_pattern.assert_called_once_with('attr', 'filecontent')
+        self.assertEqual('found_attr', attr)
 
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'disp\+work, Dispatcher,.*', 'output',),
-            mock.call(r'igswd_mt, IGS Watchdog,.*', 'output',),
-            mock.call(r'gwrd, Gateway,.*', 'output',),
-            mock.call(r'icman, ICM,.*', 'output')
-        ])
+    def test_is_ascs_installed(self):
+        self.assertTrue(self._netweaver._is_ascs_installed(mock.Mock(output=PROCESSES_ASCS1)))
+        self.assertTrue(self._netweaver._is_ascs_installed(mock.Mock(output=PROCESSES_ASCS2)))
+        self.assertFalse(self._netweaver._is_ascs_installed(mock.Mock(
+            output=PROCESSES_ASCS1.replace('enserver', 'other'))))
+        self.assertFalse(self._netweaver._is_ascs_installed(mock.Mock(
+            output=PROCESSES_ASCS2.replace('msg_server', 'other'))))
+        self.assertFalse(self._netweaver._is_ascs_installed(mock.Mock(output=PROCESSES_ERS1)))
+
+    def test_is_ers_installed(self):
+        self.assertTrue(self._netweaver._is_ers_installed(mock.Mock(output=PROCESSES_ERS1)))
+        self.assertTrue(self._netweaver._is_ers_installed(mock.Mock(output=PROCESSES_ERS2)))
+        self.assertFalse(self._netweaver._is_ers_installed(mock.Mock(output=PROCESSES_ASCS1)))
+
+    def test_is_app_server_installed(self):
+        self.assertTrue(
+            self._netweaver._is_app_server_installed(mock.Mock(output=PROCESSES_APP)))
+        self.assertFalse(self._netweaver._is_app_server_installed(mock.Mock(
+            output=PROCESSES_APP.replace('icman', 'other'))))
 
     def test_is_installed(self):
 
@@ -330,67 +398,33 @@ class TestNetweaver(unittest.TestCase):
         self._netweaver.get_process_list.assert_called_once_with(False)
         self._netweaver._is_app_server_installed.assert_called_once_with(processes_mock)
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ascs_ensa_version_ensa1(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [True, False]
-        version = self._netweaver._get_ascs_ensa_version(processes)
-        self.assertTrue(version, 1)
-        mock_find_pattern.assert_called_once_with(r'enserver, EnqueueServer,.*', 'output')
+    def test_get_ascs_ensa_version_ensa1(self):
+        processes = mock.Mock(output=PROCESSES_ASCS1)
+        self.assertEqual(1, self._netweaver._get_ascs_ensa_version(processes))
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ascs_ensa_version_ensa2(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [False, True]
-        version = self._netweaver._get_ascs_ensa_version(processes)
-        self.assertTrue(version, 2)
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enserver, EnqueueServer,.*', 'output'),
-            mock.call(r'enq_server, Enqueue Server 2,.*', 'output')
-        ])
+    def test_get_ascs_ensa_version_ensa2(self):
+        processes = mock.Mock(output=PROCESSES_ASCS2)
+        self.assertEqual(2, self._netweaver._get_ascs_ensa_version(processes))
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ascs_ensa_version_error(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [False, False]
+    def test_get_ascs_ensa_version_error(self):
+        processes = mock.Mock(output=PROCESSES_ERS1)
         with self.assertRaises(ValueError) as err:
             self._netweaver._get_ascs_ensa_version(processes)
         self.assertTrue('ASCS not installed or found' in str(err.exception))
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enserver, EnqueueServer,.*', 'output'),
-            mock.call(r'enq_server, Enqueue Server 2,.*', 'output')
-        ])
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ers_ensa_version_ensa1(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [True, False]
-        version = self._netweaver._get_ers_ensa_version(processes)
-        self.assertTrue(version, 1)
-        mock_find_pattern.assert_called_once_with(r'enrepserver, EnqueueReplicator,.*', 'output')
+    def test_get_ers_ensa_version_ensa1(self):
+        processes = mock.Mock(output=PROCESSES_ERS1)
+        self.assertEqual(1, self._netweaver._get_ers_ensa_version(processes))
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ers_ensa_version_ensa2(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [False, True]
-        version = self._netweaver._get_ers_ensa_version(processes)
-        self.assertTrue(version, 2)
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enrepserver, EnqueueReplicator,.*', 'output'),
-            mock.call(r'enq_replicator, Enqueue Replicator 2,.*', 'output')
-        ])
+    def test_get_ers_ensa_version_ensa2(self):
+        processes = mock.Mock(output=PROCESSES_ERS2)
+        self.assertEqual(2, self._netweaver._get_ers_ensa_version(processes))
 
-    @mock.patch('shaptools.shell.find_pattern')
-    def test_get_ers_ensa_version_error(self, mock_find_pattern):
-        processes = mock.Mock(output='output')
-        mock_find_pattern.side_effect = [False, False]
+    def test_get_ers_ensa_version_error(self):
+        processes = mock.Mock(output=PROCESSES_ASCS1)
         with self.assertRaises(ValueError) as err:
             self._netweaver._get_ers_ensa_version(processes)
         self.assertTrue('ERS not installed or found' in str(err.exception))
-        mock_find_pattern.assert_has_calls([
-            mock.call(r'enrepserver, EnqueueReplicator,.*', 'output'),
-            mock.call(r'enq_replicator, Enqueue Replicator 2,.*', 'output')
-        ])
 
     def test_get_ensa_version_ascs(self):
         self._netweaver.get_process_list = mock.Mock(return_value='output')
@@ -418,15 +452,25 @@ class TestNetweaver(unittest.TestCase):
     @mock.patch('shaptools.shell.execute_cmd')
     def test_remove_old_files(self, mock_execute_cmd):
 
-        mock_output = mock.Mock(output='file_a /tmp/start_dir.cd file_b')
-        mock_execute_cmd.return_value = mock_output
-
         netweaver.NetweaverInstance._remove_old_files('/tmp', 'root', 'pass', None)
 
-        mock_execute_cmd.assert_has_calls([
-            mock.call('printf \'%q \' /tmp/*', 'root', 'pass', None),
-            mock.call('rm -rf file_a  file_b', 'root', 'pass', None)
-        ])
+        mock_execute_cmd.assert_called_once_with(
+            "find /tmp -mindepth 1 -maxdepth 1 ! -name start_dir.cd ! -name '.*' "
+            "-exec rm -rf {} +", 'root', 'pass', None)
+
+    def test_remove_old_files_popen(self):
+        # This test is used to check the find command in a real folder
+        for suffix in ['', '/']:
+            folder = tempfile.mkdtemp()
+            for name in ['start_dir.cd', 'file_a', '.hidden']:
+                open(os.path.join(folder, name), 'w').close()
+            os.mkdir(os.path.join(folder, 'subfolder'))
+            try:
+                netweaver.NetweaverInstance._remove_old_files(
+                    folder + suffix, None, None, None, executors.LocalExecutor())
+                self.assertEqual(['.hidden', 'start_dir.cd'], sorted(os.listdir(folder)))
+            finally:
+                shutil.rmtree(folder)
 
     @mock.patch('shaptools.shell.execute_cmd')
     def test_install(self, mock_execute_cmd):
@@ -441,6 +485,19 @@ class TestNetweaver(unittest.TestCase):
             'SAPINST_INPUT_PARAMETERS_URL=/inifile.params'
         mock_execute_cmd.assert_called_once_with(cmd, 'root', 'pass', None)
 
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    def test_install_stream(self, mock_execute_cmd):
+
+        mock_execute_cmd.return_value = mock.Mock(returncode=0)
+
+        self._netweaver.install(
+            '/path', 'virtual', 'MYPRODUCT', '/inifile.params', 'root', 'pass', stream=True)
+        cmd = '/path/sapinst SAPINST_USE_HOSTNAME=virtual '\
+            'SAPINST_EXECUTE_PRODUCT_ID=MYPRODUCT '\
+            'SAPINST_SKIP_SUCCESSFULLY_FINISHED_DIALOG=true SAPINST_START_GUISERVER=false '\
+            'SAPINST_INPUT_PARAMETERS_URL=/inifile.params'
+        mock_execute_cmd.assert_called_once_with(cmd, 'root', 'pass', None)
+
     @mock.patch('shaptools.netweaver.NetweaverInstance._remove_old_files')
     @mock.patch('shaptools.shell.execute_cmd')
     def test_install_cwd(self, mock_execute_cmd, mock_remove_old_files):
@@ -454,9 +511,55 @@ class TestNetweaver(unittest.TestCase):
             'SAPINST_EXECUTE_PRODUCT_ID=MYPRODUCT '\
             'SAPINST_SKIP_SUCCESSFULLY_FINISHED_DIALOG=true SAPINST_START_GUISERVER=false '\
             'SAPINST_INPUT_PARAMETERS_URL=/inifile.params SAPINST_CWD=/tmp'
-        mock_remove_old_files.assert_called_once_with('/tmp', 'root', 'pass', None)
+        mock_remove_old_files.assert_called_once_with(
+            '/tmp', 'root', 'pass', None, self._netweaver.executor)
         mock_execute_cmd.assert_called_once_with(cmd, 'root', 'pass', None)
 
+    def test_execute_sapcontrol_batch(self):
+        executor = executors.FakeExecutor(default=(0, '', ''))
+        executor.add_result('sapcontrol -host host -nr 01 -function StartWait 15 0', 2)
+        self._netweaver.executor = executor
+
+        results = self._netweaver._execute_sapcontrol_batch(
+            ['StopWait 15 0', 'StartWait 15 0', 'GetProcessList'], host='host', inst='01',
+            exception=False)
+        self.assertEqual([0, 2], [result.returncode for result in results])
+        self.assertEqual([
+            ('sapcontrol -host host -nr 01 -function StopWait 15 0', 'ha1adm', None),
+            ('sapcontrol -host host -nr 01 -function StartWait 15 0', 'ha1adm', None)
+        ], executor.calls)
+
+        with self.assertRaises(netweaver.NetweaverError) as err:
+            self._netweaver._execute_sapcontrol_batch(['StartWait 15 0'], host='host', inst='01')
+        self.assertTrue('Error running sapcontrol command: sapcontrol -host host -nr 01 '
+                        '-function StartWait 15 0' in str(err.exception))
+
+    def test_execute_sapcontrol_batch_session(self):
+        self._netweaver.sidadm_env = True
+        self._netweaver._execute_sapcontrol = mock.Mock(return_value=mock.Mock(returncode=0))
+
+        results = self._netweaver._execute_sapcontrol_batch(['Stop', 'Start'], host='host')
+        self.assertEqual(2, len(results))
+        self._netweaver._execute_sapcontrol.assert_has_calls([
+            mock.call('Stop', exception=False, host='host'),
+            mock.call('Start', exception=False, host='host')])
+
+    def test_install_executor(self):
+        executor = executors.FakeExecutor(default=(0, '', ''))
+
+        self._netweaver.install(
+            '/path', 'virtual', 'MYPRODUCT', '/inifile.params', 'root', 'pass', cwd='/tmp',
+            remote_host='remote', executor=executor)
+
+        self.assertEqual([
+            ("find /tmp -mindepth 1 -maxdepth 1 ! -name start_dir.cd ! -name '.*' "
+             "-exec rm -rf {} +", 'root', 'remote'),
+            ('/path/sapinst SAPINST_USE_HOSTNAME=virtual '
+             'SAPINST_EXECUTE_PRODUCT_ID=MYPRODUCT '
+             'SAPINST_SKIP_SUCCESSFULLY_FINISHED_DIALOG=true SAPINST_START_GUISERVER=false '
+             'SAPINST_INPUT_PARAMETERS_URL=/inifile.params SAPINST_CWD=/tmp', 'root', 'remote')
+        ], executor.calls)
+
     @mock.patch('shaptools.netweaver.NetweaverInstance._remove_old_files')
     @mock.patch('shaptools.shell.execute_cmd')
     def test_install_error_cwd(self, mock_execute_cmd, mock_remove_old_files):
@@ -470,7 +573,7 @@ class TestNetweaver(unittest.TestCase):
                 remote_host='remote', cwd='/tmp/swpm_unnattended')
 
         mock_remove_old_files.assert_called_once_with(
-            '/tmp/swpm_unnattended', 'root', 'pass', 'remote')
+            '/tmp/swpm_unnattended', 'root', 'pass', 'remote', self._netweaver.executor)
 
         cmd = '/path/sapinst SAPINST_USE_HOSTNAME=virtual '\
             'SAPINST_EXECUTE_PRODUCT_ID=MYPRODUCT '\
@@ -553,18 +656,18 @@ class TestNetweaver(unittest.TestCase):
             with mock.patch.object(netweaver.NetweaverInstance, "get_system_instances") as mock_get_system_instances:
                 mock_result = mock.Mock(output='output')
                 mock_get_system_instances.return_value = mock_result
-                with mock.patch.object(netweaver.NetweaverInstance, "stop") as mock_stop:
-                    with mock.patch.object(netweaver.NetweaverInstance, "start") as mock_start:
-                        netweaver.NetweaverInstance._restart_ascs('conf_file', 'ers_pass', 'ascs_pass')
+                with mock.patch.object(
+                        netweaver.NetweaverInstance, "_execute_sapcontrol_batch") as mock_batch:
+                    netweaver.NetweaverInstance._restart_ascs('conf_file', 'ers_pass', 'ascs_pass')
 
         mock_get_attribute.assert_has_calls([
-            mock.call('conf_file',  'NW_readProfileDir.profileDir += +.*/(.*)/profile'),
-            mock.call('conf_file',  'nw_instance_ers.ersInstanceNumber += +(.*)')
+            mock.call('conf_file',  'NW_readProfileDir.profileDir += +.*/(.*)/profile', None),
+            mock.call('conf_file',  'nw_instance_ers.ersInstanceNumber += +(.*)', None)
         ])
         mock_result1.group.assert_called_once_with(1)
         mock_result2.group.assert_called_once_with(1)
 
-        mock_instance.assert_called_once_with('ha1', '00', 'ers_pass', remote_host=None)
+        mock_instance.assert_called_once_with('ha1', '00', 'ers_pass', remote_host=None, executor=None)
 
         mock_get_system_instances.assert_called_once_with(exception=False)
 
@@ -574,10 +677,48 @@ class TestNetweaver(unittest.TestCase):
         mock_ascs_data.group.assert_has_calls([
             mock.call(1), mock.call(2)
         ])
-        mock_stop.assert_called_once_with(
-            host='ascs_hostname', inst='ascs_inst', user='ha1adm', password='ascs_pass')
-        mock_start.assert_called_once_with(
-            host='ascs_hostname', inst='ascs_inst', user='ha1adm', password='ascs_pass')
+        mock_batch.assert_called_once_with(
+            ['StopWait 15 0', 'StartWait 15 0'], host='ascs_hostname', inst='ascs_inst',
+            user='ha1adm', password='ascs_pass')
+
+    @mock.patch('random.uniform')
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
+    @mock.patch('shaptools.netweaver.NetweaverInstance._ascs_restart_needed')
+    @mock.patch('shaptools.netweaver.NetweaverInstance.install')
+    def test_install_ers_deadline(
+            self, mock_install, mock_restart_needed, mock_get_attribute, mock_sleep,
+            mock_time, mock_uniform):
+        mock_time.side_effect = [0, 0, 1, 1, 6, 6, 7, 7, 10]
+        mock_uniform.return_value = 0
+        mock_install.return_value = mock.Mock(returncode=1)
+        mock_restart_needed.return_value = False
+
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            netweaver.NetweaverInstance.install_ers(
+                'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
+                timeout=100, interval=5, deadline=10)
+
+        self.assertTrue('deadline exceeded' in str(err.exception))
+        self.assertEqual(2, mock_install.call_count)
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(3)])
+
+    @mock.patch('time.time')
+    @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
+    @mock.patch('shaptools.netweaver.NetweaverInstance.install')
+    def test_install_ers_stream(self, mock_install, mock_get_attribute, mock_time):
+        mock_time.return_value = 1
+        mock_install.return_value = mock.Mock(returncode=0)
+
+        netweaver.NetweaverInstance.install_ers(
+            'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
+            timeout=5, interval=1, stream=True)
+
+        mock_install.assert_called_once_with(
+            'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
+            exception=False, remote_host=None, cwd=None, executor=None,
+            stream=True)
 
     @mock.patch('time.time')
     @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
@@ -599,7 +740,7 @@ class TestNetweaver(unittest.TestCase):
         mock_result.group.assert_called_once_with(1)
         mock_install.assert_called_once_with(
             'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-            exception=False, remote_host=None, cwd='/tmp')
+            exception=False, remote_host=None, cwd='/tmp', executor=None)
 
     @mock.patch('time.time')
     @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
@@ -626,9 +767,9 @@ class TestNetweaver(unittest.TestCase):
         mock_result.group.assert_called_once_with(1)
         mock_install.assert_called_once_with(
             'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-            exception=False, remote_host=None, cwd='/tmp')
+            exception=False, remote_host=None, cwd='/tmp', executor=None)
         mock_restart_needed.assert_called_once_with(mock_install_result)
-        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ascs_pass', None)
+        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ascs_pass', None, None)
 
     @mock.patch('time.time')
     @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
@@ -656,20 +797,20 @@ class TestNetweaver(unittest.TestCase):
         mock_install.assert_has_calls([
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None)
+                exception=False, remote_host=None, cwd=None, executor=None)
         ])
         mock_restart_needed.assert_has_calls([
             mock.call(mock_install_result),
             mock.call(mock_install_result),
             mock.call(mock_install_result)
         ])
-        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ers_pass', None)
+        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ers_pass', None, None)
         mock_time.assert_has_calls([
             mock.call(),
             mock.call(),
@@ -680,6 +821,7 @@ class TestNetweaver(unittest.TestCase):
             mock.call(1)
         ])
 
+    @mock.patch('random.uniform')
     @mock.patch('time.time')
     @mock.patch('time.sleep')
     @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
@@ -688,13 +830,14 @@ class TestNetweaver(unittest.TestCase):
     @mock.patch('shaptools.netweaver.NetweaverInstance._restart_ascs')
     def test_install_ers_loop_install(
             self, mock_restart, mock_restart_needed, mock_install,
-            mock_get_attribute, mock_sleep, mock_time):
+            mock_get_attribute, mock_sleep, mock_time, mock_uniform):
 
         mock_result = mock.Mock()
         mock_result.group.return_value = 'ers_pass'
         mock_get_attribute.return_value = mock_result
 
-        mock_time.side_effect = [1, 2, 3, 4, 5]
+        mock_time.return_value = 1
+        mock_uniform.return_value = 0
         mock_install_result = mock.Mock(returncode=111)
         mock_install.side_effect = [mock_install_result, mock_install_result, mock_install_result]
         mock_restart_needed.side_effect = [False, False, True]
@@ -707,27 +850,27 @@ class TestNetweaver(unittest.TestCase):
         mock_install.assert_has_calls([
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None)
+                exception=False, remote_host=None, cwd=None, executor=None)
         ])
         mock_restart_needed.assert_has_calls([
             mock.call(mock_install_result),
             mock.call(mock_install_result),
             mock.call(mock_install_result)
         ])
-        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ers_pass', None)
-        self.assertEqual(mock_time.call_count, 3)
+        mock_restart.assert_called_once_with('conf_file', 'ers_pass', 'ers_pass', None, None)
         self.assertEqual(mock_sleep.call_count, 2)
         mock_sleep.assert_has_calls([
             mock.call(1),
-            mock.call(1)
+            mock.call(2)
         ])
 
+    @mock.patch('random.uniform')
     @mock.patch('time.time')
     @mock.patch('time.sleep')
     @mock.patch('shaptools.netweaver.NetweaverInstance.get_attribute_from_file')
@@ -735,13 +878,14 @@ class TestNetweaver(unittest.TestCase):
     @mock.patch('shaptools.netweaver.NetweaverInstance._ascs_restart_needed')
     def test_install_ers_error_install(
             self, mock_restart_needed, mock_install,
-            mock_get_attribute, mock_sleep, mock_time):
+            mock_get_attribute, mock_sleep, mock_time, mock_uniform):
 
         mock_result = mock.Mock()
         mock_result.group.return_value = 'ers_pass'
         mock_get_attribute.return_value = mock_result
 
-        mock_time.side_effect = [1, 2, 3, 5]
+        mock_time.side_effect = [1, 1, 2, 2, 4, 4]
+        mock_uniform.return_value = 0
         mock_install_result = mock.Mock(returncode=111)
         mock_install.side_effect = [mock_install_result, mock_install_result, mock_install_result]
         mock_restart_needed.side_effect = [False, False, False]
@@ -756,25 +900,25 @@ class TestNetweaver(unittest.TestCase):
         mock_install.assert_has_calls([
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None),
+                exception=False, remote_host=None, cwd=None, executor=None),
             mock.call(
                 'software', 'myhost', 'product', 'conf_file', 'user', 'pass',
-                exception=False, remote_host=None, cwd=None)
+                exception=False, remote_host=None, cwd=None, executor=None)
         ])
         mock_restart_needed.assert_has_calls([
             mock.call(mock_install_result),
             mock.call(mock_install_result),
             mock.call(mock_install_result)
         ])
-        self.assertEqual(mock_time.call_count, 4)
-        self.assertEqual(mock_sleep.call_count, 3)
+        self.assertEqual(mock_time.call_count, 6)
+        # The second delay is shortened to the timeout
+        self.assertEqual(mock_sleep.call_count, 2)
         mock_sleep.assert_has_calls([
             mock.call(1),
-            mock.call(1),
-            mock.call(1)
+            mock.call(2)
         ])
 
     @mock.patch('shaptools.shell.remove_user')
@@ -785,8 +929,10 @@ class TestNetweaver(unittest.TestCase):
 
         self._netweaver.install.assert_called_once_with(
             '/path', 'virtual', 'NW_Uninstall:GENERIC.IND.PD',
-            '/inifile.params', 'root', 'pass', remote_host='remote')
-        mock_remove_user.assert_called_once_with('ha1adm', True, 'root', 'pass', 'remote')
+            '/inifile.params', 'root', 'pass', remote_host='remote',
+            executor=self._netweaver.executor)
+        mock_remove_user.assert_called_once_with(
+            'ha1adm', True, 'root', 'pass', 'remote', executor=self._netweaver.executor)
 
     def test_get_process_list(self):
         mock_result = mock.Mock(returncode=0)
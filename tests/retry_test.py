@@ -0,0 +1,180 @@
+"""
+Unitary tests for retry.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import retry
+from shaptools import shell
+
+class TestRetry(unittest.TestCase):
+    """
+    Unitary tests for retry.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_get_delay(self):
+        retrier = retry.Retry(interval=5, max_interval=30, jitter=0)
+        self.assertEqual(
+            [retrier.get_delay(attempt) for attempt in range(1, 6)], [5, 10, 20, 30, 30])
+
+    @mock.patch('random.uniform')
+    def test_get_delay_jitter(self, mock_uniform):
+        mock_uniform.return_value = 0.05
+        retrier = retry.Retry(interval=10, backoff=3, jitter=0.1)
+        self.assertAlmostEqual(retrier.get_delay(2), 31.5)
+        mock_uniform.assert_called_once_with(-0.1, 0.1)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run(self, mock_time, mock_sleep):
+        mock_time.side_effect = [0, 2, 7, 8, 18, 21]
+        operation = mock.Mock(side_effect=[
+            mock.Mock(returncode=1), mock.Mock(returncode=1), mock.Mock(returncode=0)])
+        retrier = retry.Retry(interval=5, jitter=0)
+
+        result = retrier.run(operation)
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(operation.call_count, 3)
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(10)])
+        self.assertEqual(retrier.stats.to_dict(), {
+            'succeeded': True,
+            'attempt_count': 3,
+            'operation_time': 6,
+            'wait_time': 15,
+            'attempts': [
+                {'number': 1, 'duration': 2, 'returncode': 1, 'delay': 5},
+                {'number': 2, 'duration': 1, 'returncode': 1, 'delay': 10},
+                {'number': 3, 'duration': 3, 'returncode': 0, 'delay': None}
+            ]
+        })
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_return_codes(self, mock_time, mock_sleep):
+        mock_time.return_value = 0
+        retrier = retry.Retry(jitter=0, success_codes=(0, 3))
+        self.assertEqual(retrier.run(mock.Mock(side_effect=[1, 3])), 3)
+        mock_sleep.assert_called_once_with(5)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_is_success(self, mock_time, mock_sleep):
+        mock_time.return_value = 0
+        retrier = retry.Retry()
+        self.assertEqual(retrier.run(mock.Mock(return_value=1), lambda result: True), 1)
+        mock_sleep.assert_not_called()
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_not_retryable(self, mock_time, mock_sleep):
+        mock_time.return_value = 0
+        last = mock.Mock(returncode=2)
+        operation = mock.Mock(side_effect=[mock.Mock(returncode=1), last])
+        retrier = retry.Retry(jitter=0, retry_codes=(1,))
+
+        with self.assertRaises(retry.RetryError) as err:
+            retrier.run(operation)
+
+        self.assertEqual(
+            str(err.exception), 'operation failed after 2 attempts: return code 2 is not retryable')
+        self.assertIs(err.exception.result, last)
+        self.assertIs(err.exception.stats, retrier.stats)
+        self.assertFalse(retrier.stats.succeeded)
+        mock_sleep.assert_called_once_with(5)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_max_attempts(self, mock_time, mock_sleep):
+        mock_time.return_value = 0
+        operation = mock.Mock(return_value=1)
+        retrier = retry.Retry(interval=1, jitter=0, max_attempts=4)
+
+        with self.assertRaises(retry.RetryError) as err:
+            retrier.run(operation)
+
+        self.assertEqual(
+            str(err.exception), 'operation failed after 4 attempts: maximum attempts reached')
+        self.assertEqual(operation.call_count, 4)
+        mock_sleep.assert_has_calls([mock.call(1), mock.call(2), mock.call(4)])
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_timeout(self, mock_time, mock_sleep):
+        mock_time.side_effect = [0, 1, 6, 7, 10, 10]
+        operation = mock.Mock(return_value=1)
+        retrier = retry.Retry(interval=5, jitter=0, timeout=10)
+
+        with self.assertRaises(retry.RetryError) as err:
+            retrier.run(operation)
+
+        self.assertEqual(str(err.exception), 'operation failed after 3 attempts: timeout reached')
+        # The last delay is shortened to the timeout
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(3)])
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_timeout_once(self, mock_time, mock_sleep):
+        mock_time.return_value = 0
+        operation = mock.Mock(return_value=1)
+
+        with self.assertRaises(retry.RetryError):
+            retry.Retry(timeout=0).run(operation)
+
+        operation.assert_called_once_with()
+        mock_sleep.assert_not_called()
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_run_deadline(self, mock_time, mock_sleep):
+        mock_time.side_effect = [0, 0, 1, 1, 6, 6, 7, 7, 10]
+        operation = mock.Mock(return_value=1)
+
+        with self.assertRaises(shell.ShellTimeoutError):
+            with shell.deadline(10):
+                retry.Retry(interval=5, jitter=0).run(operation)
+
+        self.assertEqual(operation.call_count, 2)
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(3)])
@@ -23,7 +23,7 @@ except ImportError:
     import mock
 
 
-from shaptools import saputils
+from shaptools import saputils, executors
 
 class TestSapUtils(unittest.TestCase):
     """
@@ -67,9 +67,36 @@ class TestSapUtils(unittest.TestCase):
             output_dir='/sapmedia/HANA', options='-v')
         
         cmd = '/sapmedia/sapcar.exe -xvf /sapmedia/IMDB_SERVER_LINUX.SAR -v -R /sapmedia/HANA'
-        mock_execute_cmd.assert_called_once_with(cmd, user=None, password=None, remote_host=None)
+        mock_execute_cmd.assert_called_once_with(cmd, None, None, None)
         self.assertEqual(proc_mock, result)
 
+    @mock.patch('shaptools.cmdstream.execute_cmd_stream')
+    @mock.patch('os.path.isfile')
+    def test_extract_sapcar_file_stream(self, mock_sapcar_file, mock_execute_cmd):
+        mock_sapcar_file.side_effect = [True, True]
+        mock_execute_cmd.return_value = mock.Mock(returncode=0)
+
+        result = saputils.extract_sapcar_file(
+            sapcar_exe='/sapmedia/sapcar.exe', sar_file='/sapmedia/IMDB_SERVER_LINUX.SAR',
+            output_dir='/sapmedia/HANA', stream=True)
+
+        cmd = '/sapmedia/sapcar.exe -xvf /sapmedia/IMDB_SERVER_LINUX.SAR -R /sapmedia/HANA'
+        mock_execute_cmd.assert_called_once_with(cmd, None, None, None)
+        self.assertEqual(mock_execute_cmd.return_value, result)
+
+    @mock.patch('os.path.isfile')
+    def test_extract_sapcar_file_executor(self, mock_sapcar_file):
+        mock_sapcar_file.side_effect = [True, True]
+        cmd = '/sapmedia/sapcar.exe -xvf /sapmedia/IMDB_SERVER_LINUX.SAR'
+        executor = executors.FakeExecutor({cmd: (0, 'extracted', '')})
+
+        result = saputils.extract_sapcar_file(
+            sapcar_exe='/sapmedia/sapcar.exe', sar_file='/sapmedia/IMDB_SERVER_LINUX.SAR',
+            user='root', remote_host='remote', executor=executor)
+
+        self.assertEqual('extracted', result.output)
+        self.assertEqual([(cmd, 'root', 'remote')], executor.calls)
+
     @mock.patch('shaptools.shell.execute_cmd')
     @mock.patch('os.path.isfile')
     def test_extract_sapcar_error(self, mock_sapcar_file, mock_execute_cmd):
@@ -83,7 +110,7 @@ class TestSapUtils(unittest.TestCase):
                sapcar_exe='/sapmedia/sapcar.exe', sar_file='/sapmedia/IMDB_SERVER_LINUX.SAR')
 
         cmd = '/sapmedia/sapcar.exe -xvf /sapmedia/IMDB_SERVER_LINUX.SAR'
-        mock_execute_cmd.assert_called_once_with(cmd, user=None, password=None, remote_host=None)
+        mock_execute_cmd.assert_called_once_with(cmd, None, None, None)
         
         self.assertTrue(
             'Error running SAPCAR command' in str(err.exception))
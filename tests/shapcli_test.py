@@ -53,10 +53,12 @@ class TestShapCli(object):
         message = formatter.format(mock_record)
         assert message == 'msg'
 
+    @mock.patch('shaptools.asynclog.setup_async_logging')
     @mock.patch('logging.getLogger')
     @mock.patch('logging.StreamHandler')
     @mock.patch('shaptools.shapcli.DecodedFormatter')
-    def test_setup_logger(self, mock_formatter, mock_stream_handler, mock_get_logger):
+    def test_setup_logger(
+            self, mock_formatter, mock_stream_handler, mock_get_logger, mock_async_logging):
 
         mock_logger_instance = mock.Mock()
         mock_get_logger.return_value = mock_logger_instance
@@ -74,7 +76,7 @@ class TestShapCli(object):
         mock_get_logger.assert_called_once_with()
         mock_stream_instance.setFormatter.assert_called_once_with(mock_formatter_instance)
 
-        mock_logger_instance.addHandler.assert_called_once_with(mock_stream_instance)
+        mock_async_logging.assert_called_once_with(mock_logger_instance, [mock_stream_instance])
         mock_logger_instance.setLevel.assert_called_once_with(level='INFO')
 
         assert logger == mock_logger_instance
@@ -204,7 +206,11 @@ class TestShapCli(object):
                 '(if this value is set user, password and database are omitted'),
             mock.call('--user_name', help='User to connect to sap hana db'),
             mock.call('--user_password', help='Password to connect to sap hana db'),
-            mock.call('--database', help='Database name to connect')
+            mock.call('--database', help='Database name to connect'),
+            mock.call(
+                '--connector', action='store_true',
+                help='Run the query with the python database connector (dbapi or pyhdb) instead '
+                'of hdbsql. user_name and user_password are required')
         ])
 
         mock_hdbsql.add_argument.assert_has_calls([
@@ -214,6 +220,10 @@ class TestShapCli(object):
             mock.call('--user_name', help='User to connect to sap hana db'),
             mock.call('--user_password', help='Password to connect to sap hana db'),
             mock.call('--database', help='Database name to connect'),
+            mock.call(
+                '--connector', action='store_true',
+                help='Run the query with the python database connector (dbapi or pyhdb) instead '
+                'of hdbsql. user_name and user_password are required'),
             mock.call('--query', help='Query to execute')
         ])
 
@@ -333,18 +343,33 @@ class TestShapCli(object):
 
     def test_run_hdbsql(self):
         mock_hana_instance = mock.Mock(sid='prd', inst='00', _password='pass')
-        args = mock.Mock(key_name='key', user_name='user', user_password='pass', database='db')
-
-        mock_hana_instance._hdbsql_connect.return_value = 'hdbsql'
+        args = mock.Mock(
+            key_name='key', user_name='user', user_password='pass', database='db',
+            connector=False)
 
         shapcli.run_hdbsql(mock_hana_instance, args, 'cmd')
 
-        mock_hana_instance._hdbsql_connect.assert_called_once_with(
-            key_name='key', user_name='user', user_password='pass')
+        mock_hana_instance.run_sql.assert_called_once_with(
+            'cmd', 'db', key_name='key', user_name='user', user_password='pass')
+        mock_hana_instance.connect_db.assert_not_called()
 
-        mock_hana_instance._run_hana_command.assert_called_once_with(
-            'hdbsql -d db \\"cmd\\"'
-        )
+    def test_run_hdbsql_connector(self):
+        mock_hana_instance = mock.Mock(sid='prd', inst='00', _password='pass')
+        mock_hana_instance.run_sql.return_value = mock.Mock(records=[('X',)])
+        mock_logger = mock.Mock()
+        args = mock.Mock(
+            key_name=None, user_name='user', user_password='pass', database='db',
+            connector=True)
+
+        shapcli.run_hdbsql(mock_hana_instance, args, 'cmd', mock_logger)
+
+        mock_hana_instance.connect_db.assert_called_once_with('user', 'pass', database='db')
+        mock_hana_instance.run_sql.assert_called_once_with('cmd')
+        mock_hana_instance.disconnect_db.assert_called_once_with()
+        mock_logger.info.assert_has_calls([
+            mock.call('query returned %d records', 1),
+            mock.call(('X',))
+        ])
 
     @mock.patch('shaptools.shapcli.run_hdbsql')
     @mock.patch('shaptools.shapcli.uninstall')
@@ -397,12 +422,14 @@ class TestShapCli(object):
 
         mock_hana_args = mock.Mock(hana='dummy')
         shapcli.run_hana_subcommands(mock_hana_instance, mock_hana_args, mock_logger)
-        mock_run_hdbsql.assert_called_once_with(mock_hana_instance, mock_hana_args, 'SELECT * FROM DUMMY')
+        mock_run_hdbsql.assert_called_once_with(
+            mock_hana_instance, mock_hana_args, 'SELECT * FROM DUMMY', mock_logger)
         mock_run_hdbsql.reset_mock()
 
         mock_hana_args = mock.Mock(hana='hdbsql', query='query')
         shapcli.run_hana_subcommands(mock_hana_instance, mock_hana_args, mock_logger)
-        mock_run_hdbsql.assert_called_once_with(mock_hana_instance, mock_hana_args, 'query')
+        mock_run_hdbsql.assert_called_once_with(
+            mock_hana_instance, mock_hana_args, 'query', mock_logger)
         mock_run_hdbsql.reset_mock()
 
         mock_hana_args = mock.Mock(
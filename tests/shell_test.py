@@ -17,6 +17,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import logging
 import unittest
 import subprocess
+import threading
+import time
 
 try:
     from unittest import mock
@@ -54,6 +56,7 @@ class TestShell(unittest.TestCase):
         Global tearDown.
         """
 
+    @mock.patch('logging.Logger.isEnabledFor', mock.Mock(return_value=True))
     @mock.patch('logging.Logger.info')
     @mock.patch('logging.Logger.error')
     def test_log_results(self, logger_error, logger_info):
@@ -78,6 +81,32 @@ class TestShell(unittest.TestCase):
             mock.call('err2')
         ])
 
+    @mock.patch('logging.Logger.isEnabledFor', mock.Mock(return_value=True))
+    @mock.patch('logging.Logger.info')
+    @mock.patch('logging.Logger.error')
+    def test_log_results_max_lines(self, logger_error, logger_info):
+        shell.log_command_results('line1\nline2\nline3\nline4', 'err1\nerr2', max_lines=2)
+
+        self.assertEqual(logger_info.call_args_list, [
+            mock.call('line1'),
+            mock.call('line2'),
+            mock.call('... %d more lines not logged', 2)
+        ])
+        self.assertEqual(logger_error.call_args_list, [mock.call('err1'), mock.call('err2')])
+
+    @mock.patch('shaptools.shell.iter_lines')
+    @mock.patch('logging.Logger.isEnabledFor')
+    @mock.patch('logging.Logger.info')
+    @mock.patch('logging.Logger.error')
+    def test_log_results_disabled(
+            self, logger_error, logger_info, mock_is_enabled, mock_iter_lines):
+        mock_is_enabled.return_value = False
+        shell.log_command_results('out', 'err')
+        mock_is_enabled.assert_has_calls([mock.call(logging.INFO), mock.call(logging.ERROR)])
+        mock_iter_lines.assert_not_called()
+        logger_info.assert_not_called()
+        logger_error.assert_not_called()
+
     @mock.patch('logging.Logger.info')
     @mock.patch('logging.Logger.error')
     def test_show_output_empty(self, logger_error, logger_info):
@@ -240,27 +269,75 @@ class TestShell(unittest.TestCase):
         result = mock.Mock(returncode=0)
         mock_execute_cmd.return_value = result
 
-        shell.remove_user('user', False, 'root', 'pass', 'remote_host')
+        removal = shell.remove_user('user', False, 'root', 'pass', 'remote_host')
 
         mock_execute_cmd.assert_called_once_with('userdel user', 'root', 'pass', 'remote_host')
+        self.assertEqual(removal.killed, 0)
 
+    @mock.patch('time.sleep')
     @mock.patch('shaptools.shell.execute_cmd')
-    def test_remove_user_force(self, mock_execute_cmd):
+    def test_remove_user_force(self, mock_execute_cmd, mock_sleep):
 
         result1 = mock.Mock(returncode=1, err='userdel: user user is currently used by process 1')
-        result2 = mock.Mock(returncode=1, err='userdel: user user is currently used by process 2')
-        result3 = mock.Mock(returncode=0)
-        mock_execute_cmd.side_effect = [result1, None, result2, None, result3]
+        kill_result = mock.Mock(
+            returncode=0, output='sapstart killed (pid 1)\nhdbindexserver killed (pid 2)\n')
+        pgrep_result1 = mock.Mock(returncode=0)
+        pgrep_result2 = mock.Mock(returncode=1)
+        result2 = mock.Mock(returncode=0)
+        mock_execute_cmd.side_effect = [
+            result1, kill_result, pgrep_result1, pgrep_result2, result2]
 
-        shell.remove_user('user', True, 'root', 'pass')
+        removal = shell.remove_user('user', True, 'root', 'pass')
 
         mock_execute_cmd.assert_has_calls([
             mock.call('userdel user', 'root', 'pass', None),
-            mock.call('kill -9 1', 'root', 'pass', None),
-            mock.call('userdel user', 'root', 'pass', None),
-            mock.call('kill -9 2', 'root', 'pass', None),
+            mock.call('pkill -9 -e -u user', 'root', 'pass', None),
+            mock.call('pgrep -u user', 'root', 'pass', None),
+            mock.call('pgrep -u user', 'root', 'pass', None),
             mock.call('userdel user', 'root', 'pass', None),
         ])
+        mock_sleep.assert_called_once_with(shell.USER_PROCESSES_POLL_INTERVAL)
+        self.assertEqual(removal.user, 'user')
+        self.assertEqual(removal.killed, 2)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    @mock.patch('shaptools.shell.execute_cmd')
+    def test_remove_user_force_wait(self, mock_execute_cmd, mock_time, mock_sleep):
+
+        mock_time.side_effect = [0, 0, 5, 11]
+        result1 = mock.Mock(returncode=1, err='userdel: user user is currently used by process 1')
+        kill_result = mock.Mock(returncode=0, output='sapstart killed (pid 1)\n')
+        pgrep_result = mock.Mock(returncode=0)
+        mock_execute_cmd.side_effect = [result1, kill_result, pgrep_result, pgrep_result, result1]
+
+        with self.assertRaises(shell.ShellError) as err:
+            shell.remove_user('user', True, 'root', 'pass', wait=10)
+
+        self.assertEqual(mock_execute_cmd.call_count, 5)
+        mock_execute_cmd.assert_called_with('userdel user', 'root', 'pass', None)
+        mock_sleep.assert_called_once_with(shell.USER_PROCESSES_POLL_INTERVAL)
+        self.assertTrue('error removing user user' in str(err.exception))
+
+    @mock.patch('time.sleep')
+    def test_remove_user_executor(self, mock_sleep):
+        executor = mock.Mock()
+        executor.execute.side_effect = [
+            mock.Mock(returncode=1, err='userdel: user user is currently used by process 1'),
+            mock.Mock(returncode=0, output='sapstart killed (pid 1)\n'),
+            mock.Mock(returncode=1),
+            mock.Mock(returncode=0)]
+
+        removal = shell.remove_user('user', True, 'root', 'pass', 'remote', executor=executor)
+
+        executor.execute.assert_has_calls([
+            mock.call('userdel user', 'root', 'pass', 'remote'),
+            mock.call('pkill -9 -e -u user', 'root', 'pass', 'remote'),
+            mock.call('pgrep -u user', 'root', 'pass', 'remote'),
+            mock.call('userdel user', 'root', 'pass', 'remote'),
+        ])
+        self.assertFalse(mock_sleep.called)
+        self.assertEqual(removal.killed, 1)
 
     @mock.patch('shaptools.shell.execute_cmd')
     def test_remove_user_error(self, mock_execute_cmd):
@@ -277,17 +354,316 @@ class TestShell(unittest.TestCase):
     @mock.patch('shaptools.shell.execute_cmd')
     def test_remove_user_force_error(self, mock_execute_cmd):
 
-        result1 = mock.Mock(returncode=1, err='userdel: user user is currently used by process 1')
-        result2 = mock.Mock(returncode=1, err='other error')
-        result3 = mock.Mock(returncode=0)
-        mock_execute_cmd.side_effect = [result1, None, result2, None, result3]
+        result = mock.Mock(returncode=1, err='other error')
+        mock_execute_cmd.return_value = result
 
         with self.assertRaises(shell.ShellError) as err:
             shell.remove_user('user', True, 'root', 'pass')
 
-        mock_execute_cmd.assert_has_calls([
-            mock.call('userdel user', 'root', 'pass', None),
-            mock.call('kill -9 1', 'root', 'pass', None),
-            mock.call('userdel user', 'root', 'pass', None)
-        ])
+        mock_execute_cmd.assert_called_once_with('userdel user', 'root', 'pass', None)
         self.assertTrue('error removing user user' in str(err.exception))
+
+    def test_format_remote_cmd_ssh_options(self):
+        cmd = shell.format_remote_cmd('ls -la', 'remote', 'test', ssh_options='-o opt=1')
+        self.assertEqual('ssh -o opt=1 test@remote "bash --login -c \'ls -la\'"', cmd)
+
+    @mock.patch('shaptools.sshpool.SshSessionPool')
+    def test_enable_ssh_pool(self, mock_pool):
+        pool1 = mock.Mock()
+        pool2 = mock.Mock()
+        mock_pool.side_effect = [pool1, pool2]
+
+        self.assertEqual(pool1, shell.enable_ssh_pool(max_sessions=5))
+        self.assertEqual(pool1, shell.SSH_POOL)
+        self.assertEqual(pool2, shell.enable_ssh_pool())
+        pool1.close_all.assert_called_once_with()
+        mock_pool.assert_has_calls([mock.call(max_sessions=5), mock.call()])
+
+        shell.disable_ssh_pool()
+        pool2.close_all.assert_called_once_with()
+        self.assertIsNone(shell.SSH_POOL)
+
+    @mock.patch('shaptools.shell.SSH_POOL')
+    @mock.patch('shaptools.shell.ProcessResult')
+    @mock.patch('subprocess.Popen')
+    def test_execute_cmd_remote_pool(self, mock_popen, mock_process, mock_pool):
+
+        mock_pool.ssh_options.return_value = '-o ControlPath=path'
+        mock_popen_inst = mock.Mock()
+        mock_popen_inst.returncode = 0
+        mock_popen_inst.communicate.return_value = (b'out', b'err')
+        mock_popen.return_value = mock_popen_inst
+
+        shell.execute_cmd('ls', 'test', 'pass', 'remote')
+
+        mock_pool.ssh_options.assert_called_once_with('test', 'remote')
+        mock_popen.assert_called_once_with(
+            ['ssh', '-o', 'ControlPath=path', 'test@remote', "bash --login -c 'ls'"],
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    @mock.patch('shaptools.shell.format_su_cmd')
+    @mock.patch('shaptools.shell.format_remote_cmd')
+    def test_format_cmd(self, mock_remote, mock_su):
+        mock_remote.return_value = 'remote cmd'
+        mock_su.return_value = 'su cmd'
+        self.assertEqual('ls', shell.format_cmd('ls'))
+        self.assertEqual('su cmd', shell.format_cmd('ls', 'user'))
+        mock_su.assert_called_once_with('ls', 'user')
+        self.assertEqual('remote cmd', shell.format_cmd('ls', 'user', 'remote'))
+        mock_remote.assert_called_once_with('ls', 'remote', 'user')
+        shell.format_cmd('ls', 'user', 'remote', '-o Port=2222')
+        mock_remote.assert_called_with('ls', 'remote', 'user', ssh_options='-o Port=2222')
+
+    def test_execute_cmd_timeout_popen(self):
+        # This test is used to check that the whole process group is killed
+        start_time = time.time()
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            shell.execute_cmd('sh -c "sleep 30 | cat; echo done"', timeout=0.5)
+        self.assertLess(time.time() - start_time, 10)
+        self.assertEqual(0.5, err.exception.timeout)
+        self.assertTrue('timed out after 0.5 seconds' in str(err.exception))
+
+        result = shell.execute_cmd('echo fast', timeout=5)
+        self.assertEqual('fast\n', result.output)
+
+    @mock.patch('shaptools.shell.ProcessResult')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('shaptools.shell.Watchdog')
+    def test_execute_cmd_default_timeout(self, mock_watchdog, mock_popen, mock_process):
+        mock_popen.return_value.communicate.return_value = (b'out', b'err')
+        mock_watchdog.return_value.__enter__.return_value.expired = False
+        with mock.patch('shaptools.shell.DEFAULT_TIMEOUT', 10):
+            shell.execute_cmd('ls')
+        mock_popen.assert_called_once_with(
+            ['ls'], stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+            preexec_fn=mock.ANY)
+        mock_watchdog.assert_called_once_with(mock_popen.return_value, 10)
+
+    def test_get_timeout(self):
+        self.assertIsNone(shell.get_timeout())
+        self.assertEqual(5, shell.get_timeout(5))
+        with mock.patch('shaptools.shell.DEFAULT_TIMEOUT', 10):
+            self.assertEqual(10, shell.get_timeout())
+            self.assertEqual(5, shell.get_timeout(5))
+
+    @mock.patch('time.time')
+    def test_deadline(self, mock_time):
+        mock_time.return_value = 100
+        with shell.deadline(10) as active_deadline:
+            self.assertEqual(110, active_deadline)
+            self.assertEqual(10, shell.get_timeout())
+            self.assertEqual(5, shell.get_timeout(5))
+            with shell.deadline(20) as nested_deadline:
+                self.assertEqual(110, nested_deadline)
+            with shell.deadline(None) as nested_deadline:
+                self.assertEqual(110, nested_deadline)
+            with shell.deadline(2) as nested_deadline:
+                self.assertEqual(102, nested_deadline)
+            self.assertEqual(110, shell._CONTEXT.deadline)
+            mock_time.return_value = 110
+            with self.assertRaises(shell.ShellTimeoutError) as err:
+                shell.get_timeout()
+            self.assertTrue('deadline exceeded' in str(err.exception))
+        self.assertIsNone(shell._CONTEXT.deadline)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    def test_bounded_sleep(self, mock_time, mock_sleep):
+        shell.bounded_sleep(5)
+        mock_time.return_value = 100
+        with shell.deadline(2):
+            shell.bounded_sleep(5)
+        mock_sleep.assert_has_calls([mock.call(5), mock.call(2)])
+
+    @mock.patch('time.sleep')
+    @mock.patch('os.killpg')
+    def test_kill_process_group(self, mock_killpg, mock_sleep):
+        mock_proc = mock.Mock(pid=10)
+        mock_proc.poll.side_effect = [None, 0]
+        shell.kill_process_group(mock_proc)
+        mock_killpg.assert_has_calls([
+            mock.call(10, shell.signal.SIGTERM), mock.call(10, shell.signal.SIGKILL)])
+        mock_sleep.assert_called_once_with(0.1)
+
+        mock_killpg.reset_mock()
+        mock_killpg.side_effect = OSError
+        shell.kill_process_group(mock_proc)
+        mock_killpg.assert_called_once_with(10, shell.signal.SIGTERM)
+
+    @mock.patch('shaptools.shell.kill_process_group')
+    def test_watchdog(self, mock_kill):
+        mock_proc = mock.Mock(pid=10)
+        with shell.Watchdog(mock_proc, None) as watchdog:
+            self.assertIsNone(watchdog._timer)
+        with shell.Watchdog(mock_proc, 10) as watchdog:
+            pass
+        self.assertFalse(watchdog.expired)
+        with shell.Watchdog(mock_proc, 0.01) as watchdog:
+            watchdog._timer.join()
+        self.assertTrue(watchdog.expired)
+        mock_kill.assert_called_once_with(mock_proc)
+
+    def test_pattern_scanner(self):
+        scanner = shell.PatternScanner([
+            ('version', r'\s+version:\s+(\d+.\d+.\d+).*'),
+            ('mode', r'mode: (\w+)'),
+            ('both', r'.*mode: primary'),
+            ('missing', r'missing')
+        ])
+        found = scanner.scan('header\n  version:  2.00.040.00\nmode: primary\nmode: sync\n')
+        self.assertEqual(['version', 'mode', 'both'], sorted(found, key=scanner.names.index))
+        self.assertEqual('2.00.040', found['version'].group(1))
+        # The first matching line is returned and a line can match multiple patterns
+        self.assertEqual('primary', found['mode'].group(1))
+        self.assertEqual('mode: primary', found['both'].group(0))
+        self.assertEqual({}, scanner.scan(''))
+
+    def test_pattern_scanner_all_found(self):
+        scanner = shell.PatternScanner([('first', 'a'), ('second', 'b')])
+        scanner._patterns = [mock.Mock(wraps=pattern) for pattern in scanner._patterns]
+        found = scanner.scan('a\nb\na\nb\n')
+        self.assertEqual(['first', 'second'], sorted(found))
+        # The scan stops when all the patterns are found
+        self.assertEqual(2, scanner._patterns[1].match.call_count)
+
+    def test_process_result(self):
+        result = shell.ProcessResult('cmd', 0, b'line1\nline2\n', b'err\n')
+        self.assertEqual(b'line1\nline2\n', result._output)
+        self.assertIsNone(result._output_text)
+        self.assertEqual(['line1', 'line2'], list(result.iter_lines()))
+        self.assertEqual(['err'], list(result.iter_lines(err=True)))
+        self.assertEqual('line1\nline2\n', result.output)
+        # The raw output is released once it's decoded
+        self.assertIsNone(result._output)
+        self.assertEqual(['line1', 'line2'], list(result.iter_lines()))
+        self.assertEqual('err\n', result.err)
+
+        result.output = 'new'
+        result.err = 'new err'
+        self.assertEqual('new', result.output)
+        self.assertEqual('new err', result.err)
+        with self.assertRaises(AttributeError):
+            result.other = 'value'
+
+    @mock.patch('shaptools.shell.SPILL_THRESHOLD', 8)
+    def test_process_result_spill(self):
+        result = shell.ProcessResult('cmd', 0, b'line1\nline2\nlast', b'small')
+        self.assertTrue(hasattr(result._output, 'fileno'))
+        self.assertEqual(b'small', result._err)
+        self.assertEqual(['line1', 'line2', 'last'], list(result.iter_lines()))
+        self.assertEqual('line1\nline2\nlast', result.output)
+        self.assertEqual('line1\nline2\nlast', result.output)
+        self.assertIsNone(result._output_text)
+        self.assertEqual('small', result.err)
+
+    def test_iter_lines(self):
+        self.assertEqual(['a', '', 'b'], list(shell.iter_lines('a\n\nb\n')))
+        self.assertEqual(['a', 'b'], list(shell.iter_lines(b'a\nb')))
+        self.assertEqual([], list(shell.iter_lines(b'')))
+        self.assertEqual([u'\ufffd'], list(shell.iter_lines(b'\xff', 'replace')))
+
+    def test_add_remove_hook(self):
+        hook = shell.CommandHook()
+        shell.add_hook(hook)
+        shell.add_hook(hook)
+        self.assertEqual([hook], shell.HOOKS)
+        shell.remove_hook(hook)
+        shell.remove_hook(hook)
+        self.assertEqual([], shell.HOOKS)
+
+    @mock.patch('time.time')
+    def test_instrument(self, mock_time):
+        hook = mock.Mock()
+        events = []
+        hook.on_start.side_effect = lambda event: events.append(
+            ('start', event.cmd, event.user, event.host, event.operation, event.duration))
+        hook.on_end.side_effect = lambda event: events.append(
+            ('end', event.duration, event.returncode, event.output_size))
+        mock_time.side_effect = [10, 12]
+        execute = mock.Mock(return_value=mock.Mock(returncode=1, output_size=20))
+
+        with mock.patch('shaptools.shell.HOOKS', [hook]):
+            with shell.tagged_operation('operation'):
+                result = shell.instrument('ls', 'user', 'host', execute)
+
+        self.assertEqual(execute.return_value, result)
+        self.assertEqual([
+            ('start', 'ls', 'user', 'host', 'operation', None), ('end', 2, 1, 20)], events)
+        self.assertIsNone(shell.get_operation())
+
+    def test_instrument_hook_error(self):
+        failing_hook = mock.Mock()
+        failing_hook.on_start.side_effect = ValueError('hook error')
+        execute = mock.Mock()
+
+        with mock.patch('shaptools.shell.HOOKS', [failing_hook]):
+            result = shell.instrument('ls', 'user', 'host', execute)
+
+        self.assertEqual(execute.return_value, result)
+        failing_hook.on_end.assert_called_once_with(mock.ANY)
+
+    @mock.patch('time.time')
+    def test_instrument_error(self, mock_time):
+        hook = mock.Mock()
+        mock_time.side_effect = [10, 15]
+        execute = mock.Mock(side_effect=shell.ShellTimeoutError('ls', 5))
+
+        with mock.patch('shaptools.shell.HOOKS', [hook]):
+            with self.assertRaises(shell.ShellTimeoutError):
+                shell.instrument('ls', 'user', None, execute)
+
+        event = hook.on_error.call_args[0][0]
+        self.assertEqual(5, event.duration)
+        self.assertEqual(execute.side_effect, event.error)
+        self.assertEqual(0, hook.on_end.call_count)
+
+    @mock.patch('time.time')
+    def test_instrument_batch_error(self, mock_time):
+        hook = mock.Mock()
+        mock_time.side_effect = [10, 15] + [15] * 4
+        execute = mock.Mock(side_effect=shell.ShellTimeoutError('ls; pwd', 5))
+
+        with mock.patch('shaptools.shell.HOOKS', [hook]):
+            with self.assertRaises(shell.ShellTimeoutError):
+                shell.instrument_batch(['ls', 'pwd'], 'user', None, execute)
+
+        events = [call[0][0] for call in hook.on_error.call_args_list]
+        self.assertEqual(['ls', 'pwd'], [event.cmd for event in events])
+        self.assertEqual([5, 5], [event.duration for event in events])
+        self.assertEqual(0, hook.on_end.call_count)
+
+    def test_instrument_no_hooks(self):
+        execute = mock.Mock()
+        self.assertEqual(execute.return_value, shell.instrument('ls', None, None, execute))
+
+    def test_tag_operation(self):
+        @shell.tag_operation
+        def outer():
+            self.assertEqual('outer', shell.get_operation())
+            inner()
+            self.assertEqual('outer', shell.get_operation())
+            return 'result'
+
+        @shell.tag_operation
+        def inner():
+            self.assertEqual('inner', shell.get_operation())
+
+        self.assertEqual('result', outer())
+        self.assertEqual('outer', outer.__name__)
+        self.assertIsNone(shell.get_operation())
+
+    def test_context(self):
+        with shell.tagged_operation('operation'):
+            with shell.deadline(100):
+                context = shell.get_context()
+        contexts = []
+
+        def worker():
+            shell.set_context(context)
+            contexts.append((shell.get_operation(), shell._CONTEXT.deadline))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual([('operation', context['deadline'])], contexts)
+        self.assertIsNone(shell.get_operation())
@@ -0,0 +1,175 @@
+"""
+Unitary tests for shellsession.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+import subprocess
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import shellsession, shell
+
+class TestShellSession(unittest.TestCase):
+    """
+    Unitary tests for shellsession.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._session = shellsession.ShellSession()
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+        self._session.close()
+        shellsession.close_sessions()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_execute(self):
+        # This test is used to check the session framing with a real shell
+        result = self._session.execute('echo out; echo err >&2; exit 3')
+        self.assertEqual(3, result.returncode)
+        self.assertEqual('out\n', result.output)
+        self.assertEqual('err\n', result.err)
+        self.assertEqual('echo out; echo err >&2; exit 3', result.cmd)
+
+        result = self._session.execute('printf text')
+        self.assertEqual(0, result.returncode)
+        self.assertEqual('text', result.output)
+        self.assertEqual('', result.err)
+
+    def test_execute_same_shell(self):
+        pid = self._session.execute('echo $$').output
+        self.assertEqual(pid, self._session.execute('echo $$').output)
+        # Each command runs in its own subshell, so the state is not shared
+        self._session.execute('export SHAPTOOLS_TEST=value')
+        self.assertEqual('\n', self._session.execute('echo $SHAPTOOLS_TEST').output)
+
+    def test_execute_respawn(self):
+        first_pid = self._session.execute('echo $$').output
+        self._session._proc.kill()
+        self._session._proc.wait()
+        result = self._session.execute('echo $$')
+        self.assertEqual(0, result.returncode)
+        self.assertNotEqual(first_pid, result.output)
+
+    def test_execute_shell_exit(self):
+        self._session.execute('echo $$')
+        with self.assertRaises(shell.ShellError) as err:
+            self._session.execute('kill -9 $$')
+        self.assertTrue(
+            'shell session finished while running the command' in str(err.exception))
+        self.assertIsNone(self._session._proc)
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('shaptools.shell.format_cmd')
+    def test_spawn(self, mock_format_cmd, mock_popen):
+        mock_format_cmd.return_value = 'su -lc "exec bash -s" prdadm'
+        session = shellsession.ShellSession('prdadm', 'remote')
+        session._spawn()
+        mock_format_cmd.assert_called_once_with('exec bash -s', 'prdadm', 'remote')
+        mock_popen.assert_called_once_with(
+            ['su', '-lc', 'exec bash -s', 'prdadm'], preexec_fn=mock.ANY,
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(mock_popen.return_value, session._proc)
+
+    def test_execute_unwrap_cmd(self):
+        session = shellsession.ShellSession('prdadm')
+        session._send = mock.Mock()
+        session._read_output = mock.Mock(return_value=(0, b'', b''))
+        result = session.execute('echo \\"text\\"')
+        self.assertTrue('\necho "text"\n' in session._send.call_args[0][0])
+        self.assertEqual('echo \\"text\\"', result.cmd)
+
+    def test_execute_banner(self):
+        # The login shell messages written before the first command are dropped
+        self._session.LOCAL_SHELL_CMD = \
+            'bash -c "echo banner; echo banner-err >&2; exec bash -s"'
+        result = self._session.execute('echo out; echo err >&2')
+        self.assertEqual('out\n', result.output)
+        self.assertEqual('err\n', result.err)
+
+    def test_strip_start(self):
+        self.assertEqual(b'out\n', shellsession._strip_start(b'banner\nM_START\nout\n', 'M'))
+        self.assertEqual(b'out\n', shellsession._strip_start(b'out\n', 'M'))
+
+    def test_get_session(self):
+        session = shellsession.get_session('prdadm', 'remote')
+        self.assertEqual('prdadm', session.user)
+        self.assertEqual('remote', session.remote_host)
+        self.assertEqual(session, shellsession.get_session('prdadm', 'remote'))
+        self.assertNotEqual(session, shellsession.get_session('prdadm'))
+
+    def test_close_sessions(self):
+        session = shellsession.get_session()
+        session.execute('true')
+        self.assertTrue(session.is_alive())
+        shellsession.close_sessions()
+        self.assertFalse(session.is_alive())
+        self.assertNotEqual(session, shellsession.get_session())
+
+    def test_close_finished(self):
+        self._session.execute('true')
+        proc = self._session._proc
+        proc.kill()
+        proc.wait()
+        self._session.close()
+        self.assertTrue(proc.stdin.closed)
+        self.assertTrue(proc.stdout.closed)
+        self.assertIsNone(self._session._proc)
+
+    def test_close_running(self):
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(self._session.execute('sleep 0.5; echo ok')))
+        thread.start()
+        while not self._session._lock.locked():
+            time.sleep(0.01)
+        # close waits until the running command finishes
+        self._session.close()
+        thread.join()
+        self.assertEqual('ok\n', results[0].output)
+        self.assertIsNone(self._session._proc)
+
+    def test_execute_timeout(self):
+        self._session.execute('true')
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            self._session.execute('sleep 30', timeout=0.5)
+        self.assertEqual('sleep 30', err.exception.cmd)
+        self.assertIsNone(self._session._proc)
+        # The session is respawned
+        self.assertEqual('ok\n', self._session.execute('echo ok').output)
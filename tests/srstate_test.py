@@ -0,0 +1,283 @@
+"""
+Unitary tests for srstate.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+from shaptools import srstate
+
+SR_STATE_OUTPUT = """
+checking for active or inactive nameserver ...
+SAPCONTROL-OK: <begin>
+online=true
+mode=syncmem
+operation mode=logreplay
+site id=2
+site name=PRAGUE
+isSource=true
+isConsumer=true
+siteMapping/NUREMBERG=PRAGUE
+siteMapping/PRAGUE=BERLIN
+siteMapping/NUREMBERG=MADRID
+siteTier/NUREMBERG=1
+siteTier/PRAGUE=2
+siteTier/MADRID=2
+siteTier/BERLIN=3
+siteReplicationMode/NUREMBERG=primary
+siteReplicationMode/PRAGUE=syncmem
+siteReplicationMode/MADRID=async
+siteReplicationMode/BERLIN=async
+siteOperationMode/NUREMBERG=primary
+siteOperationMode/PRAGUE=logreplay
+siteOperationMode/MADRID=logreplay
+siteOperationMode/BERLIN=logreplay
+mapping/hana01=NUREMBERG/hana01
+mapping/hana01=PRAGUE/hana03
+mapping/hana01=MADRID/hana05
+mapping/hana01=BERLIN/hana07
+mapping/hana02=NUREMBERG/hana02
+mapping/hana02=PRAGUE/hana04
+mapping/hana02=MADRID/hana06
+mapping/hana02=BERLIN/hana08
+SAPCONTROL-OK: <end>
+done.
+"""
+
+SR_STATUS_OUTPUT = """SAPCONTROL-OK: <begin>
+service/hana01/30001/SHIPPED_LOG_POSITION_TIME=2020-03-10 10:38:13.284573
+service/hana01/30001/LAST_LOG_POSITION_TIME=2020-03-10 10:38:13.284573
+service/hana01/30001/SHIPPED_FULL_REPLICA_DURATION=1337425
+service/hana01/30001/REPLAYED_LOG_POSITION_TIME=2020-03-10 10:38:13.284573
+service/hana01/30001/SITE_ID=1
+service/hana01/30001/SECONDARY_SITE_NAME=PRAGUE
+service/hana01/30001/SECONDARY_HOST=hana02
+service/hana01/30001/SECONDARY_SITE_ID=2
+service/hana01/30001/SECONDARY_PORT=30001
+service/hana01/30001/SECONDARY_ACTIVE_STATUS=YES
+service/hana01/30001/DATABASE=SYSTEMDB
+service/hana01/30001/SERVICE_NAME=nameserver
+service/hana01/30001/SITE_NAME=NUREMBERG
+service/hana01/30001/REPLICATION_MODE=SYNC
+service/hana01/30001/REPLICATION_STATUS=ACTIVE
+service/hana01/30001/REPLICATION_STATUS_DETAILS=
+service/hana01/30001/SHIPPED_LOG_POSITION=38112256
+service/hana01/30001/LAST_LOG_POSITION=38112256
+service/hana01/30007/SHIPPED_LOG_POSITION_TIME=2020-03-10 10:38:10.784573
+service/hana01/30007/LAST_LOG_POSITION_TIME=2020-03-10 10:38:13.284573
+service/hana01/30007/SITE_ID=1
+service/hana01/30007/SECONDARY_SITE_NAME=PRAGUE
+service/hana01/30007/SECONDARY_HOST=hana02
+service/hana01/30007/SECONDARY_SITE_ID=2
+service/hana01/30007/SECONDARY_PORT=30007
+service/hana01/30007/SECONDARY_ACTIVE_STATUS=YES
+service/hana01/30007/DATABASE=SYSTEMDB
+service/hana01/30007/SERVICE_NAME=xsengine
+service/hana01/30007/SITE_NAME=NUREMBERG
+service/hana01/30007/REPLICATION_MODE=SYNC
+service/hana01/30007/REPLICATION_STATUS=SYNCING
+service/hana01/30007/REPLICATION_STATUS_DETAILS=Full Replica: 25 % (12/48 MB)
+service/hana01/30007/SHIPPED_LOG_POSITION=1536
+service/hana01/30007/LAST_LOG_POSITION=2048
+site/2/SITE_NAME=PRAGUE
+site/2/SOURCE_SITE_ID=1
+site/2/REPLICATION_MODE=SYNC
+site/2/REPLICATION_STATUS=ACTIVE
+overall_replication_status=ACTIVE
+site/1/REPLICATION_MODE=PRIMARY
+site/1/SITE_NAME=NUREMBERG
+local_site_id=1
+site_name=NUREMBERG
+SAPCONTROL-OK: <end>
+"""
+
+
+class TestSrState(unittest.TestCase):
+    """
+    Unitary tests for srstate.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._state = srstate.SrState.parse(SR_STATE_OUTPUT)
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_entries(self):
+        self.assertEqual(self._state.mode, 'syncmem')
+        self.assertEqual(self._state.site_id, '2')
+        self.assertEqual(self._state.site_name, 'PRAGUE')
+        self.assertEqual(self._state.operation_mode, 'logreplay')
+        self.assertEqual(self._state.get('isSource'), 'true')
+        self.assertIsNone(self._state.get('other'))
+        self.assertFalse(self._state.is_primary)
+
+    def test_sites(self):
+        self.assertEqual(
+            [site.name for site in self._state.sites], ['NUREMBERG', 'MADRID', 'PRAGUE', 'BERLIN'])
+        self.assertEqual(self._state.primary_site, srstate.Site(
+            name='NUREMBERG', tier=1, replication_mode='primary', operation_mode='primary',
+            source=None, targets=('PRAGUE', 'MADRID'), hosts=frozenset(['hana01', 'hana02'])))
+        self.assertEqual(self._state.local_site.source, 'NUREMBERG')
+        self.assertEqual(self._state.local_site.targets, ('BERLIN',))
+        self.assertEqual(self._state.site('BERLIN').source, 'PRAGUE')
+        self.assertIsNone(self._state.site('OTHER'))
+
+    def test_tiers(self):
+        self.assertEqual(
+            sorted(site.name for site in self._state.sites_in_tier(2)), ['MADRID', 'PRAGUE'])
+        self.assertEqual(self._state.hosts_in_tier(3), frozenset(['hana07', 'hana08']))
+        self.assertEqual(self._state.hosts_in_tier(4), frozenset())
+
+    def test_host_mapping(self):
+        self.assertEqual(self._state.host_mapping('hana02'), {
+            'NUREMBERG': 'hana02', 'PRAGUE': 'hana04', 'MADRID': 'hana06', 'BERLIN': 'hana08'})
+        self.assertEqual(self._state.host_mapping('other'), {})
+
+    def test_to_dict(self):
+        data = self._state.to_dict()
+        self.assertEqual(data['mode'], 'syncmem')
+        self.assertEqual(data['sites']['PRAGUE'], {
+            'tier': 2, 'replication_mode': 'syncmem', 'operation_mode': 'logreplay',
+            'source': 'NUREMBERG', 'targets': ['BERLIN'], 'hosts': ['hana03', 'hana04']})
+        self.assertEqual(data['host_mappings']['hana01']['BERLIN'], 'hana07')
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self._state.mode = 'primary'
+        with self.assertRaises(AttributeError):
+            self._state._entries = {}
+        with self.assertRaises(AttributeError):
+            del self._state._sites
+        self._state.host_mapping('hana01')['PRAGUE'] = 'other'
+        self.assertEqual(self._state.host_mapping('hana01')['PRAGUE'], 'hana03')
+
+    def test_not_configured(self):
+        state = srstate.SrState.parse('online=true\nmode=none\n')
+        self.assertEqual(state.mode, 'none')
+        self.assertIsNone(state.primary_site)
+        self.assertIsNone(state.local_site)
+        self.assertEqual(state.sites, ())
+
+
+class TestReplicationStatus(unittest.TestCase):
+    """
+    Unitary tests for srstate.py replication status parsing.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_parse_replication_status(self):
+        status = srstate.parse_replication_status(SR_STATUS_OUTPUT)
+
+        self.assertEqual(status['overall_replication_status'], 'ACTIVE')
+        self.assertEqual(status['local_site_id'], '1')
+        self.assertEqual(status['site_name'], 'NUREMBERG')
+        self.assertEqual(status['sites'], {
+            '1': {'site_name': 'NUREMBERG', 'replication_mode': 'PRIMARY'},
+            '2': {
+                'site_name': 'PRAGUE', 'source_site_id': '1', 'replication_mode': 'SYNC',
+                'replication_status': 'ACTIVE'}
+        })
+        self.assertEqual(len(status['services']), 2)
+        self.assertEqual(status['services'][0], {
+            'host': 'hana01',
+            'port': 30001,
+            'database': 'SYSTEMDB',
+            'service_name': 'nameserver',
+            'site_id': '1',
+            'site_name': 'NUREMBERG',
+            'secondary_host': 'hana02',
+            'secondary_port': 30001,
+            'secondary_site_id': '2',
+            'secondary_site_name': 'PRAGUE',
+            'secondary_active_status': 'YES',
+            'replication_mode': 'SYNC',
+            'status': 'ACTIVE',
+            'status_details': '',
+            'shipped_log_position': 38112256,
+            'shipped_log_position_time': '2020-03-10 10:38:13.284573',
+            'last_log_position': 38112256,
+            'last_log_position_time': '2020-03-10 10:38:13.284573',
+            'shipping_delay': 0.0
+        })
+        service = status['services'][1]
+        self.assertEqual(service['host'], 'hana01')
+        self.assertEqual(service['port'], 30007)
+        self.assertEqual(service['service_name'], 'xsengine')
+        self.assertEqual(service['status'], 'SYNCING')
+        self.assertEqual(service['status_details'], 'Full Replica: 25 % (12/48 MB)')
+        self.assertAlmostEqual(service['shipping_delay'], 2.5)
+
+    def test_shipping_delay(self):
+        self.assertIsNone(srstate._shipping_delay(None, '2020-03-10 10:38:13.284573'))
+        self.assertEqual(srstate._shipping_delay(
+            '2020-03-10 10:38:13.284573', '2020-03-10 10:38:13.284573'), 0.0)
+        self.assertAlmostEqual(srstate._shipping_delay(
+            '2020-03-10 11:00:01.500000', '2020-03-10 10:59:59.000000'), 2.5)
+        self.assertAlmostEqual(srstate._shipping_delay(
+            '2020-03-11 00:00:01.000000', '2020-03-10 23:59:59.500000'), 1.5)
+
+    def test_parse_replication_status_missing_fields(self):
+        status = srstate.parse_replication_status(
+            'service/hana01/30001/REPLICATION_STATUS=ERROR\n'
+            'service/hana01/30001/LAST_LOG_POSITION_TIME=invalid\n'
+            'service/hana01/30001/SHIPPED_LOG_POSITION_TIME=2020-03-10 10:38:13\n')
+        service = status['services'][0]
+        self.assertEqual(service['status'], 'ERROR')
+        self.assertIsNone(service['replication_mode'])
+        self.assertIsNone(service['shipped_log_position'])
+        self.assertIsNone(service['shipping_delay'])
@@ -0,0 +1,170 @@
+"""
+Unitary tests for sshpool.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import sshpool
+
+class TestSshSessionPool(unittest.TestCase):
+    """
+    Unitary tests for sshpool.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    def setUp(self):
+        """
+        Test setUp.
+        """
+        self._pool = sshpool.SshSessionPool(
+            control_dir='/tmp/sockets', max_sessions=2, idle_timeout=60)
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_init_error(self):
+        with self.assertRaises(ValueError) as err:
+            sshpool.SshSessionPool(max_sessions=0)
+        self.assertTrue('max_sessions must be greater than 0' in str(err.exception))
+
+    @mock.patch('tempfile.mkdtemp')
+    def test_control_dir(self, mock_mkdtemp):
+        mock_mkdtemp.return_value = '/tmp/new'
+        pool = sshpool.SshSessionPool()
+        self.assertEqual('/tmp/new', pool.control_dir)
+        self.assertEqual('/tmp/new', pool.control_dir)
+        mock_mkdtemp.assert_called_once_with(prefix='shaptools-ssh-')
+
+    @mock.patch('time.time')
+    def test_ssh_options(self, mock_time):
+        mock_time.return_value = 10
+        options = self._pool.ssh_options('user', 'host')
+        control_path = self._pool._control_path('user', 'host')
+        self.assertEqual(
+            '-o ControlMaster=auto -o ControlPath={} -o ControlPersist=60'.format(control_path),
+            options)
+        self.assertTrue(control_path.startswith('/tmp/sockets/'))
+        self.assertEqual(options, self._pool.ssh_options('user', 'host'))
+        self.assertEqual([('user', 'host')], self._pool.sessions)
+        self.assertEqual(2, self._pool._sessions[('user', 'host')].uses)
+
+    def test_control_path(self):
+        self.assertNotEqual(
+            self._pool._control_path('user', 'host1'), self._pool._control_path('user', 'host2'))
+
+    @mock.patch('os.path.exists')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('time.time')
+    def test_ssh_options_max_sessions(self, mock_time, mock_popen, mock_exists):
+        mock_exists.return_value = True
+        mock_popen.return_value.communicate.return_value = (b'', b'')
+        mock_time.return_value = 1
+        self._pool.ssh_options('user', 'host1')
+        mock_time.return_value = 2
+        self._pool.ssh_options('user', 'host2')
+        mock_time.return_value = 3
+        self._pool.ssh_options('user', 'host3')
+
+        self.assertEqual(
+            sorted([('user', 'host2'), ('user', 'host3')]), sorted(self._pool.sessions))
+        mock_popen.assert_called_once_with(
+            ['ssh', '-O', 'stop', '-o',
+             'ControlPath={}'.format(self._pool._control_path('user', 'host1')), 'user@host1'],
+            stdout=mock.ANY, stderr=mock.ANY)
+
+    @mock.patch('os.path.exists')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('time.time')
+    def test_evict_idle(self, mock_time, mock_popen, mock_exists):
+        mock_exists.return_value = False
+        mock_time.return_value = 1
+        self._pool.ssh_options('user', 'host1')
+        mock_time.return_value = 50
+        self._pool.ssh_options('user', 'host2')
+        mock_time.return_value = 100
+        self._pool.evict_idle()
+        self.assertEqual([('user', 'host2')], self._pool.sessions)
+        self.assertEqual(0, mock_popen.call_count)
+
+    @mock.patch('os.path.exists')
+    @mock.patch('subprocess.Popen')
+    def test_close(self, mock_popen, mock_exists):
+        mock_exists.return_value = True
+        mock_popen.return_value.communicate.return_value = (b'', b'')
+        self._pool.ssh_options('user', 'host1')
+        self._pool.ssh_options('user', 'host2')
+        self._pool.close('user', 'host1')
+        self._pool.close('user', 'other')
+        self.assertEqual([('user', 'host2')], self._pool.sessions)
+        self._pool.close_all()
+        self.assertEqual([], self._pool.sessions)
+        self.assertEqual(2, mock_popen.call_count)
+        mock_popen.assert_called_with(
+            ['ssh', '-O', 'exit', '-o',
+             'ControlPath={}'.format(self._pool._control_path('user', 'host2')), 'user@host2'],
+            stdout=mock.ANY, stderr=mock.ANY)
+
+    @mock.patch('subprocess.Popen')
+    def test_close_outside_lock(self, mock_popen):
+        # The control command can't block the pool, as it runs after releasing the lock
+        def _communicate():
+            self.assertTrue(self._pool._lock.acquire(False))
+            self._pool._lock.release()
+            return (b'', b'')
+
+        mock_popen.return_value.communicate.side_effect = _communicate
+        self._pool.ssh_options('user', 'host1')
+        with mock.patch('os.path.exists', return_value=True):
+            self._pool.close('user', 'host1')
+        self.assertEqual(1, mock_popen.call_count)
+
+    @mock.patch('os.path.exists')
+    @mock.patch('subprocess.Popen')
+    def test_close_all_control_dir(self, mock_popen, mock_exists):
+        mock_exists.return_value = False
+        pool = sshpool.SshSessionPool()
+        control_dir = pool.control_dir
+        pool.ssh_options('user', 'host1')
+        self.assertTrue(os.path.isdir(control_dir))
+        pool.close_all()
+        self.assertFalse(os.path.isdir(control_dir))
+        self.assertNotEqual(control_dir, pool.control_dir)
+        pool.close_all()
+
+        # The folders provided by the user are kept
+        with mock.patch('shutil.rmtree') as mock_rmtree:
+            self._pool.close_all()
+        self.assertFalse(mock_rmtree.called)
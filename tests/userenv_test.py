@@ -0,0 +1,222 @@
+"""
+Unitary tests for userenv.py.
+
+:author: xarbulu
+:organization: SUSE LLC
+:contact: xarbulu@suse.com
+
+:since: 2026-10-17
+"""
+
+# pylint:disable=C0103,C0111,W0212,W0611
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import unittest
+import subprocess
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from shaptools import userenv, shell
+
+class TestUserEnvironment(unittest.TestCase):
+    """
+    Unitary tests for userenv.py.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Global setUp.
+        """
+
+        logging.basicConfig(level=logging.INFO)
+
+    @mock.patch('pwd.getpwnam')
+    def setUp(self, mock_getpwnam):
+        """
+        Test setUp.
+        """
+        mock_getpwnam.return_value = mock.Mock(pw_uid=1001, pw_gid=79, pw_dir='/home/prdadm')
+        self._env = userenv.UserEnvironment('prdadm', 'pass', watch_paths=['/manifest'])
+
+    def tearDown(self):
+        """
+        Test tearDown.
+        """
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Global tearDown.
+        """
+
+    def test_init(self):
+        self.assertEqual('prdadm', self._env.user)
+        self.assertEqual(1001, self._env._uid)
+        self.assertEqual(79, self._env._gid)
+        self.assertEqual('/home/prdadm', self._env._home)
+        self.assertIsNone(self._env.env)
+
+    @mock.patch('os.stat')
+    def test_get_fingerprint(self, mock_stat):
+        self._env.watch_paths = ['/path1', '/path2']
+        mock_stat.side_effect = [mock.Mock(st_mtime=10), OSError]
+        self.assertEqual([10, None], self._env._get_fingerprint())
+        mock_stat.assert_has_calls([mock.call('/path1'), mock.call('/path2')])
+
+    @mock.patch('shaptools.shell.log_command_results')
+    @mock.patch('subprocess.Popen')
+    def test_capture(self, mock_popen, mock_log):
+        self._env._get_fingerprint = mock.Mock(return_value=[10])
+        self._env._executables = {'ls': '/bin/ls'}
+        mock_popen.return_value.communicate.return_value = (
+            b'PATH=/bin:/usr/bin\0_=/usr/bin/env\0SHLVL=1\0VAR=a=b\0', b'')
+        mock_popen.return_value.returncode = 0
+        self._env.capture()
+        mock_popen.assert_called_once_with(
+            ['su', '-lc', 'env -0', 'prdadm'],
+            stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        mock_popen.return_value.communicate.assert_called_once_with(input=b'pass')
+        mock_log.assert_not_called()
+        self.assertEqual({'PATH': '/bin:/usr/bin', 'VAR': 'a=b'}, self._env.env)
+        self.assertEqual({}, self._env._executables)
+        self.assertEqual([10], self._env._fingerprint)
+
+    @mock.patch('subprocess.Popen')
+    def test_capture_error(self, mock_popen):
+        mock_popen.return_value.communicate.return_value = (b'', b'error')
+        mock_popen.return_value.returncode = 1
+        with self.assertRaises(shell.ShellError) as err:
+            self._env.capture()
+        self.assertTrue('error capturing prdadm environment' in str(err.exception))
+
+    def test_is_valid(self):
+        self._env._get_fingerprint = mock.Mock(return_value=[10])
+        self.assertFalse(self._env.is_valid())
+        self._env.env = {}
+        self._env._fingerprint = [10]
+        self.assertTrue(self._env.is_valid())
+        self._env._get_fingerprint.return_value = [11]
+        self.assertFalse(self._env.is_valid())
+
+    @mock.patch('os.access')
+    @mock.patch('os.path.isfile')
+    def test_which(self, mock_isfile, mock_access):
+        self._env.env = {'PATH': '/exe:/usr/bin'}
+        mock_isfile.side_effect = [False, True]
+        mock_access.return_value = True
+        self.assertEqual('/usr/bin/HDB', self._env.which('HDB'))
+        self.assertEqual('/usr/bin/HDB', self._env.which('HDB'))
+        self.assertEqual('/abs/HDB', self._env.which('/abs/HDB'))
+        mock_isfile.assert_has_calls([mock.call('/exe/HDB'), mock.call('/usr/bin/HDB')])
+        mock_access.assert_called_once_with('/usr/bin/HDB', os.X_OK)
+
+        mock_isfile.side_effect = None
+        mock_isfile.return_value = False
+        self.assertIsNone(self._env.which('other'))
+
+    @mock.patch('shaptools.shell.ProcessResult')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.getuid')
+    def test_execute(self, mock_getuid, mock_popen, mock_process):
+        self._env.is_valid = mock.Mock(return_value=True)
+        self._env.env = {'PATH': '/exe'}
+        self._env.which = mock.Mock(return_value='/exe/hdbnsutil')
+        mock_getuid.return_value = 0
+        mock_popen.return_value.communicate.return_value = (b'out', b'err')
+        mock_popen.return_value.returncode = 0
+
+        result = self._env.execute('hdbnsutil -sr_state')
+
+        self._env.which.assert_called_once_with('hdbnsutil')
+        mock_popen.assert_called_once_with(
+            ['/exe/hdbnsutil', '-sr_state'], env={'PATH': '/exe'}, cwd='/home/prdadm',
+            preexec_fn=self._env._demote, stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        mock_popen.return_value.communicate.assert_called_once_with()
+        mock_process.assert_called_once_with(
+            'su -lc "hdbnsutil -sr_state" prdadm', 0, b'out', b'err')
+        self.assertEqual(mock_process.return_value, result)
+
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.getuid')
+    def test_execute_same_user(self, mock_getuid, mock_popen):
+        self._env.is_valid = mock.Mock(return_value=True)
+        self._env.env = {}
+        self._env.which = mock.Mock(return_value='/exe/hdbsql')
+        mock_getuid.return_value = 1001
+        mock_popen.return_value.communicate.return_value = (b'', b'')
+
+        self._env.execute('hdbsql -U key \\"SELECT 1 FROM DUMMY\\"')
+
+        mock_popen.assert_called_once_with(
+            ['/exe/hdbsql', '-U', 'key', 'SELECT 1 FROM DUMMY'], env={}, cwd='/home/prdadm',
+            preexec_fn=None, stdout=subprocess.PIPE, stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+
+    @mock.patch('shaptools.shell.new_session_preexec')
+    @mock.patch('shaptools.shell.Watchdog')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.getuid')
+    def test_execute_timeout(self, mock_getuid, mock_popen, mock_watchdog, mock_preexec):
+        self._env.is_valid = mock.Mock(return_value=True)
+        self._env.env = {}
+        self._env.which = mock.Mock(return_value='/exe/HDB')
+        mock_getuid.return_value = 0
+        mock_popen.return_value.communicate.return_value = (b'', b'')
+        mock_watchdog.return_value.__enter__.return_value.expired = True
+
+        with self.assertRaises(shell.ShellTimeoutError) as err:
+            self._env.execute('HDB version', timeout=5)
+
+        mock_preexec.assert_called_once_with(self._env._demote)
+        mock_popen.assert_called_once_with(
+            ['/exe/HDB', 'version'], env={}, cwd='/home/prdadm',
+            preexec_fn=mock_preexec.return_value, stdout=subprocess.PIPE,
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        mock_watchdog.assert_called_once_with(mock_popen.return_value, 5)
+        self.assertEqual('su -lc "HDB version" prdadm', err.exception.cmd)
+
+    @mock.patch('shaptools.shell.execute_cmd')
+    @mock.patch('subprocess.Popen')
+    @mock.patch('os.getuid')
+    def test_execute_fallback(self, mock_getuid, mock_popen, mock_execute):
+        self._env.capture = mock.Mock()
+        self._env.env = {}
+        self._env.which = mock.Mock(return_value='/exe/HDBSettings.sh')
+        mock_getuid.return_value = 0
+
+        result = self._env.execute('HDBSettings.sh systemReplicationStatus.py; echo $?')
+        self._env.capture.assert_called_once_with()
+        mock_execute.assert_called_once_with(
+            'HDBSettings.sh systemReplicationStatus.py; echo $?', 'prdadm', 'pass')
+        self.assertEqual(mock_execute.return_value, result)
+
+        mock_execute.reset_mock()
+        self._env.which.return_value = None
+        self._env.execute('unknown')
+        mock_execute.assert_called_once_with('unknown', 'prdadm', 'pass')
+
+        mock_execute.reset_mock()
+        self._env.which.return_value = '/exe/HDB'
+        mock_getuid.return_value = 500
+        self._env.execute('HDB version')
+        mock_execute.assert_called_once_with('HDB version', 'prdadm', 'pass')
+
+        self.assertEqual(0, mock_popen.call_count)
+
+    @mock.patch('os.setuid')
+    @mock.patch('os.setgid')
+    @mock.patch('os.initgroups')
+    def test_demote(self, mock_initgroups, mock_setgid, mock_setuid):
+        self._env._demote()
+        mock_initgroups.assert_called_once_with('prdadm', 79)
+        mock_setgid.assert_called_once_with(79)
+        mock_setuid.assert_called_once_with(1001)